@@ -1,10 +1,9 @@
-import aiohttp
-
 from astrbot.api import star
 from astrbot.api.event import AstrMessageEvent, MessageEventResult
 from astrbot.core.config.default import VERSION
 from astrbot.core.dashboard_assets import get_dashboard_version
 from astrbot.core.star import command_management
+from astrbot.core.utils.http_client import http_client
 
 
 class HelpCommand:
@@ -13,7 +12,7 @@ class HelpCommand:
 
     async def _query_astrbot_notice(self):
         try:
-            async with aiohttp.ClientSession(trust_env=True) as session:
+            async with http_client.session(trust_env=True) as session:
                 async with session.get(
                     "https://astrbot.app/notice.json",
                     timeout=2,
@@ -5,7 +5,7 @@ import sys
 import click
 
 from . import __version__
-from .commands import conf, init, password, plug, run
+from .commands import conf, init, kb, password, plug, run
 
 logo_tmpl = r"""
      ___           _______.___________..______      .______     ______   .___________.
@@ -55,6 +55,7 @@ cli.add_command(help)
 cli.add_command(plug)
 cli.add_command(conf)
 cli.add_command(password)
+cli.add_command(kb)
 
 if __name__ == "__main__":
     cli()
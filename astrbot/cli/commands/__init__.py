@@ -1,7 +1,8 @@
 from .cmd_conf import conf
 from .cmd_init import init
+from .cmd_kb import kb
 from .cmd_password import password
 from .cmd_plug import plug
 from .cmd_run import run
 
-__all__ = ["conf", "init", "password", "plug", "run"]
+__all__ = ["conf", "init", "kb", "password", "plug", "run"]
@@ -0,0 +1,129 @@
+import asyncio
+import sqlite3
+
+import click
+
+from ..utils import check_astrbot_root, get_astrbot_root
+
+
+def _load_index_settings(kb_db_path, kb_id: str) -> dict:
+    """Read the stored index settings of a knowledge base from kb.db"""
+    conn = sqlite3.connect(kb_db_path)
+    try:
+        row = conn.execute(
+            "SELECT index_type, index_nprobe, index_ef_search "
+            "FROM knowledge_bases WHERE kb_id = ?",
+            (kb_id,),
+        ).fetchone()
+    except sqlite3.OperationalError:
+        row = None
+    finally:
+        conn.close()
+    if not row:
+        return {}
+    return {
+        key: value
+        for key, value in zip(("index_type", "nprobe", "ef_search"), row)
+        if value is not None
+    }
+
+
+async def _evaluate(index_path: str, options, samples: int, k: int) -> dict:
+    from astrbot.core.db.vec_db.faiss_impl.embedding_storage import (
+        EmbeddingStorage,
+    )
+
+    storage = EmbeddingStorage(0, index_path, options)
+    # Use the dimension stored in the existing index file
+    storage.dimension = storage.index.d
+    if storage.ann_index is None:
+        click.echo(
+            f"Building {options.index_type} index from {storage.index.ntotal} vectors...",
+        )
+        vectors, ids = storage._export_vectors()
+        storage.ann_index = await asyncio.to_thread(
+            storage._train_ann_index,
+            vectors,
+            ids,
+        )
+    return await storage.evaluate_ann(sample_size=samples, k=k)
+
+
+@click.group(name="kb")
+def kb() -> None:
+    """Knowledge base maintenance tools"""
+
+
+@kb.command(name="ann-check")
+@click.argument("kb_id")
+@click.option(
+    "--index-type",
+    type=click.Choice(["hnsw", "ivf_flat", "ivf_pq"]),
+    help="Index type to check. Defaults to the knowledge base's configured type.",
+)
+@click.option("--nprobe", type=int, help="IVF nprobe override")
+@click.option("--ef-search", type=int, help="HNSW efSearch override")
+@click.option(
+    "--samples",
+    default=100,
+    show_default=True,
+    help="Number of sample queries",
+)
+@click.option(
+    "-k",
+    "top_k",
+    default=10,
+    show_default=True,
+    help="Neighbours per query",
+)
+def ann_check(
+    kb_id: str,
+    index_type: str | None,
+    nprobe: int | None,
+    ef_search: int | None,
+    samples: int,
+    top_k: int,
+) -> None:
+    """Compare ANN index recall and latency against the flat index.
+
+    Stored vectors are sampled as queries, so no embedding provider is needed.
+    """
+    from astrbot.core.db.vec_db.faiss_impl.embedding_storage import (
+        AnnIndexOptions,
+    )
+
+    root = get_astrbot_root()
+    if not check_astrbot_root(root):
+        raise click.ClickException(
+            f"{root} is not a valid AstrBot root directory. Use 'astrbot init' to initialize",
+        )
+    kb_root = root / "data" / "knowledge_base"
+    index_path = kb_root / kb_id / "index.faiss"
+    if not index_path.exists():
+        raise click.ClickException(f"Index file not found: {index_path}")
+
+    settings = _load_index_settings(kb_root / "kb.db", kb_id)
+    if index_type:
+        settings["index_type"] = index_type
+    if nprobe is not None:
+        settings["nprobe"] = nprobe
+    if ef_search is not None:
+        settings["ef_search"] = ef_search
+    if settings.get("index_type", "flat") == "flat":
+        raise click.ClickException(
+            "The knowledge base uses a flat index. "
+            "Pass --index-type to check an ANN index.",
+        )
+    options = AnnIndexOptions(min_train_size=0, **settings)
+
+    try:
+        report = asyncio.run(_evaluate(str(index_path), options, samples, top_k))
+    except ValueError as e:
+        raise click.ClickException(str(e))
+
+    click.echo(f"Index type:      {report['index_type']}")
+    click.echo(f"Vectors:         {report['ntotal']}")
+    click.echo(f"Sample queries:  {report['samples']} (k={report['k']})")
+    click.echo(f"Recall@{report['k']}:       {report['recall']:.4f}")
+    click.echo(f"Flat latency:    {report['flat_latency_ms']:.3f} ms/query")
+    click.echo(f"ANN latency:     {report['ann_latency_ms']:.3f} ms/query")
@@ -1,5 +1,12 @@
+import hashlib
 import json
-from typing import Protocol, runtime_checkable
+import os
+import re
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Protocol, runtime_checkable
+
+from astrbot import logger
 
 from ..message import AudioURLPart, ImageURLPart, Message, TextPart, ThinkPart
 
@@ -35,14 +42,56 @@ IMAGE_TOKEN_ESTIMATE = 765
 AUDIO_TOKEN_ESTIMATE = 500
 
 
-class EstimateTokenCounter:
-    """Estimate token counter implementation.
-    Provides a simple estimation of token count based on character types.
+# 单个计数器缓存的文本条目数上限
+TOKEN_CACHE_MAX_ENTRIES = 8192
 
-    Supports multimodal content: images, audio, and thinking parts
-    are all counted so that the context compressor can trigger in time.
+_CJK_PATTERN = re.compile("[\u4e00-\u9fff]")
+
+
+def _text_digest(text: str) -> bytes:
+    return hashlib.blake2b(
+        text.encode("utf-8", "surrogatepass"), digest_size=16
+    ).digest()
+
+
+class _CountCache:
+    """按文本摘要缓存 token 数的 LRU 缓存.
+
+    键为文本的 16 字节 blake2b 摘要而不是文本本身, 缓存不会让已离开上下文的
+    完整消息文本一直驻留在内存中。摘要计算远快于 BPE 分词, 未改变的历史消息
+    仍不会被重新计数。
     """
 
+    def __init__(self, max_entries: int = TOKEN_CACHE_MAX_ENTRIES) -> None:
+        self.max_entries = max_entries
+        self._entries: OrderedDict[bytes, int] = OrderedDict()
+
+    def get(self, key: bytes) -> int | None:
+        count = self._entries.get(key)
+        if count is not None:
+            self._entries.move_to_end(key)
+        return count
+
+    def put(self, key: bytes, count: int) -> None:
+        self._entries[key] = count
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class _CachedTokenCounter(ABC):
+    """遍历消息并按文本缓存计数结果的 token 计数器基类."""
+
+    tokens_per_message = 0
+    """每条消息的固定开销 (角色、分隔符等)."""
+
+    def __init__(self) -> None:
+        self._text_cache = _CountCache()
+        # id(tool_call) -> (tool_call, token 数), 保留引用以避免 id 被复用
+        self._tool_call_cache: OrderedDict[int, tuple[Any, int]] = OrderedDict()
+
     def count_tokens(
         self, messages: list[Message], trusted_token_usage: int = 0
     ) -> int:
@@ -51,15 +100,16 @@ class EstimateTokenCounter:
 
         total = 0
         for msg in messages:
+            total += self.tokens_per_message
             content = msg.content
             if isinstance(content, str):
-                total += self._estimate_tokens(content)
+                total += self._count_text_cached(content)
             elif isinstance(content, list):
                 for part in content:
                     if isinstance(part, TextPart):
-                        total += self._estimate_tokens(part.text)
+                        total += self._count_text_cached(part.text)
                     elif isinstance(part, ThinkPart):
-                        total += self._estimate_tokens(part.think)
+                        total += self._count_text_cached(part.think)
                     elif isinstance(part, ImageURLPart):
                         total += IMAGE_TOKEN_ESTIMATE
                     elif isinstance(part, AudioURLPart):
@@ -67,12 +117,190 @@ class EstimateTokenCounter:
 
             if msg.tool_calls:
                 for tc in msg.tool_calls:
-                    tc_str = json.dumps(tc if isinstance(tc, dict) else tc.model_dump())
-                    total += self._estimate_tokens(tc_str)
+                    total += self._count_tool_call(tc)
 
         return total
 
+    def _count_text_cached(self, text: str) -> int:
+        if not text:
+            return 0
+        key = _text_digest(text)
+        count = self._text_cache.get(key)
+        if count is None:
+            count = self._count_text(text)
+            self._text_cache.put(key, count)
+        return count
+
+    def _count_tool_call(self, tc: Any) -> int:
+        cached = self._tool_call_cache.get(id(tc))
+        if cached is not None and cached[0] is tc:
+            self._tool_call_cache.move_to_end(id(tc))
+            return cached[1]
+        tc_str = json.dumps(tc if isinstance(tc, dict) else tc.model_dump())
+        count = self._count_text_cached(tc_str)
+        self._tool_call_cache[id(tc)] = (tc, count)
+        if len(self._tool_call_cache) > TOKEN_CACHE_MAX_ENTRIES:
+            self._tool_call_cache.popitem(last=False)
+        return count
+
+    @abstractmethod
+    def _count_text(self, text: str) -> int:
+        """计算单段文本的 token 数."""
+
+
+class EstimateTokenCounter(_CachedTokenCounter):
+    """Estimate token counter implementation.
+    Provides a simple estimation of token count based on character types.
+
+    Supports multimodal content: images, audio, and thinking parts
+    are all counted so that the context compressor can trigger in time.
+    """
+
+    def _count_text(self, text: str) -> int:
+        return self._estimate_tokens(text)
+
     def _estimate_tokens(self, text: str) -> int:
-        chinese_count = len([c for c in text if "\u4e00" <= c <= "\u9fff"])
+        chinese_count = len(text) - len(_CJK_PATTERN.sub("", text))
         other_count = len(text) - chinese_count
         return int(chinese_count * 0.6 + other_count * 0.3)
+
+
+class BPETokenCounter(_CachedTokenCounter):
+    """Token counter backed by a tiktoken BPE encoding.
+
+    Counts are exact for models that use the encoding and a close
+    approximation for other BPE-based models.
+    """
+
+    tokens_per_message = 3
+
+    def __init__(self, encoding: Any) -> None:
+        super().__init__()
+        self.encoding = encoding
+
+    def _count_text(self, text: str) -> int:
+        return len(self.encoding.encode_ordinary(text))
+
+
+# BPE 计数需要安装可选依赖 tiktoken: pip install "AstrBot[tokenizer]"。
+# 词表按以下顺序查找:
+#   1. 本地词表文件 <词表目录>/<encoding>.tiktoken, 词表目录默认为
+#      data/tiktoken, 可通过环境变量 ASTRBOT_TIKTOKEN_DIR 指定 (适合离线部署);
+#   2. tiktoken.get_encoding(), 首次使用时由 tiktoken 下载并缓存词表
+#      (缓存目录可通过 TIKTOKEN_CACHE_DIR 指定)。
+# 两者都不可用时回退到 EstimateTokenCounter。
+BPE_VOCAB_DIR_ENV = "ASTRBOT_TIKTOKEN_DIR"
+
+_CL100K_PAT = (
+    r"""(?i:'s|'t|'re|'ve|'m|'ll|'d)|[^\r\n\p{L}\p{N}]?\p{L}+|\p{N}{1,3}|"""
+    r""" ?[^\s\p{L}\p{N}]+[\r\n]*|\s*[\r\n]+|\s+(?!\S)|\s+"""
+)
+_O200K_PAT = "|".join(
+    [
+        r"""[^\r\n\p{L}\p{N}]?[\p{Lu}\p{Lt}\p{Lm}\p{Lo}\p{M}]*"""
+        r"""[\p{Ll}\p{Lm}\p{Lo}\p{M}]+(?i:'s|'t|'re|'ve|'m|'ll|'d)?""",
+        r"""[^\r\n\p{L}\p{N}]?[\p{Lu}\p{Lt}\p{Lm}\p{Lo}\p{M}]+"""
+        r"""[\p{Ll}\p{Lm}\p{Lo}\p{M}]*(?i:'s|'t|'re|'ve|'m|'ll|'d)?""",
+        r"""\p{N}{1,3}""",
+        r""" ?[^\s\p{L}\p{N}]+[\r\n/]*""",
+        r"""\s*[\r\n]+""",
+        r"""\s+(?!\S)""",
+        r"""\s+""",
+    ]
+)
+# encoding -> (分词正则, 特殊 token)
+BPE_ENCODINGS: dict[str, tuple[str, dict[str, int]]] = {
+    "cl100k_base": (_CL100K_PAT, {"<|endoftext|>": 100257}),
+    "o200k_base": (_O200K_PAT, {"<|endoftext|>": 199999}),
+}
+# 按模型名前缀选择 encoding, 未匹配的模型使用 DEFAULT_BPE_ENCODING 近似
+MODEL_ENCODING_PREFIXES: tuple[tuple[str, str], ...] = (
+    ("gpt-4o", "o200k_base"),
+    ("chatgpt-4o", "o200k_base"),
+    ("gpt-4.1", "o200k_base"),
+    ("gpt-4.5", "o200k_base"),
+    ("gpt-5", "o200k_base"),
+    ("o1", "o200k_base"),
+    ("o3", "o200k_base"),
+    ("o4", "o200k_base"),
+    ("gpt-oss", "o200k_base"),
+    ("gpt-4", "cl100k_base"),
+    ("gpt-3.5", "cl100k_base"),
+)
+DEFAULT_BPE_ENCODING = "cl100k_base"
+
+# encoding 名称 -> 计数器; None 表示该 encoding 不可用
+_bpe_counters: dict[str, BPETokenCounter | None] = {}
+_estimate_counter = EstimateTokenCounter()
+_estimate_fallback_logged = False
+
+
+def encoding_for_model(model: str | None) -> str:
+    """Return the BPE encoding name used to count tokens for a model."""
+    name = (model or "").lower().rsplit("/", 1)[-1]
+    for prefix, encoding in MODEL_ENCODING_PREFIXES:
+        if name.startswith(prefix):
+            return encoding
+    return DEFAULT_BPE_ENCODING
+
+
+def _bpe_vocab_dir() -> str:
+    vocab_dir = os.environ.get(BPE_VOCAB_DIR_ENV)
+    if vocab_dir:
+        return vocab_dir
+    from astrbot.core.utils.astrbot_path import get_astrbot_data_path
+
+    return os.path.join(get_astrbot_data_path(), "tiktoken")
+
+
+def _load_bpe_counter(encoding_name: str) -> BPETokenCounter | None:
+    try:
+        import tiktoken
+        from tiktoken.load import load_tiktoken_bpe
+    except ImportError:
+        return None
+
+    vocab_path = os.path.join(_bpe_vocab_dir(), f"{encoding_name}.tiktoken")
+    if not os.path.isfile(vocab_path):
+        return BPETokenCounter(tiktoken.get_encoding(encoding_name))
+
+    pat_str, special_tokens = BPE_ENCODINGS[encoding_name]
+    encoding = tiktoken.Encoding(
+        name=encoding_name,
+        pat_str=pat_str,
+        mergeable_ranks=load_tiktoken_bpe(vocab_path),
+        special_tokens=special_tokens,
+    )
+    return BPETokenCounter(encoding)
+
+
+def get_token_counter(model: str | None = None) -> TokenCounter:
+    """Return a shared token counter for the given model.
+
+    Uses the model's BPE encoding when tiktoken is installed, loading the
+    vocabulary from the local vocabulary directory if present and from
+    tiktoken's own cache otherwise. Falls back to EstimateTokenCounter
+    when neither is available. Counters are shared so their caches are
+    reused across requests.
+    """
+    global _estimate_fallback_logged
+
+    encoding_name = encoding_for_model(model)
+    if encoding_name not in _bpe_counters:
+        try:
+            _bpe_counters[encoding_name] = _load_bpe_counter(encoding_name)
+        except Exception as e:
+            logger.debug(f"Failed to load BPE encoding {encoding_name}: {e}")
+            _bpe_counters[encoding_name] = None
+    bpe_counter = _bpe_counters[encoding_name]
+    if bpe_counter is not None:
+        return bpe_counter
+    if not _estimate_fallback_logged:
+        _estimate_fallback_logged = True
+        logger.info(
+            f"BPE encoding {encoding_name} is unavailable, token counts are "
+            'estimated. Install it with pip install "AstrBot[tokenizer]", or '
+            f"put {encoding_name}.tiktoken under {_bpe_vocab_dir()} "
+            f"(set {BPE_VOCAB_DIR_ENV} to change the directory) for offline use."
+        )
+    return _estimate_counter
@@ -808,6 +808,9 @@ class MCPTool(FunctionTool, Generic[TContext]):
             parameters=_normalize_mcp_input_schema(mcp_tool.inputSchema),
         )
         self.mcp_tool = mcp_tool
+        # Read-only MCP tools can be called concurrently on the same session.
+        annotations = getattr(mcp_tool, "annotations", None)
+        self.parallel_safe = bool(annotations and annotations.readOnlyHint)
         self.mcp_client = mcp_client
         self.mcp_server_name = mcp_server_name
 
@@ -50,7 +50,11 @@ from astrbot.core.provider.provider import Provider
 from ..context.compressor import ContextCompressor
 from ..context.config import ContextConfig
 from ..context.manager import ContextManager
-from ..context.token_counter import EstimateTokenCounter, TokenCounter
+from ..context.token_counter import (
+    EstimateTokenCounter,
+    TokenCounter,
+    get_token_counter,
+)
 from ..hooks import BaseAgentRunHooks
 from ..message import (
     AssistantMessageSegment,
@@ -229,6 +233,8 @@ class ToolLoopAgentRunner(BaseAgentRunner[TContext]):
         request_max_retries: int | None = None,
         tool_result_overflow_dir: str | None = None,
         read_tool: FunctionTool | None = None,
+        # max concurrent parallel-safe tool calls in one run, <=1 runs tools one by one
+        max_parallel_tool_calls: int = 4,
         **kwargs: T.Any,
     ) -> None:
         self.req = request
@@ -243,6 +249,8 @@ class ToolLoopAgentRunner(BaseAgentRunner[TContext]):
         self.request_max_retries = request_max_retries
         self.tool_result_overflow_dir = tool_result_overflow_dir
         self.read_tool = read_tool
+        self.max_parallel_tool_calls = max_parallel_tool_calls
+        self._tool_call_semaphore = asyncio.Semaphore(max(1, max_parallel_tool_calls))
         self._tool_result_token_counter = EstimateTokenCounter()
         self.request_context_manager_config = ContextConfig(
             # <=0 disables token-based guarding.
@@ -253,7 +261,8 @@ class ToolLoopAgentRunner(BaseAgentRunner[TContext]):
             llm_compress_instruction=self.llm_compress_instruction,
             llm_compress_keep_recent_ratio=self.llm_compress_keep_recent_ratio,
             llm_compress_provider=self.llm_compress_provider,
-            custom_token_counter=self.custom_token_counter,
+            custom_token_counter=self.custom_token_counter
+            or get_token_counter(provider.get_model()),
             custom_compressor=self.custom_compressor,
         )
         self.request_context_manager = ContextManager(
@@ -1086,272 +1095,425 @@ class ToolLoopAgentRunner(BaseAgentRunner[TContext]):
             async for resp in self.step():
                 yield resp
 
-    async def _handle_function_tools(
+    def _resolve_func_tool(
         self,
         req: ProviderRequest,
-        llm_response: LLMResponse,
-    ) -> T.AsyncGenerator[_HandleFunctionToolsResult, None]:
-        """处理函数工具调用。"""
-        tool_call_result_blocks: list[ToolCallMessageSegment] = []
-        logger.info(f"Agent 使用工具: {llm_response.tools_call_name}")
+        func_tool_name: str,
+    ) -> tuple[FunctionTool | None, list[str]]:
+        """查找工具调用对应的工具, 同时返回可用的工具名称列表。"""
+        if not req.func_tool:
+            return None, []
+        if self.tool_schema_mode == "skills_like" and self._skill_like_raw_tool_set:
+            # in 'skills_like' mode, raw.func_tool is light schema, does not have handler
+            # so we need to get the tool from the raw tool set
+            return (
+                self._skill_like_raw_tool_set.get_tool(func_tool_name),
+                self._skill_like_raw_tool_set.names(),
+            )
+        return req.func_tool.get_tool(func_tool_name), req.func_tool.names()
 
-        def _append_tool_call_result(tool_call_id: str, content: str) -> None:
+    def _group_tool_calls(
+        self,
+        req: ProviderRequest,
+        tool_calls: list[tuple[str, T.Any, str]],
+    ) -> list[list[tuple[str, T.Any, str]]]:
+        """将连续调用的可并行工具分为一组, 其余工具调用各自单独成组。"""
+        groups: list[tuple[bool, list[tuple[str, T.Any, str]]]] = []
+        for tool_call in tool_calls:
+            func_tool, _ = self._resolve_func_tool(req, tool_call[0])
+            parallel_safe = (
+                self.max_parallel_tool_calls > 1
+                and getattr(func_tool, "parallel_safe", False) is True
+            )
+            if parallel_safe and groups and groups[-1][0]:
+                groups[-1][1].append(tool_call)
+            else:
+                groups.append((parallel_safe, [tool_call]))
+        return [calls for _, calls in groups]
+
+    @staticmethod
+    def _build_tool_call_chain(
+        func_tool_id: str,
+        func_tool_name: str,
+        func_tool_args: T.Any,
+    ) -> _HandleFunctionToolsResult:
+        return _HandleFunctionToolsResult.from_message_chain(
+            MessageChain(
+                type="tool_call",
+                chain=[
+                    Json(
+                        data={
+                            "id": func_tool_id,
+                            "name": func_tool_name,
+                            "args": func_tool_args,
+                            "ts": time.time(),
+                        }
+                    )
+                ],
+            )
+        )
+
+    def _collect_tool_call_results(
+        self,
+        tool_call_result_blocks: list[ToolCallMessageSegment],
+        func_tool_name: str,
+        func_tool_id: str,
+        result_contents: list[str],
+    ) -> _HandleFunctionToolsResult | None:
+        """将一次工具调用的结果加入结果列表, 并返回用于展示的 tool_call_result 消息。"""
+        if not result_contents:
+            return None
+        for content in result_contents:
             tool_call_result_blocks.append(
                 ToolCallMessageSegment(
                     role="tool",
-                    tool_call_id=tool_call_id,
+                    tool_call_id=func_tool_id,
                     content=self._merge_follow_up_notice(content),
                 ),
             )
+        tool_result_content = str(tool_call_result_blocks[-1].content)
+        logger.info(f"Tool `{func_tool_name}` Result: {tool_result_content}")
+        return _HandleFunctionToolsResult.from_message_chain(
+            MessageChain(
+                type="tool_call_result",
+                chain=[
+                    Json(
+                        data={
+                            "id": func_tool_id,
+                            "ts": time.time(),
+                            "result": tool_result_content,
+                        }
+                    )
+                ],
+            )
+        )
 
-        # 执行函数调用
-        for func_tool_name, func_tool_args, func_tool_id in zip(
-            llm_response.tools_call_name,
-            llm_response.tools_call_args,
-            llm_response.tools_call_ids,
-        ):
-            tool_result_blocks_start = len(tool_call_result_blocks)
-            tool_call_streak = self._track_tool_call_streak(
-                func_tool_name,
-                func_tool_args,
+    async def _handle_function_tools(
+        self,
+        req: ProviderRequest,
+        llm_response: LLMResponse,
+    ) -> T.AsyncGenerator[_HandleFunctionToolsResult, None]:
+        """处理函数工具调用。
+
+        连续调用的可并行工具 (parallel_safe) 会并发执行, 并发数受 max_parallel_tool_calls 限制,
+        其余工具逐个执行。无论是否并发, 工具调用的消息与结果都按模型给出的调用顺序返回。
+        """
+        tool_call_result_blocks: list[ToolCallMessageSegment] = []
+        logger.info(f"Agent 使用工具: {llm_response.tools_call_name}")
+
+        tool_calls = list(
+            zip(
+                llm_response.tools_call_name,
+                llm_response.tools_call_args,
+                llm_response.tools_call_ids,
             )
-            yield _HandleFunctionToolsResult.from_message_chain(
-                MessageChain(
-                    type="tool_call",
-                    chain=[
-                        Json(
-                            data={
-                                "id": func_tool_id,
-                                "name": func_tool_name,
-                                "args": func_tool_args,
-                                "ts": time.time(),
-                            }
-                        )
-                    ],
+        )
+        for group in self._group_tool_calls(req, tool_calls):
+            if len(group) == 1:
+                func_tool_name, func_tool_args, func_tool_id = group[0]
+                tool_call_streak = self._track_tool_call_streak(
+                    func_tool_name,
+                    func_tool_args,
+                )
+                yield self._build_tool_call_chain(
+                    func_tool_id, func_tool_name, func_tool_args
                 )
-            )
-            try:
                 if not req.func_tool:
                     return
 
-                if (
-                    self.tool_schema_mode == "skills_like"
-                    and self._skill_like_raw_tool_set
+                result_contents: list[str] = []
+                async for result in self._execute_tool_call(
+                    req,
+                    func_tool_name,
+                    func_tool_args,
+                    func_tool_id,
+                    tool_call_streak,
+                    result_contents,
                 ):
-                    # in 'skills_like' mode, raw.func_tool is light schema, does not have handler
-                    # so we need to get the tool from the raw tool set
-                    func_tool = self._skill_like_raw_tool_set.get_tool(func_tool_name)
-                    available_tools = self._skill_like_raw_tool_set.names()
-                else:
-                    func_tool = req.func_tool.get_tool(func_tool_name)
-                    available_tools = req.func_tool.names()
-
-                #  Some API may return None for tools with no parameters
-                if func_tool_args is None:
-                    func_tool_args = {}
-                logger.info(f"使用工具：{func_tool_name}，参数：{func_tool_args}")
+                    yield result
+                result_chain = self._collect_tool_call_results(
+                    tool_call_result_blocks,
+                    func_tool_name,
+                    func_tool_id,
+                    result_contents,
+                )
+                if result_chain:
+                    yield result_chain
+                continue
 
-                if not func_tool:
-                    logger.warning(f"未找到指定的工具: {func_tool_name}，将跳过。")
-                    _append_tool_call_result(
+            # 并发执行这一组工具调用, 结果按调用顺序返回
+            streaks = [
+                self._track_tool_call_streak(func_tool_name, func_tool_args)
+                for func_tool_name, func_tool_args, _ in group
+            ]
+            for func_tool_name, func_tool_args, func_tool_id in group:
+                yield self._build_tool_call_chain(
+                    func_tool_id, func_tool_name, func_tool_args
+                )
+            buffered_results: list[list[_HandleFunctionToolsResult]] = [
+                [] for _ in group
+            ]
+            group_contents: list[list[str]] = [[] for _ in group]
+            tasks = [
+                asyncio.create_task(
+                    self._run_parallel_tool_call(
+                        req,
+                        *tool_call,
+                        streak,
+                        buffered_results[index],
+                        group_contents[index],
+                    )
+                )
+                for index, (tool_call, streak) in enumerate(zip(group, streaks))
+            ]
+            try:
+                for index, task in enumerate(tasks):
+                    await task
+                    for result in buffered_results[index]:
+                        yield result
+                    func_tool_name, _, func_tool_id = group[index]
+                    result_chain = self._collect_tool_call_results(
+                        tool_call_result_blocks,
+                        func_tool_name,
                         func_tool_id,
-                        f"error: Tool {func_tool_name} not found. Available tools are: {', '.join(available_tools)}",
+                        group_contents[index],
                     )
-                    continue
+                    if result_chain:
+                        yield result_chain
+            finally:
+                await self._finish_tool_call_tasks(tasks)
 
-                valid_params = {}  # 参数过滤：只传递函数实际需要的参数
+        # 处理函数调用响应
+        if tool_call_result_blocks:
+            yield _HandleFunctionToolsResult.from_tool_call_result_blocks(
+                tool_call_result_blocks
+            )
 
-                # 获取实际的 handler 函数
-                if func_tool.handler:
-                    logger.debug(
-                        f"工具 {func_tool_name} 期望的参数: {func_tool.parameters}",
-                    )
-                    if func_tool.parameters and func_tool.parameters.get("properties"):
-                        expected_params = set(func_tool.parameters["properties"].keys())
+    async def _run_parallel_tool_call(
+        self,
+        req: ProviderRequest,
+        func_tool_name: str,
+        func_tool_args: T.Any,
+        func_tool_id: str,
+        tool_call_streak: int,
+        results: list[_HandleFunctionToolsResult],
+        result_contents: list[str],
+    ) -> None:
+        async with self._tool_call_semaphore:
+            if self._is_stop_requested():
+                raise _ToolExecutionInterrupted(
+                    "Tool execution interrupted before the tool call started."
+                )
+            async for result in self._execute_tool_call(
+                req,
+                func_tool_name,
+                func_tool_args,
+                func_tool_id,
+                tool_call_streak,
+                result_contents,
+            ):
+                results.append(result)
 
-                        valid_params = {
-                            k: v
-                            for k, v in func_tool_args.items()
-                            if k in expected_params
-                        }
+    async def _finish_tool_call_tasks(self, tasks: list[asyncio.Task]) -> None:
+        """等待并发的工具调用全部结束。
 
-                    # 记录被忽略的参数
-                    ignored_params = set(func_tool_args.keys()) - set(
-                        valid_params.keys(),
-                    )
-                    if ignored_params:
-                        logger.warning(
-                            f"工具 {func_tool_name} 忽略非期望参数: {ignored_params}",
-                        )
-                else:
-                    # 如果没有 handler（如 MCP 工具），使用所有参数
-                    valid_params = func_tool_args
+        收到停止请求时, 各工具调用会自行中断并关闭执行器; 其他情况 (如出现异常或调用方提前退出)
+        直接取消尚未完成的工具调用。
+        """
+        if not self._is_stop_requested():
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
 
-                try:
-                    await self.agent_hooks.on_tool_start(
-                        self.run_context,
-                        func_tool,
-                        valid_params,
+    async def _execute_tool_call(
+        self,
+        req: ProviderRequest,
+        func_tool_name: str,
+        func_tool_args: T.Any,
+        func_tool_id: str,
+        tool_call_streak: int,
+        result_contents: list[str],
+    ) -> T.AsyncGenerator[_HandleFunctionToolsResult, None]:
+        """执行单个工具调用。
+
+        工具返回的图片通过 cached_image 结果返回, 工具结果文本追加到 result_contents 中。
+        """
+        try:
+            func_tool, available_tools = self._resolve_func_tool(req, func_tool_name)
+
+            #  Some API may return None for tools with no parameters
+            if func_tool_args is None:
+                func_tool_args = {}
+            logger.info(f"使用工具：{func_tool_name}，参数：{func_tool_args}")
+
+            if not func_tool:
+                logger.warning(f"未找到指定的工具: {func_tool_name}，将跳过。")
+                result_contents.append(
+                    f"error: Tool {func_tool_name} not found. Available tools are: {', '.join(available_tools)}",
+                )
+                return
+
+            valid_params = {}  # 参数过滤：只传递函数实际需要的参数
+
+            # 获取实际的 handler 函数
+            if func_tool.handler:
+                logger.debug(
+                    f"工具 {func_tool_name} 期望的参数: {func_tool.parameters}",
+                )
+                if func_tool.parameters and func_tool.parameters.get("properties"):
+                    expected_params = set(func_tool.parameters["properties"].keys())
+
+                    valid_params = {
+                        k: v for k, v in func_tool_args.items() if k in expected_params
+                    }
+
+                # 记录被忽略的参数
+                ignored_params = set(func_tool_args.keys()) - set(
+                    valid_params.keys(),
+                )
+                if ignored_params:
+                    logger.warning(
+                        f"工具 {func_tool_name} 忽略非期望参数: {ignored_params}",
                     )
-                except Exception as e:
-                    logger.error(f"Error in on_tool_start hook: {e}", exc_info=True)
+            else:
+                # 如果没有 handler（如 MCP 工具），使用所有参数
+                valid_params = func_tool_args
 
-                executor = self.tool_executor.execute(
-                    tool=func_tool,
-                    run_context=self.run_context,
-                    **valid_params,  # 只传递有效的参数
+            try:
+                await self.agent_hooks.on_tool_start(
+                    self.run_context,
+                    func_tool,
+                    valid_params,
                 )
+            except Exception as e:
+                logger.error(f"Error in on_tool_start hook: {e}", exc_info=True)
 
-                _final_resp: CallToolResult | None = None
-                async for resp in self._iter_tool_executor_results(executor):  # type: ignore
-                    if isinstance(resp, CallToolResult):
-                        res = resp
-                        _final_resp = resp
-                        if not res.content:
-                            _append_tool_call_result(
-                                func_tool_id,
-                                "The tool returned no content.",
-                            )
-                            continue
+            executor = self.tool_executor.execute(
+                tool=func_tool,
+                run_context=self.run_context,
+                **valid_params,  # 只传递有效的参数
+            )
 
-                        result_parts: list[str] = []
-                        for index, content_item in enumerate(res.content):
-                            if isinstance(content_item, TextContent):
-                                result_parts.append(content_item.text)
-                            elif isinstance(content_item, ImageContent):
+            _final_resp: CallToolResult | None = None
+            async for resp in self._iter_tool_executor_results(executor):  # type: ignore
+                if isinstance(resp, CallToolResult):
+                    res = resp
+                    _final_resp = resp
+                    if not res.content:
+                        result_contents.append("The tool returned no content.")
+                        continue
+
+                    result_parts: list[str] = []
+                    for index, content_item in enumerate(res.content):
+                        if isinstance(content_item, TextContent):
+                            result_parts.append(content_item.text)
+                        elif isinstance(content_item, ImageContent):
+                            # Cache the image instead of sending directly
+                            cached_img = tool_image_cache.save_image(
+                                base64_data=content_item.data,
+                                tool_call_id=func_tool_id,
+                                tool_name=func_tool_name,
+                                index=index,
+                                mime_type=content_item.mimeType or "image/png",
+                            )
+                            result_parts.append(
+                                f"Image returned and cached at path='{cached_img.file_path}'. "
+                                f"Review the image below. Use send_message_to_user to send it to the user if satisfied, "
+                                f"with type='image' and path='{cached_img.file_path}'."
+                            )
+                            # Yield image info for LLM visibility (will be handled in step())
+                            yield _HandleFunctionToolsResult.from_cached_image(
+                                cached_img
+                            )
+                        elif isinstance(content_item, EmbeddedResource):
+                            resource = content_item.resource
+                            if isinstance(resource, TextResourceContents):
+                                result_parts.append(resource.text)
+                            elif (
+                                isinstance(resource, BlobResourceContents)
+                                and resource.mimeType
+                                and resource.mimeType.startswith("image/")
+                            ):
                                 # Cache the image instead of sending directly
                                 cached_img = tool_image_cache.save_image(
-                                    base64_data=content_item.data,
+                                    base64_data=resource.blob,
                                     tool_call_id=func_tool_id,
                                     tool_name=func_tool_name,
                                     index=index,
-                                    mime_type=content_item.mimeType or "image/png",
+                                    mime_type=resource.mimeType,
                                 )
                                 result_parts.append(
                                     f"Image returned and cached at path='{cached_img.file_path}'. "
                                     f"Review the image below. Use send_message_to_user to send it to the user if satisfied, "
                                     f"with type='image' and path='{cached_img.file_path}'."
                                 )
-                                # Yield image info for LLM visibility (will be handled in step())
+                                # Yield image info for LLM visibility
                                 yield _HandleFunctionToolsResult.from_cached_image(
                                     cached_img
                                 )
-                            elif isinstance(content_item, EmbeddedResource):
-                                resource = content_item.resource
-                                if isinstance(resource, TextResourceContents):
-                                    result_parts.append(resource.text)
-                                elif (
-                                    isinstance(resource, BlobResourceContents)
-                                    and resource.mimeType
-                                    and resource.mimeType.startswith("image/")
-                                ):
-                                    # Cache the image instead of sending directly
-                                    cached_img = tool_image_cache.save_image(
-                                        base64_data=resource.blob,
-                                        tool_call_id=func_tool_id,
-                                        tool_name=func_tool_name,
-                                        index=index,
-                                        mime_type=resource.mimeType,
-                                    )
-                                    result_parts.append(
-                                        f"Image returned and cached at path='{cached_img.file_path}'. "
-                                        f"Review the image below. Use send_message_to_user to send it to the user if satisfied, "
-                                        f"with type='image' and path='{cached_img.file_path}'."
-                                    )
-                                    # Yield image info for LLM visibility
-                                    yield _HandleFunctionToolsResult.from_cached_image(
-                                        cached_img
-                                    )
-                                else:
-                                    result_parts.append(
-                                        "The tool has returned a data type that is not supported."
-                                    )
-                        if result_parts:
-                            inline_result = "\n\n".join(result_parts)
-                            inline_result = await self._materialize_large_tool_result(
-                                tool_call_id=func_tool_id,
-                                content=inline_result,
-                            )
-                            _append_tool_call_result(
-                                func_tool_id,
-                                inline_result
-                                + self._build_repeated_tool_call_guidance(
-                                    func_tool_name, tool_call_streak
-                                ),
-                            )
-
-                    elif resp is None:
-                        # Tool 直接请求发送消息给用户
-                        # 这里我们将直接结束 Agent Loop
-                        # 发送消息逻辑在 ToolExecutor 中处理了
-                        logger.warning(
-                            f"{func_tool_name} 没有返回值，或者已将结果直接发送给用户。"
-                        )
-                        self._transition_state(AgentState.DONE)
-                        self.stats.end_time = time.time()
-                        _append_tool_call_result(
-                            func_tool_id,
-                            "The tool has no return value, or has sent the result directly to the user."
-                            + self._build_repeated_tool_call_guidance(
-                                func_tool_name, tool_call_streak
-                            ),
-                        )
-                    else:
-                        # 不应该出现其他类型
-                        logger.warning(
-                            f"Tool 返回了不支持的类型: {type(resp)}。",
+                            else:
+                                result_parts.append(
+                                    "The tool has returned a data type that is not supported."
+                                )
+                    if result_parts:
+                        inline_result = "\n\n".join(result_parts)
+                        inline_result = await self._materialize_large_tool_result(
+                            tool_call_id=func_tool_id,
+                            content=inline_result,
                         )
-                        _append_tool_call_result(
-                            func_tool_id,
-                            "*The tool has returned an unsupported type. Please tell the user to check the definition and implementation of this tool.*"
+                        result_contents.append(
+                            inline_result
                             + self._build_repeated_tool_call_guidance(
                                 func_tool_name, tool_call_streak
                             ),
                         )
 
-                try:
-                    await self.agent_hooks.on_tool_end(
-                        self.run_context,
-                        func_tool,
-                        func_tool_args,
-                        _final_resp,
+                elif resp is None:
+                    # Tool 直接请求发送消息给用户
+                    # 这里我们将直接结束 Agent Loop
+                    # 发送消息逻辑在 ToolExecutor 中处理了
+                    logger.warning(
+                        f"{func_tool_name} 没有返回值，或者已将结果直接发送给用户。"
                     )
-                except Exception as e:
-                    logger.error(f"Error in on_tool_end hook: {e}", exc_info=True)
-            except Exception as e:
-                if isinstance(e, _ToolExecutionInterrupted):
-                    raise
-                logger.warning(traceback.format_exc())
-                _append_tool_call_result(
-                    func_tool_id,
-                    f"error: {e!s}"
-                    + self._build_repeated_tool_call_guidance(
-                        func_tool_name, tool_call_streak
-                    ),
-                )
-
-            if len(tool_call_result_blocks) > tool_result_blocks_start:
-                tool_result_content = str(tool_call_result_blocks[-1].content)
-                yield _HandleFunctionToolsResult.from_message_chain(
-                    MessageChain(
-                        type="tool_call_result",
-                        chain=[
-                            Json(
-                                data={
-                                    "id": func_tool_id,
-                                    "ts": time.time(),
-                                    "result": tool_result_content,
-                                }
-                            )
-                        ],
+                    self._transition_state(AgentState.DONE)
+                    self.stats.end_time = time.time()
+                    result_contents.append(
+                        "The tool has no return value, or has sent the result directly to the user."
+                        + self._build_repeated_tool_call_guidance(
+                            func_tool_name, tool_call_streak
+                        ),
+                    )
+                else:
+                    # 不应该出现其他类型
+                    logger.warning(
+                        f"Tool 返回了不支持的类型: {type(resp)}。",
+                    )
+                    result_contents.append(
+                        "*The tool has returned an unsupported type. Please tell the user to check the definition and implementation of this tool.*"
+                        + self._build_repeated_tool_call_guidance(
+                            func_tool_name, tool_call_streak
+                        ),
                     )
-                )
-                logger.info(f"Tool `{func_tool_name}` Result: {tool_result_content}")
 
-        # 处理函数调用响应
-        if tool_call_result_blocks:
-            yield _HandleFunctionToolsResult.from_tool_call_result_blocks(
-                tool_call_result_blocks
+            try:
+                await self.agent_hooks.on_tool_end(
+                    self.run_context,
+                    func_tool,
+                    func_tool_args,
+                    _final_resp,
+                )
+            except Exception as e:
+                logger.error(f"Error in on_tool_end hook: {e}", exc_info=True)
+        except Exception as e:
+            if isinstance(e, _ToolExecutionInterrupted):
+                raise
+            logger.warning(traceback.format_exc())
+            result_contents.append(
+                f"error: {e!s}"
+                + self._build_repeated_tool_call_guidance(
+                    func_tool_name, tool_call_streak
+                ),
             )
 
     def _build_tool_requery_context(
@@ -63,6 +63,11 @@ class FunctionTool(ToolSchema, Generic[TContext]):
     Declare this tool as a background task. Background tasks return immediately
     with a task identifier while the real work continues asynchronously.
     """
+    parallel_safe: bool = False
+    """
+    Declare this tool as free of side effects. Consecutive calls to parallel-safe
+    tools in the same LLM response may be executed concurrently by the agent runner.
+    """
 
     def __repr__(self) -> str:
         return f"FuncTool(name={self.name}, parameters={self.parameters}, description={self.description})"
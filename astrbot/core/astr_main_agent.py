@@ -7,9 +7,10 @@ import json
 import os
 import platform
 import zoneinfo
-from collections.abc import Coroutine
+from collections.abc import Awaitable, Callable, Coroutine
 from dataclasses import dataclass, field
 from pathlib import Path
+from typing import Any
 
 from astrbot.core import logger
 from astrbot.core.agent.handoff import HandoffTool
@@ -106,6 +107,7 @@ from astrbot.core.utils.astrbot_path import (
     get_astrbot_workspaces_path,
 )
 from astrbot.core.utils.file_extract import extract_file_moonshotai
+from astrbot.core.utils.image_caption_cache import image_caption_cache
 from astrbot.core.utils.llm_metadata import LLM_METADATAS
 from astrbot.core.utils.media_utils import (
     IMAGE_COMPRESS_DEFAULT_MAX_SIZE,
@@ -129,6 +131,8 @@ from astrbot.core.workspace import (
 )
 
 LLM_ERROR_MESSAGE_EXTRA_KEY = "_llm_error_message"
+LOADED_HISTORY_EXTRA_KEY = "_loaded_conversation_history"
+FILE_EXTRACT_DEFAULT_PROMPT = "总结一下文件里面讲了什么？"
 WEEKDAY_NAMES = (
     "Monday",
     "Tuesday",
@@ -213,6 +217,9 @@ class MainAgentBuildConfig:
     timezone: str | None = None
     max_quoted_fallback_images: int = 20
     """Maximum number of images injected from quoted-message fallback extraction."""
+    request_build_timeout: float = 30.0
+    """Deadline (in seconds) for the optional enrichment steps of request building.
+    Steps still running at the deadline are skipped, required steps are not."""
 
 
 @dataclass(slots=True)
@@ -223,6 +230,110 @@ class MainAgentBuildResult:
     reset_coro: Coroutine | None = None
 
 
+@dataclass(slots=True)
+class _BuildStep:
+    """An enrichment step of request building."""
+
+    name: str
+    run: Callable[[dict[str, Any]], Awaitable[Any]]
+    """Receives the results of the finished steps, keyed by step name."""
+    deps: tuple[str, ...] = ()
+    """Steps that must finish (or be skipped) before this one starts."""
+    required: bool = False
+    """Required steps always run to completion. Optional steps are skipped when
+    the build deadline passes, and their result is None."""
+
+
+async def _run_build_steps(
+    event: AstrMessageEvent,
+    steps: list[_BuildStep],
+    deadline: float,
+) -> dict[str, Any]:
+    """并发执行构建请求的各个步骤, 每个步骤在其依赖完成后立即开始.
+
+    可选步骤超过 deadline (事件循环时间) 时会被取消并跳过, 不影响请求本身。
+    各步骤的耗时与状态会记录到 trace 中。
+
+    Returns:
+        步骤名到其返回值的映射。被跳过的步骤返回 None。
+    """
+    loop = asyncio.get_running_loop()
+    build_started = loop.time()
+    finished = {step.name: asyncio.Event() for step in steps}
+    results: dict[str, Any] = {}
+    timings: dict[str, dict[str, Any]] = {}
+
+    async def run_step(step: _BuildStep) -> None:
+        try:
+            for dep in step.deps:
+                await finished[dep].wait()
+            started = loop.time()
+            status = "ok"
+            if step.required:
+                results[step.name] = await step.run(results)
+            elif deadline <= started:
+                status = "skipped"
+            else:
+                try:
+                    async with asyncio.timeout_at(deadline) as timeout:
+                        results[step.name] = await step.run(results)
+                except TimeoutError:
+                    # 步骤自身抛出的 TimeoutError 不是超过 deadline, 照常向上抛出
+                    if not timeout.expired():
+                        raise
+                    status = "skipped"
+            if status == "skipped":
+                results[step.name] = None
+                logger.warning(
+                    "Request build step %s exceeded its deadline for umo=%s, skipped.",
+                    step.name,
+                    event.unified_msg_origin,
+                )
+            timings[step.name] = {
+                "status": status,
+                "start_ms": round((started - build_started) * 1000, 1),
+                "duration_ms": round((loop.time() - started) * 1000, 1),
+            }
+        finally:
+            finished[step.name].set()
+
+    tasks = [asyncio.create_task(run_step(step)) for step in steps]
+    try:
+        _, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        # 任一步骤失败时取消其余步骤
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        errors = [
+            exc
+            for task in tasks
+            if not task.cancelled() and (exc := task.exception()) is not None
+        ]
+        if errors:
+            for exc in errors[1:]:
+                logger.error(
+                    "Another request build step failed for umo=%s: %s",
+                    event.unified_msg_origin,
+                    exc,
+                    exc_info=exc,
+                )
+            # 与顺序执行时一样, 向调用方抛出失败步骤的原始异常
+            raise errors[0]
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+        try:
+            event.trace.record(
+                "build_main_agent_steps",
+                steps=timings,
+                total_ms=round((loop.time() - build_started) * 1000, 1),
+            )
+        except Exception:
+            pass
+    return results
+
+
 def _set_llm_error_message(event: AstrMessageEvent, message: str) -> None:
     event.set_extra(LLM_ERROR_MESSAGE_EXTRA_KEY, message)
 
@@ -270,22 +381,80 @@ async def _select_provider(
 
 
 async def _get_session_conv(
-    event: AstrMessageEvent, plugin_context: Context
+    event: AstrMessageEvent,
+    plugin_context: Context,
+    history_turns: int | None = None,
 ) -> Conversation:
     conv_mgr = plugin_context.conversation_manager
     umo = event.unified_msg_origin
     cid = await conv_mgr.get_curr_conversation_id(umo)
     if not cid:
         cid = await conv_mgr.new_conversation(umo, event.get_platform_id())
-    conversation = await conv_mgr.get_conversation(umo, cid)
+    conversation = await conv_mgr.get_conversation(
+        umo, cid, history_turns=history_turns
+    )
     if not conversation:
         cid = await conv_mgr.new_conversation(umo, event.get_platform_id())
-        conversation = await conv_mgr.get_conversation(umo, cid)
+        conversation = await conv_mgr.get_conversation(
+            umo, cid, history_turns=history_turns
+        )
     if not conversation:
         raise RuntimeError("无法创建新的对话。")
     return conversation
 
 
+def _context_history_turns(config: MainAgentBuildConfig) -> int | None:
+    """按轮次截断上下文时, 构建请求只需读取的最近历史轮数.
+
+    每轮从一条用户消息开始, 包含其后的助手回复、工具调用与检查点记录, 因此读取的窗口总是从
+    一轮的开头开始, 且不论每轮有多少条消息都包含完整的最近 max_context_length 轮。多读取的一轮
+    使截断仍会像读取全部历史时一样触发。截断后剩余部分不含用户消息时, 补在开头的是窗口内
+    最早的用户消息, 而不是整个对话的第一条用户消息。
+    """
+    if config.max_context_length <= 0:
+        return None
+    return config.max_context_length + 1
+
+
+def _load_conversation_contexts(
+    event: AstrMessageEvent,
+    req: ProviderRequest,
+    conversation: Conversation,
+) -> None:
+    req.conversation = conversation
+    req.contexts = json.loads(conversation.history)
+    # 保存历史记录时与此比较, 只写入本轮的变化
+    event.set_extra(LOADED_HISTORY_EXTRA_KEY, list(req.contexts))
+
+
+async def _retrieve_kb(
+    event: AstrMessageEvent,
+    prompt: str | None,
+    plugin_context: Context,
+) -> str | None:
+    if prompt is None or not prompt.strip():
+        return None
+    try:
+        return await retrieve_knowledge_base(
+            query=prompt,
+            umo=event.unified_msg_origin,
+            context=plugin_context,
+        )
+    except Exception as exc:  # noqa: BLE001
+        logger.error("Error occurred while retrieving knowledge base: %s", exc)
+        return None
+
+
+def _append_kb_result(req: ProviderRequest, kb_result: str | None) -> None:
+    if not kb_result:
+        return
+    req.extra_user_content_parts.append(
+        TextPart(
+            text=f"[Related Knowledge Base Results]:\n{kb_result}",
+        ).mark_as_temp()
+    )
+
+
 async def _apply_kb(
     event: AstrMessageEvent,
     req: ProviderRequest,
@@ -293,23 +462,8 @@ async def _apply_kb(
     config: MainAgentBuildConfig,
 ) -> None:
     if not config.kb_agentic_mode:
-        if req.prompt is None or not req.prompt.strip():
-            return
-        try:
-            kb_result = await retrieve_knowledge_base(
-                query=req.prompt,
-                umo=event.unified_msg_origin,
-                context=plugin_context,
-            )
-            if not kb_result:
-                return
-            req.extra_user_content_parts.append(
-                TextPart(
-                    text=f"[Related Knowledge Base Results]:\n{kb_result}",
-                ).mark_as_temp()
-            )
-        except Exception as exc:  # noqa: BLE001
-            logger.error("Error occurred while retrieving knowledge base: %s", exc)
+        kb_result = await _retrieve_kb(event, req.prompt, plugin_context)
+        _append_kb_result(req, kb_result)
     else:
         if req.func_tool is None:
             req.func_tool = ToolSet()
@@ -339,7 +493,7 @@ async def _apply_file_extract(
     if not file_paths:
         return
     if not req.prompt:
-        req.prompt = "总结一下文件里面讲了什么？"
+        req.prompt = FILE_EXTRACT_DEFAULT_PROMPT
     if config.file_extract_prov == "moonshotai":
         if not config.file_extract_msh_api_key:
             logger.error("Moonshot AI API key for file extract is not set")
@@ -687,6 +841,10 @@ async def _ensure_persona_and_skills(
         pass
 
 
+def _image_caption_prompt(cfg: dict) -> str:
+    return cfg.get("image_caption_prompt", "Please describe the image.")
+
+
 async def _request_img_caption(
     provider_id: str,
     cfg: dict,
@@ -703,13 +861,9 @@ async def _request_img_caption(
             f"Cannot get image caption because provider `{provider_id}` is not a valid Provider, it is {type(prov)}.",
         )
 
-    img_cap_prompt = cfg.get(
-        "image_caption_prompt",
-        "Please describe the image.",
-    )
     logger.debug("Processing image caption with provider: %s", provider_id)
     llm_resp = await prov.text_chat(
-        prompt=img_cap_prompt,
+        prompt=_image_caption_prompt(cfg),
         image_urls=image_urls,
     )
     return llm_resp.completion_text
@@ -722,19 +876,30 @@ async def _ensure_img_caption(
     plugin_context: Context,
     image_caption_provider: str,
 ) -> None:
-    try:
+    image_urls = list(req.image_urls)
+
+    async def caption_images() -> str:
         compressed_urls = []
-        for url in req.image_urls:
+        for url in image_urls:
             compressed_url = await _compress_image_for_provider(url, cfg)
             compressed_urls.append(compressed_url)
             if _is_generated_compressed_image_path(url, compressed_url):
                 event.track_temporary_local_file(compressed_url)
-        caption = await _request_img_caption(
+        return await _request_img_caption(
             image_caption_provider,
             cfg,
             compressed_urls,
             plugin_context,
         )
+
+    try:
+        # 命中缓存时既不压缩图片也不请求转述模型
+        cache_key = await image_caption_cache.make_key(
+            image_caption_provider,
+            _image_caption_prompt(cfg),
+            image_urls,
+        )
+        caption = await image_caption_cache.get_caption(cache_key, caption_images)
         if caption:
             req.extra_user_content_parts.append(
                 TextPart(text=f"<image_caption>{caption}</image_caption>")
@@ -932,21 +1097,36 @@ async def _process_quote_message(
 
                 if prov and isinstance(prov, Provider):
                     path = await image_seg.convert_to_file_path()
-                    compress_path = await _compress_image_for_provider(
-                        path,
-                        config.provider_settings if config else None,
+                    quote_prompt = "Please describe the image content."
+
+                    async def caption_quoted_image() -> str:
+                        nonlocal compress_path
+                        compress_path = await _compress_image_for_provider(
+                            path,
+                            config.provider_settings if config else None,
+                        )
+                        if path and _is_generated_compressed_image_path(
+                            path, compress_path
+                        ):
+                            event.track_temporary_local_file(compress_path)
+                        llm_resp = await prov.text_chat(
+                            prompt=quote_prompt,
+                            image_urls=[compress_path],
+                        )
+                        return llm_resp.completion_text
+
+                    cache_key = await image_caption_cache.make_key(
+                        prov.meta().id,
+                        quote_prompt,
+                        [path],
                     )
-                    if path and _is_generated_compressed_image_path(
-                        path, compress_path
-                    ):
-                        event.track_temporary_local_file(compress_path)
-                    llm_resp = await prov.text_chat(
-                        prompt="Please describe the image content.",
-                        image_urls=[compress_path],
+                    caption = await image_caption_cache.get_caption(
+                        cache_key,
+                        caption_quoted_image,
                     )
-                    if llm_resp.completion_text:
+                    if caption:
                         content_parts.append(
-                            f"[Image Caption in quoted message]: {llm_resp.completion_text}"
+                            f"[Image Caption in quoted message]: {caption}"
                         )
                 else:
                     logger.warning("No provider found for image captioning in quote.")
@@ -1409,6 +1589,170 @@ def _select_image_chat_provider(
     return provider
 
 
+async def _resolve_attachment(
+    event: AstrMessageEvent,
+    comp: object,
+    config: MainAgentBuildConfig,
+    *,
+    quoted: bool = False,
+) -> ProviderRequest:
+    """将单个消息组件转换为附件.
+
+    结果写入一个独立的请求对象, 以便各组件并发转换后再按消息顺序合并。
+    """
+    part = ProviderRequest()
+    if isinstance(comp, Image):
+        path = await comp.convert_to_file_path()
+        image_path = await _compress_image_for_provider(
+            path,
+            config.provider_settings,
+        )
+        if _is_generated_compressed_image_path(path, image_path):
+            event.track_temporary_local_file(image_path)
+        part.image_urls.append(image_path)
+        if quoted:
+            _append_quoted_image_attachment(part, image_path)
+        else:
+            part.extra_user_content_parts.append(
+                TextPart(text=f"[Image Attachment: path {image_path}]")
+            )
+    elif isinstance(comp, Record):
+        audio_path = await comp.convert_to_file_path()
+        part.audio_urls.append(audio_path)
+        if quoted:
+            _append_quoted_audio_attachment(part, audio_path)
+        else:
+            _append_audio_attachment(part, audio_path)
+    elif isinstance(comp, File):
+        file_path = await comp.get_file()
+        file_name = comp.name or os.path.basename(file_path)
+        label = "File Attachment in quoted message" if quoted else "File Attachment"
+        part.extra_user_content_parts.append(
+            TextPart(text=f"[{label}: name {file_name}, path {file_path}]")
+        )
+    elif isinstance(comp, Video):
+        await _append_video_attachment(part, comp, quoted=quoted)
+    return part
+
+
+async def _resolve_quoted_fallback_images(
+    event: AstrMessageEvent,
+    reply: Reply,
+    settings: QuotedMessageParserSettings,
+) -> list[str]:
+    # Fallback quoted image extraction for reply-id-only payloads, or when
+    # embedded reply chain only contains placeholders (e.g. [Forward Message], [Image]).
+    if any(isinstance(reply_comp, Image) for reply_comp in reply.chain or []):
+        return []
+    try:
+        return normalize_and_dedupe_strings(
+            await extract_quoted_message_images(
+                event,
+                reply,
+                settings=settings,
+            )
+        )
+    except Exception as exc:  # noqa: BLE001
+        logger.warning(
+            "Failed to resolve fallback quoted images for umo=%s, reply_id=%s: %s",
+            event.unified_msg_origin,
+            getattr(reply, "id", None),
+            exc,
+            exc_info=True,
+        )
+        return []
+
+
+def _merge_attachment(req: ProviderRequest, part: ProviderRequest) -> None:
+    req.image_urls.extend(part.image_urls)
+    req.audio_urls.extend(part.audio_urls)
+    req.extra_user_content_parts.extend(part.extra_user_content_parts)
+
+
+async def _apply_message_attachments(
+    event: AstrMessageEvent,
+    req: ProviderRequest,
+    config: MainAgentBuildConfig,
+) -> None:
+    """并发转换消息与引用消息中的附件, 并按消息顺序写入请求."""
+    message = event.message_obj.message
+    reply_comps = [comp for comp in message if isinstance(comp, Reply)]
+    quoted_message_settings = _get_quoted_message_parser_settings(
+        config.provider_settings
+    )
+
+    attachments = asyncio.gather(
+        *(_resolve_attachment(event, comp, config) for comp in message)
+    )
+    quoted_attachments = asyncio.gather(
+        *(
+            asyncio.gather(
+                *(
+                    _resolve_attachment(event, reply_comp, config, quoted=True)
+                    for reply_comp in comp.chain or []
+                )
+            )
+            for comp in reply_comps
+        )
+    )
+    fallback_images = asyncio.gather(
+        *(
+            _resolve_quoted_fallback_images(event, comp, quoted_message_settings)
+            for comp in reply_comps
+        )
+    )
+    attachment_parts, quoted_parts, fallback_refs = await asyncio.gather(
+        attachments,
+        quoted_attachments,
+        fallback_images,
+    )
+
+    for part in attachment_parts:
+        _merge_attachment(req, part)
+    fallback_quoted_image_count = 0
+    for comp, parts, images in zip(reply_comps, quoted_parts, fallback_refs):
+        for part in parts:
+            _merge_attachment(req, part)
+        if not images:
+            continue
+        remaining_limit = max(
+            config.max_quoted_fallback_images - fallback_quoted_image_count,
+            0,
+        )
+        if remaining_limit <= 0:
+            logger.warning(
+                "Skip quoted fallback images due to limit=%d for umo=%s",
+                config.max_quoted_fallback_images,
+                event.unified_msg_origin,
+            )
+            continue
+        if len(images) > remaining_limit:
+            logger.warning(
+                "Truncate quoted fallback images for umo=%s, reply_id=%s from %d to %d",
+                event.unified_msg_origin,
+                getattr(comp, "id", None),
+                len(images),
+                remaining_limit,
+            )
+            images = images[:remaining_limit]
+        for image_ref in images:
+            if image_ref in req.image_urls:
+                continue
+            req.image_urls.append(image_ref)
+            fallback_quoted_image_count += 1
+            _append_quoted_image_attachment(req, image_ref)
+
+
+def _has_file_attachment(event: AstrMessageEvent) -> bool:
+    for comp in event.message_obj.message:
+        if isinstance(comp, File):
+            return True
+        if isinstance(comp, Reply) and comp.chain:
+            if any(isinstance(reply_comp, File) for reply_comp in comp.chain):
+                return True
+    return False
+
+
 async def build_main_agent(
     *,
     event: AstrMessageEvent,
@@ -1422,6 +1766,7 @@ async def build_main_agent(
 
     If apply_reset is False, will not call reset on the agent runner.
     """
+    deadline = asyncio.get_running_loop().time() + config.request_build_timeout
     provider = provider or await _select_provider(event, plugin_context)
     if provider is None:
         logger.info("未找到任何对话模型（提供商），跳过 LLM 请求处理。")
@@ -1439,7 +1784,7 @@ async def build_main_agent(
                 "provider_request 必须是 ProviderRequest 类型。"
             )
             if req.conversation:
-                req.contexts = json.loads(req.conversation.history)
+                _load_conversation_contexts(event, req, req.conversation)
         else:
             req = ProviderRequest()
             req.prompt = ""
@@ -1454,125 +1799,30 @@ async def build_main_agent(
 
             req.prompt = event.message_str[len(config.provider_wake_prefix) :]
 
-            # media files attachments
-            for comp in event.message_obj.message:
-                if isinstance(comp, Image):
-                    path = await comp.convert_to_file_path()
-                    image_path = await _compress_image_for_provider(
-                        path,
-                        config.provider_settings,
-                    )
-                    if _is_generated_compressed_image_path(path, image_path):
-                        event.track_temporary_local_file(image_path)
-                    req.image_urls.append(image_path)
-                    req.extra_user_content_parts.append(
-                        TextPart(text=f"[Image Attachment: path {image_path}]")
-                    )
-                elif isinstance(comp, Record):
-                    audio_path = await comp.convert_to_file_path()
-                    req.audio_urls.append(audio_path)
-                    _append_audio_attachment(req, audio_path)
-                elif isinstance(comp, File):
-                    file_path = await comp.get_file()
-                    file_name = comp.name or os.path.basename(file_path)
-                    req.extra_user_content_parts.append(
-                        TextPart(
-                            text=f"[File Attachment: name {file_name}, path {file_path}]"
-                        )
-                    )
-                elif isinstance(comp, Video):
-                    await _append_video_attachment(req, comp)
-            # quoted message attachments
-            reply_comps = [
-                comp for comp in event.message_obj.message if isinstance(comp, Reply)
-            ]
-            quoted_message_settings = _get_quoted_message_parser_settings(
-                config.provider_settings
-            )
-            fallback_quoted_image_count = 0
-            for comp in reply_comps:
-                has_embedded_image = False
-                if comp.chain:
-                    for reply_comp in comp.chain:
-                        if isinstance(reply_comp, Image):
-                            has_embedded_image = True
-                            path = await reply_comp.convert_to_file_path()
-                            image_path = await _compress_image_for_provider(
-                                path,
-                                config.provider_settings,
-                            )
-                            if _is_generated_compressed_image_path(path, image_path):
-                                event.track_temporary_local_file(image_path)
-                            req.image_urls.append(image_path)
-                            _append_quoted_image_attachment(req, image_path)
-                        elif isinstance(reply_comp, Record):
-                            audio_path = await reply_comp.convert_to_file_path()
-                            req.audio_urls.append(audio_path)
-                            _append_quoted_audio_attachment(req, audio_path)
-                        elif isinstance(reply_comp, File):
-                            file_path = await reply_comp.get_file()
-                            file_name = reply_comp.name or os.path.basename(file_path)
-                            req.extra_user_content_parts.append(
-                                TextPart(
-                                    text=(
-                                        f"[File Attachment in quoted message: "
-                                        f"name {file_name}, path {file_path}]"
-                                    )
-                                )
-                            )
-                        elif isinstance(reply_comp, Video):
-                            await _append_video_attachment(req, reply_comp, quoted=True)
-
-                # Fallback quoted image extraction for reply-id-only payloads, or when
-                # embedded reply chain only contains placeholders (e.g. [Forward Message], [Image]).
-                if not has_embedded_image:
-                    try:
-                        fallback_images = normalize_and_dedupe_strings(
-                            await extract_quoted_message_images(
-                                event,
-                                comp,
-                                settings=quoted_message_settings,
-                            )
-                        )
-                        remaining_limit = max(
-                            config.max_quoted_fallback_images
-                            - fallback_quoted_image_count,
-                            0,
-                        )
-                        if remaining_limit <= 0 and fallback_images:
-                            logger.warning(
-                                "Skip quoted fallback images due to limit=%d for umo=%s",
-                                config.max_quoted_fallback_images,
-                                event.unified_msg_origin,
-                            )
-                            continue
-                        if len(fallback_images) > remaining_limit:
-                            logger.warning(
-                                "Truncate quoted fallback images for umo=%s, reply_id=%s from %d to %d",
-                                event.unified_msg_origin,
-                                getattr(comp, "id", None),
-                                len(fallback_images),
-                                remaining_limit,
-                            )
-                            fallback_images = fallback_images[:remaining_limit]
-                        for image_ref in fallback_images:
-                            if image_ref in req.image_urls:
-                                continue
-                            req.image_urls.append(image_ref)
-                            fallback_quoted_image_count += 1
-                            _append_quoted_image_attachment(req, image_ref)
-                    except Exception as exc:  # noqa: BLE001
-                        logger.warning(
-                            "Failed to resolve fallback quoted images for umo=%s, reply_id=%s: %s",
-                            event.unified_msg_origin,
-                            getattr(comp, "id", None),
-                            exc,
-                            exc_info=True,
-                        )
+            async def load_conversation(_results: dict[str, Any]) -> None:
+                conversation = await _get_session_conv(
+                    event,
+                    plugin_context,
+                    history_turns=_context_history_turns(config),
+                )
+                _load_conversation_contexts(event, req, conversation)
 
-            conversation = await _get_session_conv(event, plugin_context)
-            req.conversation = conversation
-            req.contexts = json.loads(conversation.history)
+            # 附件转换与会话加载互不依赖, 并发执行
+            await _run_build_steps(
+                event,
+                [
+                    _BuildStep(
+                        "attachments",
+                        lambda _results: _apply_message_attachments(
+                            event,
+                            req,
+                            config,
+                        ),
+                    ),
+                    _BuildStep("conversation", load_conversation, required=True),
+                ],
+                deadline,
+            )
             event.set_extra("provider_request", req)
 
     if isinstance(req.contexts, str):
@@ -1591,11 +1841,8 @@ async def build_main_agent(
     req.image_urls = normalize_and_dedupe_strings(req.image_urls)
     req.audio_urls = normalize_and_dedupe_strings(req.audio_urls)
 
-    if config.file_extract_enabled:
-        try:
-            await _apply_file_extract(event, req, config)
-        except Exception as exc:  # noqa: BLE001
-            logger.error("Error occurred while applying file extract: %s", exc)
+    if config.file_extract_enabled and not req.prompt and _has_file_attachment(event):
+        req.prompt = FILE_EXTRACT_DEFAULT_PROMPT
 
     has_reply = any(isinstance(comp, Reply) for comp in event.message_obj.message)
 
@@ -1605,15 +1852,54 @@ async def build_main_agent(
         else:
             return None
 
-    await _decorate_llm_request(event, req, plugin_context, config, provider=provider)
-
-    await _apply_kb(event, req, plugin_context, config)
+    # 知识库检索使用用户原始输入, 不受请求装饰阶段添加的前缀影响
+    kb_query = req.prompt
 
-    if not req.session_id:
-        req.session_id = event.unified_msg_origin
+    async def apply_file_extract(_results: dict[str, Any]) -> None:
+        try:
+            await _apply_file_extract(event, req, config)
+        except Exception as exc:  # noqa: BLE001
+            logger.error("Error occurred while applying file extract: %s", exc)
 
-    _plugin_tool_fix(event, req)
-    await _apply_web_search_tools(event, req, plugin_context)
+    async def apply_tools(results: dict[str, Any]) -> None:
+        if config.kb_agentic_mode:
+            await _apply_kb(event, req, plugin_context, config)
+        else:
+            _append_kb_result(req, results.get("kb"))
+        if not req.session_id:
+            req.session_id = event.unified_msg_origin
+        _plugin_tool_fix(event, req)
+        await _apply_web_search_tools(event, req, plugin_context)
+
+    # 请求装饰、文件提取与知识库检索并发执行; 工具注入需等待装饰与检索完成
+    build_steps = [
+        _BuildStep(
+            "decorate",
+            lambda _results: _decorate_llm_request(
+                event,
+                req,
+                plugin_context,
+                config,
+                provider=provider,
+            ),
+            required=True,
+        ),
+    ]
+    tool_deps = ["decorate"]
+    if config.file_extract_enabled:
+        build_steps.append(_BuildStep("file_extract", apply_file_extract))
+    if not config.kb_agentic_mode:
+        build_steps.append(
+            _BuildStep(
+                "kb",
+                lambda _results: _retrieve_kb(event, kb_query, plugin_context),
+            )
+        )
+        tool_deps.append("kb")
+    build_steps.append(
+        _BuildStep("tools", apply_tools, deps=tuple(tool_deps), required=True)
+    )
+    await _run_build_steps(event, build_steps, deadline)
 
     if config.llm_safety_mode:
         _apply_llm_safety_mode(config, req)
@@ -1733,6 +2019,9 @@ async def build_main_agent(
         tool_schema_mode=config.tool_schema_mode,
         fallback_providers=fallback_providers,
         request_max_retries=config.provider_settings.get("request_max_retries", 5),
+        max_parallel_tool_calls=config.provider_settings.get(
+            "max_parallel_tool_calls", 4
+        ),
         tool_result_overflow_dir=(
             get_astrbot_system_tmp_path()
             if req.func_tool and req.func_tool.get_tool("astrbot_file_read_tool")
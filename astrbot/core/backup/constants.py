@@ -10,6 +10,7 @@ from astrbot.core.db.po import (
     ChatUIProject,
     CommandConfig,
     CommandConflict,
+    ConversationMessage,
     ConversationV2,
     Persona,
     PersonaFolder,
@@ -43,6 +44,7 @@ from astrbot.core.utils.astrbot_path import (
 MAIN_DB_MODELS: dict[str, type[SQLModel]] = {
     "platform_stats": PlatformStat,
     "conversations": ConversationV2,
+    "conversation_messages": ConversationMessage,
     "personas": Persona,
     "persona_folders": PersonaFolder,
     "preferences": Preference,
@@ -63,6 +65,15 @@ KB_METADATA_MODELS: dict[str, type[SQLModel]] = {
     "kb_media": KBMedia,
 }
 
+# 增量备份中按父表导出的子表: {子表: (外键列, 父表, 父表中被引用的列)}
+# 子表没有更新时间, 父表记录有变化时导出并替换该父记录下的全部子记录
+INCREMENTAL_CHILD_TABLES: dict[str, tuple[str, str, str]] = {
+    "conversation_messages": ("conversation_id", "conversations", "conversation_id"),
+}
+
+# 增量备份中始终完整导出的表。platform_stats 的计数会原地累加, 无法通过时间判断变化
+INCREMENTAL_FULL_TABLES: set[str] = {"platform_stats"}
+
 
 def get_backup_directories() -> dict[str, str]:
     """获取需要备份的目录列表
@@ -84,4 +95,4 @@ def get_backup_directories() -> dict[str, str]:
 
 
 # 备份清单版本号
-BACKUP_MANIFEST_VERSION = "1.1"
+BACKUP_MANIFEST_VERSION = "1.2"
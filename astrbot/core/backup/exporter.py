@@ -1,18 +1,22 @@
 """AstrBot 数据导出器
 
 负责将所有数据导出为 ZIP 备份文件。
-导出格式为 JSON，这是数据库无关的方案，支持未来向 MySQL/PostgreSQL 迁移。
+数据库表导出为 NDJSON（每行一条 JSON 记录），这是数据库无关的方案，支持未来向
+MySQL/PostgreSQL 迁移；逐批读取和写入，大型实例导出时内存占用也保持稳定。
+支持增量备份：只导出上一次备份之后有变化的记录和知识库。
 """
 
 import hashlib
 import json
 import os
 import zipfile
+from collections.abc import Callable
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import TYPE_CHECKING, Any
 
 from sqlalchemy import select
+from sqlmodel import SQLModel
 
 from astrbot.core import logger
 from astrbot.core.config.default import VERSION
@@ -25,10 +29,13 @@ from astrbot.core.utils.astrbot_path import (
 # 从共享常量模块导入
 from .constants import (
     BACKUP_MANIFEST_VERSION,
+    INCREMENTAL_CHILD_TABLES,
+    INCREMENTAL_FULL_TABLES,
     KB_METADATA_MODELS,
     MAIN_DB_MODELS,
     get_backup_directories,
 )
+from .ndjson import BACKUP_BATCH_SIZE, NDJSONWriter
 
 if TYPE_CHECKING:
     from astrbot.core.knowledge_base.kb_mgr import KnowledgeBaseManager
@@ -69,12 +76,17 @@ class AstrBotExporter:
         self,
         output_dir: str | None = None,
         progress_callback: Any | None = None,
+        base_manifest: dict | None = None,
     ) -> str:
         """导出所有数据到 ZIP 文件
 
+        数据库表以 NDJSON 格式逐表、逐批写入, 内存占用与数据量无关。
+
         Args:
             output_dir: 输出目录
             progress_callback: 进度回调函数，接收参数 (stage, current, total, message)
+            base_manifest: 上一次备份的 manifest。给出时进行增量备份,
+                只导出该备份之后有变化的记录和知识库
 
         Returns:
             str: 生成的 ZIP 文件路径
@@ -86,9 +98,14 @@ class AstrBotExporter:
         Path(output_dir).mkdir(parents=True, exist_ok=True)
 
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        zip_filename = f"astrbot_backup_{timestamp}.zip"
+        kind = "incremental" if base_manifest else "backup"
+        zip_filename = f"astrbot_{kind}_{timestamp}.zip"
         zip_path = os.path.join(output_dir, zip_filename)
 
+        since = self._incremental_since(base_manifest) if base_manifest else None
+        # 在读取数据前记录快照时间, 导出期间被修改的记录会进入下一次增量备份
+        snapshot_at = datetime.now(timezone.utc)
+
         logger.info(f"开始导出备份到 {zip_path}")
 
         try:
@@ -96,41 +113,41 @@ class AstrBotExporter:
                 # 1. 导出主数据库
                 if progress_callback:
                     await progress_callback("main_db", 0, 100, "正在导出主数据库...")
-                main_data = await self._export_main_database()
-                main_db_json = json.dumps(
-                    main_data, ensure_ascii=False, indent=2, default=str
+                main_stats, attachments = await self._export_main_database(
+                    zf, since, progress_callback
                 )
-                zf.writestr("databases/main_db.json", main_db_json)
-                self._add_checksum("databases/main_db.json", main_db_json)
                 if progress_callback:
                     await progress_callback("main_db", 100, 100, "主数据库导出完成")
 
                 # 2. 导出知识库数据
-                kb_meta_data: dict[str, Any] = {
-                    "knowledge_bases": [],
-                    "kb_documents": [],
-                    "kb_media": [],
-                }
+                kb_meta_stats: dict[str, int] = {}
+                kb_fingerprints: dict[str, str] = {}
+                exported_kbs: list[str] = []
                 if self.kb_manager:
                     if progress_callback:
                         await progress_callback(
                             "kb_metadata", 0, 100, "正在导出知识库元数据..."
                         )
-                    kb_meta_data = await self._export_kb_metadata()
-                    kb_meta_json = json.dumps(
-                        kb_meta_data, ensure_ascii=False, indent=2, default=str
-                    )
-                    zf.writestr("databases/kb_metadata.json", kb_meta_json)
-                    self._add_checksum("databases/kb_metadata.json", kb_meta_json)
+                    kb_meta_stats = await self._export_kb_metadata(zf)
                     if progress_callback:
                         await progress_callback(
                             "kb_metadata", 100, 100, "知识库元数据导出完成"
                         )
 
-                    # 导出每个知识库的文档数据
+                    # 导出每个知识库的文档数据, 增量备份跳过未变化的知识库
+                    base_fingerprints = (
+                        base_manifest.get("kb_fingerprints", {})
+                        if base_manifest
+                        else {}
+                    )
                     kb_insts = self.kb_manager.kb_insts
                     total_kbs = len(kb_insts)
                     for idx, (kb_id, kb_helper) in enumerate(kb_insts.items()):
+                        fingerprint = self._kb_fingerprint(kb_helper)
+                        kb_fingerprints[kb_id] = fingerprint
+                        unchanged = base_fingerprints.get(kb_id) == fingerprint
+                        if base_manifest and unchanged:
+                            continue
                         if progress_callback:
                             await progress_callback(
                                 "kb_documents",
@@ -138,19 +155,14 @@ class AstrBotExporter:
                                 total_kbs,
                                 f"正在导出知识库 {kb_helper.kb.kb_name} 的文档数据...",
                             )
-                        doc_data = await self._export_kb_documents(kb_helper)
-                        doc_json = json.dumps(
-                            doc_data, ensure_ascii=False, indent=2, default=str
-                        )
-                        doc_path = f"databases/kb_{kb_id}/documents.json"
-                        zf.writestr(doc_path, doc_json)
-                        self._add_checksum(doc_path, doc_json)
+                        await self._export_kb_documents(zf, kb_helper, kb_id)
 
                         # 导出 FAISS 索引文件
                         await self._export_faiss_index(zf, kb_helper, kb_id)
 
                         # 导出知识库多媒体文件
                         await self._export_kb_media_files(zf, kb_helper, kb_id)
+                        exported_kbs.append(kb_id)
 
                     if progress_callback:
                         await progress_callback(
@@ -171,7 +183,7 @@ class AstrBotExporter:
                 # 4. 导出附件文件
                 if progress_callback:
                     await progress_callback("attachments", 0, 100, "正在导出附件...")
-                await self._export_attachments(zf, main_data.get("attachments", []))
+                await self._export_attachments(zf, attachments)
                 if progress_callback:
                     await progress_callback("attachments", 100, 100, "附件导出完成")
 
@@ -187,7 +199,22 @@ class AstrBotExporter:
                 # 6. 生成 manifest
                 if progress_callback:
                     await progress_callback("manifest", 0, 100, "正在生成清单...")
-                manifest = self._generate_manifest(main_data, kb_meta_data, dir_stats)
+                manifest = self._generate_manifest(
+                    main_stats,
+                    kb_meta_stats,
+                    dir_stats,
+                    attachments=attachments,
+                    exported_kbs=exported_kbs,
+                )
+                manifest["snapshot_at"] = snapshot_at.isoformat()
+                manifest["kb_fingerprints"] = kb_fingerprints
+                if base_manifest and since:
+                    manifest["backup_type"] = "incremental"
+                    manifest["incremental"] = {
+                        "since": since.isoformat(),
+                        "base_exported_at": base_manifest.get("exported_at"),
+                        "changed_tables": self._changed_tables(),
+                    }
                 manifest_json = json.dumps(manifest, ensure_ascii=False, indent=2)
                 zf.writestr("manifest.json", manifest_json)
                 if progress_callback:
@@ -203,71 +230,194 @@ class AstrBotExporter:
                 os.remove(zip_path)
             raise
 
-    async def _export_main_database(self) -> dict[str, list[dict]]:
-        """导出主数据库所有表"""
-        export_data: dict[str, list[dict]] = {}
+    @staticmethod
+    def _incremental_since(base_manifest: dict) -> datetime:
+        """增量备份的起始时间: 基础备份读取数据前记录的快照时间"""
+        value = base_manifest.get("snapshot_at") or base_manifest.get("exported_at")
+        if not value:
+            raise ValueError("基础备份的 manifest 缺少导出时间，无法进行增量备份")
+        since = datetime.fromisoformat(value)
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return since
+
+    @staticmethod
+    def _changed_tables() -> list[str]:
+        """增量备份中只包含变化记录的表, 其余表为完整导出"""
+        return [
+            table_name
+            for table_name, model_class in MAIN_DB_MODELS.items()
+            if table_name not in INCREMENTAL_FULL_TABLES
+            and table_name not in INCREMENTAL_CHILD_TABLES
+            and "updated_at" in model_class.__table__.c  # type: ignore[attr-defined]
+        ]
+
+    @staticmethod
+    def _incremental_condition(
+        table_name: str,
+        model_class: type[SQLModel],
+        since: datetime,
+    ) -> Any | None:
+        """增量备份的过滤条件, 返回 None 表示完整导出该表"""
+        if table_name in INCREMENTAL_CHILD_TABLES:
+            fk, parent_table, parent_key = INCREMENTAL_CHILD_TABLES[table_name]
+            parent = MAIN_DB_MODELS[parent_table]
+            changed_parents = select(getattr(parent, parent_key)).where(
+                getattr(parent, "updated_at") > since
+            )
+            return getattr(model_class, fk).in_(changed_parents)
+        if table_name in INCREMENTAL_FULL_TABLES:
+            return None
+        columns = model_class.__table__.c  # type: ignore[attr-defined]
+        if "updated_at" not in columns:
+            return None
+        return columns.updated_at > since
+
+    async def _export_table(
+        self,
+        zf: zipfile.ZipFile,
+        session: Any,
+        arcname: str,
+        model_class: type[SQLModel],
+        condition: Any | None = None,
+        on_rows: Callable[[list[dict]], None] | None = None,
+    ) -> int:
+        """通过服务端游标分批读取一张表, 逐批写入 NDJSON 文件
+
+        Returns:
+            int: 导出的记录数
+        """
+        query = select(model_class)
+        if condition is not None:
+            query = query.where(condition)
+        query = query.execution_options(yield_per=BACKUP_BATCH_SIZE)
+
+        with NDJSONWriter(zf, arcname) as writer:
+            try:
+                result = await session.stream_scalars(query)
+                async for records in result.partitions():
+                    rows = [self._model_to_dict(record) for record in records]
+                    writer.write_rows(rows)
+                    if on_rows:
+                        on_rows(rows)
+            finally:
+                self._checksums[arcname] = writer.checksum
+        return writer.count
+
+    async def _export_main_database(
+        self,
+        zf: zipfile.ZipFile,
+        since: datetime | None = None,
+        progress_callback: Any | None = None,
+    ) -> tuple[dict[str, int], list[dict]]:
+        """逐表导出主数据库
+
+        Returns:
+            tuple: (每张表导出的记录数, 附件记录的 attachment_id 与 path)
+        """
+        stats: dict[str, int] = {}
+        attachments: list[dict] = []
+
+        def collect_attachments(rows: list[dict]) -> None:
+            attachments.extend(
+                {"attachment_id": row.get("attachment_id"), "path": row.get("path")}
+                for row in rows
+            )
 
+        total = len(MAIN_DB_MODELS)
         async with self.main_db.get_db() as session:
-            for table_name, model_class in MAIN_DB_MODELS.items():
+            for idx, (table_name, model_class) in enumerate(MAIN_DB_MODELS.items()):
+                if progress_callback:
+                    await progress_callback(
+                        "main_db",
+                        idx * 100 // total,
+                        100,
+                        f"正在导出表 {table_name}...",
+                    )
+                condition = (
+                    self._incremental_condition(table_name, model_class, since)
+                    if since
+                    else None
+                )
                 try:
-                    result = await session.execute(select(model_class))
-                    records = result.scalars().all()
-                    export_data[table_name] = [
-                        self._model_to_dict(record) for record in records
-                    ]
-                    logger.debug(
-                        f"导出表 {table_name}: {len(export_data[table_name])} 条记录"
+                    stats[table_name] = await self._export_table(
+                        zf,
+                        session,
+                        f"databases/main_db/{table_name}.ndjson",
+                        model_class,
+                        condition,
+                        collect_attachments if table_name == "attachments" else None,
                     )
+                    logger.debug(f"导出表 {table_name}: {stats[table_name]} 条记录")
                 except Exception as e:
                     logger.warning(f"导出表 {table_name} 失败: {e}")
-                    export_data[table_name] = []
+                    stats.setdefault(table_name, 0)
 
-        return export_data
+        return stats, attachments
 
-    async def _export_kb_metadata(self) -> dict[str, list[dict]]:
-        """导出知识库元数据库"""
+    async def _export_kb_metadata(self, zf: zipfile.ZipFile) -> dict[str, int]:
+        """逐表导出知识库元数据库。元数据表很小, 增量备份中也完整导出"""
         if not self.kb_manager:
-            return {"knowledge_bases": [], "kb_documents": [], "kb_media": []}
+            return {}
 
-        export_data: dict[str, list[dict]] = {}
+        stats: dict[str, int] = {}
 
         async with self.kb_manager.kb_db.get_db() as session:
             for table_name, model_class in KB_METADATA_MODELS.items():
                 try:
-                    result = await session.execute(select(model_class))
-                    records = result.scalars().all()
-                    export_data[table_name] = [
-                        self._model_to_dict(record) for record in records
-                    ]
+                    stats[table_name] = await self._export_table(
+                        zf,
+                        session,
+                        f"databases/kb_metadata/{table_name}.ndjson",
+                        model_class,
+                    )
                     logger.debug(
-                        f"导出知识库表 {table_name}: {len(export_data[table_name])} 条记录"
+                        f"导出知识库表 {table_name}: {stats[table_name]} 条记录"
                     )
                 except Exception as e:
                     logger.warning(f"导出知识库表 {table_name} 失败: {e}")
-                    export_data[table_name] = []
+                    stats.setdefault(table_name, 0)
 
-        return export_data
+        return stats
 
-    async def _export_kb_documents(self, kb_helper: Any) -> dict[str, Any]:
-        """导出知识库的文档块数据"""
+    async def _export_kb_documents(
+        self,
+        zf: zipfile.ZipFile,
+        kb_helper: Any,
+        kb_id: str,
+    ) -> None:
+        """分批导出知识库的文档块数据"""
+        arcname = f"databases/kb_{kb_id}/documents.ndjson"
         try:
             from astrbot.core.db.vec_db.faiss_impl.vec_db import FaissVecDB
 
             vec_db: FaissVecDB = kb_helper.vec_db
-            if not vec_db or not vec_db.document_storage:
-                return {"documents": []}
-
-            # 获取所有文档
-            docs = await vec_db.document_storage.get_documents(
-                metadata_filters={},
-                offset=0,
-                limit=None,  # 获取全部
-            )
-
-            return {"documents": docs}
+            with NDJSONWriter(zf, arcname) as writer:
+                if vec_db and vec_db.document_storage:
+                    async for docs in vec_db.document_storage.iter_documents(
+                        BACKUP_BATCH_SIZE
+                    ):
+                        writer.write_rows(docs)
+            self._checksums[arcname] = writer.checksum
         except Exception as e:
             logger.warning(f"导出知识库文档失败: {e}")
-            return {"documents": []}
+
+    @staticmethod
+    def _kb_fingerprint(kb_helper: Any) -> str:
+        """知识库存储文件的指纹, 用于增量备份判断知识库是否有变化
+
+        文档库与索引文件的任何写入都会改变文件大小或修改时间。
+        """
+        sha256 = hashlib.sha256()
+        kb_dir = Path(kb_helper.kb_dir)
+        if kb_dir.is_dir():
+            for path in sorted(kb_dir.iterdir()):
+                if path.is_file():
+                    stat = path.stat()
+                    sha256.update(
+                        f"{path.name}:{stat.st_size}:{stat.st_mtime_ns}\n".encode()
+                    )
+        return sha256.hexdigest()
 
     async def _export_faiss_index(
         self,
@@ -408,22 +558,31 @@ class AstrBotExporter:
 
     def _generate_manifest(
         self,
-        main_data: dict[str, list[dict]],
-        kb_meta_data: dict[str, list[dict]],
+        main_stats: dict[str, int],
+        kb_meta_stats: dict[str, int],
         dir_stats: dict[str, dict[str, int]] | None = None,
+        attachments: list[dict] | None = None,
+        exported_kbs: list[str] | None = None,
     ) -> dict:
-        """生成备份清单"""
+        """生成备份清单
+
+        Args:
+            main_stats: 主数据库每张表导出的记录数
+            kb_meta_stats: 知识库元数据库每张表导出的记录数
+            dir_stats: 每个目录的统计信息
+            attachments: 附件记录的 attachment_id 与 path
+            exported_kbs: 导出了文档数据的知识库 ID, 为空时为所有知识库
+        """
         if dir_stats is None:
             dir_stats = {}
         # 收集知识库 ID
-        kb_document_tables = {}
-        if self.kb_manager:
-            for kb_id in self.kb_manager.kb_insts.keys():
-                kb_document_tables[kb_id] = "documents"
+        if exported_kbs is None and self.kb_manager:
+            exported_kbs = list(self.kb_manager.kb_insts.keys())
+        kb_document_tables = dict.fromkeys(exported_kbs or [], "documents")
 
         # 收集附件文件列表
         attachment_files = []
-        for attachment in main_data.get("attachments", []):
+        for attachment in attachments or []:
             attachment_id = attachment.get("attachment_id", "")
             path = attachment.get("path", "")
             if attachment_id and path:
@@ -433,7 +592,8 @@ class AstrBotExporter:
         # 收集知识库媒体文件
         kb_media_files: dict[str, list[str]] = {}
         if self.kb_manager:
-            for kb_id, kb_helper in self.kb_manager.kb_insts.items():
+            for kb_id in kb_document_tables:
+                kb_helper = self.kb_manager.kb_insts[kb_id]
                 media_files: list[str] = []
                 media_dir = kb_helper.kb_medias_dir
                 if media_dir.exists():
@@ -448,13 +608,15 @@ class AstrBotExporter:
             "astrbot_version": VERSION,
             "exported_at": datetime.now(timezone.utc).isoformat(),
             "origin": "exported",  # 标记备份来源：exported=本实例导出, uploaded=用户上传
+            "format": "ndjson",  # 数据库表以 NDJSON 逐表保存
+            "backup_type": "full",  # full=完整备份, incremental=增量备份
             "schema_version": {
                 "main_db": "v4",
                 "kb_db": "v1",
             },
             "tables": {
-                "main_db": list(main_data.keys()),
-                "kb_metadata": list(kb_meta_data.keys()),
+                "main_db": list(main_stats.keys()),
+                "kb_metadata": list(kb_meta_stats.keys()),
                 "kb_documents": kb_document_tables,
             },
             "files": {
@@ -464,12 +626,8 @@ class AstrBotExporter:
             "directories": list(dir_stats.keys()),
             "checksums": self._checksums,
             "statistics": {
-                "main_db": {
-                    table: len(records) for table, records in main_data.items()
-                },
-                "kb_metadata": {
-                    table: len(records) for table, records in kb_meta_data.items()
-                },
+                "main_db": main_stats,
+                "kb_metadata": kb_meta_stats,
                 "directories": dir_stats,
             },
         }
@@ -11,6 +11,7 @@ import json
 import os
 import shutil
 import zipfile
+from collections.abc import Iterator
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from pathlib import Path
@@ -30,10 +31,12 @@ from astrbot.core.utils.version_comparator import VersionComparator
 
 # 从共享常量模块导入
 from .constants import (
+    INCREMENTAL_CHILD_TABLES,
     KB_METADATA_MODELS,
     MAIN_DB_MODELS,
     get_backup_directories,
 )
+from .ndjson import BACKUP_BATCH_SIZE, iter_ndjson_batches
 
 if TYPE_CHECKING:
     from astrbot.core.knowledge_base.kb_mgr import KnowledgeBaseManager
@@ -292,7 +295,14 @@ class AstrBotImporter:
                     "has_knowledge_bases": manifest.get("has_knowledge_bases", False),
                     "has_config": manifest.get("has_config", False),
                     "directories": manifest.get("directories", []),
+                    "backup_type": manifest.get("backup_type", "full"),
                 }
+                if manifest.get("backup_type") == "incremental":
+                    since = manifest.get("incremental", {}).get("since", "未知")
+                    result.warnings.append(
+                        f"这是增量备份，只包含 {since} 之后变化的数据。"
+                        "请先导入它所基于的完整备份及之前的增量备份，再导入此备份。"
+                    )
 
                 # 检查版本兼容性
                 version_check = self._check_version_compatibility(result.backup_version)
@@ -415,14 +425,26 @@ class AstrBotImporter:
                 if progress_callback:
                     await progress_callback("main_db", 0, 100, "正在导入主数据库...")
 
+                # 1.2 起数据库表以 NDJSON 逐表保存, 之前的版本为单个 JSON 文件
+                is_ndjson = manifest.get("format") == "ndjson"
+                incremental = manifest.get("backup_type") == "incremental"
+                attachments: list[dict] = []
                 try:
-                    main_data_content = zf.read("databases/main_db.json")
-                    main_data = json.loads(main_data_content)
+                    if is_ndjson:
+                        # 增量备份在现有数据上合并, 不清空数据库
+                        if mode == "replace" and not incremental:
+                            await self._clear_main_db()
+                        imported = await self._import_main_database_stream(zf, manifest)
+                        attachments = self._read_attachment_rows(zf)
+                    else:
+                        main_data_content = zf.read("databases/main_db.json")
+                        main_data = json.loads(main_data_content)
 
-                    if mode == "replace":
-                        await self._clear_main_db()
+                        if mode == "replace":
+                            await self._clear_main_db()
 
-                    imported = await self._import_main_database(main_data)
+                        imported = await self._import_main_database(main_data)
+                        attachments = main_data.get("attachments", [])
                     result.imported_tables.update(imported)
                 except DatabaseClearError as e:
                     result.add_error(f"清空主数据库失败: {e}")
@@ -435,18 +457,31 @@ class AstrBotImporter:
                     await progress_callback("main_db", 100, 100, "主数据库导入完成")
 
                 # 3. 导入知识库
-                if self.kb_manager and "databases/kb_metadata.json" in zf.namelist():
+                kb_meta_path = (
+                    "databases/kb_metadata/knowledge_bases.ndjson"
+                    if is_ndjson
+                    else "databases/kb_metadata.json"
+                )
+                if self.kb_manager and kb_meta_path in zf.namelist():
                     if progress_callback:
                         await progress_callback("kb", 0, 100, "正在导入知识库...")
 
                     try:
-                        kb_meta_content = zf.read("databases/kb_metadata.json")
-                        kb_meta_data = json.loads(kb_meta_content)
-
-                        if mode == "replace":
-                            await self._clear_kb_data()
-
-                        await self._import_knowledge_bases(zf, kb_meta_data, result)
+                        if is_ndjson:
+                            if mode == "replace":
+                                # 增量备份只替换有变化的知识库, 保留其余知识库的文件
+                                await self._clear_kb_data(remove_dirs=not incremental)
+                            await self._import_knowledge_bases_stream(
+                                zf, manifest, result
+                            )
+                        else:
+                            kb_meta_content = zf.read(kb_meta_path)
+                            kb_meta_data = json.loads(kb_meta_content)
+
+                            if mode == "replace":
+                                await self._clear_kb_data()
+
+                            await self._import_knowledge_bases(zf, kb_meta_data, result)
                     except Exception as e:
                         result.add_warning(f"导入知识库失败: {e}")
 
@@ -478,9 +513,7 @@ class AstrBotImporter:
                 if progress_callback:
                     await progress_callback("attachments", 0, 100, "正在导入附件...")
 
-                attachment_count = await self._import_attachments(
-                    zf, main_data.get("attachments", [])
-                )
+                attachment_count = await self._import_attachments(zf, attachments)
                 result.imported_files["attachments"] = attachment_count
 
                 if progress_callback:
@@ -541,8 +574,12 @@ class AstrBotImporter:
                             f"清空表 {table_name} 失败: {e}"
                         ) from e
 
-    async def _clear_kb_data(self) -> None:
-        """清空知识库数据"""
+    async def _clear_kb_data(self, remove_dirs: bool = True) -> None:
+        """清空知识库数据
+
+        Args:
+            remove_dirs: 是否同时删除知识库文件目录。为 False 时只清空元数据并关闭知识库实例
+        """
         if not self.kb_manager:
             return
 
@@ -561,7 +598,7 @@ class AstrBotImporter:
             try:
                 kb_helper = self.kb_manager.kb_insts[kb_id]
                 await kb_helper.terminate()
-                if kb_helper.kb_dir.exists():
+                if remove_dirs and kb_helper.kb_dir.exists():
                     shutil.rmtree(kb_helper.kb_dir)
             except Exception as e:
                 logger.warning(f"清理知识库 {kb_id} 失败: {e}")
@@ -599,6 +636,140 @@ class AstrBotImporter:
 
         return imported
 
+    async def _import_main_database_stream(
+        self,
+        zf: zipfile.ZipFile,
+        manifest: dict,
+    ) -> dict[str, int]:
+        """逐表、逐批导入 NDJSON 格式的主数据库
+
+        所有表在同一个事务中写入, 任一文件校验失败时整个导入回滚。
+        增量备份中, 只包含变化记录的表按主键合并, 子表先删除变化父记录下的旧记录,
+        其余表整表替换。
+        """
+        imported: dict[str, int] = {}
+        checksums = manifest.get("checksums", {})
+        incremental = manifest.get("backup_type") == "incremental"
+        changed_tables = set(manifest.get("incremental", {}).get("changed_tables", []))
+        parent_tables = {parent for _, parent, _ in INCREMENTAL_CHILD_TABLES.values()}
+        # 增量导入中父表记录的键, 用于替换其子表记录
+        parent_keys: dict[str, set] = {}
+        names = set(zf.namelist())
+
+        async with self.main_db.get_db() as session:
+            async with session.begin():
+                for table_name in manifest.get("tables", {}).get("main_db", []):
+                    model_class = MAIN_DB_MODELS.get(table_name)
+                    if not model_class:
+                        logger.warning(f"未知的表: {table_name}")
+                        continue
+                    arcname = f"databases/main_db/{table_name}.ndjson"
+                    if arcname not in names:
+                        continue
+
+                    merge = incremental and table_name in changed_tables
+                    if incremental and not merge:
+                        await self._delete_incremental_rows(
+                            session, table_name, model_class, parent_keys
+                        )
+
+                    count = 0
+                    for rows in self._iter_main_table_batches(
+                        zf, arcname, table_name, checksums.get(arcname)
+                    ):
+                        count += await self._insert_rows(
+                            session, table_name, model_class, rows, merge=merge
+                        )
+                        if incremental and table_name in parent_tables:
+                            for _, parent, key in INCREMENTAL_CHILD_TABLES.values():
+                                if parent == table_name:
+                                    parent_keys.setdefault(key, set()).update(
+                                        row.get(key) for row in rows
+                                    )
+
+                    imported[table_name] = count
+                    logger.debug(f"导入表 {table_name}: {count} 条记录")
+
+        return imported
+
+    def _iter_main_table_batches(
+        self,
+        zf: zipfile.ZipFile,
+        arcname: str,
+        table_name: str,
+        checksum: str | None,
+    ) -> Iterator[list[dict[str, Any]]]:
+        batches = iter_ndjson_batches(zf, arcname, checksum=checksum)
+        if table_name != "platform_stats":
+            yield from batches
+            return
+        # 重复键需要在整张表范围内聚合。platform_stats 按小时聚合, 数据量很小
+        rows = [row for batch in batches for row in batch]
+        if rows:
+            yield self._preprocess_main_table_rows(table_name, rows)
+
+    async def _delete_incremental_rows(
+        self,
+        session: Any,
+        table_name: str,
+        model_class: type,
+        parent_keys: dict[str, set],
+    ) -> None:
+        """增量导入前删除将被替换的记录: 子表删除变化父记录下的记录, 完整导出的表整表删除"""
+        if table_name not in INCREMENTAL_CHILD_TABLES:
+            await session.execute(delete(model_class))
+            return
+        fk, _, parent_key = INCREMENTAL_CHILD_TABLES[table_name]
+        keys = list(parent_keys.get(parent_key, ()))
+        column = getattr(model_class, fk)
+        for start in range(0, len(keys), BACKUP_BATCH_SIZE):
+            chunk = keys[start : start + BACKUP_BATCH_SIZE]
+            await session.execute(delete(model_class).where(column.in_(chunk)))
+
+    async def _insert_rows(
+        self,
+        session: Any,
+        table_name: str,
+        model_class: type,
+        rows: list[dict[str, Any]],
+        merge: bool = False,
+    ) -> int:
+        """批量写入一批记录并立即 flush, 写入后从会话中移除以释放内存
+
+        Args:
+            merge: 按主键合并（存在则更新），用于增量导入
+
+        Returns:
+            int: 写入的记录数
+        """
+        objs = []
+        for row in rows:
+            try:
+                row = self._convert_datetime_fields(row, model_class)
+                objs.append(model_class(**row))
+            except Exception as e:
+                logger.warning(f"导入记录到 {table_name} 失败: {e}")
+        if merge:
+            for obj in objs:
+                await session.merge(obj)
+        else:
+            session.add_all(objs)
+        await session.flush()
+        session.expunge_all()
+        return len(objs)
+
+    @staticmethod
+    def _read_attachment_rows(zf: zipfile.ZipFile) -> list[dict]:
+        """读取附件记录中恢复附件文件所需的字段"""
+        arcname = "databases/main_db/attachments.ndjson"
+        if arcname not in zf.namelist():
+            return []
+        return [
+            {"attachment_id": row.get("attachment_id"), "path": row.get("path")}
+            for batch in iter_ndjson_batches(zf, arcname)
+            for row in batch
+        ]
+
     def _preprocess_main_table_rows(
         self, table_name: str, rows: list[dict[str, Any]]
     ) -> list[dict[str, Any]]:
@@ -763,36 +934,106 @@ class AstrBotImporter:
                 except Exception as e:
                     result.add_warning(f"导入知识库 {kb_id} 的文档失败: {e}")
 
-            # 导入 FAISS 索引
-            faiss_path = f"databases/kb_{kb_id}/index.faiss"
-            if faiss_path in zf.namelist():
+            self._import_kb_files(zf, kb_id, kb_dir, result)
+
+        # 3. 重新加载知识库实例
+        await self.kb_manager.load_kbs()
+
+    async def _import_knowledge_bases_stream(
+        self,
+        zf: zipfile.ZipFile,
+        manifest: dict,
+        result: ImportResult,
+    ) -> None:
+        """逐批导入 NDJSON 格式的知识库数据
+
+        知识库元数据总是完整导出, 直接整表写入; 文档数据只包含备份中导出的知识库,
+        增量备份中这些知识库的旧文件会先被删除。
+        """
+        if not self.kb_manager:
+            return
+
+        checksums = manifest.get("checksums", {})
+        incremental = manifest.get("backup_type") == "incremental"
+        names = set(zf.namelist())
+
+        # 1. 导入知识库元数据
+        async with self.kb_manager.kb_db.get_db() as session:
+            async with session.begin():
+                for table_name, model_class in KB_METADATA_MODELS.items():
+                    arcname = f"databases/kb_metadata/{table_name}.ndjson"
+                    if arcname not in names:
+                        continue
+                    count = 0
+                    for rows in iter_ndjson_batches(
+                        zf, arcname, checksum=checksums.get(arcname)
+                    ):
+                        count += await self._insert_rows(
+                            session, table_name, model_class, rows
+                        )
+                    result.imported_tables[f"kb_{table_name}"] = count
+
+        # 2. 导入每个知识库的文档和文件
+        kb_root = Path(self.kb_root_dir)
+        for kb_id in manifest.get("tables", {}).get("kb_documents", {}):
+            kb_dir = kb_root / kb_id
+            # Validate path is within knowledge base root (CWE-22)
+            if not _validate_path_within(kb_dir, kb_root):
+                result.add_warning(f"知识库路径越界，已跳过: {kb_id}")
+                continue
+            if incremental and kb_dir.exists():
+                shutil.rmtree(kb_dir)
+            kb_dir.mkdir(parents=True, exist_ok=True)
+
+            doc_path = f"databases/kb_{kb_id}/documents.ndjson"
+            if doc_path in names:
                 try:
-                    target_path = kb_dir / "index.faiss"
-                    with zf.open(faiss_path) as src, open(target_path, "wb") as dst:
-                        dst.write(src.read())
+                    await self._import_kb_documents_stream(
+                        zf, kb_id, doc_path, checksums.get(doc_path)
+                    )
                 except Exception as e:
-                    result.add_warning(f"导入知识库 {kb_id} 的 FAISS 索引失败: {e}")
+                    result.add_warning(f"导入知识库 {kb_id} 的文档失败: {e}")
 
-            # 导入媒体文件
-            media_prefix = f"files/kb_media/{kb_id}/"
-            for name in zf.namelist():
-                if name.startswith(media_prefix):
-                    try:
-                        rel_path = name[len(media_prefix) :]
-                        target_path = kb_dir / rel_path
-                        # Validate path is within kb directory (CWE-22)
-                        if not _validate_path_within(target_path, kb_dir):
-                            logger.warning(f"媒体文件路径越界，已跳过: {target_path}")
-                            continue
-                        target_path.parent.mkdir(parents=True, exist_ok=True)
-                        with zf.open(name) as src, open(target_path, "wb") as dst:
-                            dst.write(src.read())
-                    except Exception as e:
-                        result.add_warning(f"导入媒体文件 {name} 失败: {e}")
+            self._import_kb_files(zf, kb_id, kb_dir, result)
 
         # 3. 重新加载知识库实例
         await self.kb_manager.load_kbs()
 
+    def _import_kb_files(
+        self,
+        zf: zipfile.ZipFile,
+        kb_id: str,
+        kb_dir: Path,
+        result: ImportResult,
+    ) -> None:
+        """导入知识库的 FAISS 索引和媒体文件"""
+        # 导入 FAISS 索引
+        faiss_path = f"databases/kb_{kb_id}/index.faiss"
+        if faiss_path in zf.namelist():
+            try:
+                target_path = kb_dir / "index.faiss"
+                with zf.open(faiss_path) as src, open(target_path, "wb") as dst:
+                    shutil.copyfileobj(src, dst)
+            except Exception as e:
+                result.add_warning(f"导入知识库 {kb_id} 的 FAISS 索引失败: {e}")
+
+        # 导入媒体文件
+        media_prefix = f"files/kb_media/{kb_id}/"
+        for name in zf.namelist():
+            if name.startswith(media_prefix):
+                try:
+                    rel_path = name[len(media_prefix) :]
+                    target_path = kb_dir / rel_path
+                    # Validate path is within kb directory (CWE-22)
+                    if not _validate_path_within(target_path, kb_dir):
+                        logger.warning(f"媒体文件路径越界，已跳过: {target_path}")
+                        continue
+                    target_path.parent.mkdir(parents=True, exist_ok=True)
+                    with zf.open(name) as src, open(target_path, "wb") as dst:
+                        shutil.copyfileobj(src, dst)
+                except Exception as e:
+                    result.add_warning(f"导入媒体文件 {name} 失败: {e}")
+
     async def _import_kb_documents(self, kb_id: str, doc_data: dict) -> None:
         """导入知识库文档到向量数据库"""
         from astrbot.core.db.vec_db.faiss_impl.document_storage import DocumentStorage
@@ -818,6 +1059,32 @@ class AstrBotImporter:
         finally:
             await doc_storage.close()
 
+    async def _import_kb_documents_stream(
+        self,
+        zf: zipfile.ZipFile,
+        kb_id: str,
+        arcname: str,
+        checksum: str | None = None,
+    ) -> None:
+        """逐批导入 NDJSON 格式的知识库文档, 保留文档的整数 ID 以对应 FAISS 索引"""
+        from astrbot.core.db.vec_db.faiss_impl.document_storage import DocumentStorage
+
+        kb_dir = Path(self.kb_root_dir) / kb_id
+        doc_storage = DocumentStorage(str(kb_dir / "doc.db"))
+        await doc_storage.initialize()
+
+        try:
+            for docs in iter_ndjson_batches(zf, arcname, checksum=checksum):
+                ids = [doc.get("id") for doc in docs]
+                await doc_storage.insert_documents_batch(
+                    doc_ids=[doc.get("doc_id", "") for doc in docs],
+                    texts=[doc.get("text", "") for doc in docs],
+                    metadatas=[json.loads(doc.get("metadata") or "{}") for doc in docs],
+                    ids=None if None in ids else ids,
+                )
+        finally:
+            await doc_storage.close()
+
     async def _import_attachments(
         self,
         zf: zipfile.ZipFile,
@@ -0,0 +1,76 @@
+"""备份文件中 NDJSON 数据的流式读写
+
+每张表保存为一个 NDJSON 文件, 每行一条记录。导出时按批写入 ZIP 并同步计算校验和,
+导入时逐行读取并按批返回, 内存占用只与批大小有关, 与表的大小无关。
+"""
+
+import hashlib
+import json
+import zipfile
+from collections.abc import Iterable, Iterator
+from typing import Any
+
+# 每批读写的记录数
+BACKUP_BATCH_SIZE = 1000
+
+
+class NDJSONWriter:
+    """将记录逐批写入 ZIP 中的一个 NDJSON 文件, 并增量计算 sha256 校验和"""
+
+    def __init__(self, zf: zipfile.ZipFile, arcname: str) -> None:
+        self.arcname = arcname
+        self.count = 0
+        self._sha256 = hashlib.sha256()
+        # 写入前无法得知文件大小, 强制使用 ZIP64 以支持超过 2GB 的表
+        self._file = zf.open(arcname, "w", force_zip64=True)
+
+    def write_rows(self, rows: Iterable[dict[str, Any]]) -> None:
+        lines = [json.dumps(row, ensure_ascii=False, default=str) for row in rows]
+        if not lines:
+            return
+        data = ("\n".join(lines) + "\n").encode("utf-8")
+        self._file.write(data)
+        self._sha256.update(data)
+        self.count += len(lines)
+
+    @property
+    def checksum(self) -> str:
+        return f"sha256:{self._sha256.hexdigest()}"
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> "NDJSONWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def iter_ndjson_batches(
+    zf: zipfile.ZipFile,
+    arcname: str,
+    batch_size: int = BACKUP_BATCH_SIZE,
+    checksum: str | None = None,
+) -> Iterator[list[dict[str, Any]]]:
+    """逐批读取 ZIP 中的 NDJSON 文件
+
+    给出 checksum 时, 读取完最后一批后校验文件内容, 不一致时抛出 ValueError。
+    调用方在同一个事务中写入各批记录, 校验失败时整个事务回滚。
+    """
+    sha256 = hashlib.sha256()
+    batch: list[dict[str, Any]] = []
+    with zf.open(arcname) as f:
+        for line in f:
+            sha256.update(line)
+            line = line.strip()
+            if not line:
+                continue
+            batch.append(json.loads(line))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if checksum and checksum != f"sha256:{sha256.hexdigest()}":
+        raise ValueError(f"{arcname} 校验和不匹配，备份文件可能已损坏")
+    if batch:
+        yield batch
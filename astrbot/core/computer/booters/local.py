@@ -29,6 +29,7 @@ from astrbot.core.utils.astrbot_path import (
 
 from ..olayer import FileSystemComponent, PythonComponent, ShellComponent
 from .base import ComputerBooter
+from .local_kernel import LocalKernelManager
 from .shipyard_search_file_util import _truncate_long_lines
 
 _BLOCKED_COMMAND_PATTERNS = [
@@ -835,6 +836,10 @@ class LocalShellComponent(ShellComponent):
 
 @dataclass
 class LocalPythonComponent(PythonComponent):
+    """Runs code in warm kernels; cells with the same ``kernel_id`` share state."""
+
+    kernels: LocalKernelManager = field(default_factory=LocalKernelManager)
+
     async def exec(
         self,
         code: str,
@@ -843,36 +848,28 @@ class LocalPythonComponent(PythonComponent):
         silent: bool = False,
         cwd: str | None = None,
     ) -> dict[str, Any]:
-        def _run() -> dict[str, Any]:
-            try:
-                working_dir = os.path.abspath(cwd) if cwd else get_astrbot_root()
-                result = subprocess.run(
-                    [os.environ.get("PYTHON", sys.executable), "-c", code],
-                    timeout=timeout,
-                    capture_output=True,
-                    cwd=working_dir,
-                )
-                stdout = "" if silent else _decode_shell_output(result.stdout)
-                stderr = (
-                    _decode_shell_output(result.stderr)
-                    if result.returncode != 0
-                    else ""
-                )
-                return {
-                    "data": {
-                        "output": {"text": stdout, "images": []},
-                        "error": stderr,
-                    }
-                }
-            except subprocess.TimeoutExpired:
-                return {
-                    "data": {
-                        "output": {"text": "", "images": []},
-                        "error": "Execution timed out.",
-                    }
-                }
+        working_dir = os.path.abspath(cwd) if cwd else get_astrbot_root()
+        result = await self.kernels.exec(
+            code,
+            kernel_id=kernel_id,
+            timeout=timeout,
+            cwd=working_dir,
+        )
+        error = result["error"]
+        if error and result["stderr"]:
+            error = result["stderr"] + error
+        return {
+            "data": {
+                "output": {
+                    "text": "" if silent else result["stdout"],
+                    "images": [],
+                },
+                "error": error,
+            }
+        }
 
-        return await asyncio.to_thread(_run)
+    async def shutdown(self) -> None:
+        await self.kernels.shutdown()
 
 
 @dataclass
@@ -1084,6 +1081,7 @@ class LocalBooter(ComputerBooter):
 
     async def shutdown(self) -> None:
         await self._shell.shutdown_sessions()
+        await self._python.shutdown()
         logger.info("Local computer booter shutdown complete.")
 
     @property
@@ -0,0 +1,294 @@
+"""Warm Python kernels for the local computer runtime.
+
+Each kernel is a long-lived interpreter running ``local_kernel_worker.py``.
+Kernels are keyed by ``kernel_id`` so variables and imports carry over between
+cells of the same session. A small pool of spare kernels is started ahead of
+time, so a new session (or a one-off execution without ``kernel_id``) does not
+pay interpreter startup and the configured pre-imports.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import struct
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from astrbot.api import logger
+from astrbot.core.utils.astrbot_path import get_astrbot_root
+from astrbot.core.utils.async_cache import SingleFlight
+
+_HEADER = struct.Struct(">I")
+_WORKER_PATH = Path(__file__).with_name("local_kernel_worker.py")
+_KERNEL_START_TIMEOUT = 120
+
+
+@dataclass
+class LocalKernelOptions:
+    """Process-wide limits for local Python kernels, set from the config at startup."""
+
+    pool_size: int = 1
+    max_kernels: int = 8
+    idle_timeout: float = 600
+    max_memory_mb: int = 0
+    preload_modules: list[str] = field(default_factory=list)
+
+    def configure(
+        self,
+        pool_size: int,
+        max_kernels: int,
+        idle_timeout: float,
+        max_memory_mb: int,
+        preload_modules: list[str],
+    ) -> None:
+        self.pool_size = max(0, pool_size)
+        self.max_kernels = max(1, max_kernels)
+        self.idle_timeout = max(0, idle_timeout)
+        self.max_memory_mb = max(0, max_memory_mb)
+        self.preload_modules = [m.strip() for m in preload_modules if m.strip()]
+
+
+kernel_options = LocalKernelOptions()
+
+
+class KernelDiedError(RuntimeError):
+    pass
+
+
+@dataclass
+class _Kernel:
+    """Runtime state for one warm interpreter process."""
+
+    process: asyncio.subprocess.Process
+    started_at: float
+    last_used: float
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+    @property
+    def alive(self) -> bool:
+        return self.process.returncode is None
+
+    async def read_frame(self) -> dict[str, Any]:
+        assert self.process.stdout is not None
+        try:
+            header = await self.process.stdout.readexactly(_HEADER.size)
+            (length,) = _HEADER.unpack(header)
+            payload = await self.process.stdout.readexactly(length)
+        except asyncio.IncompleteReadError as exc:
+            raise KernelDiedError("Python kernel exited unexpectedly.") from exc
+        return json.loads(payload.decode("utf-8"))
+
+    async def request(self, message: dict[str, Any]) -> dict[str, Any]:
+        assert self.process.stdin is not None
+        payload = json.dumps(message, ensure_ascii=False).encode("utf-8")
+        try:
+            self.process.stdin.write(_HEADER.pack(len(payload)) + payload)
+            await self.process.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError) as exc:
+            raise KernelDiedError("Python kernel exited unexpectedly.") from exc
+        return await self.read_frame()
+
+    async def kill(self) -> None:
+        if self.alive:
+            try:
+                self.process.kill()
+            except ProcessLookupError:
+                pass
+        try:
+            await self.process.wait()
+        except Exception:
+            pass
+
+
+class LocalKernelManager:
+    """Owns the warm kernels of one ``LocalPythonComponent``."""
+
+    def __init__(self, options: LocalKernelOptions | None = None) -> None:
+        self.options = options or kernel_options
+        self._kernels: dict[str, _Kernel] = {}
+        self._spares: list[_Kernel] = []
+        # Concurrent first cells of one kernel_id share a single kernel start.
+        self._starting: SingleFlight[str, _Kernel] = SingleFlight()
+        self._refill_task: asyncio.Task[None] | None = None
+        self._cull_task: asyncio.Task[None] | None = None
+
+    async def exec(
+        self,
+        code: str,
+        kernel_id: str | None,
+        timeout: float,
+        cwd: str,
+    ) -> dict[str, Any]:
+        """Run ``code`` in the kernel of ``kernel_id``.
+
+        Without ``kernel_id`` the code runs in a fresh spare kernel that is
+        discarded afterwards, matching a one-off ``python -c`` run.
+        """
+        kernel = await self._acquire(kernel_id)
+        async with kernel.lock:
+            kernel.last_used = time.monotonic()
+            try:
+                response = await asyncio.wait_for(
+                    kernel.request({"op": "exec", "code": code, "cwd": cwd}),
+                    timeout=timeout,
+                )
+            except asyncio.TimeoutError:
+                # Running code cannot be interrupted safely, so the whole kernel goes.
+                await self._discard(kernel_id, kernel)
+                suffix = (
+                    " The Python kernel was restarted and its state was lost."
+                    if kernel_id
+                    else ""
+                )
+                return {
+                    "stdout": "",
+                    "stderr": "",
+                    "error": "Execution timed out." + suffix,
+                }
+            except KernelDiedError as exc:
+                await self._discard(kernel_id, kernel)
+                return {"stdout": "", "stderr": "", "error": str(exc)}
+            finally:
+                kernel.last_used = time.monotonic()
+        if kernel_id is None:
+            await self._discard(None, kernel)
+        return response
+
+    async def shutdown(self) -> None:
+        tasks = [
+            task
+            for task in (self._refill_task, self._cull_task)
+            if task is not None and not task.done()
+        ]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        kernels = [*self._kernels.values(), *self._spares]
+        self._kernels.clear()
+        self._spares.clear()
+        await asyncio.gather(*(kernel.kill() for kernel in kernels))
+
+    async def _acquire(self, kernel_id: str | None) -> _Kernel:
+        if kernel_id is None:
+            return await self._take_kernel(None)
+        kernel = self._kernels.get(kernel_id)
+        if kernel is not None and kernel.alive:
+            return kernel
+        kernel, _ = await self._starting.do(
+            kernel_id, lambda: self._take_kernel(kernel_id)
+        )
+        return kernel
+
+    async def _take_kernel(self, kernel_id: str | None) -> _Kernel:
+        """Hand out a spare (or freshly started) kernel, registered under ``kernel_id``."""
+        if kernel_id is not None:
+            self._kernels.pop(kernel_id, None)
+
+        kernel = None
+        while self._spares:
+            spare = self._spares.pop(0)
+            if spare.alive:
+                kernel = spare
+                break
+        if kernel is None:
+            kernel = await self._start_kernel()
+
+        if kernel_id is not None:
+            await self._evict_for_new_kernel()
+            self._kernels[kernel_id] = kernel
+        self._schedule_refill()
+        self._ensure_cull_task()
+        return kernel
+
+    async def _start_kernel(self) -> _Kernel:
+        env = os.environ.copy()
+        env["PYTHONIOENCODING"] = "utf-8"
+        env["PYTHONUNBUFFERED"] = "1"
+        env["ASTRBOT_KERNEL_MAX_MEMORY_MB"] = str(self.options.max_memory_mb)
+        env["ASTRBOT_KERNEL_PRELOAD"] = ",".join(self.options.preload_modules)
+        process = await asyncio.create_subprocess_exec(
+            os.environ.get("PYTHON", sys.executable),
+            str(_WORKER_PATH),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+            cwd=get_astrbot_root(),
+            env=env,
+        )
+        now = time.monotonic()
+        kernel = _Kernel(process=process, started_at=now, last_used=now)
+        try:
+            ready = await asyncio.wait_for(
+                kernel.read_frame(), timeout=_KERNEL_START_TIMEOUT
+            )
+        except (asyncio.TimeoutError, KernelDiedError) as exc:
+            await kernel.kill()
+            raise RuntimeError("Failed to start the local Python kernel.") from exc
+        except asyncio.CancelledError:
+            await kernel.kill()
+            raise
+        if ready.get("failed"):
+            logger.warning(
+                "[Computer] Python kernel failed to pre-import: %s",
+                ", ".join(ready["failed"]),
+            )
+        return kernel
+
+    async def _discard(self, kernel_id: str | None, kernel: _Kernel) -> None:
+        if kernel_id is not None and self._kernels.get(kernel_id) is kernel:
+            del self._kernels[kernel_id]
+        await kernel.kill()
+
+    async def _evict_for_new_kernel(self) -> None:
+        """Make room for one more kernel by ending the least recently used idle ones."""
+        overflow = len(self._kernels) + 1 - self.options.max_kernels
+        if overflow <= 0:
+            return
+        idle = sorted(
+            (
+                (kernel.last_used, kernel_id)
+                for kernel_id, kernel in self._kernels.items()
+                if not kernel.lock.locked()
+            ),
+        )
+        for _, kernel_id in idle[:overflow]:
+            await self._discard(kernel_id, self._kernels[kernel_id])
+
+    def _schedule_refill(self) -> None:
+        if self._refill_task is None or self._refill_task.done():
+            self._refill_task = asyncio.create_task(self._refill_spares())
+
+    async def _refill_spares(self) -> None:
+        while len(self._spares) < self.options.pool_size:
+            try:
+                self._spares.append(await self._start_kernel())
+            except Exception as exc:
+                logger.warning(f"[Computer] Failed to pre-warm Python kernel: {exc}")
+                return
+
+    def _ensure_cull_task(self) -> None:
+        if self.options.idle_timeout <= 0:
+            return
+        if self._cull_task is None or self._cull_task.done():
+            self._cull_task = asyncio.create_task(self._cull_idle_kernels())
+
+    async def _cull_idle_kernels(self) -> None:
+        interval = min(60.0, max(1.0, self.options.idle_timeout / 2))
+        while self._kernels or self._spares:
+            await asyncio.sleep(interval)
+            deadline = time.monotonic() - self.options.idle_timeout
+            for kernel_id, kernel in list(self._kernels.items()):
+                if not kernel.lock.locked() and kernel.last_used < deadline:
+                    await self._discard(kernel_id, kernel)
+            # Once nothing has run for a while, drop the spares too; the next
+            # execution warms the pool again.
+            if not self._kernels and all(
+                spare.last_used < deadline for spare in self._spares
+            ):
+                spares, self._spares = self._spares, []
+                await asyncio.gather(*(spare.kill() for spare in spares))
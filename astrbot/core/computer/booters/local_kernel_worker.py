@@ -0,0 +1,173 @@
+"""Worker process for a warm local Python kernel.
+
+Started by ``LocalKernelManager`` with the user's interpreter, so this file must
+only depend on the standard library. The manager and the worker exchange frames
+over the worker's stdin/stdout: a 4-byte big-endian length followed by a UTF-8
+JSON object.
+
+Requests:  {"op": "exec", "code": str, "cwd": str | None}
+Responses: {"op": "ready", "preloaded": [...], "failed": [...]} once on startup,
+           then {"op": "result", "stdout": str, "stderr": str, "error": str}
+           for every exec request.
+
+While user code runs, file descriptors 1 and 2 point at temporary files, so
+output from ``print`` as well as from child processes is captured.
+"""
+
+import ast
+import json
+import os
+import struct
+import sys
+import tempfile
+import traceback
+
+_HEADER = struct.Struct(">I")
+_MAX_OUTPUT_BYTES = 1024 * 1024
+
+
+def _read_frame(stream) -> dict | None:
+    header = stream.read(_HEADER.size)
+    if len(header) < _HEADER.size:
+        return None
+    (length,) = _HEADER.unpack(header)
+    payload = stream.read(length)
+    if len(payload) < length:
+        return None
+    return json.loads(payload.decode("utf-8"))
+
+
+def _write_frame(stream, message: dict) -> None:
+    payload = json.dumps(message, ensure_ascii=False).encode("utf-8")
+    stream.write(_HEADER.pack(len(payload)) + payload)
+    stream.flush()
+
+
+def _apply_memory_limit() -> None:
+    limit_mb = int(os.environ.get("ASTRBOT_KERNEL_MAX_MEMORY_MB") or 0)
+    if limit_mb <= 0:
+        return
+    try:
+        import resource
+    except ImportError:  # Windows
+        return
+    limit = limit_mb * 1024 * 1024
+    try:
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ValueError, OSError):
+        pass
+
+
+def _preload_modules() -> tuple[list[str], list[str]]:
+    preloaded, failed = [], []
+    for name in filter(None, os.environ.get("ASTRBOT_KERNEL_PRELOAD", "").split(",")):
+        try:
+            __import__(name)
+            preloaded.append(name)
+        except Exception:
+            failed.append(name)
+    return preloaded, failed
+
+
+def _compile_cell(code: str):
+    """Compile a cell; a trailing expression is echoed like in a REPL."""
+    tree = ast.parse(code, "<cell>", "exec")
+    last_expr = None
+    if tree.body and isinstance(tree.body[-1], ast.Expr):
+        last_expr = ast.Expression(tree.body.pop().value)
+    body = compile(tree, "<cell>", "exec")
+    tail = compile(last_expr, "<cell>", "eval") if last_expr is not None else None
+    return body, tail
+
+
+def _format_exception(exc: BaseException) -> str:
+    # Drop this module's frames so the traceback starts at the user's cell.
+    tb = exc.__traceback__
+    while tb is not None and tb.tb_frame.f_code.co_filename == __file__:
+        tb = tb.tb_next
+    return "".join(traceback.format_exception(type(exc), exc, tb))
+
+
+def _read_capture(f) -> str:
+    f.flush()
+    f.seek(0)
+    data = f.read(_MAX_OUTPUT_BYTES + 1)
+    f.seek(0)
+    f.truncate()
+    text = data[:_MAX_OUTPUT_BYTES].decode("utf-8", errors="replace")
+    if len(data) > _MAX_OUTPUT_BYTES:
+        text += "\n... (output truncated)"
+    return text
+
+
+def _run_cell(namespace: dict, code: str, cwd: str | None, out, err) -> dict:
+    error = ""
+    sys.stdout.flush()
+    sys.stderr.flush()
+    saved_out, saved_err = os.dup(1), os.dup(2)
+    os.dup2(out.fileno(), 1)
+    os.dup2(err.fileno(), 2)
+    try:
+        if cwd:
+            os.chdir(cwd)
+        body, tail = _compile_cell(code)
+        exec(body, namespace)
+        if tail is not None:
+            value = eval(tail, namespace)
+            if value is not None:
+                namespace["_"] = value
+                print(repr(value))
+    except SystemExit as exc:
+        if exc.code not in (None, 0):
+            error = f"SystemExit: {exc.code}"
+    except BaseException as exc:
+        error = _format_exception(exc)
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os.dup2(saved_out, 1)
+        os.dup2(saved_err, 2)
+        os.close(saved_out)
+        os.close(saved_err)
+    return {
+        "op": "result",
+        "stdout": _read_capture(out),
+        "stderr": _read_capture(err),
+        "error": error,
+    }
+
+
+def main() -> None:
+    # Keep the protocol channel on private descriptors; user code sees an empty
+    # stdin and its stdout/stderr are redirected per cell.
+    proto_in = os.fdopen(os.dup(0), "rb")
+    proto_out = os.fdopen(os.dup(1), "wb")
+    devnull = os.open(os.devnull, os.O_RDWR)
+    os.dup2(devnull, 0)
+    os.dup2(devnull, 1)
+    os.close(devnull)
+
+    # Behave like ``python -c``: the working directory is importable, this
+    # file's directory is not.
+    sys.path[0] = ""
+
+    _apply_memory_limit()
+    preloaded, failed = _preload_modules()
+    _write_frame(proto_out, {"op": "ready", "preloaded": preloaded, "failed": failed})
+
+    namespace: dict = {"__name__": "__main__", "__builtins__": __builtins__}
+    with tempfile.TemporaryFile() as out, tempfile.TemporaryFile() as err:
+        while True:
+            request = _read_frame(proto_in)
+            if request is None:
+                return
+            if request.get("op") != "exec":
+                continue
+            _write_frame(
+                proto_out,
+                _run_cell(namespace, request["code"], request.get("cwd"), out, err),
+            )
+
+
+if __name__ == "__main__":
+    main()
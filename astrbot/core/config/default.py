@@ -61,6 +61,15 @@ DEFAULT_CONFIG = {
             "time": 60,
             "count": 30,
             "strategy": "stall",  # stall, discard
+            "user_count": 0,
+            "group_count": 0,
+            "platform_count": 0,
+            "global_count": 0,
+            "token_time": 3600,
+            "user_token_quota": 0,
+            "group_token_quota": 0,
+            "global_token_quota": 0,
+            "persist_state": False,
         },
         "reply_prefix": "",
         "forward_threshold": 1500,
@@ -144,6 +153,7 @@ DEFAULT_CONFIG = {
         "buffer_intermediate_messages": False,
         "sanitize_context_by_modalities": False,
         "max_quoted_fallback_images": 20,
+        "request_build_timeout": 30,
         "quoted_message_parser": {
             "max_component_chain_depth": 4,
             "max_forward_node_depth": 6,
@@ -159,6 +169,7 @@ DEFAULT_CONFIG = {
         "reachability_check": False,
         "max_agent_step": 30,
         "tool_call_timeout": 120,
+        "max_parallel_tool_calls": 4,
         "tool_schema_mode": "full",
         "llm_safety_mode": True,
         "safety_mode_strategy": "system_prompt",  # TODO: llm judge
@@ -172,6 +183,11 @@ DEFAULT_CONFIG = {
         },
         "computer_use_runtime": "none",
         "computer_use_require_admin": True,
+        "local_python_kernel_pool_size": 1,
+        "local_python_kernel_max_kernels": 8,
+        "local_python_kernel_idle_timeout": 600,
+        "local_python_kernel_max_memory_mb": 0,
+        "local_python_kernel_preload_modules": [],
         "sandbox": {
             "booter": "shipyard_neo",
             "shipyard_endpoint": "",
@@ -220,6 +236,7 @@ DEFAULT_CONFIG = {
         "dual_output": False,
         "use_file_service": False,
         "trigger_probability": 1.0,
+        "synthesis_concurrency": 3,  # 分段回复时同时合成语音的分段数量上限
     },
     "provider_ltm_settings": {
         "group_icl_enable": False,
@@ -249,6 +266,13 @@ DEFAULT_CONFIG = {
     "t2i_active_template": "base",
     "http_proxy": "",
     "no_proxy": ["localhost", "127.0.0.1", "::1", "10.*", "192.168.*"],
+    "http_pool_limit": 100,  # 共享 HTTP 连接池的连接总数上限, 0 表示不限制
+    "http_pool_limit_per_host": 0,  # 共享 HTTP 连接池中同一主机的连接数上限, 0 表示不限制
+    "http_pool_keepalive_timeout": 30,  # 空闲的 keep-alive 连接保留时间（秒）
+    "media_cache_enable": True,  # 是否缓存从 URL 下载的图片、语音与视频
+    "media_cache_max_size_mb": 500,  # 媒体缓存占用的磁盘空间上限（MB）
+    "media_cache_max_file_size_mb": 50,  # 单个文件超过该大小（MB）时不进入媒体缓存
+    "media_cache_url_ttl": 86400,  # 同一 URL 复用缓存文件的有效期（秒），0 表示永不过期
     "dashboard": {
         "enable": True,
         "username": "astrbot",
@@ -296,6 +320,9 @@ DEFAULT_CONFIG = {
     "log_file_enable": False,
     "log_file_path": "logs/astrbot.log",
     "log_file_max_mb": 20,
+    "log_store_enable": True,  # 是否将日志写入可查询的持久化日志库
+    "log_store_max_mb": 200,  # 持久化日志库的大小上限（MB）
+    "log_store_retention_days": 7,  # 持久化日志的保留天数
     "temp_dir_max_size": 1024,
     "trace_enable": False,
     "trace_log_enable": False,
@@ -311,7 +338,30 @@ DEFAULT_CONFIG = {
     "kb_names": [],  # 默认知识库名称列表
     "kb_fusion_top_k": 20,  # 知识库检索融合阶段返回结果数量
     "kb_final_top_k": 5,  # 知识库检索最终返回结果数量
+    "kb_retrieval_concurrency": 4,  # 知识库检索时并发查询的知识库数量上限
+    "kb_retrieval_timeout": 10,  # 知识库检索各阶段（稠密/稀疏/Rerank）超时时间（秒）
+    "kb_query_cache_enable": True,  # 是否缓存知识库检索的查询向量
+    "kb_query_cache_max_entries": 1024,  # 查询向量缓存的最大条目数
+    "kb_query_cache_ttl": 3600,  # 查询向量缓存有效期（秒），0 表示永不过期
+    "kb_query_cache_persist": False,  # 是否将查询向量缓存持久化到磁盘
+    "kb_ingest_workers": 2,  # 同时导入的知识库文档数量
+    "kb_chunk_embedding_reuse": True,  # 导入文档时复用内容相同的文本块的已有向量
+    "kb_chunk_embedding_max_entries": 50000,  # 文本块向量存储的最大条目数
+    "image_caption_cache_enable": True,  # 是否按图片内容缓存图片转述结果
+    "image_caption_cache_max_entries": 2048,  # 图片转述缓存的最大条目数
+    "image_caption_cache_ttl": 604800,  # 图片转述缓存有效期（秒），0 表示永不过期
+    "tts_audio_cache_enable": True,  # 是否缓存 TTS 合成的音频
+    "tts_audio_cache_max_size_mb": 200,  # TTS 音频缓存占用的磁盘空间上限（MB）
+    "web_search_cache_enable": True,  # 是否缓存网页搜索与网页提取的结果
+    "web_search_cache_max_entries": 1000,  # 网页搜索缓存的最大条目数
+    "web_search_cache_ttl": 3600,  # 网页搜索缓存有效期（秒），0 表示永不过期
     "kb_agentic_mode": False,
+    "event_dispatch_mode": "task",  # task: 每个事件一个任务; worker_pool: 有界工作池, 会话内按序处理
+    "event_dispatch_max_workers": 32,  # worker_pool 模式下同时处理的事件数量上限
+    "event_dispatch_conf_quota": 0,  # 单个配置文件同时处理的事件数量上限, 0 表示不限制
+    "event_dispatch_max_pending": 1000,  # 等待处理的事件数量上限
+    "event_dispatch_overflow_policy": "queue",  # queue, drop_oldest, reject
+    "pipeline_profiler_enable": False,  # 是否统计消息管道各阶段与插件 Handler 的耗时
     "disable_builtin_commands": False,
     "disable_metrics": False,
 }
@@ -1017,6 +1067,15 @@ CONFIG_METADATA_2 = {
                                 "type": "string",
                                 "options": ["stall", "discard"],
                             },
+                            "user_count": {"type": "int"},
+                            "group_count": {"type": "int"},
+                            "platform_count": {"type": "int"},
+                            "global_count": {"type": "int"},
+                            "token_time": {"type": "int"},
+                            "user_token_quota": {"type": "int"},
+                            "group_token_quota": {"type": "int"},
+                            "global_token_quota": {"type": "int"},
+                            "persist_state": {"type": "bool"},
                         },
                     },
                     "no_permission_reply": {
@@ -2976,6 +3035,25 @@ CONFIG_METADATA_2 = {
                     "tool_call_timeout": {
                         "type": "int",
                     },
+                    "max_parallel_tool_calls": {
+                        "type": "int",
+                    },
+                    "local_python_kernel_pool_size": {
+                        "type": "int",
+                    },
+                    "local_python_kernel_max_kernels": {
+                        "type": "int",
+                    },
+                    "local_python_kernel_idle_timeout": {
+                        "type": "int",
+                    },
+                    "local_python_kernel_max_memory_mb": {
+                        "type": "int",
+                    },
+                    "local_python_kernel_preload_modules": {
+                        "type": "list",
+                        "items": {"type": "string"},
+                    },
                     "tool_schema_mode": {
                         "type": "string",
                     },
@@ -3032,6 +3110,9 @@ CONFIG_METADATA_2 = {
                     "trigger_probability": {
                         "type": "float",
                     },
+                    "synthesis_concurrency": {
+                        "type": "int",
+                    },
                 },
             },
             "provider_ltm_settings": {
@@ -3106,6 +3187,13 @@ CONFIG_METADATA_2 = {
                 "items": {"type": "string"},
                 "hint": "在此处添加不希望通过代理访问的地址，例如内部服务地址。回车添加，可添加多个，如未设置代理请忽略此配置",
             },
+            "http_pool_limit": {"type": "int", "default": 100},
+            "http_pool_limit_per_host": {"type": "int", "default": 0},
+            "http_pool_keepalive_timeout": {"type": "int", "default": 30},
+            "media_cache_enable": {"type": "bool", "default": True},
+            "media_cache_max_size_mb": {"type": "int", "default": 500},
+            "media_cache_max_file_size_mb": {"type": "int", "default": 50},
+            "media_cache_url_ttl": {"type": "int", "default": 86400},
             "timezone": {
                 "type": "string",
             },
@@ -3141,7 +3229,22 @@ CONFIG_METADATA_2 = {
             "log_file_enable": {"type": "bool"},
             "log_file_path": {"type": "string", "condition": {"log_file_enable": True}},
             "log_file_max_mb": {"type": "int", "condition": {"log_file_enable": True}},
+            "log_store_enable": {"type": "bool", "default": True},
+            "log_store_max_mb": {"type": "int", "default": 200},
+            "log_store_retention_days": {"type": "int", "default": 7},
             "temp_dir_max_size": {"type": "int"},
+            "event_dispatch_mode": {
+                "type": "string",
+                "options": ["task", "worker_pool"],
+            },
+            "event_dispatch_max_workers": {"type": "int", "default": 32},
+            "event_dispatch_conf_quota": {"type": "int", "default": 0},
+            "event_dispatch_max_pending": {"type": "int", "default": 1000},
+            "event_dispatch_overflow_policy": {
+                "type": "string",
+                "options": ["queue", "drop_oldest", "reject"],
+            },
+            "pipeline_profiler_enable": {"type": "bool"},
             "trace_log_enable": {"type": "bool"},
             "trace_log_path": {
                 "type": "string",
@@ -3173,6 +3276,23 @@ CONFIG_METADATA_2 = {
             "kb_names": {"type": "list", "items": {"type": "string"}},
             "kb_fusion_top_k": {"type": "int", "default": 20},
             "kb_final_top_k": {"type": "int", "default": 5},
+            "kb_retrieval_concurrency": {"type": "int", "default": 4},
+            "kb_retrieval_timeout": {"type": "float", "default": 10},
+            "kb_query_cache_enable": {"type": "bool", "default": True},
+            "kb_query_cache_max_entries": {"type": "int", "default": 1024},
+            "kb_query_cache_ttl": {"type": "int", "default": 3600},
+            "kb_query_cache_persist": {"type": "bool", "default": False},
+            "kb_ingest_workers": {"type": "int", "default": 2},
+            "kb_chunk_embedding_reuse": {"type": "bool", "default": True},
+            "kb_chunk_embedding_max_entries": {"type": "int", "default": 50000},
+            "image_caption_cache_enable": {"type": "bool", "default": True},
+            "image_caption_cache_max_entries": {"type": "int", "default": 2048},
+            "image_caption_cache_ttl": {"type": "int", "default": 604800},
+            "tts_audio_cache_enable": {"type": "bool", "default": True},
+            "tts_audio_cache_max_size_mb": {"type": "int", "default": 200},
+            "web_search_cache_enable": {"type": "bool", "default": True},
+            "web_search_cache_max_entries": {"type": "int", "default": 1000},
+            "web_search_cache_ttl": {"type": "int", "default": 3600},
             "kb_agentic_mode": {"type": "bool"},
         },
     },
@@ -3318,10 +3438,52 @@ CONFIG_METADATA_3 = {
                             "provider_tts_settings.enable": True,
                         },
                     },
+                    "provider_tts_settings.synthesis_concurrency": {
+                        "description": "TTS 并发合成数",
+                        "type": "int",
+                        "hint": "分段回复时同时合成语音的分段数量上限。支持流式合成的 TTS 提供商会在同一个会话中依次合成",
+                        "condition": {
+                            "provider_tts_settings.enable": True,
+                        },
+                    },
+                    "tts_audio_cache_enable": {
+                        "description": "TTS 音频缓存",
+                        "type": "bool",
+                        "hint": "按 TTS 提供商、音色和文本缓存合成的音频，重复的语句不再重复合成。修改后需重启生效",
+                        "condition": {
+                            "provider_tts_settings.enable": True,
+                        },
+                    },
+                    "tts_audio_cache_max_size_mb": {
+                        "description": "TTS 音频缓存大小（MB）",
+                        "type": "int",
+                        "hint": "缓存音频占用的磁盘空间上限，超出后淘汰最久未使用的音频。修改后需重启生效",
+                        "condition": {
+                            "provider_tts_settings.enable": True,
+                            "tts_audio_cache_enable": True,
+                        },
+                    },
                     "provider_settings.image_caption_prompt": {
                         "description": "图片转述提示词",
                         "type": "text",
                     },
+                    "image_caption_cache_enable": {
+                        "description": "图片转述缓存",
+                        "type": "bool",
+                        "hint": "按图片内容缓存转述结果，相同的图片不再重复压缩和请求转述模型。缓存保存在数据库中，重启后仍然有效",
+                    },
+                    "image_caption_cache_max_entries": {
+                        "description": "图片转述缓存容量",
+                        "type": "int",
+                        "hint": "最多缓存的图片转述数量，超出后淘汰最久未使用的条目。修改后需重启生效",
+                        "condition": {"image_caption_cache_enable": True},
+                    },
+                    "image_caption_cache_ttl": {
+                        "description": "图片转述缓存有效期（秒）",
+                        "type": "int",
+                        "hint": "缓存条目的有效期，0 表示永不过期。修改后需重启生效",
+                        "condition": {"image_caption_cache_enable": True},
+                    },
                 },
                 "condition": {
                     "provider_settings.enable": True,
@@ -3365,6 +3527,55 @@ CONFIG_METADATA_3 = {
                         "type": "int",
                         "hint": "从知识库中检索到的结果数量，越大可能获得越多相关信息，但也可能引入噪音。建议根据实际需求调整",
                     },
+                    "kb_retrieval_concurrency": {
+                        "description": "检索并发数",
+                        "type": "int",
+                        "hint": "同时检索的知识库数量上限。稠密检索与稀疏检索会并发执行",
+                    },
+                    "kb_retrieval_timeout": {
+                        "description": "检索阶段超时（秒）",
+                        "type": "float",
+                        "hint": "稠密检索、稀疏检索和 Rerank 各阶段的超时时间。超时的知识库或阶段会被跳过，不影响其余结果",
+                    },
+                    "kb_query_cache_enable": {
+                        "description": "查询向量缓存",
+                        "type": "bool",
+                        "hint": "缓存检索查询的向量，相同的问题不再重复请求 Embedding 服务。修改后需重启生效",
+                    },
+                    "kb_query_cache_max_entries": {
+                        "description": "查询向量缓存容量",
+                        "type": "int",
+                        "hint": "最多缓存的查询向量数量，超出后淘汰最久未使用的条目",
+                        "condition": {"kb_query_cache_enable": True},
+                    },
+                    "kb_query_cache_ttl": {
+                        "description": "查询向量缓存有效期（秒）",
+                        "type": "int",
+                        "hint": "缓存条目的有效期，0 表示永不过期",
+                        "condition": {"kb_query_cache_enable": True},
+                    },
+                    "kb_query_cache_persist": {
+                        "description": "持久化查询向量缓存",
+                        "type": "bool",
+                        "hint": "将查询向量缓存保存到知识库数据库中，重启后仍然有效",
+                        "condition": {"kb_query_cache_enable": True},
+                    },
+                    "kb_ingest_workers": {
+                        "description": "文档导入并发数",
+                        "type": "int",
+                        "hint": "同时导入的文档数量上限。导入进度会保存到数据库，中断后重启会从断点继续。修改后需重启生效",
+                    },
+                    "kb_chunk_embedding_reuse": {
+                        "description": "复用文本块向量",
+                        "type": "bool",
+                        "hint": "按 Embedding 模型与文本内容保存文本块的向量。重新上传修改过的文档或在多个知识库中导入相同内容时，未变化的文本块不再重复请求 Embedding 服务。修改后需重启生效",
+                    },
+                    "kb_chunk_embedding_max_entries": {
+                        "description": "文本块向量存储容量",
+                        "type": "int",
+                        "hint": "最多保存的文本块向量数量，超出后淘汰最久未使用的向量",
+                        "condition": {"kb_chunk_embedding_reuse": True},
+                    },
                     "kb_agentic_mode": {
                         "description": "Agentic 知识库检索",
                         "type": "bool",
@@ -3466,6 +3677,32 @@ CONFIG_METADATA_3 = {
                             "provider_settings.web_search": True,
                         },
                     },
+                    "web_search_cache_enable": {
+                        "description": "网页搜索缓存",
+                        "type": "bool",
+                        "hint": "按搜索提供商和请求参数缓存搜索与网页提取结果，重复的搜索不再消耗 API 额度。同时发起的相同搜索只请求一次。修改后需重启生效",
+                        "condition": {
+                            "provider_settings.web_search": True,
+                        },
+                    },
+                    "web_search_cache_max_entries": {
+                        "description": "网页搜索缓存容量",
+                        "type": "int",
+                        "hint": "最多缓存的搜索结果数量，超出后淘汰最久未使用的条目。修改后需重启生效",
+                        "condition": {
+                            "provider_settings.web_search": True,
+                            "web_search_cache_enable": True,
+                        },
+                    },
+                    "web_search_cache_ttl": {
+                        "description": "网页搜索缓存有效期（秒）",
+                        "type": "int",
+                        "hint": "缓存结果的有效期，0 表示永不过期。时效性强的内容建议设置较短的有效期。修改后需重启生效",
+                        "condition": {
+                            "provider_settings.web_search": True,
+                            "web_search_cache_enable": True,
+                        },
+                    },
                 },
                 "condition": {
                     "provider_settings.agent_runner_type": "local",
@@ -3489,6 +3726,47 @@ CONFIG_METADATA_3 = {
                         "type": "bool",
                         "hint": "开启后，需要 AstrBot 管理员权限才能调用使用电脑能力。在平台配置->管理员中可添加管理员。使用 /sid 指令查看管理员 ID。",
                     },
+                    "provider_settings.local_python_kernel_pool_size": {
+                        "description": "预热 Python 内核数量",
+                        "type": "int",
+                        "hint": "提前启动并完成预导入的空闲 Python 解释器数量，新会话可直接使用。设为 0 则不预热。",
+                        "condition": {
+                            "provider_settings.computer_use_runtime": "local",
+                        },
+                    },
+                    "provider_settings.local_python_kernel_max_kernels": {
+                        "description": "Python 内核数量上限",
+                        "type": "int",
+                        "hint": "每个会话独占一个 Python 内核以保留变量状态。超出上限时回收最久未使用的内核。",
+                        "condition": {
+                            "provider_settings.computer_use_runtime": "local",
+                        },
+                    },
+                    "provider_settings.local_python_kernel_idle_timeout": {
+                        "description": "Python 内核空闲回收时间（秒）",
+                        "type": "int",
+                        "hint": "内核闲置超过该时间后被关闭，其中的变量状态随之丢失。设为 0 则不回收。",
+                        "condition": {
+                            "provider_settings.computer_use_runtime": "local",
+                        },
+                    },
+                    "provider_settings.local_python_kernel_max_memory_mb": {
+                        "description": "Python 内核内存上限（MB）",
+                        "type": "int",
+                        "hint": "单个 Python 内核可使用的虚拟内存上限，仅在 Linux/macOS 上生效。设为 0 则不限制。",
+                        "condition": {
+                            "provider_settings.computer_use_runtime": "local",
+                        },
+                    },
+                    "provider_settings.local_python_kernel_preload_modules": {
+                        "description": "Python 内核预导入模块",
+                        "type": "list",
+                        "items": {"type": "string"},
+                        "hint": "内核启动时预先导入的模块，例如 numpy、pandas，可减少首次导入的等待时间。修改后对新启动的内核生效。",
+                        "condition": {
+                            "provider_settings.computer_use_runtime": "local",
+                        },
+                    },
                     "provider_settings.sandbox.booter": {
                         "description": "沙箱环境驱动器",
                         "type": "string",
@@ -3859,6 +4137,14 @@ CONFIG_METADATA_3 = {
                             "provider_settings.agent_runner_type": "local",
                         },
                     },
+                    "provider_settings.max_parallel_tool_calls": {
+                        "description": "并行工具调用上限",
+                        "type": "int",
+                        "hint": "同一轮中连续的只读工具调用可并行执行，此项为单次运行的最大并发数。设为 1 则逐个执行。",
+                        "condition": {
+                            "provider_settings.agent_runner_type": "local",
+                        },
+                    },
                     "provider_settings.tool_schema_mode": {
                         "description": "工具调用模式",
                         "type": "string",
@@ -3923,6 +4209,15 @@ CONFIG_METADATA_3 = {
                         },
                         "collapsed": True,
                     },
+                    "provider_settings.request_build_timeout": {
+                        "description": "请求构建超时时间(秒)",
+                        "type": "float",
+                        "hint": "构建 LLM 请求时，附件转换、文件提取和知识库检索等可选步骤的总时限。超时的步骤会被跳过，请求照常发送。",
+                        "condition": {
+                            "provider_settings.agent_runner_type": "local",
+                        },
+                        "collapsed": True,
+                    },
                     "provider_settings.quoted_message_parser.max_component_chain_depth": {
                         "description": "引用解析组件链深度",
                         "type": "int",
@@ -4066,6 +4361,50 @@ CONFIG_METADATA_3 = {
                         "type": "string",
                         "options": ["stall", "discard"],
                     },
+                    "platform_settings.rate_limit.user_count": {
+                        "description": "单个用户消息速率限制计数",
+                        "type": "int",
+                        "hint": "同一平台下单个用户在上述时间内允许的消息数，跨会话累计。0 表示不限制。",
+                    },
+                    "platform_settings.rate_limit.group_count": {
+                        "description": "单个群组消息速率限制计数",
+                        "type": "int",
+                        "hint": "单个群组在上述时间内允许的消息数。0 表示不限制。",
+                    },
+                    "platform_settings.rate_limit.platform_count": {
+                        "description": "单个平台消息速率限制计数",
+                        "type": "int",
+                        "hint": "单个平台实例在上述时间内允许的消息数。0 表示不限制。",
+                    },
+                    "platform_settings.rate_limit.global_count": {
+                        "description": "全局消息速率限制计数",
+                        "type": "int",
+                        "hint": "使用此配置文件的所有消息在上述时间内允许的总数。0 表示不限制。",
+                    },
+                    "platform_settings.rate_limit.token_time": {
+                        "description": "LLM Token 额度时间(秒)",
+                        "type": "int",
+                    },
+                    "platform_settings.rate_limit.user_token_quota": {
+                        "description": "单个用户 LLM Token 额度",
+                        "type": "int",
+                        "hint": "单个用户在 Token 额度时间内可消耗的 LLM Token 数，额度耗尽后的消息按速率限制策略处理。0 表示不限制。",
+                    },
+                    "platform_settings.rate_limit.group_token_quota": {
+                        "description": "单个群组 LLM Token 额度",
+                        "type": "int",
+                        "hint": "0 表示不限制。",
+                    },
+                    "platform_settings.rate_limit.global_token_quota": {
+                        "description": "全局 LLM Token 额度",
+                        "type": "int",
+                        "hint": "0 表示不限制。",
+                    },
+                    "platform_settings.rate_limit.persist_state": {
+                        "description": "持久化限流状态",
+                        "type": "bool",
+                        "hint": "启用后，限流状态会定期保存到数据库中，重启后依然生效。",
+                    },
                 },
             },
             "content_safety": {
@@ -4465,11 +4804,64 @@ CONFIG_METADATA_3_SYSTEM = {
                         "type": "int",
                         "hint": "超过大小后自动轮转，默认 20MB。",
                     },
+                    "log_store_enable": {
+                        "description": "启用持久化日志库",
+                        "type": "bool",
+                        "hint": "将日志写入 data/logs/log_store.db，可在控制台按时间范围、级别、插件和会话查询历史日志。修改后需重启生效。",
+                    },
+                    "log_store_max_mb": {
+                        "description": "持久化日志库大小上限 (MB)",
+                        "type": "int",
+                        "hint": "超出后删除最早的日志。",
+                        "condition": {"log_store_enable": True},
+                    },
+                    "log_store_retention_days": {
+                        "description": "持久化日志保留天数",
+                        "type": "int",
+                        "hint": "超过保留天数的日志会被删除，0 表示不按时间清理。",
+                        "condition": {"log_store_enable": True},
+                    },
                     "temp_dir_max_size": {
                         "description": "临时目录大小上限 (MB)",
                         "type": "int",
                         "hint": "用于限制 data/temp 目录总大小，单位为 MB。系统每 10 分钟检查一次，超限时按文件修改时间从旧到新删除，释放约 30% 当前体积。",
                     },
+                    "event_dispatch_mode": {
+                        "description": "消息事件分发模式",
+                        "type": "string",
+                        "hint": "`task` 为每条消息创建一个处理任务，不限制并发；`worker_pool` 使用固定数量的工作协程处理消息，同一会话的消息按顺序处理，可防止消息洪泛时资源耗尽。修改后需重启生效。",
+                        "options": ["task", "worker_pool"],
+                    },
+                    "event_dispatch_max_workers": {
+                        "description": "消息处理并发上限",
+                        "type": "int",
+                        "hint": "同时处理的消息数量上限。",
+                        "condition": {"event_dispatch_mode": "worker_pool"},
+                    },
+                    "event_dispatch_conf_quota": {
+                        "description": "单个配置文件并发上限",
+                        "type": "int",
+                        "hint": "使用同一配置文件的会话同时处理的消息数量上限，0 表示不限制。",
+                        "condition": {"event_dispatch_mode": "worker_pool"},
+                    },
+                    "event_dispatch_max_pending": {
+                        "description": "待处理消息上限",
+                        "type": "int",
+                        "hint": "等待处理的消息数量上限，超出后按溢出策略处理。",
+                        "condition": {"event_dispatch_mode": "worker_pool"},
+                    },
+                    "event_dispatch_overflow_policy": {
+                        "description": "溢出策略",
+                        "type": "string",
+                        "hint": "`queue` 暂停接收新消息直到有空位；`drop_oldest` 丢弃最早的待处理消息；`reject` 丢弃新到达的消息。",
+                        "options": ["queue", "drop_oldest", "reject"],
+                        "condition": {"event_dispatch_mode": "worker_pool"},
+                    },
+                    "pipeline_profiler_enable": {
+                        "description": "启用消息管道性能统计",
+                        "type": "bool",
+                        "hint": "统计每个消息处理阶段与插件 Handler 的耗时分布，可在 /api/v1/stats/pipeline-profile 查看，或通过 /api/v1/stats/pipeline-profile/prometheus 以 Prometheus 格式采集。",
+                    },
                     "trace_log_enable": {
                         "description": "启用 Trace 文件日志",
                         "type": "bool",
@@ -4515,6 +4907,44 @@ CONFIG_METADATA_3_SYSTEM = {
                         "type": "list",
                         "items": {"type": "string"},
                     },
+                    "http_pool_limit": {
+                        "description": "HTTP 连接池连接数上限",
+                        "type": "int",
+                        "hint": "工具、提供商和平台适配器共用的 HTTP 连接池同时打开的连接总数上限，0 表示不限制。修改后需重启生效。",
+                    },
+                    "http_pool_limit_per_host": {
+                        "description": "HTTP 连接池单主机连接数上限",
+                        "type": "int",
+                        "hint": "共享 HTTP 连接池中同一主机同时打开的连接数上限，0 表示不限制。修改后需重启生效。",
+                    },
+                    "http_pool_keepalive_timeout": {
+                        "description": "HTTP 空闲连接保留时间（秒）",
+                        "type": "int",
+                        "hint": "请求结束后连接保留多久以供后续请求复用。修改后需重启生效。",
+                    },
+                    "media_cache_enable": {
+                        "description": "启用媒体下载缓存",
+                        "type": "bool",
+                        "hint": "从 URL 下载的图片、语音与视频按内容去重保存在 data/media_cache 中，同一 URL 的并发下载只请求一次。修改后需重启生效。",
+                    },
+                    "media_cache_max_size_mb": {
+                        "description": "媒体缓存空间上限（MB）",
+                        "type": "int",
+                        "hint": "超出后按最近最少使用的顺序删除缓存文件。修改后需重启生效。",
+                        "condition": {"media_cache_enable": True},
+                    },
+                    "media_cache_max_file_size_mb": {
+                        "description": "媒体缓存单文件上限（MB）",
+                        "type": "int",
+                        "hint": "超过该大小的文件仍会下载到临时目录，但不进入缓存。修改后需重启生效。",
+                        "condition": {"media_cache_enable": True},
+                    },
+                    "media_cache_url_ttl": {
+                        "description": "媒体 URL 缓存有效期（秒）",
+                        "type": "int",
+                        "hint": "同一 URL 在有效期内直接复用缓存文件，过期后重新下载。0 表示永不过期。修改后需重启生效。",
+                        "condition": {"media_cache_enable": True},
+                    },
                 },
             },
         },
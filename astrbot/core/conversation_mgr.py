@@ -77,6 +77,10 @@ class ConversationManager:
         updated_ts = to_utc_timestamp(conv_v2.updated_at)
         created_at = int(created_ts) if created_ts is not None else 0
         updated_at = int(updated_ts) if updated_ts is not None else 0
+        if conv_v2.history_segmented:
+            message_count = conv_v2.message_count
+        else:
+            message_count = len(conv_v2.content or []) if include_history else 0
         return Conversation(
             platform_id=conv_v2.platform_id,
             user_id=conv_v2.user_id,
@@ -87,6 +91,7 @@ class ConversationManager:
             created_at=created_at,
             updated_at=updated_at,
             token_usage=conv_v2.token_usage,
+            message_count=message_count,
         )
 
     async def new_conversation(
@@ -192,6 +197,7 @@ class ConversationManager:
         unified_msg_origin: str,
         conversation_id: str,
         create_if_not_exists: bool = False,
+        history_turns: int | None = None,
     ) -> Conversation | None:
         """获取会话的对话.
 
@@ -199,18 +205,35 @@ class ConversationManager:
             unified_msg_origin (str): 统一的消息来源字符串。格式为 platform_name:message_type:session_id
             conversation_id (str): 对话 ID, 是 uuid 格式的字符串
             create_if_not_exists (bool): 如果对话不存在,是否创建一个新的对话
+            history_turns (int | None): 只读取最近 history_turns 轮的历史记录 (每轮从一条用户消息开始), 默认读取全部
         Returns:
             conversation (Conversation): 对话对象
 
         """
-        conv = await self.db.get_conversation_by_id(cid=conversation_id)
+        include_history = not history_turns
+        conv = await self.db.get_conversation_by_id(
+            cid=conversation_id,
+            include_history=include_history,
+        )
         if not conv and create_if_not_exists:
             # 如果对话不存在且需要创建，则新建一个对话
             conversation_id = await self.new_conversation(unified_msg_origin)
-            conv = await self.db.get_conversation_by_id(cid=conversation_id)
-        conv_res = None
-        if conv:
-            conv_res = self._convert_conv_from_v2_to_v1(conv)
+            conv = await self.db.get_conversation_by_id(
+                cid=conversation_id,
+                include_history=include_history,
+            )
+        if not conv:
+            return None
+        if include_history:
+            return self._convert_conv_from_v2_to_v1(conv)
+        conv_res = self._convert_conv_from_v2_to_v1(conv, include_history=False)
+        history = await self.db.get_conversation_messages(
+            cid=conv.conversation_id,
+            turns=history_turns,
+        )
+        conv_res.history = json.dumps(history)
+        if not conv.history_segmented:
+            conv_res.message_count = len(conv.content or [])
         return conv_res
 
     async def get_conversations(
@@ -276,6 +299,99 @@ class ConversationManager:
             convs_res.append(conv_res)
         return convs_res, cnt
 
+    async def get_conversations_by_cursor(
+        self,
+        page_size: int = 20,
+        cursor: str | None = None,
+        platform_ids: list[str] | None = None,
+        search_query: str = "",
+        include_history: bool = True,
+        **kwargs,
+    ) -> tuple[list[Conversation], str | None]:
+        """使用游标分页获取过滤后的对话列表, 按创建时间倒序.
+
+        与页码分页不同, 翻到任意深度的页面开销都相同。
+
+        Args:
+            page_size (int): 每页大小, 默认为 20
+            cursor (str): 上一页返回的游标, 获取第一页时为 None
+            platform_ids (list[str]): 平台 ID 列表, 可选
+            search_query (str): 搜索查询字符串, 可选
+            include_history (bool): Whether to load the full conversation history.
+        Returns:
+            对话对象列表与下一页的游标。没有下一页时游标为 None。
+
+        Raises:
+            ValueError: 游标无效
+
+        """
+        convs, next_cursor = await self.db.get_conversations_by_cursor(
+            page_size=page_size,
+            cursor=cursor,
+            platform_ids=platform_ids,
+            search_query=search_query,
+            include_history=include_history,
+            **kwargs,
+        )
+        return [
+            self._convert_conv_from_v2_to_v1(conv, include_history=include_history)
+            for conv in convs
+        ], next_cursor
+
+    async def count_filtered_conversations(
+        self,
+        platform_ids: list[str] | None = None,
+        search_query: str = "",
+        **kwargs,
+    ) -> int:
+        """统计符合过滤条件的对话数量. 结果会短暂缓存, 可能略有滞后."""
+        return await self.db.count_filtered_conversations(
+            platform_ids=platform_ids,
+            search_query=search_query,
+            **kwargs,
+        )
+
+    async def search_conversations(
+        self,
+        search_query: str,
+        page: int = 1,
+        page_size: int = 20,
+        platform_ids: list[str] | None = None,
+        include_history: bool = True,
+        **kwargs,
+    ) -> tuple[list[tuple[Conversation, str]], int] | None:
+        """使用全文索引搜索对话, 结果按相关度排序.
+
+        Args:
+            search_query (str): 搜索查询字符串
+            page (int): 页码, 默认为 1
+            page_size (int): 每页大小, 默认为 20
+            platform_ids (list[str]): 平台 ID 列表, 可选
+            include_history (bool): Whether to load the full conversation history.
+        Returns:
+            (对话对象, 命中片段) 列表与总数。全文索引不可用时返回 None,
+            此时应退回 get_filtered_conversations。
+
+        """
+        result = await self.db.search_conversations(
+            search_query,
+            page=page,
+            page_size=page_size,
+            platform_ids=platform_ids,
+            include_history=include_history,
+            **kwargs,
+        )
+        if result is None:
+            return None
+        hits, cnt = result
+        return [
+            (
+                self._convert_conv_from_v2_to_v1(conv, include_history=include_history),
+                snippet,
+            )
+            for conv, snippet in hits
+        ], cnt
+
     async def update_conversation(
         self,
         unified_msg_origin: str,
@@ -306,6 +422,80 @@ class ConversationManager:
                 token_usage=token_usage,
             )
 
+    @staticmethod
+    def _history_delta(
+        loaded: list[dict],
+        history: list[dict],
+    ) -> tuple[int, list[dict]] | None:
+        """计算 history 相对于 loaded 的变化.
+
+        Returns:
+            (从 loaded 开头移除的消息数, 追加的新消息)。history 不是由 loaded 去掉开头若干条
+            (至少保留一条) 再追加消息构成时返回 None, 例如上下文被压缩、截断时在开头补入了
+            更早的用户消息, 或 loaded 已被全部移除。
+        """
+        loaded_count = len(loaded)
+        if history[:loaded_count] == loaded:
+            return 0, history[loaded_count:]
+        if not history:
+            return None
+        # 按轮次截断会移除最早的若干条消息
+        for dropped in range(1, loaded_count):
+            if history[0] != loaded[dropped]:
+                continue
+            kept = loaded[dropped:]
+            if history[: len(kept)] == kept:
+                return dropped, history[len(kept) :]
+        return None
+
+    async def sync_conversation_history(
+        self,
+        unified_msg_origin: str,
+        conversation_id: str,
+        loaded: list[dict],
+        history: list[dict],
+        stored_count: int | None = None,
+        token_usage: int | None = None,
+    ) -> int:
+        """保存对话的新历史记录, 只写入相对于读取时的变化.
+
+        history 由 loaded 去掉开头若干条 (按轮次截断) 再追加新消息构成时, 只删除被移除的旧消息并追加新消息;
+        否则 (例如上下文被压缩, 或期间历史记录已被修改) 整体替换历史记录。
+
+        Args:
+            unified_msg_origin (str): 统一的消息来源字符串。格式为 platform_name:message_type:session_id
+            conversation_id (str): 对话 ID, 是 uuid 格式的字符串
+            loaded (List[Dict]): 构建请求时读取的历史记录, 可以只是最近的若干条
+            history (List[Dict]): 新的完整历史记录
+            stored_count (int | None): 读取时数据库中的历史消息总数, 默认为 len(loaded)
+            token_usage (int | None): token 使用量。None 表示不更新
+        Returns:
+            保存后数据库中的历史消息总数
+
+        """
+        if stored_count is None:
+            stored_count = len(loaded)
+        delta = self._history_delta(loaded, history)
+        if delta is not None:
+            dropped, new_messages = delta
+            message_count = await self.db.append_conversation_messages(
+                cid=conversation_id,
+                messages=new_messages,
+                expected_count=stored_count,
+                # 未读取的更早的消息已被截断
+                drop_count=stored_count - len(loaded) + dropped if dropped else 0,
+                token_usage=token_usage,
+            )
+            if message_count is not None:
+                return message_count
+        await self.update_conversation(
+            unified_msg_origin,
+            conversation_id,
+            history=history,
+            token_usage=token_usage,
+        )
+        return len(history)
+
     @deprecated(reason="Use update_conversation() with the title parameter instead.")
     async def update_conversation_title(
         self,
@@ -370,10 +560,6 @@ class ConversationManager:
         Raises:
             Exception: If the conversation with the given ID is not found
         """
-        conv = await self.db.get_conversation_by_id(cid=cid)
-        if not conv:
-            raise Exception(f"Conversation with id {cid} not found")
-        history = conv.content or []
         if isinstance(user_message, UserMessageSegment):
             user_msg_dict = user_message.model_dump()
         else:
@@ -382,11 +568,32 @@ class ConversationManager:
             assistant_msg_dict = assistant_message.model_dump()
         else:
             assistant_msg_dict = assistant_message
-        history.append(user_msg_dict)
-        history.append(assistant_msg_dict)
-        await self.db.update_conversation(
+        message_count = await self.db.append_conversation_messages(
             cid=cid,
-            content=history,
+            messages=[user_msg_dict, assistant_msg_dict],
+        )
+        if message_count is None:
+            raise Exception(f"Conversation with id {cid} not found")
+
+    async def get_conversation_messages(
+        self,
+        cid: str,
+        limit: int | None = None,
+        turns: int | None = None,
+    ) -> list[dict]:
+        """Get the history of a conversation without loading the whole record.
+
+        Args:
+            cid (str): Conversation ID
+            limit (int | None): Only return the last `limit` messages when given
+            turns (int | None): Only return the last `turns` turns when given;
+                a turn starts at a user message
+        Returns:
+            messages (list[dict]): OpenAI-format messages in chronological order
+
+        """
+        return await self.db.get_conversation_messages(
+            cid=cid, limit=limit, turns=turns
         )
 
     async def get_human_readable_context(
@@ -19,13 +19,19 @@ from asyncio import Queue
 from astrbot.api import logger, sp
 from astrbot.core import LogBroker, LogManager
 from astrbot.core.astrbot_config_mgr import AstrBotConfigManager
+from astrbot.core.computer.booters.local_kernel import kernel_options
 from astrbot.core.computer.computer_client import shutdown_local_booter
 from astrbot.core.config.default import VERSION
 from astrbot.core.conversation_mgr import ConversationManager
 from astrbot.core.cron import CronJobManager
 from astrbot.core.db import BaseDatabase
+from astrbot.core.db.migration.migra_conversation_search import (
+    backfill_conversation_search_index,
+)
 from astrbot.core.knowledge_base.kb_mgr import KnowledgeBaseManager
+from astrbot.core.log_store import LogStore
 from astrbot.core.persona_mgr import PersonaManager
+from astrbot.core.pipeline.profiler import pipeline_profiler
 from astrbot.core.pipeline.scheduler import PipelineContext, PipelineScheduler
 from astrbot.core.platform.manager import PlatformManager
 from astrbot.core.platform_message_history_mgr import PlatformMessageHistoryManager
@@ -37,15 +43,21 @@ from astrbot.core.star.star_manager import PluginManager
 from astrbot.core.subagent_orchestrator import SubAgentOrchestrator
 from astrbot.core.umop_config_router import UmopConfigRouter
 from astrbot.core.updater import AstrBotUpdater
+from astrbot.core.utils.astrbot_path import get_astrbot_data_path
 from astrbot.core.utils.event_loop_diagnostics import (
     create_event_loop_diagnostic_tasks,
 )
+from astrbot.core.utils.http_client import http_client
+from astrbot.core.utils.image_caption_cache import image_caption_cache
 from astrbot.core.utils.llm_metadata import update_llm_metadata
+from astrbot.core.utils.media_cache import media_cache
 from astrbot.core.utils.migra_helper import migra
 from astrbot.core.utils.temp_dir_cleaner import TempDirCleaner
+from astrbot.core.utils.tts_audio_cache import tts_audio_cache
+from astrbot.core.utils.web_search_cache import web_search_cache
 
 from . import astrbot_config, html_renderer
-from .event_bus import EventBus
+from .event_bus import EventBus, EventDispatchOptions
 
 
 class AstrBotCoreLifecycle:
@@ -64,6 +76,7 @@ class AstrBotCoreLifecycle:
         self.subagent_orchestrator: SubAgentOrchestrator | None = None
         self.cron_manager: CronJobManager | None = None
         self.temp_dir_cleaner: TempDirCleaner | None = None
+        self.search_backfill_task: asyncio.Task | None = None
         self._default_chat_provider_warning_emitted = False
 
         # 设置代理
@@ -155,6 +168,25 @@ class AstrBotCoreLifecycle:
                 fallback_id,
             )
 
+    def _init_log_store(self) -> None:
+        if self.log_broker.store or not self.astrbot_config.get(
+            "log_store_enable", True
+        ):
+            return
+        store = LogStore(
+            os.path.join(get_astrbot_data_path(), "logs", "log_store.db"),
+            max_bytes=int(self.astrbot_config.get("log_store_max_mb", 200)) << 20,
+            retention_days=float(
+                self.astrbot_config.get("log_store_retention_days", 7),
+            ),
+        )
+        try:
+            store.start()
+        except Exception as e:
+            logger.error(f"初始化持久化日志库失败: {e}")
+            return
+        self.log_broker.attach_store(store)
+
     async def initialize(self) -> None:
         """初始化 AstrBot 核心生命周期管理类.
 
@@ -170,11 +202,21 @@ class AstrBotCoreLifecycle:
         else:
             LogManager.configure_logger(logger, self.astrbot_config)
             LogManager.configure_trace_logger(self.astrbot_config)
+        self._init_log_store()
 
         await self.db.initialize()
         if sp.db_helper is self.db:
             await sp.initialize()
 
+        # 共享 HTTP 连接池需在提供商、平台适配器发出第一个请求前配置
+        http_client.configure(
+            limit=int(self.astrbot_config.get("http_pool_limit", 100)),
+            limit_per_host=int(self.astrbot_config.get("http_pool_limit_per_host", 0)),
+            keepalive_timeout=float(
+                self.astrbot_config.get("http_pool_keepalive_timeout", 30)
+            ),
+        )
+
         await html_renderer.initialize()
 
         # 初始化 UMOP 配置路由器
@@ -231,7 +273,10 @@ class AstrBotCoreLifecycle:
         self.platform_message_history_manager = PlatformMessageHistoryManager(self.db)
 
         # 初始化知识库管理器
-        self.kb_manager = KnowledgeBaseManager(self.provider_manager)
+        self.kb_manager = KnowledgeBaseManager(
+            self.provider_manager,
+            self.astrbot_config,
+        )
 
         # 初始化 CronJob 管理器
         self.cron_manager = CronJobManager(self.db)
@@ -279,6 +324,63 @@ class AstrBotCoreLifecycle:
             self.event_queue,
             self.pipeline_scheduler_mapping,
             self.astrbot_config_mgr,
+            EventDispatchOptions.from_config(self.astrbot_config),
+        )
+        pipeline_profiler.enabled = bool(
+            self.astrbot_config.get("pipeline_profiler_enable", False),
+        )
+        image_caption_cache.configure(
+            enabled=bool(self.astrbot_config.get("image_caption_cache_enable", True)),
+            max_entries=int(
+                self.astrbot_config.get("image_caption_cache_max_entries", 2048),
+            ),
+            ttl=float(self.astrbot_config.get("image_caption_cache_ttl", 604800)),
+            store=self.db,
+        )
+        await image_caption_cache.initialize()
+        tts_audio_cache.configure(
+            enabled=bool(self.astrbot_config.get("tts_audio_cache_enable", True)),
+            max_bytes=int(self.astrbot_config.get("tts_audio_cache_max_size_mb", 200))
+            * 1024
+            * 1024,
+        )
+        await tts_audio_cache.initialize()
+        web_search_cache.configure(
+            enabled=bool(self.astrbot_config.get("web_search_cache_enable", True)),
+            max_entries=int(
+                self.astrbot_config.get("web_search_cache_max_entries", 1000)
+            ),
+            ttl=float(self.astrbot_config.get("web_search_cache_ttl", 3600)),
+        )
+        await web_search_cache.initialize()
+        media_cache.configure(
+            enabled=bool(self.astrbot_config.get("media_cache_enable", True)),
+            max_bytes=int(self.astrbot_config.get("media_cache_max_size_mb", 500))
+            * 1024
+            * 1024,
+            max_file_bytes=int(
+                self.astrbot_config.get("media_cache_max_file_size_mb", 50)
+            )
+            * 1024
+            * 1024,
+            url_ttl=float(self.astrbot_config.get("media_cache_url_ttl", 86400)),
+        )
+        await media_cache.initialize()
+        provider_settings = self.astrbot_config.get("provider_settings", {})
+        kernel_options.configure(
+            pool_size=int(provider_settings.get("local_python_kernel_pool_size", 1)),
+            max_kernels=int(
+                provider_settings.get("local_python_kernel_max_kernels", 8)
+            ),
+            idle_timeout=float(
+                provider_settings.get("local_python_kernel_idle_timeout", 600)
+            ),
+            max_memory_mb=int(
+                provider_settings.get("local_python_kernel_max_memory_mb", 0)
+            ),
+            preload_modules=list(
+                provider_settings.get("local_python_kernel_preload_modules", [])
+            ),
         )
 
         # 记录启动时间
@@ -294,6 +396,23 @@ class AstrBotCoreLifecycle:
         self.dashboard_shutdown_event = asyncio.Event()
 
         asyncio.create_task(update_llm_metadata())
+        # 保留引用, 避免任务被垃圾回收, 并在停止时取消
+        self.search_backfill_task = asyncio.create_task(
+            backfill_conversation_search_index(self.db),
+            name="conversation_search_backfill",
+        )
+        self.search_backfill_task.add_done_callback(self._log_background_task_error)
+
+    @staticmethod
+    def _log_background_task_error(task: asyncio.Task) -> None:
+        """记录后台任务中未被处理的异常"""
+        if task.cancelled():
+            return
+        if (exc := task.exception()) is not None:
+            logger.error(
+                f"后台任务 {task.get_name()} 发生错误: {exc}",
+                exc_info=exc,
+            )
 
     def _load(self) -> None:
         """加载事件总线和任务并初始化."""
@@ -388,6 +507,12 @@ class AstrBotCoreLifecycle:
         # 请求停止所有正在运行的异步任务
         for task in self.curr_tasks:
             task.cancel()
+        if self.search_backfill_task and not self.search_backfill_task.done():
+            self.search_backfill_task.cancel()
+            try:
+                await self.search_backfill_task
+            except asyncio.CancelledError:
+                pass
 
         if self.cron_manager:
             await self.cron_manager.shutdown()
@@ -406,6 +531,9 @@ class AstrBotCoreLifecycle:
         await self.provider_manager.terminate()
         await self.platform_manager.terminate()
         await self.kb_manager.terminate()
+        await image_caption_cache.close()
+        await media_cache.close()
+        await http_client.close()
         if sp.db_helper is self.db:
             await sp.close()
         self.dashboard_shutdown_event.set()
@@ -419,6 +547,9 @@ class AstrBotCoreLifecycle:
             except Exception as e:
                 logger.error(f"任务 {task.get_name()} 发生错误: {e}")
 
+        if store := self.log_broker.detach_store():
+            await asyncio.to_thread(store.close)
+
         # 释放数据库引擎连接池
         try:
             await self.db.engine.dispose()
@@ -433,6 +564,8 @@ class AstrBotCoreLifecycle:
         await self.kb_manager.terminate()
         if sp.db_helper is self.db:
             await sp.close()
+        if store := self.log_broker.detach_store():
+            await asyncio.to_thread(store.close)
         self.dashboard_shutdown_event.set()
         threading.Thread(
             target=restart_process,
@@ -15,6 +15,7 @@ from astrbot.core.db.po import (
     CommandConflict,
     ConversationV2,
     CronJob,
+    ImageCaptionCacheEntry,
     Persona,
     PersonaFolder,
     PlatformMessageHistory,
@@ -22,6 +23,7 @@ from astrbot.core.db.po import (
     PlatformStat,
     Preference,
     ProviderStat,
+    RateLimitState,
     SessionProjectRelation,
     Stats,
     UmoAlias,
@@ -137,8 +139,17 @@ class BaseDatabase(abc.ABC):
         ...
 
     @abc.abstractmethod
-    async def get_conversation_by_id(self, cid: str) -> ConversationV2:
-        """Get a specific conversation by its ID."""
+    async def get_conversation_by_id(
+        self,
+        cid: str,
+        include_history: bool = True,
+    ) -> ConversationV2:
+        """Get a specific conversation by its ID.
+
+        Args:
+            cid: Conversation ID.
+            include_history: Whether to load the full history into `content`.
+        """
         ...
 
     @abc.abstractmethod
@@ -172,6 +183,87 @@ class BaseDatabase(abc.ABC):
         """
         ...
 
+    @abc.abstractmethod
+    async def get_conversations_by_cursor(
+        self,
+        page_size: int = 20,
+        cursor: str | None = None,
+        platform_ids: list[str] | None = None,
+        search_query: str = "",
+        include_history: bool = True,
+        **kwargs,
+    ) -> tuple[list[ConversationV2], str | None]:
+        """List conversations newest first with keyset pagination.
+
+        Args:
+            page_size: Number of items per page.
+            cursor: Cursor returned with the previous page, None for the first.
+            platform_ids: Platform IDs to include, if any.
+            search_query: Search text, if any.
+            include_history: Whether to load the full history for returned rows.
+            **kwargs: The same filters as `get_filtered_conversations`.
+
+        Returns:
+            The conversations and the cursor of the next page, or None when
+            there are no more pages.
+
+        Raises:
+            ValueError: If the cursor is malformed.
+        """
+        ...
+
+    @abc.abstractmethod
+    async def count_filtered_conversations(
+        self,
+        platform_ids: list[str] | None = None,
+        search_query: str = "",
+        **kwargs,
+    ) -> int:
+        """Count the conversations matching the filters.
+
+        The count may be cached for a short time and can be slightly stale.
+        """
+        ...
+
+    @abc.abstractmethod
+    async def search_conversations(
+        self,
+        search_query: str,
+        page: int = 1,
+        page_size: int = 20,
+        platform_ids: list[str] | None = None,
+        include_history: bool = True,
+        **kwargs,
+    ) -> tuple[list[tuple[ConversationV2, str]], int] | None:
+        """Rank conversations matching the search text with the full-text index.
+
+        Args:
+            search_query: Search text.
+            page: Page number.
+            page_size: Number of items per page.
+            platform_ids: Platform IDs to include, if any.
+            include_history: Whether to load the full history for returned rows.
+            **kwargs: The same filters as `get_filtered_conversations`.
+
+        Returns:
+            (conversation, snippet) pairs in rank order and the total count, or
+            None when the full-text index is unavailable.
+        """
+        ...
+
+    @abc.abstractmethod
+    async def index_conversations_for_search(
+        self,
+        after_id: int = 0,
+        batch_size: int = 100,
+    ) -> int | None:
+        """Add a batch of not yet indexed conversations to the full-text index.
+
+        Returns:
+            The conversation row ID to continue after, or None when done.
+        """
+        ...
+
     @abc.abstractmethod
     async def create_conversation(
         self,
@@ -199,6 +291,48 @@ class BaseDatabase(abc.ABC):
         """Update a conversation's history."""
         ...
 
+    @abc.abstractmethod
+    async def append_conversation_messages(
+        self,
+        cid: str,
+        messages: list[dict],
+        expected_count: int | None = None,
+        drop_count: int = 0,
+        token_usage: int | None = None,
+    ) -> int | None:
+        """Append messages to a conversation's history without rewriting it.
+
+        Args:
+            cid: Conversation ID.
+            messages: Messages to append.
+            expected_count: Only write when the stored history still has this
+                many messages.
+            drop_count: Number of the oldest messages to remove first.
+            token_usage: New token usage of the conversation, if any.
+
+        Returns:
+            The new message count, or None if the conversation does not exist
+            or its message count differs from `expected_count`.
+        """
+        ...
+
+    @abc.abstractmethod
+    async def get_conversation_messages(
+        self,
+        cid: str,
+        limit: int | None = None,
+        turns: int | None = None,
+    ) -> list[dict]:
+        """Get a conversation's history in order.
+
+        Args:
+            cid: Conversation ID.
+            limit: Only return the last `limit` messages when given.
+            turns: Only return the messages from the start of the last `turns`
+                turns when given. A turn starts at a `user` message.
+        """
+        ...
+
     @abc.abstractmethod
     async def delete_conversation(self, cid: str) -> None:
         """Delete a conversation by its ID."""
@@ -259,6 +393,25 @@ class BaseDatabase(abc.ABC):
         """Get platform message history for a specific user."""
         ...
 
+    @abc.abstractmethod
+    async def get_platform_message_history_by_cursor(
+        self,
+        platform_id: str,
+        user_id: str,
+        page_size: int = 20,
+        cursor: str | None = None,
+    ) -> tuple[list[PlatformMessageHistory], str | None]:
+        """Get platform message history newest first with keyset pagination.
+
+        Returns:
+            The records and the cursor of the next page, or None when there
+            are no more pages.
+
+        Raises:
+            ValueError: If the cursor is malformed.
+        """
+        ...
+
     @abc.abstractmethod
     async def get_platform_message_history_by_id(
         self,
@@ -664,6 +817,44 @@ class BaseDatabase(abc.ABC):
         """Delete conflict records."""
         ...
 
+    @abc.abstractmethod
+    async def get_rate_limit_states(self, scope_id: str) -> list[RateLimitState]:
+        """Get persisted rate limiter states of a pipeline."""
+        ...
+
+    @abc.abstractmethod
+    async def replace_rate_limit_states(
+        self,
+        scope_id: str,
+        states: dict[str, float],
+    ) -> None:
+        """Replace all persisted rate limiter states of a pipeline."""
+        ...
+
+    @abc.abstractmethod
+    async def load_image_captions(
+        self,
+        since: float,
+        limit: int,
+    ) -> list[ImageCaptionCacheEntry]:
+        """Load cached image captions created after `since`, newest first."""
+        ...
+
+    @abc.abstractmethod
+    async def save_image_caption(
+        self,
+        cache_key: str,
+        caption: str,
+        created_at: float,
+    ) -> None:
+        """Insert or replace a cached image caption."""
+        ...
+
+    @abc.abstractmethod
+    async def prune_image_captions(self, before: float, keep: int) -> None:
+        """Delete captions created before `before` and keep only the newest `keep`."""
+        ...
+
     # @abc.abstractmethod
     # async def insert_llm_message(
     #     self,
@@ -0,0 +1,98 @@
+"""Text helpers for the full-text conversation search index.
+
+Conversation titles and messages are pre-tokenized with jieba before they are
+written to the FTS5 tables, so CJK text is matched by word instead of by the
+whole run of characters that the `unicode61` tokenizer would produce.
+"""
+
+import html
+
+from astrbot.core.knowledge_base.retrieval.tokenizer import (
+    quote_fts5_token,
+    tokenize_text,
+)
+
+# Only the leading part of very long messages (tool outputs, pasted files)
+# is indexed, so a single message cannot blow up the index or a write.
+MAX_INDEXED_MESSAGE_CHARS = 20000
+
+# Markers passed to FTS5 `snippet()`. They cannot appear in tokenized text, so
+# the snippet can be HTML-escaped first and highlighted afterwards.
+SNIPPET_OPEN = "\x02"
+SNIPPET_CLOSE = "\x03"
+SNIPPET_ELLIPSIS = "…"
+SNIPPET_TOKENS = 24
+
+_NO_STOPWORDS: set[str] = set()
+
+
+def _is_cjk(char: str) -> bool:
+    code = ord(char)
+    return (
+        0x3040 <= code <= 0x30FF  # Hiragana, Katakana
+        or 0x3400 <= code <= 0x4DBF  # CJK Extension A
+        or 0x4E00 <= code <= 0x9FFF  # CJK Unified Ideographs
+        or 0xAC00 <= code <= 0xD7AF  # Hangul Syllables
+        or 0xF900 <= code <= 0xFAFF  # CJK Compatibility Ideographs
+    )
+
+
+def message_search_text(message: dict) -> str:
+    """Return the plain text of an OpenAI-format message."""
+    content = message.get("content") if isinstance(message, dict) else None
+    if isinstance(content, str):
+        text = content
+    elif isinstance(content, list):
+        text = "\n".join(
+            part["text"]
+            for part in content
+            if isinstance(part, dict)
+            and part.get("type") == "text"
+            and isinstance(part.get("text"), str)
+        )
+    else:
+        return ""
+    return text[:MAX_INDEXED_MESSAGE_CHARS]
+
+
+def to_search_text(text: str | None) -> str:
+    """Tokenize text into the space separated form stored in the FTS5 tables."""
+    if not text:
+        return ""
+    return " ".join(tokenize_text(text, _NO_STOPWORDS))
+
+
+def build_match_query(search_query: str) -> str:
+    """Build an FTS5 query that requires every token of the search text."""
+    return " ".join(
+        quote_fts5_token(token) for token in tokenize_text(search_query, _NO_STOPWORDS)
+    )
+
+
+def _strip_markers(token: str) -> str:
+    return token.replace(SNIPPET_OPEN, "").replace(SNIPPET_CLOSE, "")
+
+
+def format_snippet(snippet: str | None) -> str:
+    """Turn a raw FTS5 snippet into escaped HTML with `<mark>` highlights.
+
+    The spaces inserted between CJK words by the tokenizer are removed again,
+    so the snippet reads like the original message.
+    """
+    if not snippet:
+        return ""
+    parts: list[str] = []
+    previous = ""
+    for token in snippet.split():
+        current = _strip_markers(token)
+        if parts and not (
+            previous and current and _is_cjk(previous[-1]) and _is_cjk(current[0])
+        ):
+            parts.append(" ")
+        parts.append(token)
+        previous = current or previous
+    return (
+        html.escape("".join(parts))
+        .replace(SNIPPET_OPEN, "<mark>")
+        .replace(SNIPPET_CLOSE, "</mark>")
+    )
@@ -0,0 +1,60 @@
+"""Migration script to move conversation histories into conversation_messages.
+
+Legacy conversations keep their whole history as a JSON array in
+`conversations.content`. This migration rewrites them into one row per message
+so that later turns can be appended without rewriting the blob.
+
+Changes:
+- Copies every legacy `conversations.content` into `conversation_messages`
+- Marks migrated conversations as `history_segmented` and clears `content`
+
+Conversations that are not migrated yet still work: they are converted on
+their first write.
+"""
+
+from sqlmodel import col, select
+
+from astrbot.api import logger, sp
+from astrbot.core.db import BaseDatabase
+from astrbot.core.db.po import ConversationV2
+
+BATCH_SIZE = 200
+
+
+async def migrate_conversation_messages(db_helper: BaseDatabase) -> None:
+    """Split legacy conversation histories into per-message rows."""
+    migration_done = await db_helper.get_preference(
+        "global", "global", "migration_done_conversation_messages_1"
+    )
+    if migration_done:
+        return
+
+    logger.info("开始执行数据库迁移（对话历史拆分为逐条消息存储）...")
+
+    migrated = 0
+    try:
+        while True:
+            async with db_helper.get_db() as session:
+                result = await session.execute(
+                    select(ConversationV2.conversation_id, ConversationV2.content)
+                    .where(col(ConversationV2.history_segmented).is_(False))
+                    .limit(BATCH_SIZE)
+                )
+                rows = result.all()
+            if not rows:
+                break
+            for cid, content in rows:
+                # update_conversation replaces the whole history, which also
+                # converts the row to segmented storage.
+                await db_helper.update_conversation(cid=cid, content=content or [])
+            migrated += len(rows)
+            logger.info(f"已迁移 {migrated} 个对话的历史记录")
+
+        await sp.put_async(
+            "global", "global", "migration_done_conversation_messages_1", True
+        )
+        logger.info("对话历史迁移完成")
+
+    except Exception as e:
+        logger.error(f"迁移过程中发生错误: {e}", exc_info=True)
+        raise
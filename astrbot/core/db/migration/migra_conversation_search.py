@@ -0,0 +1,43 @@
+"""Backfill job for the full-text conversation search index.
+
+Conversations written before the FTS5 tables existed have no index rows. This
+job indexes them in small batches in the background, so startup is not
+delayed on large databases and the dashboard search keeps working meanwhile.
+
+A conversation counts as indexed once its title row exists, which makes the job
+resumable: an interrupted run continues with the remaining conversations on the
+next start, and finished databases only pay for one index lookup per row.
+"""
+
+import asyncio
+
+from astrbot.api import logger
+from astrbot.core.db import BaseDatabase
+
+BATCH_SIZE = 100
+# Pause between batches so regular writes get the database in between.
+BATCH_INTERVAL = 0.05
+
+
+async def backfill_conversation_search_index(db_helper: BaseDatabase) -> None:
+    """Index all conversations that are missing from the search index."""
+    batches = 0
+    after_id = 0
+    try:
+        while True:
+            next_after_id = await db_helper.index_conversations_for_search(
+                after_id=after_id,
+                batch_size=BATCH_SIZE,
+            )
+            if next_after_id is None:
+                break
+            if not batches:
+                logger.info("开始为已有对话建立全文搜索索引...")
+            batches += 1
+            after_id = next_after_id
+            await asyncio.sleep(BATCH_INTERVAL)
+    except Exception as e:
+        logger.error(f"建立对话全文搜索索引时发生错误: {e}", exc_info=True)
+        return
+    if batches:
+        logger.info(f"对话全文搜索索引建立完成, 共处理 {batches} 批对话")
@@ -0,0 +1,74 @@
+"""Migration script to build provider stat rollups from existing records.
+
+Provider stats written before `provider_stat_rollups` existed are aggregated
+once, new records are rolled up as they are inserted.
+
+Changes:
+- Rebuilds `provider_stat_rollups` from all internal `provider_stats` records
+"""
+
+from sqlmodel import col, delete, select
+
+from astrbot.api import logger, sp
+from astrbot.core.db import BaseDatabase
+from astrbot.core.db.po import ProviderStat, ProviderStatRollup
+from astrbot.core.db.provider_stat_rollup import (
+    RollupKey,
+    accumulate_provider_stat,
+    new_rollup_row,
+    rollup_keys,
+)
+
+BATCH_SIZE = 2000
+
+
+async def migrate_provider_stat_rollups(db_helper: BaseDatabase) -> None:
+    """Aggregate existing provider stats into hourly and daily rollups."""
+    migration_done = await db_helper.get_preference(
+        "global", "global", "migration_done_provider_stat_rollups_1"
+    )
+    if migration_done:
+        return
+
+    logger.info("开始执行数据库迁移（汇总模型调用统计）...")
+
+    try:
+        rows: dict[RollupKey, ProviderStatRollup] = {}
+        last_id = 0
+        migrated = 0
+        while True:
+            async with db_helper.get_db() as session:
+                result = await session.execute(
+                    select(ProviderStat)
+                    .where(
+                        col(ProviderStat.agent_type) == "internal",
+                        col(ProviderStat.id) > last_id,
+                    )
+                    .order_by(col(ProviderStat.id))
+                    .limit(BATCH_SIZE)
+                )
+                records = result.scalars().all()
+            if not records:
+                break
+            for record in records:
+                for key in rollup_keys(record):
+                    row = rows.get(key)
+                    if row is None:
+                        row = rows[key] = new_rollup_row(key)
+                    accumulate_provider_stat(row, record)
+            last_id = records[-1].id
+            migrated += len(records)
+
+        async with db_helper.get_db() as session:
+            async with session.begin():
+                await session.execute(delete(ProviderStatRollup))
+                session.add_all(rows.values())
+
+        await sp.put_async(
+            "global", "global", "migration_done_provider_stat_rollups_1", True
+        )
+        logger.info(f"模型调用统计汇总完成, 共处理 {migrated} 条记录")
+
+    except Exception as e:
+        logger.error(f"迁移过程中发生错误: {e}", exc_info=True)
+        raise
@@ -0,0 +1,38 @@
+"""Opaque cursors for keyset pagination.
+
+A cursor holds the sort key of the last row of a page, the next page starts
+right after it: `WHERE (created_at, id) < (:created_at, :id)`. Unlike
+`OFFSET`, the cost of a page does not grow with its depth, and rows inserted
+while paging do not shift the following pages.
+"""
+
+import base64
+import json
+from datetime import datetime
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """Encode the sort key of the last row of a page into a URL-safe cursor."""
+    payload = json.dumps(
+        {"c": created_at.isoformat(), "i": row_id},
+        separators=(",", ":"),
+    )
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """Decode a cursor made by `encode_cursor`.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        created_at = datetime.fromisoformat(payload["c"])
+        row_id = payload["i"]
+    except (ValueError, TypeError, KeyError) as e:
+        raise ValueError(f"Invalid pagination cursor: {cursor!r}") from e
+    if not isinstance(row_id, int) or isinstance(row_id, bool):
+        raise ValueError(f"Invalid pagination cursor: {cursor!r}")
+    return created_at, row_id
@@ -64,6 +64,39 @@ class ProviderStat(TimestampMixin, SQLModel, table=True):
     time_to_first_token: float = Field(default=0.0, nullable=False)
 
 
+class ProviderStatRollup(SQLModel, table=True):
+    """Hourly and daily aggregates of internal `provider_stats` records.
+
+    Maintained incrementally on every insert so the stats dashboard reads a
+    range of buckets instead of every raw record. Rows with `umo == "*"` hold
+    the per provider/model totals and the latency sketches, the other rows
+    only hold the per-UMO counters.
+    """
+
+    __tablename__: str = "provider_stat_rollups"
+
+    period: str = Field(primary_key=True, max_length=8)
+    """`hour` or `day`."""
+    bucket_start: int = Field(primary_key=True)
+    """Unix timestamp of the local start of the hour or day."""
+    provider_id: str = Field(primary_key=True)
+    provider_model: str = Field(primary_key=True)
+    umo: str = Field(primary_key=True)
+    calls: int = Field(default=0, nullable=False)
+    error_calls: int = Field(default=0, nullable=False)
+    token_input_other: int = Field(default=0, nullable=False)
+    token_input_cached: int = Field(default=0, nullable=False)
+    token_output: int = Field(default=0, nullable=False)
+    ttft_sum: float = Field(default=0.0, nullable=False)
+    ttft_samples: int = Field(default=0, nullable=False)
+    duration_sum: float = Field(default=0.0, nullable=False)
+    duration_samples: int = Field(default=0, nullable=False)
+    duration_output_tokens: int = Field(default=0, nullable=False)
+    """Output tokens of the calls with a known duration, used for TPM."""
+    ttft_sketch: dict | None = Field(default=None, sa_type=JSON)
+    duration_sketch: dict | None = Field(default=None, sa_type=JSON)
+
+
 class ConversationV2(TimestampMixin, SQLModel, table=True):
     __tablename__: str = "conversations"
 
@@ -89,6 +122,13 @@ class ConversationV2(TimestampMixin, SQLModel, table=True):
     token_usage is the total token value of the messages.
     when 0, will use estimated token counter.
     """
+    history_segmented: bool = Field(default=False, nullable=False)
+    """When True, the history lives in `conversation_messages` and `content` is NULL.
+    Legacy rows keep the whole history in `content` until their first write.
+    """
+    message_count: int = Field(default=0, nullable=False)
+    history_digest: str | None = Field(default=None, max_length=64)
+    """Rolling sha256 over the stored messages, used to detect append-only rewrites."""
 
     __table_args__ = (
         Index(
@@ -109,6 +149,33 @@ class ConversationV2(TimestampMixin, SQLModel, table=True):
     )
 
 
+class ConversationMessage(SQLModel, table=True):
+    """A single OpenAI-format message of a segmented conversation history.
+
+    Messages are appended with increasing `seq`, so adding a turn writes only
+    the new rows instead of rewriting the whole history blob.
+    """
+
+    __tablename__: str = "conversation_messages"
+
+    id: int | None = Field(
+        default=None,
+        primary_key=True,
+        sa_column_kwargs={"autoincrement": True},
+    )
+    conversation_id: str = Field(max_length=36, nullable=False)
+    seq: int = Field(nullable=False)
+    message: dict = Field(sa_type=JSON, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint(
+            "conversation_id",
+            "seq",
+            name="uix_conversation_message_seq",
+        ),
+    )
+
+
 class PersonaFolder(TimestampMixin, SQLModel, table=True):
     """Persona 文件夹，支持递归层级结构。
 
@@ -266,6 +333,13 @@ class PlatformMessageHistory(TimestampMixin, SQLModel, table=True):
             "user_id",
             "id",
         ),
+        Index(
+            "ix_platform_message_history_platform_user_created_at_id",
+            "platform_id",
+            "user_id",
+            desc("created_at"),
+            desc("id"),
+        ),
     )
 
 
@@ -554,6 +628,32 @@ class CommandConflict(TimestampMixin, SQLModel, table=True):
     )
 
 
+class RateLimitState(SQLModel, table=True):
+    """Persisted GCRA state of the message pipeline rate limiter.
+
+    Only keys that are still inside their rate-limit window are stored.
+    """
+
+    __tablename__: str = "rate_limit_states"
+
+    scope_id: str = Field(primary_key=True, max_length=255)
+    """ID of the owning pipeline, i.e. the AstrBot config ID."""
+    key: str = Field(primary_key=True, max_length=512)
+    tat: float = Field(nullable=False)
+    """Theoretical arrival time as a unix timestamp."""
+
+
+class ImageCaptionCacheEntry(SQLModel, table=True):
+    """Persisted image captions, keyed by image content, provider and prompt."""
+
+    __tablename__: str = "image_caption_cache"
+
+    cache_key: str = Field(primary_key=True, max_length=64)
+    caption: str = Field(sa_type=Text, nullable=False)
+    created_at: float = Field(nullable=False, index=True)
+    """Unix timestamp of when the caption was generated."""
+
+
 @dataclass
 class Conversation:
     """LLM 对话类
@@ -576,6 +676,8 @@ class Conversation:
     updated_at: int = 0
     token_usage: int = 0
     """对话的总 token 数量。AstrBot 会保留最近一次 LLM 请求返回的总 token 数，方便统计。token_usage 可能为 0，表示未知。"""
+    message_count: int = 0
+    """数据库中保存的历史消息总数。只读取了最近的若干条历史时，可能大于 history 中的消息数。"""
 
 
 class Personality(TypedDict):
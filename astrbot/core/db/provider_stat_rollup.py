@@ -0,0 +1,98 @@
+"""Incremental hourly and daily rollups of provider stats.
+
+Every internal `ProviderStat` record is added to four `ProviderStatRollup`
+rows: the hour and the day it belongs to, each once for its UMO and once for
+the `ALL_UMO` total of its provider and model. Only the `ALL_UMO` rows carry
+the TTFT and duration sketches, which keeps the per-UMO rows small.
+
+Buckets start at local hours and local midnights, matching the way the stats
+dashboard groups its charts.
+"""
+
+from datetime import datetime, time, timezone
+
+from astrbot.core.db.po import ProviderStat, ProviderStatRollup
+from astrbot.core.utils.latency_histogram import LatencyHistogram
+
+PERIOD_HOUR = "hour"
+PERIOD_DAY = "day"
+ALL_UMO = "*"
+
+RollupKey = tuple[str, int, str, str, str]
+
+
+def _as_local(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        # SQLite returns the stored UTC timestamps as naive datetimes.
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone()
+
+
+def local_hour_start(value: datetime) -> int:
+    """Return the unix timestamp of the local hour containing `value`."""
+    local = _as_local(value).replace(minute=0, second=0, microsecond=0)
+    return int(local.timestamp())
+
+
+def local_day_start(value: datetime) -> int:
+    """Return the unix timestamp of the local midnight starting `value`'s day."""
+    midnight = datetime.combine(_as_local(value).date(), time())
+    return int(midnight.astimezone().timestamp())
+
+
+def rollup_keys(record: ProviderStat) -> list[RollupKey]:
+    provider_id = record.provider_id or "unknown"
+    provider_model = record.provider_model or ""
+    umo = record.umo or "unknown"
+    keys: list[RollupKey] = []
+    for period, bucket_start in (
+        (PERIOD_HOUR, local_hour_start(record.created_at)),
+        (PERIOD_DAY, local_day_start(record.created_at)),
+    ):
+        keys.append((period, bucket_start, provider_id, provider_model, ALL_UMO))
+        keys.append((period, bucket_start, provider_id, provider_model, umo))
+    return keys
+
+
+def new_rollup_row(key: RollupKey) -> ProviderStatRollup:
+    period, bucket_start, provider_id, provider_model, umo = key
+    return ProviderStatRollup(
+        period=period,
+        bucket_start=bucket_start,
+        provider_id=provider_id,
+        provider_model=provider_model,
+        umo=umo,
+    )
+
+
+def _add_to_sketch(sketch: dict | None, seconds: float) -> dict:
+    histogram = LatencyHistogram.from_dict(sketch)
+    histogram.record(seconds)
+    return histogram.to_dict()
+
+
+def accumulate_provider_stat(row: ProviderStatRollup, record: ProviderStat) -> None:
+    """Add a single provider stat record to a rollup row."""
+    row.calls += 1
+    if record.status == "error":
+        row.error_calls += 1
+    row.token_input_other += record.token_input_other
+    row.token_input_cached += record.token_input_cached
+    row.token_output += record.token_output
+
+    with_sketch = row.umo == ALL_UMO
+    if record.time_to_first_token > 0:
+        row.ttft_sum += record.time_to_first_token
+        row.ttft_samples += 1
+        if with_sketch:
+            row.ttft_sketch = _add_to_sketch(
+                row.ttft_sketch,
+                record.time_to_first_token,
+            )
+    if record.end_time > record.start_time:
+        duration = record.end_time - record.start_time
+        row.duration_sum += duration
+        row.duration_samples += 1
+        row.duration_output_tokens += record.token_output
+        if with_sketch:
+            row.duration_sketch = _add_to_sketch(row.duration_sketch, duration)
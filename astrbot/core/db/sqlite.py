@@ -1,28 +1,55 @@
 import asyncio
+import hashlib
 import json
 import sqlite3
 import threading
+import time
 import typing as T
 from collections.abc import Awaitable, Callable
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
 
 from deprecated import deprecated
-from sqlalchemy import CursorResult, Row, not_
+from sqlalchemy import (
+    CursorResult,
+    Float,
+    Integer,
+    Row,
+    bindparam,
+    column,
+    insert,
+    not_,
+    null,
+)
 from sqlalchemy.dialects.sqlite import dialect as sqlite_dialect
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import defer
-from sqlmodel import col, delete, desc, func, or_, select, text, update
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlmodel import and_, col, delete, desc, func, or_, select, text, update
 
+from astrbot import logger
 from astrbot.core.db import BaseDatabase
+from astrbot.core.db.conversation_search import (
+    SNIPPET_CLOSE,
+    SNIPPET_ELLIPSIS,
+    SNIPPET_OPEN,
+    SNIPPET_TOKENS,
+    build_match_query,
+    format_snippet,
+    message_search_text,
+    to_search_text,
+)
+from astrbot.core.db.pagination import decode_cursor, encode_cursor
 from astrbot.core.db.po import (
     ApiKey,
     Attachment,
     ChatUIProject,
     CommandConfig,
     CommandConflict,
+    ConversationMessage,
     ConversationV2,
     CronJob,
+    ImageCaptionCacheEntry,
     Persona,
     PersonaFolder,
     PlatformMessageHistory,
@@ -30,6 +57,8 @@ from astrbot.core.db.po import (
     PlatformStat,
     Preference,
     ProviderStat,
+    ProviderStatRollup,
+    RateLimitState,
     SessionProjectRelation,
     SQLModel,
     UmoAlias,
@@ -41,9 +70,22 @@ from astrbot.core.db.po import (
 from astrbot.core.db.po import (
     Stats as DeprecatedStats,
 )
+from astrbot.core.db.provider_stat_rollup import (
+    accumulate_provider_stat,
+    new_rollup_row,
+    rollup_keys,
+)
 from astrbot.core.sentinels import NOT_GIVEN
 
 TxResult = T.TypeVar("TxResult")
+# FTS5 indexes for the dashboard conversation search. The rowid of a title row
+# is `conversations.inner_conversation_id`, the rowid of a message row is
+# `conversation_messages.id`.
+CONVERSATION_FTS_TABLE = "conversations_fts"
+CONVERSATION_MESSAGE_FTS_TABLE = "conversation_messages_fts"
+# Cached totals of the cursor-paginated conversation list, per filter set.
+CONVERSATION_COUNT_CACHE_TTL = 30
+CONVERSATION_COUNT_CACHE_SIZE = 256
 CRON_FIELD_NOT_SET = object()
 
 
@@ -52,6 +94,8 @@ class SQLiteDatabase(BaseDatabase):
         self.db_path = db_path
         self.DATABASE_URL = f"sqlite+aiosqlite:///{db_path}"
         self.inited = False
+        self.conversation_fts_available = False
+        self._conversation_count_cache: dict[str, tuple[float, int]] = {}
         super().__init__()
 
     async def initialize(self) -> None:
@@ -72,10 +116,12 @@ class SQLiteDatabase(BaseDatabase):
             await self._ensure_platform_message_history_checkpoint_column(conn)
             await self._ensure_chatui_project_workspace_columns(conn)
             await self._ensure_conversation_indexes(conn)
+            await self._ensure_conversation_history_columns(conn)
+            await self._ensure_conversation_search_tables(conn)
             await conn.commit()
 
     async def _ensure_conversation_indexes(self, conn) -> None:
-        """Create indexes used by the dashboard conversation list.
+        """Create indexes used by the dashboard conversation and history lists.
 
         Args:
             conn: Active SQLAlchemy connection used during SQLite initialization.
@@ -94,6 +140,64 @@ class SQLiteDatabase(BaseDatabase):
                 "ON conversations (platform_id, created_at DESC, inner_conversation_id DESC)"
             )
         )
+        await conn.execute(
+            text(
+                "CREATE INDEX IF NOT EXISTS "
+                "ix_platform_message_history_platform_user_created_at_id "
+                "ON platform_message_history "
+                "(platform_id, user_id, created_at DESC, id DESC)"
+            )
+        )
+
+    async def _ensure_conversation_history_columns(self, conn) -> None:
+        """Ensure conversations has the segmented history columns."""
+        result = await conn.execute(text("PRAGMA table_info(conversations)"))
+        columns = {row[1] for row in result.fetchall()}
+
+        if "history_segmented" not in columns:
+            await conn.execute(
+                text(
+                    "ALTER TABLE conversations "
+                    "ADD COLUMN history_segmented BOOLEAN NOT NULL DEFAULT 0"
+                )
+            )
+        if "message_count" not in columns:
+            await conn.execute(
+                text(
+                    "ALTER TABLE conversations "
+                    "ADD COLUMN message_count INTEGER NOT NULL DEFAULT 0"
+                )
+            )
+        if "history_digest" not in columns:
+            await conn.execute(
+                text("ALTER TABLE conversations ADD COLUMN history_digest VARCHAR(64)")
+            )
+
+    async def _ensure_conversation_search_tables(self, conn) -> None:
+        """Create the FTS5 tables behind the conversation search.
+
+        The search falls back to `LIKE` matching when the SQLite build has no
+        FTS5 support.
+        """
+        try:
+            for table_name, column_name in (
+                (CONVERSATION_FTS_TABLE, "title"),
+                (CONVERSATION_MESSAGE_FTS_TABLE, "body"),
+            ):
+                await conn.execute(
+                    text(
+                        f"CREATE VIRTUAL TABLE IF NOT EXISTS {table_name} "
+                        f"USING fts5({column_name}, tokenize='unicode61')"
+                    )
+                )
+        except Exception as e:
+            logger.warning(
+                f"FTS5 is unavailable for {self.db_path}; "
+                f"conversation search falls back to LIKE matching: {e}",
+            )
+            self.conversation_fts_available = False
+            return
+        self.conversation_fts_available = True
 
     async def _ensure_persona_folder_columns(self, conn) -> None:
         """确保 personas 表有 folder_id 和 sort_order 列。
@@ -301,12 +405,327 @@ class SQLiteDatabase(BaseDatabase):
                 session.add(record)
                 await session.flush()
                 await session.refresh(record)
+                if agent_type == "internal":
+                    await self._rollup_provider_stat(session, record)
                 return record
 
+    async def _rollup_provider_stat(
+        self,
+        session: AsyncSession,
+        record: ProviderStat,
+    ) -> None:
+        """Add a provider stat record to its hourly and daily rollup rows."""
+        for key in rollup_keys(record):
+            row = await session.get(ProviderStatRollup, key)
+            if row is None:
+                row = new_rollup_row(key)
+                session.add(row)
+            accumulate_provider_stat(row, record)
+
     # ====
     # Conversation Management
     # ====
 
+    @staticmethod
+    def _conversation_history_digest(
+        messages: list[dict],
+        digest: str | None = None,
+    ) -> str:
+        """Extend a rolling sha256 digest with the given messages."""
+        current = digest or ""
+        for message in messages:
+            payload = json.dumps(
+                message,
+                ensure_ascii=False,
+                sort_keys=True,
+                separators=(",", ":"),
+                default=str,
+            )
+            current = hashlib.sha256(
+                f"{current}\n{payload}".encode(),
+            ).hexdigest()
+        return current
+
+    async def _hydrate_conversation_contents(
+        self,
+        session: AsyncSession,
+        conversations: T.Sequence[ConversationV2],
+    ) -> None:
+        """Load segmented histories into `content` for callers expecting the full list."""
+        segmented = {
+            conv.conversation_id: conv
+            for conv in conversations
+            if conv.history_segmented
+        }
+        if not segmented:
+            return
+        histories: dict[str, list[dict]] = {cid: [] for cid in segmented}
+        result = await session.execute(
+            select(ConversationMessage.conversation_id, ConversationMessage.message)
+            .where(col(ConversationMessage.conversation_id).in_(list(segmented)))
+            .order_by(
+                col(ConversationMessage.conversation_id),
+                col(ConversationMessage.seq),
+            ),
+        )
+        for conversation_id, message in result.all():
+            histories[conversation_id].append(message)
+        for cid, conv in segmented.items():
+            set_committed_value(conv, "content", histories[cid])
+
+    async def _lock_conversation_history(self, session: AsyncSession, cid: str):
+        """Take the write lock before reading the history state of a conversation.
+
+        The no-op UPDATE makes SQLite open a write transaction first, so
+        concurrent appends to the same conversation are serialized instead of
+        racing on `message_count`.
+        """
+        await session.execute(
+            update(ConversationV2)
+            .where(col(ConversationV2.conversation_id) == cid)
+            .values(message_count=ConversationV2.message_count),
+        )
+        result = await session.execute(
+            select(
+                ConversationV2.history_segmented,
+                ConversationV2.message_count,
+                ConversationV2.history_digest,
+            ).where(col(ConversationV2.conversation_id) == cid),
+        )
+        return result.first()
+
+    async def _index_conversation_title(self, session: AsyncSession, cid: str) -> None:
+        """Write the search index row of a conversation's title."""
+        if not self.conversation_fts_available:
+            return
+        row = (
+            await session.execute(
+                select(
+                    ConversationV2.inner_conversation_id,
+                    ConversationV2.title,
+                ).where(col(ConversationV2.conversation_id) == cid),
+            )
+        ).first()
+        if row is None:
+            return
+        inner_id, title = row
+        await session.execute(
+            text(f"DELETE FROM {CONVERSATION_FTS_TABLE} WHERE rowid = :rowid"),
+            {"rowid": inner_id},
+        )
+        await session.execute(
+            text(
+                f"INSERT INTO {CONVERSATION_FTS_TABLE}(rowid, title) "
+                "VALUES (:rowid, :title)"
+            ),
+            {
+                "rowid": inner_id,
+                "title": await asyncio.to_thread(to_search_text, title),
+            },
+        )
+
+    async def _index_conversation_messages(
+        self,
+        session: AsyncSession,
+        cid: str,
+        start: int = 0,
+    ) -> None:
+        """Index the stored messages of a conversation from `start` on."""
+        if not self.conversation_fts_available:
+            return
+        result = await session.execute(
+            select(ConversationMessage.id, ConversationMessage.message).where(
+                col(ConversationMessage.conversation_id) == cid,
+                col(ConversationMessage.seq) >= start,
+            ),
+        )
+        rows = result.all()
+        if not rows:
+            return
+
+        def _tokenize() -> list[dict]:
+            params = []
+            for message_id, message in rows:
+                body = to_search_text(message_search_text(message))
+                if body:
+                    params.append({"rowid": message_id, "body": body})
+            return params
+
+        # jieba is CPU bound, keep it off the event loop.
+        params = await asyncio.to_thread(_tokenize)
+        if params:
+            await session.execute(
+                text(
+                    f"INSERT INTO {CONVERSATION_MESSAGE_FTS_TABLE}(rowid, body) "
+                    "VALUES (:rowid, :body)"
+                ),
+                params,
+            )
+
+    async def _unindex_conversations(
+        self,
+        session: AsyncSession,
+        condition: str,
+        params: dict,
+        include_titles: bool = True,
+    ) -> None:
+        """Remove the search index rows of the conversations matching `condition`.
+
+        `condition` is an SQL expression over the `conversations` table aliased
+        as `c`. Must run before the conversation and message rows are deleted.
+        """
+        if not self.conversation_fts_available:
+            return
+        await session.execute(
+            text(
+                f"DELETE FROM {CONVERSATION_MESSAGE_FTS_TABLE} WHERE rowid IN ("
+                "SELECT m.id FROM conversation_messages m "
+                "JOIN conversations c ON c.conversation_id = m.conversation_id "
+                f"WHERE {condition})"
+            ),
+            params,
+        )
+        if not include_titles:
+            return
+        await session.execute(
+            text(
+                f"DELETE FROM {CONVERSATION_FTS_TABLE} WHERE rowid IN ("
+                "SELECT c.inner_conversation_id FROM conversations c "
+                f"WHERE {condition})"
+            ),
+            params,
+        )
+
+    async def _write_conversation_history(
+        self,
+        session: AsyncSession,
+        cid: str,
+        messages: list[dict],
+        start: int,
+        digest: str | None,
+        token_usage: int | None = None,
+    ) -> int:
+        """Append messages after the `start` stored ones and store the new history state.
+
+        `digest` is None when the digest of the stored messages is unknown
+        (e.g. after dropping the oldest ones); it then stays unknown until the
+        history is rewritten.
+        """
+        if messages:
+            # Sequence numbers keep increasing after the oldest rows are
+            # dropped, the unique (conversation_id, seq) index serves MAX().
+            last_seq = (
+                await session.execute(
+                    select(func.max(ConversationMessage.seq)).where(
+                        col(ConversationMessage.conversation_id) == cid,
+                    ),
+                )
+            ).scalar_one_or_none()
+            first_seq = 0 if last_seq is None else last_seq + 1
+            await session.execute(
+                insert(ConversationMessage),
+                [
+                    {
+                        "conversation_id": cid,
+                        "seq": first_seq + offset,
+                        "message": message,
+                    }
+                    for offset, message in enumerate(messages)
+                ],
+            )
+            await self._index_conversation_messages(session, cid, first_seq)
+        message_count = start + len(messages)
+        values = {
+            "content": null(),
+            "history_segmented": True,
+            "message_count": message_count,
+            "history_digest": (
+                self._conversation_history_digest(messages, digest)
+                if digest is not None or start == 0
+                else None
+            ),
+        }
+        if token_usage is not None:
+            values["token_usage"] = token_usage
+        await session.execute(
+            update(ConversationV2)
+            .where(col(ConversationV2.conversation_id) == cid)
+            .values(**values),
+        )
+        return message_count
+
+    async def _drop_oldest_conversation_messages(
+        self,
+        session: AsyncSession,
+        cid: str,
+        count: int,
+    ) -> None:
+        """Delete the `count` oldest stored messages of a conversation."""
+        message_ids = list(
+            (
+                await session.execute(
+                    select(ConversationMessage.id)
+                    .where(col(ConversationMessage.conversation_id) == cid)
+                    .order_by(col(ConversationMessage.seq))
+                    .limit(count),
+                )
+            )
+            .scalars()
+            .all(),
+        )
+        if not message_ids:
+            return
+        if self.conversation_fts_available:
+            await session.execute(
+                text(
+                    f"DELETE FROM {CONVERSATION_MESSAGE_FTS_TABLE} WHERE rowid IN :ids"
+                ).bindparams(bindparam("ids", expanding=True)),
+                {"ids": message_ids},
+            )
+        await session.execute(
+            delete(ConversationMessage).where(
+                col(ConversationMessage.id).in_(message_ids),
+            ),
+        )
+
+    async def _replace_conversation_history(
+        self,
+        session: AsyncSession,
+        cid: str,
+        content: list[dict],
+    ) -> None:
+        state = await self._lock_conversation_history(session, cid)
+        if state is None:
+            return
+        segmented, message_count, digest = state
+        if (
+            segmented
+            and digest is not None
+            and len(content) >= message_count
+            and self._conversation_history_digest(content[:message_count]) == digest
+        ):
+            # The new history only extends the stored one, append the tail.
+            await self._write_conversation_history(
+                session,
+                cid,
+                content[message_count:],
+                message_count,
+                digest,
+            )
+            return
+        await self._unindex_conversations(
+            session,
+            "c.conversation_id = :cid",
+            {"cid": cid},
+            include_titles=False,
+        )
+        await session.execute(
+            delete(ConversationMessage).where(
+                col(ConversationMessage.conversation_id) == cid,
+            ),
+        )
+        await self._write_conversation_history(session, cid, content, 0, None)
+
     async def get_conversations(self, user_id=None, platform_id=None):
         async with self.get_db() as session:
             session: AsyncSession
@@ -319,15 +738,20 @@ class SQLiteDatabase(BaseDatabase):
             # order by
             query = query.order_by(desc(ConversationV2.created_at))
             result = await session.execute(query)
+            conversations = result.scalars().all()
+            await self._hydrate_conversation_contents(session, conversations)
 
-            return result.scalars().all()
+            return conversations
 
-    async def get_conversation_by_id(self, cid):
+    async def get_conversation_by_id(self, cid, include_history=True):
         async with self.get_db() as session:
             session: AsyncSession
             query = select(ConversationV2).where(ConversationV2.conversation_id == cid)
             result = await session.execute(query)
-            return result.scalar_one_or_none()
+            conversation = result.scalar_one_or_none()
+            if conversation and include_history:
+                await self._hydrate_conversation_contents(session, [conversation])
+            return conversation
 
     async def get_all_conversations(self, page=1, page_size=20):
         async with self.get_db() as session:
@@ -339,62 +763,396 @@ class SQLiteDatabase(BaseDatabase):
                 .offset(offset)
                 .limit(page_size),
             )
-            return result.scalars().all()
+            conversations = result.scalars().all()
+            await self._hydrate_conversation_contents(session, conversations)
+            return conversations
 
-    async def get_filtered_conversations(
+    async def get_conversation_messages(self, cid, limit=None, turns=None):
+        async with self.get_db() as session:
+            session: AsyncSession
+            result = await session.execute(
+                select(
+                    ConversationV2.history_segmented,
+                    ConversationV2.content,
+                ).where(col(ConversationV2.conversation_id) == cid),
+            )
+            row = result.first()
+            if row is None:
+                return []
+            segmented, legacy_content = row
+            if not segmented:
+                history = legacy_content or []
+                if turns:
+                    user_indexes = [
+                        i
+                        for i, message in enumerate(history)
+                        if isinstance(message, dict) and message.get("role") == "user"
+                    ]
+                    if len(user_indexes) >= turns:
+                        history = history[user_indexes[-turns] :]
+                return history[-limit:] if limit else history
+            query = (
+                select(ConversationMessage.message)
+                .where(col(ConversationMessage.conversation_id) == cid)
+                .order_by(desc(ConversationMessage.seq))
+            )
+            if turns:
+                # A turn starts at a user message; find where the last `turns` begin.
+                first_seq = (
+                    await session.execute(
+                        select(ConversationMessage.seq)
+                        .where(
+                            col(ConversationMessage.conversation_id) == cid,
+                            func.json_extract(ConversationMessage.message, "$.role")
+                            == "user",
+                        )
+                        .order_by(desc(ConversationMessage.seq))
+                        .offset(turns - 1)
+                        .limit(1),
+                    )
+                ).scalar_one_or_none()
+                if first_seq is not None:
+                    query = query.where(col(ConversationMessage.seq) >= first_seq)
+            if limit:
+                query = query.limit(limit)
+            messages = list((await session.execute(query)).scalars().all())
+            messages.reverse()
+            return messages
+
+    async def append_conversation_messages(
         self,
+        cid,
+        messages,
+        expected_count=None,
+        drop_count=0,
+        token_usage=None,
+    ):
+        async with self.get_db() as session:
+            session: AsyncSession
+            async with session.begin():
+                state = await self._lock_conversation_history(session, cid)
+                if state is None:
+                    return None
+                segmented, message_count, digest = state
+                if not segmented:
+                    # Migrate the legacy JSON blob on the first append.
+                    legacy_content = (
+                        await session.execute(
+                            select(ConversationV2.content).where(
+                                col(ConversationV2.conversation_id) == cid,
+                            ),
+                        )
+                    ).scalar_one_or_none()
+                    legacy_content = legacy_content or []
+                    if (
+                        expected_count is not None
+                        and len(legacy_content) != expected_count
+                    ):
+                        return None
+                    messages = [*legacy_content[drop_count:], *messages]
+                    message_count, digest = 0, None
+                else:
+                    if expected_count is not None and message_count != expected_count:
+                        return None
+                    if drop_count > 0:
+                        await self._drop_oldest_conversation_messages(
+                            session,
+                            cid,
+                            drop_count,
+                        )
+                        message_count = max(0, message_count - drop_count)
+                        digest = None
+                return await self._write_conversation_history(
+                    session,
+                    cid,
+                    messages,
+                    message_count,
+                    digest,
+                    token_usage=token_usage,
+                )
+
+    @staticmethod
+    def _conversation_filter_conditions(platform_ids=None, **kwargs) -> list:
+        """Build the non-search filters of the dashboard conversation list."""
+        conditions = []
+        if platform_ids:
+            conditions.append(col(ConversationV2.platform_id).in_(platform_ids))
+        message_types = kwargs.get("message_types") or []
+        if message_types:
+            conditions.append(
+                or_(
+                    *(
+                        col(ConversationV2.user_id).like(f"%:{msg_type}:%")
+                        for msg_type in message_types
+                    )
+                )
+            )
+        platforms = kwargs.get("platforms") or []
+        if platforms:
+            conditions.append(col(ConversationV2.platform_id).in_(platforms))
+        exclude_ids = kwargs.get("exclude_ids") or []
+        for exclude_id in exclude_ids:
+            conditions.append(not_(col(ConversationV2.user_id).like(f"{exclude_id}%")))
+        exclude_platforms = kwargs.get("exclude_platforms") or []
+        if exclude_platforms:
+            conditions.append(
+                not_(col(ConversationV2.platform_id).in_(exclude_platforms))
+            )
+        return conditions
+
+    async def search_conversations(
+        self,
+        search_query,
         page=1,
         page_size=20,
         platform_ids=None,
-        search_query="",
         include_history=True,
         **kwargs,
     ):
+        """Rank conversations with the full-text index.
+
+        Title and message hits are scored with `bm25()` (title hits weigh
+        double), a conversation ranks by its best hit. Conversations whose ID
+        or unified message origin contains the search text are included too,
+        as are `LIKE` matches among the rows the index does not cover yet.
+
+        Returns:
+            A list of (conversation, snippet) pairs and the total count, or None
+            when the index cannot serve the query so callers can fall back to
+            `LIKE` matching. Snippets are HTML-escaped with `<mark>` highlights.
+        """
+        if not self.conversation_fts_available:
+            return None
+        match_query = build_match_query(search_query)
+        if not match_query:
+            return None
+
+        hits = self._conversation_search_hits(search_query, match_query)
+        conditions = self._conversation_filter_conditions(platform_ids, **kwargs)
+        joined = hits.c.inner_id == ConversationV2.inner_conversation_id
+
         async with self.get_db() as session:
             session: AsyncSession
-            # Build the base query with filters
-            base_query = select(ConversationV2)
-            conditions = []
+            try:
+                total = (
+                    await session.execute(
+                        select(func.count())
+                        .select_from(ConversationV2)
+                        .join(hits, joined)
+                        .where(*conditions),
+                    )
+                ).scalar_one()
+                result_query = (
+                    select(ConversationV2)
+                    .join(hits, joined)
+                    .where(*conditions)
+                    .order_by(
+                        hits.c.score,
+                        desc(ConversationV2.created_at),
+                        desc(ConversationV2.inner_conversation_id),
+                    )
+                    .offset((page - 1) * page_size)
+                    .limit(page_size)
+                )
+                if not include_history:
+                    result_query = result_query.options(defer(ConversationV2.content))
+                conversations = (await session.execute(result_query)).scalars().all()
+                snippets = await self._conversation_search_snippets(
+                    session,
+                    match_query,
+                    [conv.conversation_id for conv in conversations],
+                )
+            except Exception as e:
+                logger.warning(
+                    f"Conversation full-text search failed for {search_query!r}; "
+                    f"falling back to LIKE matching: {e}",
+                )
+                return None
+            if include_history:
+                await self._hydrate_conversation_contents(session, conversations)
+            return [
+                (conv, snippets.get(conv.conversation_id, "")) for conv in conversations
+            ], total
 
-            if platform_ids:
-                conditions.append(col(ConversationV2.platform_id).in_(platform_ids))
-            if search_query:
-                escaped_search_query = json.dumps(
-                    search_query,
-                    ensure_ascii=True,
-                )[1:-1]
-                conditions.append(
-                    or_(
-                        col(ConversationV2.title).ilike(f"%{search_query}%"),
-                        col(ConversationV2.user_id).ilike(f"%{search_query}%"),
-                        col(ConversationV2.conversation_id).ilike(f"%{search_query}%"),
-                        col(ConversationV2.content).ilike(f"%{search_query}%"),
-                        col(ConversationV2.content).ilike(f"%{escaped_search_query}%"),
+    @staticmethod
+    def _conversation_search_hits(search_query: str, match_query: str):
+        """Build the `hits(inner_id, score)` subquery of a conversation search.
+
+        Each matching conversation appears once with the score of its best hit,
+        lower scores rank higher.
+        """
+        hits_sql = text(
+            f"""
+            SELECT inner_id, MIN(score) AS score FROM (
+                SELECT rowid AS inner_id,
+                    bm25({CONVERSATION_FTS_TABLE}) * 2 AS score
+                FROM {CONVERSATION_FTS_TABLE}
+                WHERE {CONVERSATION_FTS_TABLE} MATCH :match_query
+                UNION ALL
+                SELECT c.inner_conversation_id AS inner_id,
+                    bm25({CONVERSATION_MESSAGE_FTS_TABLE}) AS score
+                FROM {CONVERSATION_MESSAGE_FTS_TABLE}
+                JOIN conversation_messages m
+                    ON m.id = {CONVERSATION_MESSAGE_FTS_TABLE}.rowid
+                JOIN conversations c ON c.conversation_id = m.conversation_id
+                WHERE {CONVERSATION_MESSAGE_FTS_TABLE} MATCH :match_query
+                UNION ALL
+                SELECT inner_conversation_id AS inner_id, 0 AS score
+                FROM conversations
+                WHERE conversation_id LIKE :pattern OR user_id LIKE :pattern
+                UNION ALL
+                -- Rows the index does not cover yet: not backfilled, or legacy
+                -- histories still stored inline in `content`.
+                SELECT c.inner_conversation_id AS inner_id, 0 AS score
+                FROM conversations c
+                WHERE (
+                    c.history_segmented = 0
+                    OR NOT EXISTS (
+                        SELECT 1 FROM {CONVERSATION_FTS_TABLE} f
+                        WHERE f.rowid = c.inner_conversation_id
+                    )
+                ) AND (
+                    c.title LIKE :pattern
+                    OR c.content LIKE :pattern
+                    OR c.content LIKE :escaped_pattern
+                    OR EXISTS (
+                        SELECT 1 FROM conversation_messages m
+                        WHERE m.conversation_id = c.conversation_id
+                            AND (
+                                m.message LIKE :pattern
+                                OR m.message LIKE :escaped_pattern
+                            )
                     )
                 )
-            message_types = kwargs.get("message_types") or []
-            if message_types:
-                conditions.append(
-                    or_(
-                        *(
-                            col(ConversationV2.user_id).like(f"%:{msg_type}:%")
-                            for msg_type in message_types
-                        )
+            )
+            GROUP BY inner_id
+            """
+        ).bindparams(
+            match_query=match_query,
+            pattern=f"%{search_query}%",
+            escaped_pattern=f"%{json.dumps(search_query, ensure_ascii=True)[1:-1]}%",
+        )
+        return hits_sql.columns(
+            column("inner_id", Integer),
+            column("score", Float),
+        ).subquery("hits")
+
+    async def _conversation_search_snippets(
+        self,
+        session: AsyncSession,
+        match_query: str,
+        cids: list[str],
+    ) -> dict[str, str]:
+        """Return the snippet of the best matching message of each conversation."""
+        if not cids:
+            return {}
+        result = await session.execute(
+            text(
+                f"""
+                SELECT m.conversation_id AS conversation_id,
+                    snippet({CONVERSATION_MESSAGE_FTS_TABLE}, 0, :open, :close,
+                        :ellipsis, :tokens) AS snippet
+                FROM {CONVERSATION_MESSAGE_FTS_TABLE}
+                JOIN conversation_messages m
+                    ON m.id = {CONVERSATION_MESSAGE_FTS_TABLE}.rowid
+                WHERE {CONVERSATION_MESSAGE_FTS_TABLE} MATCH :match_query
+                    AND {CONVERSATION_MESSAGE_FTS_TABLE}.rowid IN (
+                        SELECT id FROM conversation_messages
+                        WHERE conversation_id IN :cids
                     )
+                ORDER BY bm25({CONVERSATION_MESSAGE_FTS_TABLE})
+                """
+            ).bindparams(bindparam("cids", expanding=True)),
+            {
+                "open": SNIPPET_OPEN,
+                "close": SNIPPET_CLOSE,
+                "ellipsis": SNIPPET_ELLIPSIS,
+                "tokens": SNIPPET_TOKENS,
+                "match_query": match_query,
+                "cids": cids,
+            },
+        )
+        snippets: dict[str, str] = {}
+        for cid, snippet in result.all():
+            if cid not in snippets:
+                snippets[cid] = format_snippet(snippet)
+        return snippets
+
+    async def index_conversations_for_search(self, after_id=0, batch_size=100):
+        """Index a batch of conversations that have no search index rows yet.
+
+        Used to backfill conversations written before the index existed. Each
+        batch rewrites the index rows of its conversations, so it is safe to
+        run while new messages are being written.
+
+        Returns:
+            The `inner_conversation_id` to continue after, or None when done.
+        """
+        if not self.conversation_fts_available:
+            return None
+        async with self.get_db() as session:
+            session: AsyncSession
+            async with session.begin():
+                result = await session.execute(
+                    text(
+                        f"""
+                        SELECT inner_conversation_id, conversation_id
+                        FROM conversations c
+                        WHERE inner_conversation_id > :after_id
+                            AND NOT EXISTS (
+                                SELECT 1 FROM {CONVERSATION_FTS_TABLE} f
+                                WHERE f.rowid = c.inner_conversation_id
+                            )
+                        ORDER BY inner_conversation_id
+                        LIMIT :batch_size
+                        """
+                    ),
+                    {"after_id": after_id, "batch_size": batch_size},
                 )
+                rows = result.all()
+                if not rows:
+                    return None
+                for _, cid in rows:
+                    await self._unindex_conversations(
+                        session,
+                        "c.conversation_id = :cid",
+                        {"cid": cid},
+                    )
+                    await self._index_conversation_messages(session, cid)
+                    await self._index_conversation_title(session, cid)
+                return rows[-1][0]
+
+    async def get_filtered_conversations(
+        self,
+        page=1,
+        page_size=20,
+        platform_ids=None,
+        search_query="",
+        include_history=True,
+        **kwargs,
+    ):
+        if search_query:
+            search_result = await self.search_conversations(
+                search_query,
+                page=page,
+                page_size=page_size,
+                platform_ids=platform_ids,
+                include_history=include_history,
+                **kwargs,
+            )
+            if search_result is not None:
+                hits, total = search_result
+                return [conv for conv, _ in hits], total
+
+        async with self.get_db() as session:
+            session: AsyncSession
+            # Build the base query with filters
+            base_query = select(ConversationV2)
+            conditions = self._conversation_filter_conditions(platform_ids, **kwargs)
             platforms = kwargs.get("platforms") or []
-            if platforms:
-                conditions.append(col(ConversationV2.platform_id).in_(platforms))
-            exclude_ids = kwargs.get("exclude_ids") or []
-            for exclude_id in exclude_ids:
-                conditions.append(
-                    not_(col(ConversationV2.user_id).like(f"{exclude_id}%"))
-                )
-            exclude_platforms = kwargs.get("exclude_platforms") or []
-            if exclude_platforms:
-                conditions.append(
-                    not_(col(ConversationV2.platform_id).in_(exclude_platforms))
-                )
+
+            if search_query:
+                conditions.append(self._conversation_like_condition(search_query))
 
             if conditions:
                 base_query = base_query.where(*conditions)
@@ -414,40 +1172,209 @@ class SQLiteDatabase(BaseDatabase):
                 .offset(offset)
                 .limit(page_size)
             )
-            if not include_history:
-                result_query = result_query.options(defer(ConversationV2.content))
-            if len(platforms) > 1 or len(platform_ids or []) > 1:
-                # SQLite may choose the narrow platform index for IN queries and
-                # then materialize a temporary sort. Force the global ordering
-                # index for multi-platform pages while keeping ORM row mapping.
-                compiled = result_query.compile(
-                    dialect=sqlite_dialect(paramstyle="named"),
-                    compile_kwargs={"render_postcompile": True},
-                )
-                indexed_sql = compiled.string.replace(
-                    "FROM conversations",
-                    "FROM conversations INDEXED BY "
-                    "ix_conversations_created_at_inner_id",
-                    1,
-                )
-                conversation_columns = [
-                    column
-                    for column in ConversationV2.__table__.columns
-                    if include_history or column.name != "content"
-                ]
-                result_query = select(ConversationV2).from_statement(
-                    text(indexed_sql).columns(*conversation_columns),
+            conversations = await self._execute_conversation_page(
+                session,
+                result_query,
+                include_history=include_history,
+                force_order_index=len(platforms) > 1 or len(platform_ids or []) > 1,
+            )
+            if include_history:
+                await self._hydrate_conversation_contents(session, conversations)
+
+            return conversations, total
+
+    @staticmethod
+    def _conversation_like_condition(search_query: str):
+        """Match the search text with `LIKE` against titles, IDs and histories."""
+        escaped_search_query = json.dumps(
+            search_query,
+            ensure_ascii=True,
+        )[1:-1]
+        return or_(
+            col(ConversationV2.title).ilike(f"%{search_query}%"),
+            col(ConversationV2.user_id).ilike(f"%{search_query}%"),
+            col(ConversationV2.conversation_id).ilike(f"%{search_query}%"),
+            col(ConversationV2.content).ilike(f"%{search_query}%"),
+            col(ConversationV2.content).ilike(f"%{escaped_search_query}%"),
+            select(ConversationMessage.id)
+            .where(
+                col(ConversationMessage.conversation_id)
+                == ConversationV2.conversation_id,
+                or_(
+                    col(ConversationMessage.message).ilike(f"%{search_query}%"),
+                    col(ConversationMessage.message).ilike(f"%{escaped_search_query}%"),
+                ),
+            )
+            .exists(),
+        )
+
+    @staticmethod
+    async def _execute_conversation_page(
+        session: AsyncSession,
+        result_query,
+        include_history: bool,
+        force_order_index: bool,
+    ) -> list[ConversationV2]:
+        """Run a conversation page query ordered by `(created_at, inner_id)`."""
+        if not include_history:
+            result_query = result_query.options(defer(ConversationV2.content))
+        if not force_order_index:
+            return list((await session.execute(result_query)).scalars().all())
+        # SQLite may choose the narrow platform index for IN queries and
+        # then materialize a temporary sort. Force the global ordering
+        # index for multi-platform pages while keeping ORM row mapping.
+        compiled = result_query.compile(
+            dialect=sqlite_dialect(paramstyle="named"),
+            compile_kwargs={"render_postcompile": True},
+        )
+        indexed_sql = compiled.string.replace(
+            "FROM conversations",
+            "FROM conversations INDEXED BY ix_conversations_created_at_inner_id",
+            1,
+        )
+        conversation_columns = [
+            column
+            for column in ConversationV2.__table__.columns
+            if include_history or column.name != "content"
+        ]
+        result_query = select(ConversationV2).from_statement(
+            text(indexed_sql).columns(*conversation_columns),
+        )
+        if not include_history:
+            result_query = result_query.options(defer(ConversationV2.content))
+        result = await session.execute(result_query, compiled.params)
+        return list(result.scalars().all())
+
+    async def get_conversations_by_cursor(
+        self,
+        page_size=20,
+        cursor=None,
+        platform_ids=None,
+        search_query="",
+        include_history=True,
+        **kwargs,
+    ):
+        """List conversations with keyset pagination.
+
+        Pages are ordered by `(created_at, inner_conversation_id)` descending
+        and start right after the cursor, so a deep page costs the same as the
+        first one. Search results keep this order instead of ranking by
+        relevance, the full-text index only filters them.
+
+        Returns:
+            The conversations and the cursor of the next page, or None when
+            this is the last page.
+
+        Raises:
+            ValueError: If the cursor is malformed.
+        """
+        conditions = self._conversation_filter_conditions(platform_ids, **kwargs)
+        if cursor:
+            created_at, inner_id = decode_cursor(cursor)
+            conditions.append(
+                or_(
+                    col(ConversationV2.created_at) < created_at,
+                    and_(
+                        col(ConversationV2.created_at) == created_at,
+                        col(ConversationV2.inner_conversation_id) < inner_id,
+                    ),
                 )
-                if not include_history:
-                    result_query = result_query.options(
-                        defer(ConversationV2.content),
+            )
+        if search_query:
+            conditions.append(self._conversation_search_condition(search_query))
+        platforms = kwargs.get("platforms") or []
+
+        async with self.get_db() as session:
+            session: AsyncSession
+            result_query = (
+                select(ConversationV2)
+                .where(*conditions)
+                .order_by(
+                    desc(ConversationV2.created_at),
+                    desc(ConversationV2.inner_conversation_id),
+                )
+                .limit(page_size + 1)
+            )
+            conversations = await self._execute_conversation_page(
+                session,
+                result_query,
+                include_history=include_history,
+                force_order_index=len(platforms) > 1 or len(platform_ids or []) > 1,
+            )
+            next_cursor = None
+            if len(conversations) > page_size:
+                conversations = conversations[:page_size]
+                last = conversations[-1]
+                next_cursor = encode_cursor(
+                    last.created_at,
+                    last.inner_conversation_id,
+                )
+            if include_history:
+                await self._hydrate_conversation_contents(session, conversations)
+            return conversations, next_cursor
+
+    def _conversation_search_condition(self, search_query: str):
+        """Filter conversations by search text, with the index when possible."""
+        match_query = (
+            build_match_query(search_query) if self.conversation_fts_available else ""
+        )
+        if not match_query:
+            return self._conversation_like_condition(search_query)
+        hits = self._conversation_search_hits(search_query, match_query)
+        return col(ConversationV2.inner_conversation_id).in_(select(hits.c.inner_id))
+
+    async def count_filtered_conversations(
+        self,
+        platform_ids=None,
+        search_query="",
+        **kwargs,
+    ):
+        """Count the conversations matching the filters.
+
+        Counts are cached for `CONVERSATION_COUNT_CACHE_TTL` seconds, so paging
+        through a list does not rerun the count for every page. Creating or
+        deleting conversations clears the cache.
+        """
+        cache_key = json.dumps(
+            {
+                "platform_ids": platform_ids or [],
+                "search_query": search_query,
+                **{
+                    key: kwargs.get(key) or []
+                    for key in (
+                        "message_types",
+                        "platforms",
+                        "exclude_ids",
+                        "exclude_platforms",
                     )
-                result = await session.execute(result_query, compiled.params)
-            else:
-                result = await session.execute(result_query)
-            conversations = result.scalars().all()
+                },
+            },
+            sort_keys=True,
+        )
+        now = time.monotonic()
+        cached = self._conversation_count_cache.get(cache_key)
+        if cached and cached[0] > now:
+            return cached[1]
 
-            return conversations, total
+        conditions = self._conversation_filter_conditions(platform_ids, **kwargs)
+        if search_query:
+            conditions.append(self._conversation_search_condition(search_query))
+        async with self.get_db() as session:
+            session: AsyncSession
+            total = (
+                await session.execute(
+                    select(func.count(ConversationV2.inner_conversation_id)).where(
+                        *conditions
+                    )
+                )
+            ).scalar_one()
+        if len(self._conversation_count_cache) >= CONVERSATION_COUNT_CACHE_SIZE:
+            self._conversation_count_cache.clear()
+        self._conversation_count_cache[cache_key] = (
+            now + CONVERSATION_COUNT_CACHE_TTL,
+            total,
+        )
+        return total
 
     async def create_conversation(
         self,
@@ -470,16 +1397,43 @@ class SQLiteDatabase(BaseDatabase):
         async with self.get_db() as session:
             session: AsyncSession
             async with session.begin():
+                content = content or []
                 new_conversation = ConversationV2(
                     user_id=user_id,
-                    content=content or [],
+                    content=None,
                     platform_id=platform_id,
                     title=title,
                     persona_id=persona_id,
+                    history_segmented=True,
+                    message_count=len(content),
+                    history_digest=self._conversation_history_digest(content),
                     **kwargs,
                 )
                 session.add(new_conversation)
-                return new_conversation
+                await session.flush()
+                if content:
+                    await session.execute(
+                        insert(ConversationMessage),
+                        [
+                            {
+                                "conversation_id": new_conversation.conversation_id,
+                                "seq": seq,
+                                "message": message,
+                            }
+                            for seq, message in enumerate(content)
+                        ],
+                    )
+                    await self._index_conversation_messages(
+                        session,
+                        new_conversation.conversation_id,
+                    )
+                await self._index_conversation_title(
+                    session,
+                    new_conversation.conversation_id,
+                )
+                set_committed_value(new_conversation, "content", content)
+        self._conversation_count_cache.clear()
+        return new_conversation
 
     async def update_conversation(
         self, cid, title=None, persona_id=None, content=None, token_usage=None
@@ -495,35 +1449,70 @@ class SQLiteDatabase(BaseDatabase):
                     values["title"] = title
                 if persona_id is not None:
                     values["persona_id"] = persona_id
-                if content is not None:
-                    values["content"] = content
                 if token_usage is not None:
                     values["token_usage"] = token_usage
-                if not values:
+                if not values and content is None:
                     return None
-                query = query.values(**values)
-                await session.execute(query)
-        return await self.get_conversation_by_id(cid)
+                if content is not None:
+                    await self._replace_conversation_history(session, cid, content)
+                if values:
+                    query = query.values(**values)
+                    await session.execute(query)
+                if title is not None:
+                    await self._index_conversation_title(session, cid)
+        if content is None:
+            return await self.get_conversation_by_id(cid)
+        # The caller already has the new history, skip reloading every message.
+        conversation = await self.get_conversation_by_id(cid, include_history=False)
+        if conversation:
+            set_committed_value(conversation, "content", content)
+        return conversation
 
     async def delete_conversation(self, cid) -> None:
         async with self.get_db() as session:
             session: AsyncSession
             async with session.begin():
+                await self._unindex_conversations(
+                    session,
+                    "c.conversation_id = :cid",
+                    {"cid": cid},
+                )
+                await session.execute(
+                    delete(ConversationMessage).where(
+                        col(ConversationMessage.conversation_id) == cid,
+                    ),
+                )
                 await session.execute(
                     delete(ConversationV2).where(
                         col(ConversationV2.conversation_id) == cid,
                     ),
                 )
+        self._conversation_count_cache.clear()
 
     async def delete_conversations_by_user_id(self, user_id: str) -> None:
         async with self.get_db() as session:
             session: AsyncSession
             async with session.begin():
+                await self._unindex_conversations(
+                    session,
+                    "c.user_id = :user_id",
+                    {"user_id": user_id},
+                )
+                await session.execute(
+                    delete(ConversationMessage).where(
+                        col(ConversationMessage.conversation_id).in_(
+                            select(ConversationV2.conversation_id).where(
+                                col(ConversationV2.user_id) == user_id,
+                            ),
+                        ),
+                    ),
+                )
                 await session.execute(
                     delete(ConversationV2).where(
                         col(ConversationV2.user_id) == user_id
                     ),
                 )
+        self._conversation_count_cache.clear()
 
     async def get_session_conversations(
         self,
@@ -757,6 +1746,53 @@ class SQLiteDatabase(BaseDatabase):
             result = await session.execute(query.offset(offset).limit(page_size))
             return result.scalars().all()
 
+    async def get_platform_message_history_by_cursor(
+        self,
+        platform_id,
+        user_id,
+        page_size=20,
+        cursor=None,
+    ):
+        """Get platform message history records with keyset pagination.
+
+        Records are ordered newest first, like `get_platform_message_history`.
+
+        Raises:
+            ValueError: If the cursor is malformed.
+        """
+        conditions = [
+            col(PlatformMessageHistory.platform_id) == platform_id,
+            col(PlatformMessageHistory.user_id) == user_id,
+        ]
+        if cursor:
+            created_at, message_id = decode_cursor(cursor)
+            conditions.append(
+                or_(
+                    col(PlatformMessageHistory.created_at) < created_at,
+                    and_(
+                        col(PlatformMessageHistory.created_at) == created_at,
+                        col(PlatformMessageHistory.id) < message_id,
+                    ),
+                )
+            )
+        async with self.get_db() as session:
+            session: AsyncSession
+            result = await session.execute(
+                select(PlatformMessageHistory)
+                .where(*conditions)
+                .order_by(
+                    desc(PlatformMessageHistory.created_at),
+                    desc(PlatformMessageHistory.id),
+                )
+                .limit(page_size + 1)
+            )
+            records = list(result.scalars().all())
+        next_cursor = None
+        if len(records) > page_size:
+            records = records[:page_size]
+            next_cursor = encode_cursor(records[-1].created_at, records[-1].id)
+        return records, next_cursor
+
     async def get_platform_message_history_by_id(
         self, message_id: int
     ) -> PlatformMessageHistory | None:
@@ -1749,6 +2785,88 @@ class SQLiteDatabase(BaseDatabase):
 
         await self._run_in_tx(_op)
 
+    async def get_rate_limit_states(self, scope_id: str) -> list[RateLimitState]:
+        async with self.get_db() as session:
+            session: AsyncSession
+            result = await session.execute(
+                select(RateLimitState).where(RateLimitState.scope_id == scope_id),
+            )
+            return list(result.scalars().all())
+
+    async def replace_rate_limit_states(
+        self,
+        scope_id: str,
+        states: dict[str, float],
+    ) -> None:
+        async def _op(session: AsyncSession) -> None:
+            await session.execute(
+                delete(RateLimitState).where(
+                    col(RateLimitState.scope_id) == scope_id,
+                ),
+            )
+            if states:
+                await session.execute(
+                    insert(RateLimitState),
+                    [
+                        {"scope_id": scope_id, "key": key, "tat": tat}
+                        for key, tat in states.items()
+                    ],
+                )
+
+        await self._run_in_tx(_op)
+
+    async def load_image_captions(
+        self,
+        since: float,
+        limit: int,
+    ) -> list[ImageCaptionCacheEntry]:
+        async with self.get_db() as session:
+            session: AsyncSession
+            result = await session.execute(
+                select(ImageCaptionCacheEntry)
+                .where(col(ImageCaptionCacheEntry.created_at) >= since)
+                .order_by(desc(ImageCaptionCacheEntry.created_at))
+                .limit(limit),
+            )
+            return list(result.scalars().all())
+
+    async def save_image_caption(
+        self,
+        cache_key: str,
+        caption: str,
+        created_at: float,
+    ) -> None:
+        async def _op(session: AsyncSession) -> None:
+            await session.merge(
+                ImageCaptionCacheEntry(
+                    cache_key=cache_key,
+                    caption=caption,
+                    created_at=created_at,
+                ),
+            )
+
+        await self._run_in_tx(_op)
+
+    async def prune_image_captions(self, before: float, keep: int) -> None:
+        async def _op(session: AsyncSession) -> None:
+            await session.execute(
+                delete(ImageCaptionCacheEntry).where(
+                    col(ImageCaptionCacheEntry.created_at) < before,
+                ),
+            )
+            newest = (
+                select(ImageCaptionCacheEntry.cache_key)
+                .order_by(desc(ImageCaptionCacheEntry.created_at))
+                .limit(keep)
+            )
+            await session.execute(
+                delete(ImageCaptionCacheEntry).where(
+                    col(ImageCaptionCacheEntry.cache_key).not_in(newest),
+                ),
+            )
+
+        await self._run_in_tx(_op)
+
     # ====
     # Deprecated Methods
     # ====
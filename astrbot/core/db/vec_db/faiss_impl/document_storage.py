@@ -1,9 +1,13 @@
+import asyncio
 import json
 import os
+from collections import Counter
+from collections.abc import AsyncIterator
 from contextlib import asynccontextmanager
 from datetime import datetime
 from pathlib import Path
 
+import numpy as np
 from sqlalchemy import Column, Text, bindparam
 from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
@@ -14,11 +18,20 @@ from astrbot.core.knowledge_base.retrieval.tokenizer import (
     build_fts5_or_query,
     load_stopwords,
     to_fts5_search_text,
+    tokenize_text,
 )
 
 FTS_TABLE_NAME = "documents_fts"
 FTS_REBUILD_BATCH_SIZE = 1000
 
+# Persistent BM25 inverted index, used when SQLite lacks FTS5.
+BM25_POSTINGS_TABLE = "bm25_postings"
+BM25_DOC_LENGTHS_TABLE = "bm25_doc_lengths"
+BM25_STATS_TABLE = "bm25_stats"
+BM25_K1 = 1.5
+BM25_B = 0.75
+SQLITE_IN_BATCH_SIZE = 500
+
 
 class BaseDocModel(SQLModel, table=False):
     metadata = MetaData()
@@ -54,6 +67,8 @@ class DocumentStorage:
         self.fts5_available = False
         self._fts_contentless_delete = False
         self._fts_index_ready = False
+        self._bm25_index_ready = False
+        self._bm25_rebuild_lock = asyncio.Lock()
         self._stopwords: set[str] | None = None
 
     async def initialize(self) -> None:
@@ -98,6 +113,11 @@ class DocumentStorage:
             )
 
             await self._initialize_fts5(conn)
+            await self._initialize_bm25(conn)
+            if self.fts5_available:
+                # FTS5 owns sparse retrieval; drop any stale fallback postings so
+                # a later fallback rebuilds from the documents table.
+                await self._clear_bm25_index(conn)
             await conn.commit()
 
     async def _initialize_fts5(self, executor) -> None:
@@ -130,9 +150,66 @@ class DocumentStorage:
             self._fts_contentless_delete = False
             logger.warning(
                 f"SQLite FTS5 is unavailable for document storage {self.db_path}; "
-                f"falling back to in-memory BM25 sparse retrieval: {e}",
+                f"falling back to the persistent BM25 index: {e}",
             )
 
+    async def _initialize_bm25(self, executor) -> None:
+        await executor.execute(
+            text(
+                f"""
+                CREATE TABLE IF NOT EXISTS {BM25_POSTINGS_TABLE} (
+                    term TEXT NOT NULL,
+                    doc_rowid INTEGER NOT NULL,
+                    tf INTEGER NOT NULL,
+                    PRIMARY KEY (term, doc_rowid)
+                ) WITHOUT ROWID
+                """,
+            ),
+        )
+        await executor.execute(
+            text(
+                f"CREATE INDEX IF NOT EXISTS idx_{BM25_POSTINGS_TABLE}_doc_rowid "
+                f"ON {BM25_POSTINGS_TABLE}(doc_rowid)",
+            ),
+        )
+        await executor.execute(
+            text(
+                f"""
+                CREATE TABLE IF NOT EXISTS {BM25_DOC_LENGTHS_TABLE} (
+                    doc_rowid INTEGER PRIMARY KEY,
+                    length INTEGER NOT NULL
+                )
+                """,
+            ),
+        )
+        await executor.execute(
+            text(
+                f"""
+                CREATE TABLE IF NOT EXISTS {BM25_STATS_TABLE} (
+                    id INTEGER PRIMARY KEY CHECK (id = 0),
+                    doc_count INTEGER NOT NULL,
+                    total_length INTEGER NOT NULL
+                )
+                """,
+            ),
+        )
+        await executor.execute(
+            text(
+                f"INSERT OR IGNORE INTO {BM25_STATS_TABLE}"
+                "(id, doc_count, total_length) VALUES (0, 0, 0)",
+            ),
+        )
+
+    async def _clear_bm25_index(self, executor) -> None:
+        await executor.execute(text(f"DELETE FROM {BM25_POSTINGS_TABLE}"))
+        await executor.execute(text(f"DELETE FROM {BM25_DOC_LENGTHS_TABLE}"))
+        await executor.execute(
+            text(
+                f"UPDATE {BM25_STATS_TABLE} SET doc_count = 0, total_length = 0 "
+                "WHERE id = 0",
+            ),
+        )
+
     async def _create_fts5_table(self, executor, if_not_exists: bool) -> None:
         create_clause = (
             "CREATE VIRTUAL TABLE IF NOT EXISTS"
@@ -276,6 +353,37 @@ class DocumentStorage:
 
             return [self._document_to_dict(doc) for doc in documents]
 
+    async def iter_documents(
+        self,
+        batch_size: int = FTS_REBUILD_BATCH_SIZE,
+    ) -> AsyncIterator[list[dict]]:
+        """Iterate over all documents in id order, one batch at a time.
+
+        Uses keyset pagination so that memory usage is bounded by `batch_size`
+        regardless of the number of stored documents.
+
+        Args:
+            batch_size (int): The number of documents per batch.
+
+        """
+        if self.engine is None:
+            return
+
+        last_id = 0
+        while True:
+            async with self.get_session() as session:
+                result = await session.execute(
+                    select(Document)
+                    .where(col(Document.id) > last_id)
+                    .order_by(col(Document.id))
+                    .limit(batch_size),
+                )
+                documents = result.scalars().all()
+            if not documents:
+                return
+            last_id = int(documents[-1].id or last_id)
+            yield [self._document_to_dict(doc) for doc in documents]
+
     async def insert_document(self, doc_id: str, text: str, metadata: dict) -> int:
         """Insert a single document and return its integer ID.
 
@@ -302,6 +410,7 @@ class DocumentStorage:
             await session.flush()  # Flush to get the ID
             if document.id is not None:
                 await self._insert_fts_row(session, int(document.id), text)
+                await self._insert_bm25_rows(session, [(int(document.id), text)])
             return document.id  # type: ignore
 
     async def insert_documents_batch(
@@ -309,6 +418,7 @@ class DocumentStorage:
         doc_ids: list[str],
         texts: list[str],
         metadatas: list[dict],
+        ids: list[int] | None = None,
     ) -> list[int]:
         """Batch insert documents and return their integer IDs.
 
@@ -316,6 +426,8 @@ class DocumentStorage:
             doc_ids (list[str]): List of document IDs (UUID strings).
             texts (list[str]): List of document texts.
             metadatas (list[dict]): List of document metadata.
+            ids (list[int] | None): Optional integer IDs to keep, e.g. when
+                restoring a backup whose vector index refers to them.
 
         Returns:
             list[int]: List of integer IDs of the inserted documents.
@@ -327,8 +439,11 @@ class DocumentStorage:
             import json
 
             documents = []
-            for doc_id, text, metadata in zip(doc_ids, texts, metadatas):
+            for idx, (doc_id, text, metadata) in enumerate(
+                zip(doc_ids, texts, metadatas),
+            ):
                 document = Document(
+                    id=ids[idx] if ids else None,
                     doc_id=doc_id,
                     text=text,
                     metadata_=json.dumps(metadata),
@@ -340,6 +455,14 @@ class DocumentStorage:
 
             await session.flush()  # Flush to get all IDs
             await self._insert_fts_rows_batch(session, documents, texts)
+            await self._insert_bm25_rows(
+                session,
+                [
+                    (int(doc.id), text)
+                    for doc, text in zip(documents, texts)
+                    if doc.id is not None
+                ],
+            )
             return [doc.id for doc in documents]  # type: ignore
 
     async def delete_document_by_doc_id(self, doc_id: str) -> None:
@@ -359,6 +482,7 @@ class DocumentStorage:
             if document:
                 if document.id is not None:
                     await self._delete_fts_row(session, int(document.id), document.text)
+                    await self._delete_bm25_rows(session, [int(document.id)])
                 await session.delete(document)
 
     async def get_document_by_doc_id(self, doc_id: str):
@@ -400,11 +524,16 @@ class DocumentStorage:
             if document:
                 if document.id is not None:
                     await self._delete_fts_row(session, int(document.id), document.text)
+                    await self._delete_bm25_rows(session, [int(document.id)])
                 document.text = new_text
                 document.updated_at = datetime.now()
                 session.add(document)
                 if document.id is not None:
                     await self._insert_fts_row(session, int(document.id), new_text)
+                    await self._insert_bm25_rows(
+                        session,
+                        [(int(document.id), new_text)],
+                    )
 
     async def delete_documents(self, metadata_filters: dict) -> None:
         """Delete documents by their metadata filters.
@@ -431,6 +560,10 @@ class DocumentStorage:
             documents = result.scalars().all()
 
             await self._delete_fts_rows_batch(session, documents)
+            await self._delete_bm25_rows(
+                session,
+                [int(doc.id) for doc in documents if doc.id is not None],
+            )
             for doc in documents:
                 await session.delete(doc)
 
@@ -563,7 +696,7 @@ class DocumentStorage:
             except Exception as e:
                 logger.warning(
                     f"FTS5 sparse search failed for {self.db_path}; "
-                    f"falling back to in-memory BM25: {e}",
+                    f"falling back to the persistent BM25 index: {e}",
                 )
                 self.fts5_available = False
                 return None
@@ -582,6 +715,283 @@ class DocumentStorage:
                 for row in rows
             ]
 
+    async def ensure_bm25_index(self) -> None:
+        """Ensure the persistent BM25 index matches the documents table."""
+        if self._bm25_index_ready:
+            return
+
+        assert self.engine is not None, "Database connection is not initialized."
+
+        # Concurrent searches wait for a single rebuild.
+        async with self._bm25_rebuild_lock:
+            if self._bm25_index_ready:
+                return
+            async with self.get_session() as session:
+                doc_count = await self._count_documents_in_session(session)
+                indexed_count, _ = await self._get_bm25_stats(session)
+            if doc_count == indexed_count:
+                self._bm25_index_ready = True
+                return
+
+            logger.info(
+                f"Rebuilding BM25 sparse index for {self.db_path}: "
+                f"documents={doc_count}, indexed={indexed_count}",
+            )
+            await self._rebuild_bm25_index()
+
+    async def rebuild_bm25_index(self) -> None:
+        """Rebuild the persistent BM25 index from documents."""
+        assert self.engine is not None, "Database connection is not initialized."
+
+        async with self._bm25_rebuild_lock:
+            await self._rebuild_bm25_index()
+
+    async def _rebuild_bm25_index(self) -> None:
+        """Rebuild the BM25 index batch by batch.
+
+        Each batch is tokenized in a worker thread and committed in its own
+        short transaction, so a large corpus neither blocks the event loop nor
+        holds the database write lock for the whole rebuild. Writes that happen
+        meanwhile keep the index up to date themselves.
+        """
+        self._bm25_index_ready = False
+        async with self.get_session() as session, session.begin():
+            await self._initialize_bm25(session)
+            await self._clear_bm25_index(session)
+
+        last_id = 0
+        while True:
+            async with self.get_session() as session:
+                result = await session.execute(
+                    select(Document.id, Document.text)
+                    .where(col(Document.id) > last_id)
+                    .order_by(col(Document.id))
+                    .limit(FTS_REBUILD_BATCH_SIZE),
+                )
+                rows = [(int(rowid), content) for rowid, content in result.all()]
+            if not rows:
+                break
+            last_id = rows[-1][0]
+
+            tokenized = await asyncio.to_thread(self._tokenize_bm25_rows, rows)
+            async with self.get_session() as session, session.begin():
+                # Skip documents updated or deleted since they were read; their
+                # own write already maintained the index.
+                result = await session.execute(
+                    select(Document.id, Document.text).where(
+                        col(Document.id).in_([rowid for rowid, _ in rows]),
+                    ),
+                )
+                current = dict(result.all())
+                unchanged = {
+                    rowid for rowid, content in rows if current.get(rowid) == content
+                }
+                tokenized = [entry for entry in tokenized if entry[0] in unchanged]
+                # Documents inserted after the index was cleared are indexed already.
+                await self._delete_bm25_rows(session, sorted(unchanged))
+                await self._store_bm25_rows(session, tokenized)
+
+        self._bm25_index_ready = True
+
+    async def search_bm25(
+        self,
+        query_tokens: list[str],
+        limit: int,
+    ) -> list[dict]:
+        """Search chunks using the persistent BM25 inverted index.
+
+        Only the posting lists of the query terms are read, so the cost grows
+        with the number of matching postings rather than the corpus size.
+        Results have the same shape as ``search_sparse``; ``score`` follows the
+        FTS5 ``bm25()`` convention where lower is better.
+        """
+        if limit <= 0:
+            return []
+        query_tf = Counter(token for token in query_tokens if token)
+        if not query_tf:
+            return []
+
+        await self.ensure_bm25_index()
+
+        terms = list(query_tf)
+        async with self.get_session() as session:
+            doc_count, total_length = await self._get_bm25_stats(session)
+            if doc_count <= 0:
+                return []
+
+            result = await session.execute(
+                text(
+                    f"""
+                    SELECT p.term, p.doc_rowid, p.tf, l.length
+                    FROM {BM25_POSTINGS_TABLE} p
+                    JOIN {BM25_DOC_LENGTHS_TABLE} l ON l.doc_rowid = p.doc_rowid
+                    WHERE p.term IN :terms
+                    """,
+                ).bindparams(bindparam("terms", expanding=True)),
+                {"terms": terms},
+            )
+            postings = result.fetchall()
+            if not postings:
+                return []
+
+            rowids, scores = _score_bm25(
+                postings,
+                terms,
+                [query_tf[term] for term in terms],
+                doc_count,
+                total_length / doc_count,
+            )
+            if len(rowids) > limit:
+                top = np.argpartition(-scores, limit - 1)[:limit]
+                rowids, scores = rowids[top], scores[top]
+            order = np.lexsort((rowids, -scores))
+            rowids, scores = rowids[order], scores[order]
+
+            doc_result = await session.execute(
+                select(Document).where(col(Document.id).in_(rowids.tolist())),
+            )
+            documents = {doc.id: doc for doc in doc_result.scalars().all()}
+
+        return [
+            {**self._document_to_dict(documents[rowid]), "score": -float(score)}
+            for rowid, score in zip(rowids.tolist(), scores.tolist())
+            if rowid in documents
+        ]
+
+    async def _get_bm25_stats(self, session: AsyncSession) -> tuple[int, int]:
+        result = await session.execute(
+            text(
+                f"SELECT doc_count, total_length FROM {BM25_STATS_TABLE} WHERE id = 0",
+            ),
+        )
+        row = result.fetchone()
+        if row is None:
+            return 0, 0
+        return int(row[0]), int(row[1])
+
+    async def _insert_bm25_rows(
+        self,
+        session: AsyncSession,
+        rows: list[tuple[int, str]],
+    ) -> None:
+        if self.fts5_available:
+            return
+        await self._write_bm25_rows(session, rows)
+
+    async def _write_bm25_rows(
+        self,
+        session: AsyncSession,
+        rows: list[tuple[int, str]],
+    ) -> None:
+        if not rows:
+            return
+        # Tokenization (jieba) is CPU-bound; keep it off the event loop.
+        tokenized = await asyncio.to_thread(self._tokenize_bm25_rows, rows)
+        await self._store_bm25_rows(session, tokenized)
+
+    def _tokenize_bm25_rows(
+        self,
+        rows: list[tuple[int, str]],
+    ) -> list[tuple[int, Counter[str], int]]:
+        """Return ``(rowid, term frequencies, length)`` for each row."""
+        tokenized = []
+        for rowid, content in rows:
+            tokens = tokenize_text(content, self.stopwords)
+            tokenized.append((rowid, Counter(tokens), len(tokens)))
+        return tokenized
+
+    async def _store_bm25_rows(
+        self,
+        session: AsyncSession,
+        tokenized: list[tuple[int, Counter[str], int]],
+    ) -> None:
+        if not tokenized:
+            return
+
+        postings = [
+            {"term": term, "doc_rowid": rowid, "tf": tf}
+            for rowid, term_freqs, _ in tokenized
+            for term, tf in term_freqs.items()
+        ]
+        lengths = [
+            {"doc_rowid": rowid, "length": length} for rowid, _, length in tokenized
+        ]
+        total_length = sum(length for _, _, length in tokenized)
+
+        if postings:
+            await session.execute(
+                text(
+                    f"""
+                    INSERT INTO {BM25_POSTINGS_TABLE}(term, doc_rowid, tf)
+                    VALUES (:term, :doc_rowid, :tf)
+                    """,
+                ),
+                postings,
+            )
+        await session.execute(
+            text(
+                f"""
+                INSERT INTO {BM25_DOC_LENGTHS_TABLE}(doc_rowid, length)
+                VALUES (:doc_rowid, :length)
+                """,
+            ),
+            lengths,
+        )
+        await session.execute(
+            text(
+                f"""
+                UPDATE {BM25_STATS_TABLE}
+                SET doc_count = doc_count + :doc_count,
+                    total_length = total_length + :total_length
+                WHERE id = 0
+                """,
+            ),
+            {"doc_count": len(lengths), "total_length": total_length},
+        )
+
+    async def _delete_bm25_rows(
+        self,
+        session: AsyncSession,
+        rowids: list[int],
+    ) -> None:
+        if self.fts5_available or not rowids:
+            return
+
+        for start in range(0, len(rowids), SQLITE_IN_BATCH_SIZE):
+            batch = rowids[start : start + SQLITE_IN_BATCH_SIZE]
+            result = await session.execute(
+                text(
+                    f"""
+                    SELECT count(*), coalesce(sum(length), 0)
+                    FROM {BM25_DOC_LENGTHS_TABLE}
+                    WHERE doc_rowid IN :rowids
+                    """,
+                ).bindparams(bindparam("rowids", expanding=True)),
+                {"rowids": batch},
+            )
+            removed_count, removed_length = result.fetchone() or (0, 0)
+            if not removed_count:
+                continue
+
+            for table in (BM25_POSTINGS_TABLE, BM25_DOC_LENGTHS_TABLE):
+                await session.execute(
+                    text(
+                        f"DELETE FROM {table} WHERE doc_rowid IN :rowids",
+                    ).bindparams(bindparam("rowids", expanding=True)),
+                    {"rowids": batch},
+                )
+            await session.execute(
+                text(
+                    f"""
+                    UPDATE {BM25_STATS_TABLE}
+                    SET doc_count = doc_count - :doc_count,
+                        total_length = total_length - :total_length
+                    WHERE id = 0
+                    """,
+                ),
+                {"doc_count": int(removed_count), "total_length": int(removed_length)},
+            )
+
     async def _count_documents_in_session(self, session: AsyncSession) -> int:
         result = await session.execute(select(func.count(col(Document.id))))
         count = result.scalar_one_or_none()
@@ -808,3 +1218,33 @@ class DocumentStorage:
             await self.engine.dispose()
             self.engine = None
             self.async_session_maker = None
+
+
+def _score_bm25(
+    postings: list,
+    terms: list[str],
+    query_tf: list[int],
+    doc_count: int,
+    avgdl: float,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Score BM25 over ``(term, doc_rowid, tf, length)`` posting rows.
+
+    Returns the candidate rowids and their summed Okapi BM25 scores.
+    """
+    term_index = {term: i for i, term in enumerate(terms)}
+    size = len(postings)
+    term_ids = np.fromiter((term_index[row[0]] for row in postings), np.int64, size)
+    doc_rowids = np.fromiter((row[1] for row in postings), np.int64, size)
+    tfs = np.fromiter((row[2] for row in postings), np.float64, size)
+    lengths = np.fromiter((row[3] for row in postings), np.float64, size)
+
+    df = np.bincount(term_ids, minlength=len(terms)).astype(np.float64)
+    idf = np.log1p((doc_count - df + 0.5) / (df + 0.5))
+    idf *= np.asarray(query_tf, dtype=np.float64)
+
+    norm = BM25_K1 * (1.0 - BM25_B + BM25_B * lengths / max(avgdl, 1e-9))
+    weights = idf[term_ids] * tfs * (BM25_K1 + 1.0) / (tfs + norm)
+
+    rowids, inverse = np.unique(doc_rowids, return_inverse=True)
+    scores = np.bincount(inverse, weights=weights, minlength=len(rowids))
+    return rowids, scores
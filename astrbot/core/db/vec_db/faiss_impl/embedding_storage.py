@@ -1,12 +1,18 @@
 from __future__ import annotations
 
+import asyncio
 import os
+import random
 import shutil
 import tempfile
+import time
+from dataclasses import dataclass
 from typing import TYPE_CHECKING
 
 import numpy as np
 
+from astrbot import logger
+
 if TYPE_CHECKING:
     import faiss
 
@@ -59,8 +65,62 @@ def _make_temp_file(prefix: str) -> str:
     return path
 
 
+ANN_INDEX_TYPES = ("flat", "hnsw", "ivf_flat", "ivf_pq")
+
+# 写操作后延迟持久化 ANN 索引的秒数, 期间的多次写入合并为一次。
+# ANN 索引可由 flat 索引重建, 重启时数量不一致会在后台重新构建
+_ANN_SAVE_DELAY = 10.0
+
+
+@dataclass
+class AnnIndexOptions:
+    """近似最近邻索引选项
+
+    flat 索引始终保留为权威数据, ANN 索引由其在后台构建, 构建完成后原子替换用于检索。
+    """
+
+    index_type: str = "flat"
+    """flat, hnsw, ivf_flat 或 ivf_pq"""
+    nprobe: int = 8
+    """IVF 索引检索时访问的聚类数量"""
+    ef_search: int = 64
+    """HNSW 索引检索时的候选队列长度"""
+    hnsw_m: int = 32
+    """HNSW 图中每个节点的邻居数量"""
+    min_train_size: int = 1000
+    """向量数量低于该值时不构建 ANN 索引, 直接使用 flat 检索"""
+    max_tombstones: int = 1024
+    """不支持删除的 ANN 索引 (HNSW) 累计删除超过该数量后重新构建"""
+
+    def __post_init__(self) -> None:
+        if self.index_type not in ANN_INDEX_TYPES:
+            raise ValueError(
+                f"不支持的索引类型: {self.index_type}，可选值: {', '.join(ANN_INDEX_TYPES)}",
+            )
+
+    @property
+    def enabled(self) -> bool:
+        return self.index_type != "flat"
+
+    def factory_string(self, dimension: int, ntotal: int) -> str:
+        """返回用于 faiss.index_factory 的索引描述"""
+        if self.index_type == "hnsw":
+            return f"IDMap,HNSW{self.hnsw_m}"
+        # 每个聚类至少需要约 39 个训练样本
+        nlist = max(1, min(int(4 * np.sqrt(ntotal)), ntotal // 39))
+        if self.index_type == "ivf_flat":
+            return f"IVF{nlist},Flat"
+        pq_m = next(m for m in (64, 32, 16, 8, 4, 2, 1) if dimension % m == 0)
+        return f"IVF{nlist},PQ{pq_m}"
+
+
 class EmbeddingStorage:
-    def __init__(self, dimension: int, path: str | None = None) -> None:
+    def __init__(
+        self,
+        dimension: int,
+        path: str | None = None,
+        index_options: AnnIndexOptions | None = None,
+    ) -> None:
         try:
             import faiss
         except ImportError:
@@ -70,6 +130,20 @@ class EmbeddingStorage:
         self.dimension = dimension
         self.path = path
         self.index = None
+        self.index_options = index_options or AnnIndexOptions()
+        self.ann_index: faiss.Index | None = None
+        self._ann_trained_size = 0
+        self._ann_tombstones: set[int] = set()
+        self._ann_build_task: asyncio.Task | None = None
+        self._ann_save_task: asyncio.Task | None = None
+        self._ann_dirty = False
+        # 串行化索引的写操作, 以及在线程中读取索引的操作 (导出向量、写入文件)。
+        # 检索只读索引, 不需要加锁
+        self._lock = asyncio.Lock()
+        # ANN 构建期间对 flat 索引的写操作, 构建完成后重放到新索引上
+        self._ann_pending_ops: (
+            list[tuple[str, np.ndarray | None, np.ndarray]] | None
+        ) = None
         if path and os.path.exists(path):
             self.index = self._read_index(path)
         else:
@@ -80,6 +154,228 @@ class EmbeddingStorage:
                 )
             base_index = faiss.IndexFlatL2(dimension)
             self.index = faiss.IndexIDMap(base_index)
+        if self.index_options.enabled:
+            self._load_ann_index()
+
+    @property
+    def ann_path(self) -> str | None:
+        if not self.path:
+            return None
+        root, ext = os.path.splitext(self.path)
+        return f"{root}.{self.index_options.index_type}{ext or '.faiss'}"
+
+    def _load_ann_index(self) -> None:
+        """读取已持久化的 ANN 索引, 与 flat 索引数量不一致时丢弃"""
+        ann_path = self.ann_path
+        if not ann_path or not os.path.exists(ann_path):
+            return
+        try:
+            ann_index = self._read_index(ann_path)
+        except Exception as e:
+            logger.warning(f"读取 ANN 索引 {ann_path} 失败, 将重新构建: {e}")
+            return
+        assert self.index is not None
+        if ann_index.ntotal != self.index.ntotal:
+            logger.info(f"ANN 索引 {ann_path} 已过期, 将在后台重新构建")
+            return
+        self._apply_search_params(ann_index)
+        self.ann_index = ann_index
+        self._ann_trained_size = ann_index.ntotal
+
+    def _apply_search_params(self, index: faiss.Index) -> None:
+        import faiss
+
+        if self.index_options.index_type == "hnsw":
+            hnsw_index = faiss.downcast_index(faiss.downcast_index(index).index)
+            hnsw_index.hnsw.efSearch = self.index_options.ef_search
+        elif self.index_options.enabled:
+            faiss.extract_index_ivf(index).nprobe = self.index_options.nprobe
+
+    def _export_vectors(self) -> tuple[np.ndarray, np.ndarray]:
+        """从 flat 索引中导出全部向量及其 ID"""
+        import faiss
+
+        assert self.index is not None
+        ntotal = self.index.ntotal
+        if ntotal == 0:
+            return np.empty((0, self.dimension), dtype=np.float32), np.empty(
+                0,
+                dtype=np.int64,
+            )
+        flat = faiss.downcast_index(self.index.index)
+        vectors = flat.reconstruct_n(0, ntotal)
+        ids = faiss.vector_to_array(self.index.id_map).astype(np.int64)
+        return vectors, ids
+
+    def _train_ann_index(self, vectors: np.ndarray, ids: np.ndarray) -> faiss.Index:
+        """构建并训练 ANN 索引 (在线程池中执行)"""
+        import faiss
+
+        index = faiss.index_factory(
+            self.dimension,
+            self.index_options.factory_string(self.dimension, len(vectors)),
+        )
+        if not index.is_trained:
+            index.train(vectors)
+        index.add_with_ids(vectors, ids)
+        self._apply_search_params(index)
+        return index
+
+    def _should_build_ann(self) -> bool:
+        if not self.index_options.enabled or self.index is None:
+            return False
+        if self._ann_build_task and not self._ann_build_task.done():
+            return False
+        ntotal = self.index.ntotal
+        if ntotal < self.index_options.min_train_size:
+            return False
+        if self.ann_index is None:
+            return True
+        if len(self._ann_tombstones) > self.index_options.max_tombstones:
+            return True
+        # IVF 的聚类数按训练时的数据量确定, 数据量增长较多后需要重新训练
+        return (
+            self.index_options.index_type != "hnsw"
+            and ntotal > 4 * self._ann_trained_size
+        )
+
+    def schedule_ann_build(self) -> None:
+        """在需要时于后台构建 ANN 索引"""
+        if not self._should_build_ann():
+            return
+        self._ann_build_task = asyncio.create_task(self._build_ann_index())
+
+    async def _build_ann_index(self) -> None:
+        async with self._lock:
+            vectors, ids = await asyncio.to_thread(self._export_vectors)
+            self._ann_pending_ops = []
+        start = time.perf_counter()
+        try:
+            new_index = await asyncio.to_thread(self._train_ann_index, vectors, ids)
+            tombstones: set[int] = set()
+            for op, op_vectors, op_ids in self._ann_pending_ops:
+                if op == "add":
+                    new_index.add_with_ids(op_vectors, op_ids)
+                    tombstones.difference_update(op_ids.tolist())
+                elif not self._remove_from_ann(new_index, op_ids):
+                    tombstones.update(op_ids.tolist())
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(
+                f"构建 {self.index_options.index_type} 索引失败, 继续使用 flat 检索: {e}",
+                exc_info=True,
+            )
+            return
+        finally:
+            self._ann_pending_ops = None
+
+        # 在事件循环中一次性替换, 检索不会看到构建中的索引
+        self.ann_index = new_index
+        self._ann_tombstones = tombstones
+        self._ann_trained_size = len(vectors)
+        logger.info(
+            f"{self.index_options.index_type} 索引构建完成: {len(vectors)} 个向量, "
+            f"耗时 {time.perf_counter() - start:.2f}s",
+        )
+        self._ann_dirty = False
+        try:
+            await self._save_ann_index()
+        except Exception as e:
+            logger.warning(f"保存 {self.index_options.index_type} 索引失败: {e}")
+
+    def _remove_from_ann(self, index: faiss.Index, ids: np.ndarray) -> bool:
+        """从 ANN 索引中删除向量, 索引不支持删除时返回 False"""
+        if self.index_options.index_type == "hnsw":
+            return False
+        index.remove_ids(ids)
+        return True
+
+    async def _save_ann_index(self) -> None:
+        ann_path = self.ann_path
+        if not ann_path:
+            return
+        async with self._lock:
+            if self.ann_index is None:
+                return
+            await asyncio.to_thread(self._replace_index, self.ann_index, ann_path)
+
+    @classmethod
+    def _replace_index(cls, index: faiss.Index, path: str) -> None:
+        """先写临时文件再替换, 避免重启时读到写了一半的索引"""
+        tmp_path = f"{path}.tmp"
+        cls._write_index(index, tmp_path)
+        os.replace(tmp_path, path)
+
+    def _schedule_ann_save(self) -> None:
+        """标记 ANN 索引已修改, 并在延迟后于后台持久化"""
+        if self.ann_index is None or not self.ann_path:
+            return
+        self._ann_dirty = True
+        if self._ann_save_task and not self._ann_save_task.done():
+            return
+        self._ann_save_task = asyncio.create_task(self._delayed_ann_save())
+
+    async def _delayed_ann_save(self) -> None:
+        while self._ann_dirty:
+            await asyncio.sleep(_ANN_SAVE_DELAY)
+            self._ann_dirty = False
+            try:
+                await self._save_ann_index()
+            except Exception as e:
+                logger.warning(f"保存 {self.index_options.index_type} 索引失败: {e}")
+
+    def _record_ann_op(
+        self,
+        op: str,
+        vectors: np.ndarray | None,
+        ids: np.ndarray,
+    ) -> None:
+        if self._ann_pending_ops is not None:
+            self._ann_pending_ops.append((op, vectors, ids))
+        if self.ann_index is None:
+            return
+        if op == "add":
+            self.ann_index.add_with_ids(vectors, ids)
+            self._ann_tombstones.difference_update(ids.tolist())
+        elif not self._remove_from_ann(self.ann_index, ids):
+            self._ann_tombstones.update(ids.tolist())
+
+    async def evaluate_ann(self, sample_size: int = 100, k: int = 10) -> dict:
+        """对比 ANN 索引与 flat 索引的召回率和检索延迟
+
+        从已存储的向量中随机抽取 sample_size 个作为查询。
+        """
+        if self.ann_index is None:
+            raise ValueError("ANN 索引尚未构建")
+        async with self._lock:
+            vectors, _ = await asyncio.to_thread(self._export_vectors)
+        if len(vectors) == 0:
+            raise ValueError("索引中没有向量")
+        sample_ids = random.sample(range(len(vectors)), min(sample_size, len(vectors)))
+        sample = vectors[sample_ids]
+
+        def run(index: faiss.Index) -> tuple[np.ndarray, float]:
+            start = time.perf_counter()
+            results = [index.search(query.reshape(1, -1), k)[1][0] for query in sample]
+            return np.array(results), (time.perf_counter() - start) * 1000 / len(sample)
+
+        flat_ids, flat_ms = await asyncio.to_thread(run, self.index)
+        ann_ids, ann_ms = await asyncio.to_thread(run, self.ann_index)
+        hits = sum(
+            len(set(expected[expected >= 0]) & set(actual[actual >= 0]))
+            for expected, actual in zip(flat_ids, ann_ids)
+        )
+        expected_total = int((flat_ids >= 0).sum())
+        return {
+            "index_type": self.index_options.index_type,
+            "ntotal": int(self.index.ntotal),
+            "samples": len(sample),
+            "k": k,
+            "recall": hits / expected_total if expected_total else 1.0,
+            "flat_latency_ms": flat_ms,
+            "ann_latency_ms": ann_ms,
+        }
 
     @staticmethod
     def _read_index(path: str) -> faiss.Index:
@@ -134,8 +430,12 @@ class EmbeddingStorage:
             raise ValueError(
                 f"向量维度不匹配, 期望: {self.dimension}, 实际: {vector.shape[0]}",
             )
-        self.index.add_with_ids(vector.reshape(1, -1), np.array([id], dtype=np.int64))
-        await self.save_index()
+        ids = np.array([id], dtype=np.int64)
+        async with self._lock:
+            self.index.add_with_ids(vector.reshape(1, -1), ids)
+            self._record_ann_op("add", vector.reshape(1, -1), ids)
+            await self._write_flat_index()
+        self._schedule_ann_save()
 
     async def insert_batch(self, vectors: np.ndarray, ids: list[int]) -> None:
         """批量插入向量"""
@@ -148,13 +448,19 @@ class EmbeddingStorage:
             raise ValueError(
                 f"向量维度不匹配, 期望: {self.dimension}, 实际: {vectors.shape[1]}",
             )
-        self.index.add_with_ids(vectors, np.array(ids, dtype=np.int64))
-        await self.save_index()
+        id_array = np.array(ids, dtype=np.int64)
+        async with self._lock:
+            self.index.add_with_ids(vectors, id_array)
+            self._record_ann_op("add", vectors, id_array)
+            await self._write_flat_index()
+        self._schedule_ann_save()
+        self.schedule_ann_build()
 
     async def search(self, vector: np.ndarray, k: int) -> tuple:
         """搜索向量
 
         接受 1D (d,) 或 2D (1, d) 向量，自动展平为 Faiss 期望的 (1, d)。
+        ANN 索引就绪时使用 ANN 索引, 否则使用 flat 索引。
         """
         assert self.index is not None, "FAISS index is not initialized."
         vector = np.asarray(vector, dtype=np.float32).ravel()
@@ -162,8 +468,20 @@ class EmbeddingStorage:
             raise ValueError(
                 f"向量维度不匹配, 期望: {self.dimension}, 实际: {vector.shape[0]}",
             )
-        distances, indices = self.index.search(vector.reshape(1, -1), k)
-        return distances, indices
+        ann_index = self.ann_index
+        if ann_index is None:
+            return self.index.search(vector.reshape(1, -1), k)
+
+        tombstones = self._ann_tombstones
+        distances, indices = ann_index.search(
+            vector.reshape(1, -1),
+            k + len(tombstones),
+        )
+        if tombstones:
+            keep = ~np.isin(indices[0], list(tombstones))
+            distances = distances[:, keep]
+            indices = indices[:, keep]
+        return distances[:, :k], indices[:, :k]
 
     async def delete(self, ids: list[int]) -> None:
         """删除向量
@@ -172,15 +490,43 @@ class EmbeddingStorage:
         由于 remove_ids 为幂等操作，此处忽略该错误。
         """
         assert self.index is not None, "FAISS index is not initialized."
-        try:
-            self.index.remove_ids(np.array(ids, dtype=np.int64))
-        except RuntimeError:
-            # 幂等：删除已不存在的 ID，安全忽略
-            pass
-        await self.save_index()
+        id_array = np.array(ids, dtype=np.int64)
+        async with self._lock:
+            try:
+                self.index.remove_ids(id_array)
+            except RuntimeError:
+                # 幂等：删除已不存在的 ID，安全忽略
+                pass
+            try:
+                self._record_ann_op("remove", None, id_array)
+            except RuntimeError:
+                pass
+            await self._write_flat_index()
+        self._schedule_ann_save()
+        self.schedule_ann_build()
 
-    async def save_index(self) -> None:
-        """保存索引（兼容含非 ASCII 字符的 Windows 路径）"""
+    async def _write_flat_index(self) -> None:
+        """在线程中写入 flat 索引, 调用方需持有 self._lock"""
         if self.index is None or not self.path:
             return
-        self._write_index(self.index, self.path)
+        await asyncio.to_thread(self._write_index, self.index, self.path)
+
+    async def save_index(self) -> None:
+        """保存索引（兼容含非 ASCII 字符的 Windows 路径）"""
+        async with self._lock:
+            await self._write_flat_index()
+        self._ann_dirty = False
+        await self._save_ann_index()
+
+    async def close(self) -> None:
+        """取消尚未完成的 ANN 索引构建, 并保存尚未持久化的 ANN 索引"""
+        for task in (self._ann_build_task, self._ann_save_task):
+            if task and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        if self._ann_dirty:
+            self._ann_dirty = False
+            await self._save_ann_index()
@@ -9,7 +9,7 @@ from astrbot.core.provider.provider import EmbeddingProvider, RerankProvider
 
 from ..base import BaseVecDB, Result
 from .document_storage import DocumentStorage
-from .embedding_storage import EmbeddingStorage
+from .embedding_storage import AnnIndexOptions, EmbeddingStorage
 
 
 class FaissVecDB(BaseVecDB):
@@ -21,6 +21,7 @@ class FaissVecDB(BaseVecDB):
         index_store_path: str,
         embedding_provider: EmbeddingProvider,
         rerank_provider: RerankProvider | None = None,
+        index_options: AnnIndexOptions | None = None,
     ) -> None:
         self.doc_store_path = doc_store_path
         self.index_store_path = index_store_path
@@ -29,12 +30,14 @@ class FaissVecDB(BaseVecDB):
         self.embedding_storage = EmbeddingStorage(
             embedding_provider.get_dim(),
             index_store_path,
+            index_options,
         )
         self.embedding_provider = embedding_provider
         self.rerank_provider = rerank_provider
 
     async def initialize(self) -> None:
         await self.document_storage.initialize()
+        self.embedding_storage.schedule_ann_build()
 
     async def insert(
         self,
@@ -66,12 +69,15 @@ class FaissVecDB(BaseVecDB):
         max_retries: int = 3,
         progress_callback=None,
         embedding_contents: list[str] | None = None,
+        vectors: list[list[float]] | None = None,
     ) -> list[int]:
         """批量插入文本和其对应向量，自动生成 ID 并保持一致性。
 
         Args:
             progress_callback: 进度回调函数，接收参数 (current, total)
             embedding_contents: Optional enriched texts used only for embeddings.
+            vectors: Precomputed embeddings in ``contents`` order. When given,
+                the embedding provider is not called.
 
         """
         metadatas = metadatas or [{} for _ in contents]
@@ -123,19 +129,20 @@ class FaissVecDB(BaseVecDB):
                 },
             )
 
-        start = time.time()
-        logger.debug(f"Generating embeddings for {len(contents)} contents...")
-        vectors = await self.embedding_provider.get_embeddings_batch(
-            embedding_contents,
-            batch_size=batch_size,
-            tasks_limit=tasks_limit,
-            max_retries=max_retries,
-            progress_callback=progress_callback,
-        )
-        end = time.time()
-        logger.debug(
-            f"Generated embeddings for {len(contents)} contents in {end - start:.2f} seconds.",
-        )
+        if vectors is None:
+            start = time.time()
+            logger.debug(f"Generating embeddings for {len(contents)} contents...")
+            vectors = await self.embedding_provider.get_embeddings_batch(
+                embedding_contents,
+                batch_size=batch_size,
+                tasks_limit=tasks_limit,
+                max_retries=max_retries,
+                progress_callback=progress_callback,
+            )
+            end = time.time()
+            logger.debug(
+                f"Generated embeddings for {len(contents)} contents in {end - start:.2f} seconds.",
+            )
         if len(vectors) != content_count:
             raise KnowledgeBaseUploadError(
                 stage="embedding",
@@ -219,6 +226,7 @@ class FaissVecDB(BaseVecDB):
         fetch_k: int = 20,
         rerank: bool = False,
         metadata_filters: dict | None = None,
+        query_embedding: list[float] | None = None,
     ) -> list[Result]:
         """搜索最相似的文档。
 
@@ -228,12 +236,15 @@ class FaissVecDB(BaseVecDB):
             fetch_k (int): 在根据 metadata 过滤前从 FAISS 中获取的数量
             rerank (bool): 是否使用重排序。这需要在实例化时提供 rerank_provider, 如果未提供并且 rerank 为 True, 不会抛出异常。
             metadata_filters (dict): 元数据过滤器
+            query_embedding (list[float]): 预先计算好的查询向量, 提供时不再调用 embedding_provider
 
         Returns:
             List[Result]: 查询结果
 
         """
-        embedding = await self.embedding_provider.get_embedding(query)
+        embedding = query_embedding or await self.embedding_provider.get_embedding(
+            query
+        )
         scores, indices = await self.embedding_storage.search(
             vector=np.array(embedding).astype("float32"),
             k=fetch_k if metadata_filters else k,
@@ -323,6 +334,7 @@ class FaissVecDB(BaseVecDB):
         await self.embedding_storage.delete([int_id])
 
     async def close(self) -> None:
+        await self.embedding_storage.close()
         await self.document_storage.close()
 
     async def count_documents(self, metadata_filter: dict | None = None) -> int:
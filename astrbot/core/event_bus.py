@@ -1,24 +1,76 @@
 """事件总线, 用于处理事件的分发和处理
 事件总线是一个异步队列, 用于接收各种消息事件, 并将其发送到Scheduler调度器进行处理
-其中包含了一个无限循环的调度函数, 用于从事件队列中获取新的事件, 并创建一个新的异步任务来执行管道调度器的处理逻辑
+其中包含了一个无限循环的调度函数, 用于从事件队列中获取新的事件, 并交给管道调度器处理
 
 class:
     EventBus: 事件总线, 用于处理事件的分发和处理
+    EventDispatchOptions: 事件分发策略
 
 工作流程:
 1. 维护一个异步队列, 来接受各种消息事件
-2. 无限循环的调度函数, 从事件队列中获取新的事件, 打印日志并创建一个新的异步任务来执行管道调度器的处理逻辑
+2. 无限循环的调度函数, 从事件队列中获取新的事件, 打印日志并交给管道调度器处理
+3. 分发模式:
+    - task: 每个事件创建一个新的异步任务 (默认, 不限制并发)
+    - worker_pool: 固定数量的工作协程处理事件, 同一会话 (unified_msg_origin) 内按顺序处理,
+      可限制单个配置文件的并发数, 待处理事件超出上限时按溢出策略处理
 """
 
 import asyncio
+import time
 from asyncio import Queue
+from collections import Counter, deque
+from dataclasses import dataclass
 
 from astrbot.core import logger
 from astrbot.core.astrbot_config_mgr import AstrBotConfigManager
 from astrbot.core.pipeline.scheduler import PipelineScheduler
+from astrbot.core.utils.session_waiter import FILTERS, USER_SESSIONS
 
 from .platform import AstrMessageEvent
 
+DISPATCH_MODES = ("task", "worker_pool")
+OVERFLOW_POLICIES = ("queue", "drop_oldest", "reject")
+
+
+@dataclass
+class EventDispatchOptions:
+    """事件分发策略
+
+    worker_pool 模式下, max_workers 限制同时执行的管道数量;
+    conf_quota 限制单个配置文件 (conf_id) 同时执行的管道数量, 0 表示不限制;
+    max_pending 为等待执行的事件总数上限, 超出后按 overflow_policy 处理:
+    queue 暂停从事件队列取新事件, drop_oldest 丢弃最早的待处理事件, reject 丢弃新事件。
+    """
+
+    mode: str = "task"
+    max_workers: int = 32
+    conf_quota: int = 0
+    max_pending: int = 1000
+    overflow_policy: str = "queue"
+
+    @classmethod
+    def from_config(cls, config: dict) -> "EventDispatchOptions":
+        mode = config.get("event_dispatch_mode", "task")
+        policy = config.get("event_dispatch_overflow_policy", "queue")
+        return cls(
+            mode=mode if mode in DISPATCH_MODES else "task",
+            max_workers=max(1, int(config.get("event_dispatch_max_workers", 32) or 32)),
+            conf_quota=max(0, int(config.get("event_dispatch_conf_quota", 0) or 0)),
+            max_pending=max(
+                1,
+                int(config.get("event_dispatch_max_pending", 1000) or 1000),
+            ),
+            overflow_policy=policy if policy in OVERFLOW_POLICIES else "queue",
+        )
+
+
+@dataclass
+class _QueuedEvent:
+    event: AstrMessageEvent
+    scheduler: PipelineScheduler
+    conf_id: str
+    enqueued_at: float
+
 
 class EventBus:
     """用于处理事件的分发和处理"""
@@ -28,30 +80,69 @@ class EventBus:
         event_queue: Queue,
         pipeline_scheduler_mapping: dict[str, PipelineScheduler],
         astrbot_config_mgr: AstrBotConfigManager,
+        dispatch_options: EventDispatchOptions | None = None,
     ) -> None:
         self.event_queue = event_queue  # 事件队列
         # abconf uuid -> scheduler
         self.pipeline_scheduler_mapping = pipeline_scheduler_mapping
         self.astrbot_config_mgr = astrbot_config_mgr
+        self.dispatch_options = dispatch_options or EventDispatchOptions()
         # 持有正在执行的 pipeline 任务的强引用, 防止 task 在 pending 状态被 GC 回收
         self._pending_tasks: set[asyncio.Task] = set()
 
+        # worker_pool 模式的状态
+        # unified_msg_origin -> 待处理事件 (FIFO)
+        self._session_queues: dict[str, deque[_QueuedEvent]] = {}
+        # 有待处理事件且当前没有事件在执行的会话, 按就绪顺序轮转
+        self._runnable_sessions: deque[str] = deque()
+        self._active_sessions: set[str] = set()
+        self._conf_running: Counter[str] = Counter()
+        self._conf_queued: Counter[str] = Counter()
+        self._queued_count = 0
+        self._work_available = asyncio.Event()
+        self._space_available = asyncio.Event()
+        self._workers: list[asyncio.Task] = []
+        self._processed = 0
+        self._dropped = 0
+        self._rejected = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._wait_last = 0.0
+
     async def dispatch(self) -> None:
-        while True:
-            event: AstrMessageEvent = await self.event_queue.get()
-            conf_info = self.astrbot_config_mgr.get_conf_info(event.unified_msg_origin)
-            conf_id = conf_info["id"]
-            conf_name = conf_info.get("name") or conf_id
-            self._print_event(event, conf_name)
-            scheduler = self.pipeline_scheduler_mapping.get(conf_id)
-            if not scheduler:
-                logger.error(
-                    f"PipelineScheduler not found for id: {conf_id}, event ignored."
+        if self.dispatch_options.mode == "worker_pool":
+            self._start_workers()
+        try:
+            while True:
+                event: AstrMessageEvent = await self.event_queue.get()
+                conf_info = self.astrbot_config_mgr.get_conf_info(
+                    event.unified_msg_origin
                 )
-                continue
-            task = asyncio.create_task(scheduler.execute(event))
-            self._pending_tasks.add(task)
-            task.add_done_callback(self._on_task_done)
+                conf_id = conf_info["id"]
+                conf_name = conf_info.get("name") or conf_id
+                self._print_event(event, conf_name)
+                scheduler = self.pipeline_scheduler_mapping.get(conf_id)
+                if not scheduler:
+                    logger.error(
+                        f"PipelineScheduler not found for id: {conf_id}, event ignored."
+                    )
+                    continue
+                if self.dispatch_options.mode != "worker_pool" or (
+                    self._has_session_waiter(event)
+                ):
+                    # 正在等待用户输入的会话 (session_waiter) 不能排在自身之后, 直接执行
+                    self._spawn(scheduler, event)
+                    continue
+                await self._enqueue(event, scheduler, conf_id)
+        finally:
+            for worker in self._workers:
+                worker.cancel()
+            self._workers.clear()
+
+    def _spawn(self, scheduler: PipelineScheduler, event: AstrMessageEvent) -> None:
+        task = asyncio.create_task(scheduler.execute(event))
+        self._pending_tasks.add(task)
+        task.add_done_callback(self._on_task_done)
 
     def _on_task_done(self, task: asyncio.Task) -> None:
         """pipeline 任务结束回调: 移除强引用并暴露未捕获的异常"""
@@ -62,6 +153,148 @@ class EventBus:
         if exc is not None:
             logger.error("Pipeline task failed.", exc_info=exc)
 
+    @staticmethod
+    def _has_session_waiter(event: AstrMessageEvent) -> bool:
+        if not USER_SESSIONS:
+            return False
+        return any(
+            session_filter.filter(event) in USER_SESSIONS
+            for session_filter in list(FILTERS)
+        )
+
+    def _start_workers(self) -> None:
+        if self._workers:
+            return
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"event_bus_worker_{i}")
+            for i in range(self.dispatch_options.max_workers)
+        ]
+
+    async def _enqueue(
+        self,
+        event: AstrMessageEvent,
+        scheduler: PipelineScheduler,
+        conf_id: str,
+    ) -> None:
+        options = self.dispatch_options
+        while self._queued_count >= options.max_pending:
+            if options.overflow_policy == "reject":
+                self._rejected += 1
+                logger.warning(
+                    f"事件队列已满 ({self._queued_count}), 丢弃新事件: "
+                    f"{event.unified_msg_origin}",
+                )
+                return
+            if options.overflow_policy == "drop_oldest":
+                self._drop_oldest()
+                continue
+            self._space_available.clear()
+            await self._space_available.wait()
+
+        umo = event.unified_msg_origin
+        session_queue = self._session_queues.setdefault(umo, deque())
+        session_queue.append(
+            _QueuedEvent(event, scheduler, conf_id, time.monotonic()),
+        )
+        self._queued_count += 1
+        self._conf_queued[conf_id] += 1
+        if len(session_queue) == 1 and umo not in self._active_sessions:
+            self._runnable_sessions.append(umo)
+        self._work_available.set()
+
+    def _drop_oldest(self) -> None:
+        oldest_umo = min(
+            (umo for umo, queue in self._session_queues.items() if queue),
+            key=lambda umo: self._session_queues[umo][0].enqueued_at,
+        )
+        session_queue = self._session_queues[oldest_umo]
+        dropped = session_queue.popleft()
+        self._queued_count -= 1
+        self._conf_queued[dropped.conf_id] -= 1
+        self._dropped += 1
+        if not session_queue:
+            del self._session_queues[oldest_umo]
+            if oldest_umo in self._runnable_sessions:
+                self._runnable_sessions.remove(oldest_umo)
+        logger.warning(
+            f"事件队列已满, 丢弃最早的待处理事件: {oldest_umo}",
+        )
+
+    def _take_next(self) -> tuple[str, _QueuedEvent] | None:
+        """取出下一个可执行的事件, 跳过已达到配额的配置文件"""
+        quota = self.dispatch_options.conf_quota
+        for _ in range(len(self._runnable_sessions)):
+            umo = self._runnable_sessions.popleft()
+            session_queue = self._session_queues[umo]
+            conf_id = session_queue[0].conf_id
+            if quota and self._conf_running[conf_id] >= quota:
+                self._runnable_sessions.append(umo)
+                continue
+            item = session_queue.popleft()
+            if not session_queue:
+                del self._session_queues[umo]
+            self._active_sessions.add(umo)
+            self._conf_running[conf_id] += 1
+            self._queued_count -= 1
+            self._conf_queued[conf_id] -= 1
+            self._space_available.set()
+            return umo, item
+        return None
+
+    async def _worker(self) -> None:
+        while True:
+            next_item = self._take_next()
+            if next_item is None:
+                self._work_available.clear()
+                await self._work_available.wait()
+                continue
+
+            umo, item = next_item
+            wait = time.monotonic() - item.enqueued_at
+            self._wait_last = wait
+            self._wait_total += wait
+            self._wait_max = max(self._wait_max, wait)
+            try:
+                await item.scheduler.execute(item.event)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.error("Pipeline task failed.", exc_info=exc)
+            finally:
+                self._processed += 1
+                self._active_sessions.discard(umo)
+                self._conf_running[item.conf_id] -= 1
+                if self._session_queues.get(umo):
+                    self._runnable_sessions.append(umo)
+                # 会话或配额释放后, 其他工作协程可能有新的事件可执行
+                self._work_available.set()
+
+    def metrics(self) -> dict:
+        """事件分发指标, 包括排队深度与等待时间 (秒)"""
+        started = self._processed + len(self._active_sessions)
+        return {
+            "mode": self.dispatch_options.mode,
+            "max_workers": self.dispatch_options.max_workers,
+            "running": len(self._active_sessions)
+            if self.dispatch_options.mode == "worker_pool"
+            else len(self._pending_tasks),
+            "queue_depth": self._queued_count,
+            "inbound_queue_depth": self.event_queue.qsize(),
+            "queue_depth_by_conf": {
+                conf_id: count for conf_id, count in self._conf_queued.items() if count
+            },
+            "running_by_conf": {
+                conf_id: count for conf_id, count in self._conf_running.items() if count
+            },
+            "waiting_sessions": len(self._session_queues),
+            "processed": self._processed,
+            "dropped": self._dropped,
+            "rejected": self._rejected,
+            "wait_time_last": round(self._wait_last, 4),
+            "wait_time_avg": round(self._wait_total / started, 4) if started else 0.0,
+            "wait_time_max": round(self._wait_max, 4),
+        }
+
     def _print_event(self, event: AstrMessageEvent, conf_name: str) -> None:
         """用于记录事件信息
 
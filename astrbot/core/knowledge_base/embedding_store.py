@@ -0,0 +1,160 @@
+"""文本块向量存储
+
+按 (Embedding 模型, 文本内容哈希) 在知识库数据库中保存文本块的向量。重新上传略有修改的文档、
+以不同参数重新导入, 或在多个知识库中导入相同内容时, 内容未变化的文本块直接复用已有向量,
+只为新增或修改的文本块请求 Embedding 服务。
+"""
+
+import hashlib
+import time
+from collections.abc import Awaitable, Callable
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from astrbot import logger
+from astrbot.core.provider.provider import EmbeddingProvider
+
+if TYPE_CHECKING:
+    from astrbot.core.knowledge_base.kb_db_sqlite import KBSQLiteDatabase
+
+# 每写入这么多条向量后检查一次容量
+_PRUNE_INTERVAL = 1000
+
+
+class ChunkEmbeddingStore:
+    """持久化的文本块向量存储
+
+    键为 Embedding Provider ID、模型名与向量维度, 加上用于向量化的完整文本 (包含文档标题前缀)
+    的 SHA-256, 因此只有生成的向量完全相同的文本才会被复用。超出容量时淘汰最久未使用的记录。
+    """
+
+    def __init__(self, kb_db: "KBSQLiteDatabase", max_entries: int = 50000) -> None:
+        """初始化文本块向量存储
+
+        Args:
+            kb_db: 保存向量的知识库数据库
+            max_entries: 最多保存的向量数量
+
+        """
+        self.kb_db = kb_db
+        self.max_entries = max(1, max_entries)
+        self.hits = 0
+        self.misses = 0
+        self._saved_since_prune = 0
+
+    @staticmethod
+    def model_key(provider: EmbeddingProvider) -> str:
+        provider_id = provider.provider_config.get("id", "")
+        model = provider.provider_config.get("embedding_model") or provider.get_model()
+        try:
+            dim = provider.get_dim()
+        except Exception:
+            dim = 0
+        raw = "\x00".join([provider_id, model or "", str(dim)])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def content_hash(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    async def initialize(self) -> None:
+        await self.prune()
+
+    async def prune(self) -> None:
+        """删除超出容量的最久未使用的向量"""
+        try:
+            removed = await self.kb_db.prune_chunk_embeddings(keep=self.max_entries)
+        except Exception as e:
+            logger.warning(f"清理文本块向量存储失败: {e}")
+            return
+        if removed:
+            logger.info(f"已从文本块向量存储中淘汰 {removed} 条最久未使用的向量")
+
+    async def lookup(
+        self,
+        provider: EmbeddingProvider,
+        texts: list[str],
+    ) -> list[list[float] | None]:
+        """查询文本已保存的向量, 未保存的位置为 None"""
+        hashes = [self.content_hash(text) for text in texts]
+        try:
+            found = await self.kb_db.get_chunk_embeddings(
+                model_key=self.model_key(provider),
+                content_hashes=list(dict.fromkeys(hashes)),
+                used_at=time.time(),
+            )
+        except Exception as e:
+            logger.warning(f"查询文本块向量存储失败, 将重新生成向量: {e}")
+            found = {}
+        results: list[list[float] | None] = [
+            np.frombuffer(found[h], dtype=np.float32).tolist() if h in found else None
+            for h in hashes
+        ]
+        hits = sum(1 for result in results if result is not None)
+        self.hits += hits
+        self.misses += len(texts) - hits
+        return results
+
+    async def save(
+        self,
+        provider: EmbeddingProvider,
+        texts: list[str],
+        vectors: list[list[float]],
+    ) -> None:
+        """保存新生成的向量. 写入失败只记录日志, 不影响文档导入"""
+        embeddings = {
+            self.content_hash(text): np.asarray(vector, dtype=np.float32).tobytes()
+            for text, vector in zip(texts, vectors)
+        }
+        try:
+            await self.kb_db.save_chunk_embeddings(
+                model_key=self.model_key(provider),
+                embeddings=embeddings,
+                used_at=time.time(),
+            )
+        except Exception as e:
+            logger.warning(f"写入文本块向量存储失败: {e}")
+            return
+        self._saved_since_prune += len(embeddings)
+        if self._saved_since_prune >= _PRUNE_INTERVAL:
+            self._saved_since_prune = 0
+            await self.prune()
+
+    async def get_embeddings(
+        self,
+        provider: EmbeddingProvider,
+        texts: list[str],
+        embed: Callable[[list[str]], Awaitable[list[list[float]]]],
+    ) -> list[list[float]]:
+        """获取文本向量, 只对没有已保存向量的文本 (去重后) 调用 embed, 并保存生成的向量"""
+        results = await self.lookup(provider, texts)
+        missing = list(
+            dict.fromkeys(
+                text for text, result in zip(texts, results) if result is None
+            ),
+        )
+        if not missing:
+            return results  # type: ignore[return-value]
+
+        vectors = await embed(missing)
+        if len(vectors) != len(missing):
+            raise ValueError(
+                f"Embedding 服务返回的向量数量 ({len(vectors)}) "
+                f"与文本数量 ({len(missing)}) 不一致",
+            )
+        await self.save(provider, missing, vectors)
+        fetched = dict(zip(missing, vectors))
+        return [
+            result if result is not None else fetched[text]
+            for text, result in zip(texts, results)
+        ]
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
@@ -0,0 +1,208 @@
+"""知识库文档导入流水线的调度工具
+
+- AdaptiveConcurrency: 根据 Embedding 服务的限流响应 (HTTP 429) 自适应调整并发数
+- embed_in_batches: 分批向量化文本, 每批完成后回调, 供调用方写入检查点
+- IngestQueue: 以有限的并发数执行多个文档的导入任务
+"""
+
+from __future__ import annotations
+
+import asyncio
+import re
+from collections.abc import Awaitable, Callable, Iterable
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, TypeVar
+
+if TYPE_CHECKING:
+    from astrbot.core.provider.provider import EmbeddingProvider
+
+T = TypeVar("T")
+
+# 限流重试不计入 max_retries, 但次数有上限, 避免无限等待
+_MAX_RATE_LIMIT_RETRIES = 8
+_MAX_BACKOFF_SECONDS = 60.0
+_RATE_LIMIT_PATTERN = re.compile(
+    r"\b429\b|rate[ _-]?limit|too many requests",
+    re.IGNORECASE,
+)
+
+
+def is_rate_limit_error(exc: BaseException) -> bool:
+    """判断异常是否为服务端限流 (HTTP 429)"""
+    for attr in ("status_code", "status", "code"):
+        if getattr(exc, attr, None) == 429:
+            return True
+    response = getattr(exc, "response", None)
+    if getattr(response, "status_code", None) == 429:
+        return True
+    return bool(_RATE_LIMIT_PATTERN.search(str(exc)))
+
+
+def retry_after_seconds(exc: BaseException) -> float | None:
+    """读取限流响应中的 Retry-After 头 (秒), 不存在或无法解析时返回 None"""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None) or getattr(exc, "headers", None)
+    if not headers:
+        return None
+    try:
+        value = headers.get("retry-after") or headers.get("Retry-After")
+        return max(0.0, float(value)) if value is not None else None
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
+class AdaptiveConcurrency:
+    """加性增、乘性减 (AIMD) 的并发限制器
+
+    遇到限流时并发数减半; 连续成功的次数达到当前并发数后加一, 最多恢复到 max_limit。
+    """
+
+    def __init__(self, max_limit: int) -> None:
+        self.max_limit = max(1, max_limit)
+        self.limit = self.max_limit
+        self.rate_limited = 0
+        self._active = 0
+        self._successes = 0
+        self._cond = asyncio.Condition()
+
+    @asynccontextmanager
+    async def slot(self):
+        async with self._cond:
+            await self._cond.wait_for(lambda: self._active < self.limit)
+            self._active += 1
+        try:
+            yield
+        finally:
+            async with self._cond:
+                self._active -= 1
+                self._cond.notify_all()
+
+    def on_success(self) -> None:
+        self._successes += 1
+        if self.limit < self.max_limit and self._successes >= self.limit:
+            self.limit += 1
+            self._successes = 0
+
+    def on_rate_limited(self) -> None:
+        self.rate_limited += 1
+        self._successes = 0
+        self.limit = max(1, self.limit // 2)
+
+
+async def embed_in_batches(
+    provider: EmbeddingProvider,
+    items: list[tuple[int, str]],
+    *,
+    batch_size: int,
+    limiter: AdaptiveConcurrency,
+    max_retries: int,
+    on_batch: Callable[[list[int], list[list[float]]], Awaitable[None]],
+) -> None:
+    """分批向量化 items 中的 (块序号, 文本), 每批成功后调用 on_batch(块序号列表, 向量列表)
+
+    限流错误会降低并发数并按 Retry-After 或指数退避等待后重试, 不计入 max_retries。
+    某一批最终失败时其余批次照常完成并回调, 全部结束后抛出第一个错误。
+    """
+    batch_size = max(1, batch_size)
+    max_retries = max(1, max_retries)
+
+    async def run(batch: list[tuple[int, str]]) -> None:
+        indexes = [idx for idx, _ in batch]
+        texts = [text for _, text in batch]
+        failures = 0
+        rate_limited = 0
+        while True:
+            error: Exception | None = None
+            async with limiter.slot():
+                try:
+                    vectors = await provider.get_embeddings(texts)
+                except Exception as e:
+                    error = e
+                else:
+                    limiter.on_success()
+            if error is None:
+                if len(vectors) != len(texts):
+                    raise ValueError(
+                        f"Embedding 服务返回的向量数量 ({len(vectors)}) "
+                        f"与文本数量 ({len(texts)}) 不一致",
+                    )
+                await on_batch(indexes, vectors)
+                return
+            if is_rate_limit_error(error) and rate_limited < _MAX_RATE_LIMIT_RETRIES:
+                rate_limited += 1
+                limiter.on_rate_limited()
+                delay = retry_after_seconds(error)
+                if delay is None:
+                    delay = 2.0**rate_limited
+            else:
+                failures += 1
+                if failures >= max_retries:
+                    raise error
+                delay = 2.0 ** (failures - 1)
+            await asyncio.sleep(min(delay, _MAX_BACKOFF_SECONDS))
+
+    batches = [items[i : i + batch_size] for i in range(0, len(items), batch_size)]
+    results = await asyncio.gather(*(run(b) for b in batches), return_exceptions=True)
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+
+
+class IngestQueue:
+    """文档导入队列
+
+    任务按提交顺序执行, 同时最多执行 workers 个。同一任务在执行结束前重复提交时返回同一个 Task。
+    """
+
+    def __init__(self, workers: int = 2) -> None:
+        self.workers = max(1, workers)
+        self._semaphore = asyncio.Semaphore(self.workers)
+        self._tasks: dict[str, asyncio.Task] = {}
+        self._running = 0
+
+    def submit(self, job_id: str, run: Callable[[], Awaitable[T]]) -> asyncio.Task[T]:
+        task = self._tasks.get(job_id)
+        if task is not None and not task.done():
+            return task
+        task = asyncio.create_task(self._run(run))
+        self._tasks[job_id] = task
+
+        def _done(t: asyncio.Task) -> None:
+            if self._tasks.get(job_id) is t:
+                del self._tasks[job_id]
+
+        task.add_done_callback(_done)
+        return task
+
+    async def _run(self, run: Callable[[], Awaitable[T]]) -> T:
+        async with self._semaphore:
+            self._running += 1
+            try:
+                return await run()
+            finally:
+                self._running -= 1
+
+    def is_active(self, job_id: str) -> bool:
+        task = self._tasks.get(job_id)
+        return task is not None and not task.done()
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "running": self._running,
+            "queued": len(self._tasks) - self._running,
+        }
+
+    async def cancel(self, job_ids: Iterable[str]) -> None:
+        """取消指定的排队或执行中的任务, 并等待它们结束"""
+        tasks = [
+            task for job_id in job_ids if (task := self._tasks.get(job_id)) is not None
+        ]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def close(self) -> None:
+        """取消所有排队与执行中的任务, 任务的检查点会保留到下次启动"""
+        await self.cancel(list(self._tasks))
+        self._tasks.clear()
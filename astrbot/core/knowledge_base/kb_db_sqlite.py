@@ -1,16 +1,21 @@
 from contextlib import asynccontextmanager
+from datetime import datetime, timezone
 from pathlib import Path
 from typing import TYPE_CHECKING
 
-from sqlalchemy import delete, func, select, text, update
+from sqlalchemy import delete, func, select, text, tuple_, update
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlmodel import col, desc
 
 from astrbot.core import logger
 from astrbot.core.knowledge_base.models import (
     BaseKBModel,
+    KBChunkEmbedding,
     KBDocument,
+    KBIngestChunk,
+    KBIngestJob,
     KBMedia,
+    KBQueryEmbedding,
     KnowledgeBase,
 )
 from astrbot.core.utils.astrbot_path import get_astrbot_knowledge_base_path
@@ -68,6 +73,7 @@ class KBSQLiteDatabase:
         async with self.engine.begin() as conn:
             # 创建所有知识库相关表
             await conn.run_sync(BaseKBModel.metadata.create_all)
+            await self._ensure_kb_index_columns(conn)
 
             # 配置 SQLite 性能优化参数
             await conn.execute(text("PRAGMA journal_mode=WAL"))
@@ -80,6 +86,36 @@ class KBSQLiteDatabase:
 
         self.inited = True
 
+    async def _ensure_kb_index_columns(self, conn) -> None:
+        """确保 knowledge_bases 表有向量索引配置列。
+
+        新版数据库通过 SQLModel 的 metadata.create_all 自动创建这些列。
+        """
+        result = await conn.execute(text("PRAGMA table_info(knowledge_bases)"))
+        columns = {row[1] for row in result.fetchall()}
+
+        if "index_type" not in columns:
+            await conn.execute(
+                text(
+                    "ALTER TABLE knowledge_bases "
+                    "ADD COLUMN index_type VARCHAR(20) DEFAULT 'flat'"
+                ),
+            )
+        if "index_nprobe" not in columns:
+            await conn.execute(
+                text(
+                    "ALTER TABLE knowledge_bases "
+                    "ADD COLUMN index_nprobe INTEGER DEFAULT 8"
+                ),
+            )
+        if "index_ef_search" not in columns:
+            await conn.execute(
+                text(
+                    "ALTER TABLE knowledge_bases "
+                    "ADD COLUMN index_ef_search INTEGER DEFAULT 64"
+                ),
+            )
+
     async def migrate_to_v1(self) -> None:
         """执行知识库数据库 v1 迁移
 
@@ -367,3 +403,296 @@ class KBSQLiteDatabase:
 
             await session.execute(update_stmt)
             await session.commit()
+
+    # ===== 查询向量缓存 =====
+
+    async def load_query_embeddings(
+        self,
+        since: float,
+        limit: int,
+    ) -> list[KBQueryEmbedding]:
+        """加载 since 之后写入的查询向量, 按写入时间倒序, 最多 limit 条"""
+        async with self.get_db() as session:
+            stmt = (
+                select(KBQueryEmbedding)
+                .where(col(KBQueryEmbedding.created_at) >= since)
+                .order_by(desc(KBQueryEmbedding.created_at))
+                .limit(limit)
+            )
+            result = await session.execute(stmt)
+            return list(result.scalars().all())
+
+    async def save_query_embedding(
+        self,
+        cache_key: str,
+        embedding: bytes,
+        created_at: float,
+    ) -> None:
+        """写入或覆盖一条查询向量"""
+        async with self.get_db() as session, session.begin():
+            await session.merge(
+                KBQueryEmbedding(
+                    cache_key=cache_key,
+                    embedding=embedding,
+                    created_at=created_at,
+                ),
+            )
+
+    async def prune_query_embeddings(self, before: float, keep: int) -> None:
+        """删除 before 之前写入的查询向量, 并只保留最新的 keep 条"""
+        async with self.get_db() as session, session.begin():
+            await session.execute(
+                delete(KBQueryEmbedding).where(
+                    col(KBQueryEmbedding.created_at) < before,
+                ),
+            )
+            newest = (
+                select(KBQueryEmbedding.cache_key)
+                .order_by(desc(KBQueryEmbedding.created_at))
+                .limit(keep)
+            )
+            await session.execute(
+                delete(KBQueryEmbedding).where(
+                    col(KBQueryEmbedding.cache_key).not_in(newest),
+                ),
+            )
+
+    # ===== 文档导入任务 =====
+
+    async def create_ingest_job(self, job: KBIngestJob) -> KBIngestJob:
+        """创建文档导入任务"""
+        async with self.get_db() as session:
+            async with session.begin():
+                session.add(job)
+            await session.refresh(job)
+            return job
+
+    async def get_ingest_job(self, job_id: str) -> KBIngestJob | None:
+        """根据 ID 获取文档导入任务"""
+        async with self.get_db() as session:
+            stmt = select(KBIngestJob).where(col(KBIngestJob.job_id) == job_id)
+            result = await session.execute(stmt)
+            return result.scalar_one_or_none()
+
+    async def list_ingest_jobs(
+        self,
+        kb_id: str | None = None,
+        statuses: list[str] | None = None,
+    ) -> list[KBIngestJob]:
+        """列出文档导入任务, 按创建时间先后排序"""
+        async with self.get_db() as session:
+            stmt = select(KBIngestJob)
+            if kb_id is not None:
+                stmt = stmt.where(col(KBIngestJob.kb_id) == kb_id)
+            if statuses:
+                stmt = stmt.where(col(KBIngestJob.status).in_(statuses))
+            stmt = stmt.order_by(col(KBIngestJob.created_at))
+            result = await session.execute(stmt)
+            return list(result.scalars().all())
+
+    async def update_ingest_job(self, job_id: str, **values) -> None:
+        """更新文档导入任务的状态字段"""
+        values["updated_at"] = datetime.now(timezone.utc)
+        async with self.get_db() as session, session.begin():
+            await session.execute(
+                update(KBIngestJob)
+                .where(col(KBIngestJob.job_id) == job_id)
+                .values(**values),
+            )
+
+    async def save_ingest_chunks(
+        self,
+        job_id: str,
+        chunks: list[str],
+        media: list[KBMedia],
+    ) -> None:
+        """保存分块检查点
+
+        文本块、多媒体记录与任务阶段在同一事务中写入, 重启后从向量化阶段继续。
+        """
+        async with self.get_db() as session, session.begin():
+            await session.execute(
+                delete(KBIngestChunk).where(col(KBIngestChunk.job_id) == job_id),
+            )
+            session.add_all(
+                KBIngestChunk(job_id=job_id, chunk_index=idx, content=chunk)
+                for idx, chunk in enumerate(chunks)
+            )
+            session.add_all(media)
+            await session.execute(
+                update(KBIngestJob)
+                .where(col(KBIngestJob.job_id) == job_id)
+                .values(
+                    stage="embedding",
+                    chunk_count=len(chunks),
+                    embedded_count=0,
+                    source_path="",
+                    updated_at=datetime.now(timezone.utc),
+                ),
+            )
+
+    async def list_ingest_chunks(
+        self,
+        job_id: str,
+        pending_only: bool = False,
+    ) -> list[KBIngestChunk]:
+        """按顺序列出任务的文本块, pending_only 时只返回尚未向量化的块"""
+        async with self.get_db() as session:
+            stmt = select(KBIngestChunk).where(col(KBIngestChunk.job_id) == job_id)
+            if pending_only:
+                stmt = stmt.where(col(KBIngestChunk.embedding).is_(None))
+            stmt = stmt.order_by(col(KBIngestChunk.chunk_index))
+            result = await session.execute(stmt)
+            return list(result.scalars().all())
+
+    async def save_ingest_embeddings(
+        self,
+        job_id: str,
+        embeddings: dict[int, bytes],
+    ) -> int:
+        """保存一批文本块的向量, 返回任务中已向量化的块数"""
+        async with self.get_db() as session, session.begin():
+            for chunk_index, embedding in embeddings.items():
+                await session.execute(
+                    update(KBIngestChunk)
+                    .where(
+                        col(KBIngestChunk.job_id) == job_id,
+                        col(KBIngestChunk.chunk_index) == chunk_index,
+                    )
+                    .values(embedding=embedding),
+                )
+            embedded_count = (
+                await session.execute(
+                    select(func.count(col(KBIngestChunk.id))).where(
+                        col(KBIngestChunk.job_id) == job_id,
+                        col(KBIngestChunk.embedding).is_not(None),
+                    ),
+                )
+            ).scalar() or 0
+            await session.execute(
+                update(KBIngestJob)
+                .where(col(KBIngestJob.job_id) == job_id)
+                .values(
+                    embedded_count=embedded_count,
+                    updated_at=datetime.now(timezone.utc),
+                ),
+            )
+        return embedded_count
+
+    async def complete_ingest_job(self, job_id: str, document: KBDocument) -> None:
+        """写入文档记录并删除已完成的导入任务
+
+        文档记录的写入与任务、检查点的删除在同一事务中完成, 避免重启后重复导入。
+        """
+        async with self.get_db() as session, session.begin():
+            session.add(document)
+            await session.execute(
+                delete(KBIngestChunk).where(col(KBIngestChunk.job_id) == job_id),
+            )
+            await session.execute(
+                delete(KBIngestJob).where(col(KBIngestJob.job_id) == job_id),
+            )
+
+    async def delete_ingest_job(self, job_id: str) -> None:
+        """删除导入任务及其检查点"""
+        async with self.get_db() as session, session.begin():
+            await session.execute(
+                delete(KBIngestChunk).where(col(KBIngestChunk.job_id) == job_id),
+            )
+            await session.execute(
+                delete(KBIngestJob).where(col(KBIngestJob.job_id) == job_id),
+            )
+
+    # ===== 文本块向量存储 =====
+
+    async def get_chunk_embeddings(
+        self,
+        model_key: str,
+        content_hashes: list[str],
+        used_at: float,
+    ) -> dict[str, bytes]:
+        """查询已保存的文本块向量, 并将命中记录的最近使用时间更新为 used_at"""
+        found: dict[str, bytes] = {}
+        async with self.get_db() as session, session.begin():
+            for i in range(0, len(content_hashes), 500):
+                batch = content_hashes[i : i + 500]
+                result = await session.execute(
+                    select(
+                        KBChunkEmbedding.content_hash,
+                        KBChunkEmbedding.embedding,
+                    ).where(
+                        col(KBChunkEmbedding.model_key) == model_key,
+                        col(KBChunkEmbedding.content_hash).in_(batch),
+                    ),
+                )
+                found.update(result.tuples().all())
+            hits = list(found)
+            for i in range(0, len(hits), 500):
+                await session.execute(
+                    update(KBChunkEmbedding)
+                    .where(
+                        col(KBChunkEmbedding.model_key) == model_key,
+                        col(KBChunkEmbedding.content_hash).in_(hits[i : i + 500]),
+                    )
+                    .values(last_used_at=used_at),
+                )
+        return found
+
+    async def save_chunk_embeddings(
+        self,
+        model_key: str,
+        embeddings: dict[str, bytes],
+        used_at: float,
+    ) -> None:
+        """写入或覆盖文本块向量"""
+        async with self.get_db() as session, session.begin():
+            for content_hash, embedding in embeddings.items():
+                await session.merge(
+                    KBChunkEmbedding(
+                        model_key=model_key,
+                        content_hash=content_hash,
+                        embedding=embedding,
+                        last_used_at=used_at,
+                    ),
+                )
+
+    async def count_chunk_embeddings(self) -> int:
+        async with self.get_db() as session:
+            result = await session.execute(
+                select(func.count()).select_from(KBChunkEmbedding),
+            )
+            return result.scalar() or 0
+
+    async def prune_chunk_embeddings(self, keep: int) -> int:
+        """只保留最近使用的 keep 条文本块向量, 返回删除的条数"""
+        async with self.get_db() as session, session.begin():
+            total = (
+                await session.execute(
+                    select(func.count()).select_from(KBChunkEmbedding),
+                )
+            ).scalar() or 0
+            if total <= keep:
+                return 0
+            stale = (
+                (
+                    await session.execute(
+                        select(
+                            KBChunkEmbedding.model_key, KBChunkEmbedding.content_hash
+                        )
+                        .order_by(col(KBChunkEmbedding.last_used_at))
+                        .limit(total - keep),
+                    )
+                )
+                .tuples()
+                .all()
+            )
+            for i in range(0, len(stale), 400):
+                await session.execute(
+                    delete(KBChunkEmbedding).where(
+                        tuple_(
+                            col(KBChunkEmbedding.model_key),
+                            col(KBChunkEmbedding.content_hash),
+                        ).in_(stale[i : i + 400]),
+                    ),
+                )
+            return len(stale)
@@ -1,12 +1,14 @@
 import asyncio
 import json
 import re
+import shutil
 import time
 import uuid
 from pathlib import Path
 from typing import TYPE_CHECKING
 
 import aiofiles
+import numpy as np
 
 from astrbot.core import logger
 from astrbot.core.db.vec_db.base import BaseVecDB
@@ -23,8 +25,16 @@ from astrbot.core.provider.provider import (
 from .chunking.base import BaseChunker
 from .chunking.markdown import MarkdownChunker
 from .chunking.recursive import RecursiveCharacterChunker
+from .embedding_store import ChunkEmbeddingStore
+from .ingest import AdaptiveConcurrency, embed_in_batches
 from .kb_db_sqlite import KBSQLiteDatabase
-from .models import KBDocument, KBMedia, KnowledgeBase
+from .models import (
+    KBDocument,
+    KBIngestChunk,
+    KBIngestJob,
+    KBMedia,
+    KnowledgeBase,
+)
 from .parsers.url_parser import extract_text_from_url
 from .parsers.util import select_parser
 from .prompts import TEXT_REPAIR_SYSTEM_PROMPT
@@ -114,10 +124,19 @@ def _compact_chunks(chunks: list[str]) -> list[str]:
     return [chunk.strip() for chunk in chunks if chunk and chunk.strip()]
 
 
+def _embedding_texts(file_name: str, chunks: list[str]) -> list[str]:
+    """生成用于向量化的文本, 在文本块前加上文档标题以补充上下文"""
+    document_title = Path(file_name).stem.strip()
+    if not document_title:
+        return list(chunks)
+    return [f"{document_title}\n\n{chunk}" for chunk in chunks]
+
+
 class KBHelper:
     vec_db: BaseVecDB
     kb: KnowledgeBase
     init_error: str | None
+    embedding_store: ChunkEmbeddingStore | None = None
 
     def __init__(
         self,
@@ -126,17 +145,23 @@ class KBHelper:
         provider_manager: ProviderManager,
         kb_root_dir: str,
         chunker: BaseChunker,
+        embedding_store: ChunkEmbeddingStore | None = None,
     ) -> None:
         self.kb_db = kb_db
         self.kb = kb
         self.prov_mgr = provider_manager
         self.kb_root_dir = kb_root_dir
         self.chunker = chunker
+        self.embedding_store = embedding_store
         self.init_error = None
 
         self.kb_dir = Path(self.kb_root_dir) / self.kb.kb_id
         self.kb_medias_dir = Path(self.kb_dir) / "medias" / self.kb.kb_id
         self.kb_files_dir = Path(self.kb_dir) / "files" / self.kb.kb_id
+        # 导入任务的源文件暂存目录
+        self.kb_ingest_dir = Path(self.kb_dir) / "ingest"
+        # 多个导入任务并行时, 写入索引的阶段按知识库串行执行
+        self._index_lock = asyncio.Lock()
 
         self.kb_medias_dir.mkdir(parents=True, exist_ok=True)
         self.kb_files_dir.mkdir(parents=True, exist_ok=True)
@@ -182,6 +207,9 @@ class KBHelper:
                 f"知识库 {self.kb.kb_name}({self.kb.kb_id}) 初始化重排序能力失败，将跳过重排序: {e}",
             )
 
+        from astrbot.core.db.vec_db.faiss_impl.embedding_storage import (
+            AnnIndexOptions,
+        )
         from astrbot.core.db.vec_db.faiss_impl.vec_db import FaissVecDB
 
         vec_db = FaissVecDB(
@@ -189,6 +217,11 @@ class KBHelper:
             index_store_path=str(self.kb_dir / "index.faiss"),
             embedding_provider=ep,
             rerank_provider=rp,
+            index_options=AnnIndexOptions(
+                index_type=self.kb.index_type or "flat",
+                nprobe=self.kb.index_nprobe or 8,
+                ef_search=self.kb.index_ef_search or 64,
+            ),
         )
         await vec_db.initialize()
         self.vec_db = vec_db
@@ -198,8 +231,6 @@ class KBHelper:
 
     async def delete_vec_db(self) -> None:
         """删除知识库的向量数据库和所有相关文件"""
-        import shutil
-
         await self.terminate()
         if self.kb_dir.exists():
             shutil.rmtree(self.kb_dir)
@@ -274,96 +305,25 @@ class KBHelper:
                 file_size = len(file_content)
 
                 # 阶段1: 解析文档
-                if progress_callback:
-                    await progress_callback("parsing", 0, 100)
-
-                try:
-                    parser = await select_parser(f".{file_type}")
-                    parse_result = await parser.parse(file_content, file_name)
-                except KnowledgeBaseUploadError:
-                    raise
-                except Exception as exc:
-                    raise KnowledgeBaseUploadError(
-                        stage="parsing",
-                        user_message=(
-                            "文档解析失败：无法读取或解析上传文件。"
-                            "请确认文件格式受支持且文件内容未损坏。"
-                        ),
-                        details={"file_name": file_name},
-                    ) from exc
-                text_content = parse_result.text
-                media_items = parse_result.media
-                if not text_content or not text_content.strip():
-                    raise KnowledgeBaseUploadError(
-                        stage="parsing",
-                        user_message=(
-                            "文档解析失败：未能从文件中提取可索引文本。"
-                            "该文件可能是扫描件、纯图片 PDF，或格式暂不受支持。"
-                        ),
-                        details={"file_name": file_name},
-                    )
-
-                if progress_callback:
-                    await progress_callback("parsing", 100, 100)
-
-                # 保存媒体文件
-                for media_item in media_items:
-                    media = await self._save_media(
-                        doc_id=doc_id,
-                        media_type=media_item.media_type,
-                        file_name=media_item.file_name,
-                        content=media_item.content,
-                        mime_type=media_item.mime_type,
-                    )
-                    saved_media.append(media)
-                    media_paths.append(Path(media.file_path))
+                text_content, saved_media = await self._parse_document(
+                    doc_id=doc_id,
+                    file_name=file_name,
+                    file_content=file_content,
+                    file_type=file_type,
+                    media_paths=media_paths,
+                    progress_callback=progress_callback,
+                )
 
                 # 阶段2: 分块
                 if progress_callback:
                     await progress_callback("chunking", 0, 100)
 
-                try:
-                    # These parsers return Markdown, so retain their heading hierarchy.
-                    effective_chunker = self.chunker
-                    file_ext = Path(file_name).suffix.lower() if file_name else ""
-                    if file_ext in {
-                        ".adoc",
-                        ".docx",
-                        ".epub",
-                        ".markdown",
-                        ".md",
-                        ".mdx",
-                        ".mkd",
-                        ".rst",
-                        ".xls",
-                        ".xlsx",
-                    }:
-                        effective_chunker = MarkdownChunker(
-                            chunk_size=chunk_size,
-                            chunk_overlap=chunk_overlap,
-                        )
-                        logger.info(
-                            f"Using MarkdownChunker for structured document "
-                            f"'{file_name}'."
-                        )
-
-                    chunks_text = await effective_chunker.chunk(
-                        text_content,
-                        chunk_size=chunk_size,
-                        chunk_overlap=chunk_overlap,
-                    )
-                    chunks_text = _compact_chunks(chunks_text)
-                except KnowledgeBaseUploadError:
-                    raise
-                except Exception as exc:
-                    raise KnowledgeBaseUploadError(
-                        stage="chunking",
-                        user_message=(
-                            "分块失败：文档内容在切分文本块时发生错误。"
-                            "请稍后重试，或调整分块参数后再次上传。"
-                        ),
-                        details={"file_name": file_name},
-                    ) from exc
+                chunks_text = await self._chunk_text(
+                    text_content,
+                    file_name=file_name,
+                    chunk_size=chunk_size,
+                    chunk_overlap=chunk_overlap,
+                )
 
             if not chunks_text or not any(chunk.strip() for chunk in chunks_text):
                 if pre_chunked_text is not None:
@@ -392,12 +352,7 @@ class KBHelper:
                         "chunk_index": idx,
                     },
                 )
-            document_title = Path(file_name).stem.strip()
-            embedding_contents = (
-                [f"{document_title}\n\n{chunk_text}" for chunk_text in chunks_text]
-                if document_title
-                else contents
-            )
+            embedding_contents = _embedding_texts(file_name, chunks_text)
 
             if progress_callback:
                 await progress_callback("chunking", 100, 100)
@@ -408,6 +363,15 @@ class KBHelper:
                     await progress_callback("embedding", current, total)
 
             try:
+                vectors = None
+                if self.embedding_store is not None:
+                    vectors = await self._embed_with_store(
+                        embedding_contents,
+                        batch_size=batch_size,
+                        tasks_limit=tasks_limit,
+                        max_retries=max_retries,
+                        progress_callback=embedding_progress_callback,
+                    )
                 await self.vec_db.insert_batch(
                     contents=contents,
                     metadatas=metadatas,
@@ -416,6 +380,7 @@ class KBHelper:
                     max_retries=max_retries,
                     progress_callback=embedding_progress_callback,
                     embedding_contents=embedding_contents,
+                    vectors=vectors,
                 )
             except KnowledgeBaseUploadError:
                 raise
@@ -501,6 +466,465 @@ class KBHelper:
 
             raise
 
+    async def create_ingest_job(
+        self,
+        file_name: str,
+        file_type: str,
+        source_path: str | Path,
+        chunk_size: int = 512,
+        chunk_overlap: int = 50,
+        batch_size: int = 32,
+        tasks_limit: int = 3,
+        max_retries: int = 3,
+    ) -> KBIngestJob:
+        """创建可断点续传的文档导入任务
+
+        源文件会被移动到知识库的暂存目录, 在完成分块前一直保留, 以便任务中断后重新解析。
+        创建后需调用 run_ingest_job 执行, 通常由 KnowledgeBaseManager 的导入队列调度。
+        """
+        job = KBIngestJob(
+            kb_id=self.kb.kb_id,
+            doc_name=file_name,
+            file_type=file_type,
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            batch_size=batch_size,
+            tasks_limit=tasks_limit,
+            max_retries=max_retries,
+        )
+        staged_path = self.kb_ingest_dir / f"{job.job_id}{Path(file_name).suffix}"
+        self.kb_ingest_dir.mkdir(parents=True, exist_ok=True)
+        await asyncio.to_thread(shutil.move, str(source_path), staged_path)
+        job.source_path = str(staged_path)
+        job.file_size = staged_path.stat().st_size
+        try:
+            return await self.kb_db.create_ingest_job(job)
+        except Exception:
+            staged_path.unlink(missing_ok=True)
+            raise
+
+    async def run_ingest_job(
+        self,
+        job_id: str,
+        progress_callback=None,
+    ) -> KBDocument:
+        """执行或继续一个文档导入任务
+
+        流水线依次为解析、分块、向量化与写入索引。分块结果以及每一批生成的向量都会写入
+        知识库数据库作为检查点, 任务中断 (重启) 或失败后再次执行时从断点继续,
+        已生成的向量不会被重新计算。
+
+        Args:
+            progress_callback: Progress callback ``(stage, current, total)``.
+                - stage: ``parsing``, ``chunking``, ``embedding`` or ``indexing``
+
+        """
+        job = await self.kb_db.get_ingest_job(job_id)
+        if not job:
+            raise ValueError(f"无法找到 ID 为 {job_id} 的导入任务")
+        if not getattr(self, "vec_db", None):
+            await self._ensure_vec_db()
+
+        await self.kb_db.update_ingest_job(job_id, status="running", error=None)
+        try:
+            if job.stage == "parsing":
+                await self._ingest_parse_and_chunk(job, progress_callback)
+            chunks = await self.kb_db.list_ingest_chunks(job_id)
+            await self._ingest_embed(job, chunks, progress_callback)
+            return await self._ingest_index(job, chunks, progress_callback)
+        except asyncio.CancelledError:
+            # 任务保持 running 状态, 下次启动时继续执行
+            raise
+        except Exception as e:
+            if isinstance(e, KnowledgeBaseUploadError):
+                logger.warning(f"导入文档失败: {e}", extra={"details": e.details})
+            else:
+                logger.error(f"导入文档失败: {e}", exc_info=True)
+            try:
+                await self.kb_db.update_ingest_job(
+                    job_id, status="failed", error=str(e)
+                )
+            except Exception as exc:
+                logger.warning(f"更新导入任务 {job_id} 的状态失败: {exc}")
+            raise
+
+    async def _ingest_parse_and_chunk(
+        self,
+        job: KBIngestJob,
+        progress_callback=None,
+    ) -> None:
+        source_path = Path(job.source_path)
+        if not source_path.is_file():
+            raise KnowledgeBaseUploadError(
+                stage="parsing",
+                user_message="文档解析失败：暂存的源文件已不存在，请重新上传。",
+                details={"file_name": job.doc_name, "job_id": job.job_id},
+            )
+        file_content = await asyncio.to_thread(source_path.read_bytes)
+        media_paths: list[Path] = []
+        try:
+            text_content, saved_media = await self._parse_document(
+                doc_id=job.doc_id,
+                file_name=job.doc_name,
+                file_content=file_content,
+                file_type=job.file_type,
+                media_paths=media_paths,
+                progress_callback=progress_callback,
+            )
+            if progress_callback:
+                await progress_callback("chunking", 0, 100)
+            chunks_text = await self._chunk_text(
+                text_content,
+                file_name=job.doc_name,
+                chunk_size=job.chunk_size,
+                chunk_overlap=job.chunk_overlap,
+            )
+            if not chunks_text:
+                raise KnowledgeBaseUploadError(
+                    stage="chunking",
+                    user_message="分块失败：文档内容为空，未生成任何可索引文本块。",
+                    details={"file_name": job.doc_name},
+                )
+            await self.kb_db.save_ingest_chunks(job.job_id, chunks_text, saved_media)
+        except Exception:
+            await self._cleanup_failed_upload(
+                doc_id=job.doc_id,
+                media_paths=media_paths,
+            )
+            raise
+        if progress_callback:
+            await progress_callback("chunking", 100, 100)
+        source_path.unlink(missing_ok=True)
+
+    async def _ingest_embed(
+        self,
+        job: KBIngestJob,
+        chunks: list[KBIngestChunk],
+        progress_callback=None,
+    ) -> None:
+        """只为尚未向量化的文本块生成向量, 每批完成后写入检查点"""
+        total = len(chunks)
+        done = sum(1 for chunk in chunks if chunk.embedding is not None)
+        if progress_callback:
+            await progress_callback("embedding", done, total)
+        pending = [chunk for chunk in chunks if chunk.embedding is None]
+        if not pending:
+            return
+
+        ep: EmbeddingProvider = self.vec_db.embedding_provider  # type: ignore
+        by_index = {chunk.chunk_index: chunk for chunk in chunks}
+        texts = _embedding_texts(job.doc_name, [chunk.content for chunk in pending])
+        items = [(chunk.chunk_index, text) for chunk, text in zip(pending, texts)]
+        limiter = AdaptiveConcurrency(job.tasks_limit)
+
+        async def checkpoint(indexes: list[int], vectors: list[list[float]]) -> None:
+            nonlocal done
+            embeddings = {}
+            for idx, vector in zip(indexes, vectors):
+                blob = np.asarray(vector, dtype=np.float32).tobytes()
+                by_index[idx].embedding = blob
+                embeddings[idx] = blob
+            done = await self.kb_db.save_ingest_embeddings(job.job_id, embeddings)
+            if progress_callback:
+                await progress_callback("embedding", done, total)
+
+        if self.embedding_store is not None:
+            stored = await self.embedding_store.lookup(ep, texts)
+            reused = [
+                (idx, vec) for (idx, _), vec in zip(items, stored) if vec is not None
+            ]
+            if reused:
+                logger.info(
+                    f"导入文档 {job.doc_name} 时复用 {len(reused)}/{total} "
+                    f"个文本块的已有向量",
+                )
+                await checkpoint([idx for idx, _ in reused], [v for _, v in reused])
+                items = [item for item, vec in zip(items, stored) if vec is None]
+            if not items:
+                return
+        text_by_index = dict(items)
+
+        async def on_batch(indexes: list[int], vectors: list[list[float]]) -> None:
+            await checkpoint(indexes, vectors)
+            if self.embedding_store is not None:
+                await self.embedding_store.save(
+                    ep,
+                    [text_by_index[idx] for idx in indexes],
+                    vectors,
+                )
+
+        try:
+            await embed_in_batches(
+                ep,
+                items,
+                batch_size=job.batch_size,
+                limiter=limiter,
+                max_retries=job.max_retries,
+                on_batch=on_batch,
+            )
+        except KnowledgeBaseUploadError:
+            raise
+        except Exception as exc:
+            raise KnowledgeBaseUploadError(
+                stage="embedding",
+                user_message=(
+                    "向量化失败：部分文本块未能生成向量。"
+                    "已生成的向量已保存，重试任务时将从断点继续。"
+                ),
+                details={
+                    "file_name": job.doc_name,
+                    "job_id": job.job_id,
+                    "cause": str(exc),
+                },
+            ) from exc
+        finally:
+            if limiter.rate_limited:
+                logger.info(
+                    f"导入文档 {job.doc_name} 时 Embedding 服务限流 "
+                    f"{limiter.rate_limited} 次，并发数调整为 {limiter.limit}",
+                )
+
+    async def _ingest_index(
+        self,
+        job: KBIngestJob,
+        chunks: list[KBIngestChunk],
+        progress_callback=None,
+    ) -> KBDocument:
+        """将已向量化的文本块写入索引, 并保存文档记录"""
+        total = len(chunks)
+        if progress_callback:
+            await progress_callback("indexing", 0, total)
+        await self.kb_db.update_ingest_job(job.job_id, stage="indexing")
+
+        contents = [chunk.content for chunk in chunks]
+        metadatas = [
+            {"kb_id": self.kb.kb_id, "kb_doc_id": job.doc_id, "chunk_index": idx}
+            for idx in range(total)
+        ]
+        vectors = [
+            np.frombuffer(chunk.embedding, dtype=np.float32).tolist()  # type: ignore
+            for chunk in chunks
+        ]
+        async with self._index_lock:
+            try:
+                # 上次执行可能在写入索引后、保存文档记录前中断, 先清理已写入的块
+                await self.vec_db.delete_documents(
+                    metadata_filters={"kb_doc_id": job.doc_id},
+                )
+                await self.vec_db.insert_batch(
+                    contents=contents,
+                    metadatas=metadatas,
+                    vectors=vectors,
+                )
+            except KnowledgeBaseUploadError:
+                await self._rollback_ingest_index(job.doc_id)
+                raise
+            except Exception as exc:
+                await self._rollback_ingest_index(job.doc_id)
+                raise KnowledgeBaseUploadError(
+                    stage="storage",
+                    user_message="存储失败：文本块已生成，但写入知识库索引时出错。",
+                    details={
+                        "file_name": job.doc_name,
+                        "doc_id": job.doc_id,
+                        "cause": str(exc),
+                    },
+                ) from exc
+
+        doc = KBDocument(
+            doc_id=job.doc_id,
+            kb_id=self.kb.kb_id,
+            doc_name=job.doc_name,
+            file_type=job.file_type,
+            file_size=job.file_size,
+            file_path="",
+            chunk_count=total,
+            media_count=0,
+        )
+        try:
+            await self.kb_db.complete_ingest_job(job.job_id, doc)
+        except Exception as exc:
+            await self._rollback_ingest_index(job.doc_id)
+            raise KnowledgeBaseUploadError(
+                stage="metadata",
+                user_message=(
+                    "元数据保存失败：文本块已写入知识库，但文档记录保存失败。"
+                ),
+                details={"file_name": job.doc_name, "doc_id": job.doc_id},
+            ) from exc
+
+        if progress_callback:
+            await progress_callback("indexing", total, total)
+        try:
+            await self.kb_db.update_kb_stats(kb_id=self.kb.kb_id, vec_db=self.vec_db)  # type: ignore
+            await self.refresh_kb()
+            await self.refresh_document(job.doc_id)
+        except Exception as exc:
+            # 文档已导入完成, 统计信息会在下次更新时修正
+            logger.warning(f"导入文档 {job.doc_name} 后刷新知识库统计信息失败: {exc}")
+        return doc
+
+    async def _rollback_ingest_index(self, doc_id: str) -> None:
+        try:
+            await self.vec_db.delete_documents(metadata_filters={"kb_doc_id": doc_id})
+        except Exception as exc:
+            logger.warning(
+                f"Failed to roll back chunks/vectors for ingest job "
+                f"(doc_id={doc_id}): {exc}",
+            )
+
+    async def discard_ingest_job(self, job: KBIngestJob) -> None:
+        """删除导入任务及其检查点、暂存的源文件与已保存的多媒体资源"""
+        media = await self.kb_db.list_media_by_doc(job.doc_id)
+        await self._cleanup_failed_upload(
+            doc_id=job.doc_id,
+            media_paths=[Path(m.file_path) for m in media],
+        )
+        if job.source_path:
+            Path(job.source_path).unlink(missing_ok=True)
+        await self.kb_db.delete_ingest_job(job.job_id)
+
+    async def _parse_document(
+        self,
+        doc_id: str,
+        file_name: str,
+        file_content: bytes,
+        file_type: str,
+        media_paths: list[Path],
+        progress_callback=None,
+    ) -> tuple[str, list[KBMedia]]:
+        """解析文档并保存其中的多媒体资源
+
+        已写入磁盘的多媒体文件路径会追加到 media_paths, 供失败时清理。
+        """
+        if progress_callback:
+            await progress_callback("parsing", 0, 100)
+
+        try:
+            parser = await select_parser(f".{file_type}")
+            parse_result = await parser.parse(file_content, file_name)
+        except KnowledgeBaseUploadError:
+            raise
+        except Exception as exc:
+            raise KnowledgeBaseUploadError(
+                stage="parsing",
+                user_message=(
+                    "文档解析失败：无法读取或解析上传文件。"
+                    "请确认文件格式受支持且文件内容未损坏。"
+                ),
+                details={"file_name": file_name},
+            ) from exc
+        text_content = parse_result.text
+        if not text_content or not text_content.strip():
+            raise KnowledgeBaseUploadError(
+                stage="parsing",
+                user_message=(
+                    "文档解析失败：未能从文件中提取可索引文本。"
+                    "该文件可能是扫描件、纯图片 PDF，或格式暂不受支持。"
+                ),
+                details={"file_name": file_name},
+            )
+
+        if progress_callback:
+            await progress_callback("parsing", 100, 100)
+
+        # 保存媒体文件
+        saved_media = []
+        for media_item in parse_result.media:
+            media = await self._save_media(
+                doc_id=doc_id,
+                media_type=media_item.media_type,
+                file_name=media_item.file_name,
+                content=media_item.content,
+                mime_type=media_item.mime_type,
+            )
+            saved_media.append(media)
+            media_paths.append(Path(media.file_path))
+        return text_content, saved_media
+
+    async def _chunk_text(
+        self,
+        text_content: str,
+        file_name: str,
+        chunk_size: int,
+        chunk_overlap: int,
+    ) -> list[str]:
+        """按文档类型选择分块器切分文本"""
+        try:
+            # These parsers return Markdown, so retain their heading hierarchy.
+            effective_chunker = self.chunker
+            file_ext = Path(file_name).suffix.lower() if file_name else ""
+            if file_ext in {
+                ".adoc",
+                ".docx",
+                ".epub",
+                ".markdown",
+                ".md",
+                ".mdx",
+                ".mkd",
+                ".rst",
+                ".xls",
+                ".xlsx",
+            }:
+                effective_chunker = MarkdownChunker(
+                    chunk_size=chunk_size,
+                    chunk_overlap=chunk_overlap,
+                )
+                logger.info(
+                    f"Using MarkdownChunker for structured document '{file_name}'."
+                )
+
+            chunks_text = await effective_chunker.chunk(
+                text_content,
+                chunk_size=chunk_size,
+                chunk_overlap=chunk_overlap,
+            )
+            return _compact_chunks(chunks_text)
+        except KnowledgeBaseUploadError:
+            raise
+        except Exception as exc:
+            raise KnowledgeBaseUploadError(
+                stage="chunking",
+                user_message=(
+                    "分块失败：文档内容在切分文本块时发生错误。"
+                    "请稍后重试，或调整分块参数后再次上传。"
+                ),
+                details={"file_name": file_name},
+            ) from exc
+
+    async def _embed_with_store(
+        self,
+        texts: list[str],
+        batch_size: int,
+        tasks_limit: int,
+        max_retries: int,
+        progress_callback,
+    ) -> list[list[float]]:
+        """生成向量, 复用文本块向量存储中已有的向量, 只为其余文本请求 Embedding 服务"""
+        assert self.embedding_store is not None
+        ep: EmbeddingProvider = self.vec_db.embedding_provider  # type: ignore
+        total = len(texts)
+
+        async def embed(missing: list[str]) -> list[list[float]]:
+            reused = total - len(missing)
+            if reused:
+                logger.info(f"复用 {reused}/{total} 个文本块的已有向量")
+
+            async def progress(current: int, _total: int) -> None:
+                await progress_callback(reused + current, total)
+
+            return await ep.get_embeddings_batch(
+                missing,
+                batch_size=batch_size,
+                tasks_limit=tasks_limit,
+                max_retries=max_retries,
+                progress_callback=progress,
+            )
+
+        vectors = await self.embedding_store.get_embeddings(ep, texts, embed)
+        await progress_callback(total, total)
+        return vectors
+
     async def _cleanup_failed_upload(
         self,
         doc_id: str,
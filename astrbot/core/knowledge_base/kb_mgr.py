@@ -1,3 +1,4 @@
+import asyncio
 from pathlib import Path
 
 from sqlalchemy.exc import IntegrityError  # type: ignore
@@ -8,10 +9,13 @@ from astrbot.core.utils.astrbot_path import get_astrbot_knowledge_base_path
 
 # from .chunking.fixed_size import FixedSizeChunker
 from .chunking.recursive import RecursiveCharacterChunker
+from .embedding_store import ChunkEmbeddingStore
+from .ingest import IngestQueue
 from .kb_db_sqlite import KBSQLiteDatabase
 from .kb_helper import KBHelper
-from .models import KBDocument, KnowledgeBase
-from .retrieval.manager import RetrievalManager, RetrievalResult
+from .models import KBDocument, KBIngestJob, KnowledgeBase
+from .retrieval.embedding_cache import QueryEmbeddingCache
+from .retrieval.manager import RetrievalManager, RetrievalPlan, RetrievalResult
 from .retrieval.rank_fusion import RankFusion
 from .retrieval.sparse_retriever import SparseRetriever
 
@@ -21,19 +25,33 @@ DB_PATH = Path(FILES_PATH) / "kb.db"
 CHUNKER = RecursiveCharacterChunker()
 
 
+def _log_ingest_result(task: "asyncio.Task[KBDocument]") -> None:
+    if task.cancelled():
+        return
+    if exc := task.exception():
+        logger.warning(f"知识库文档导入任务失败: {exc}")
+
+
 class KnowledgeBaseManager:
     kb_db: KBSQLiteDatabase
     retrieval_manager: RetrievalManager
+    query_embedding_cache: QueryEmbeddingCache | None = None
+    chunk_embedding_store: ChunkEmbeddingStore | None = None
 
     def __init__(
         self,
         provider_manager: ProviderManager,
+        config: dict | None = None,
     ) -> None:
         DB_PATH.parent.mkdir(parents=True, exist_ok=True)
         self.provider_manager = provider_manager
+        self.config = config or {}
         self._session_deleted_callback_registered = False
 
         self.kb_insts: dict[str, KBHelper] = {}
+        self.ingest_queue = IngestQueue(
+            workers=int(self.config.get("kb_ingest_workers", 2)),
+        )
 
     async def initialize(self) -> None:
         """初始化知识库模块"""
@@ -44,16 +62,20 @@ class KnowledgeBaseManager:
             # 初始化检索管理器
             sparse_retriever = SparseRetriever(self.kb_db)
             rank_fusion = RankFusion(self.kb_db)
+            await self._init_query_embedding_cache()
+            await self._init_chunk_embedding_store()
             self.retrieval_manager = RetrievalManager(
                 sparse_retriever=sparse_retriever,
                 rank_fusion=rank_fusion,
                 kb_db=self.kb_db,
+                query_embedding_cache=self.query_embedding_cache,
             )
             await self.load_kbs()
+            await self.resume_ingest_jobs()
 
         except ImportError as e:
             logger.error(f"知识库模块导入失败: {e}")
-            logger.warning("请确保已安装所需依赖: pypdf, aiofiles, Pillow, rank-bm25")
+            logger.warning("请确保已安装所需依赖: pypdf, aiofiles, Pillow")
         except Exception as e:
             logger.error(f"知识库模块初始化失败: {e}", exc_info=True)
 
@@ -63,6 +85,25 @@ class KnowledgeBaseManager:
         await self.kb_db.migrate_to_v1()
         logger.info(f"KnowledgeBase database initialized: {DB_PATH}")
 
+    async def _init_query_embedding_cache(self) -> None:
+        if not self.config.get("kb_query_cache_enable", True):
+            return
+        self.query_embedding_cache = QueryEmbeddingCache(
+            max_entries=int(self.config.get("kb_query_cache_max_entries", 1024)),
+            ttl=float(self.config.get("kb_query_cache_ttl", 3600)),
+            store=self.kb_db if self.config.get("kb_query_cache_persist") else None,
+        )
+        await self.query_embedding_cache.initialize()
+
+    async def _init_chunk_embedding_store(self) -> None:
+        if not self.config.get("kb_chunk_embedding_reuse", True):
+            return
+        self.chunk_embedding_store = ChunkEmbeddingStore(
+            self.kb_db,
+            max_entries=int(self.config.get("kb_chunk_embedding_max_entries", 50000)),
+        )
+        await self.chunk_embedding_store.initialize()
+
     async def load_kbs(self) -> None:
         """加载所有知识库实例"""
         kb_records = await self.kb_db.list_kbs()
@@ -73,6 +114,7 @@ class KnowledgeBaseManager:
                 provider_manager=self.provider_manager,
                 kb_root_dir=FILES_PATH,
                 chunker=CHUNKER,
+                embedding_store=self.chunk_embedding_store,
             )
             try:
                 await kb_helper.initialize()
@@ -96,6 +138,9 @@ class KnowledgeBaseManager:
         top_k_dense: int | None = None,
         top_k_sparse: int | None = None,
         top_m_final: int | None = None,
+        index_type: str | None = None,
+        index_nprobe: int | None = None,
+        index_ef_search: int | None = None,
     ) -> KBHelper:
         """创建新的知识库实例"""
         if embedding_provider_id is None:
@@ -116,6 +161,9 @@ class KnowledgeBaseManager:
             top_k_dense=top_k_dense if top_k_dense is not None else 50,
             top_k_sparse=top_k_sparse if top_k_sparse is not None else 50,
             top_m_final=top_m_final if top_m_final is not None else 5,
+            index_type=index_type or "flat",
+            index_nprobe=index_nprobe if index_nprobe is not None else 8,
+            index_ef_search=index_ef_search if index_ef_search is not None else 64,
         )
         try:
             async with self.kb_db.get_db() as session:
@@ -128,6 +176,7 @@ class KnowledgeBaseManager:
                     provider_manager=self.provider_manager,
                     kb_root_dir=FILES_PATH,
                     chunker=CHUNKER,
+                    embedding_store=self.chunk_embedding_store,
                 )
                 await kb_helper.initialize()
                 await session.commit()
@@ -171,6 +220,11 @@ class KnowledgeBaseManager:
         if not kb_helper:
             return False
 
+        # 先停止该知识库排队与执行中的导入任务, 避免其在删除后继续写入
+        jobs = await self.kb_db.list_ingest_jobs(kb_id=kb_id)
+        await self.ingest_queue.cancel(job.job_id for job in jobs)
+        for job in jobs:
+            await self.kb_db.delete_ingest_job(job.job_id)
         await kb_helper.delete_vec_db()
         async with self.kb_db.get_db() as session:
             await session.delete(kb_helper.kb)
@@ -197,6 +251,9 @@ class KnowledgeBaseManager:
         top_k_dense: int | None = None,
         top_k_sparse: int | None = None,
         top_m_final: int | None = None,
+        index_type: str | None = None,
+        index_nprobe: int | None = None,
+        index_ef_search: int | None = None,
     ) -> KBHelper | None:
         """更新知识库实例"""
         kb_helper = await self.get_kb(kb_id)
@@ -215,6 +272,9 @@ class KnowledgeBaseManager:
             "top_k_dense": kb.top_k_dense,
             "top_k_sparse": kb.top_k_sparse,
             "top_m_final": kb.top_m_final,
+            "index_type": kb.index_type,
+            "index_nprobe": kb.index_nprobe,
+            "index_ef_search": kb.index_ef_search,
         }
         previous_init_error = kb_helper.init_error
 
@@ -237,6 +297,12 @@ class KnowledgeBaseManager:
             kb.top_k_sparse = top_k_sparse
         if top_m_final is not None:
             kb.top_m_final = top_m_final
+        if index_type is not None:
+            kb.index_type = index_type
+        if index_nprobe is not None:
+            kb.index_nprobe = index_nprobe
+        if index_ef_search is not None:
+            kb.index_ef_search = index_ef_search
 
         # Build a new helper first. Keep current vec_db alive until new init succeeds.
         new_helper = KBHelper(
@@ -261,6 +327,9 @@ class KnowledgeBaseManager:
             kb.top_k_dense = previous_state["top_k_dense"]
             kb.top_k_sparse = previous_state["top_k_sparse"]
             kb.top_m_final = previous_state["top_m_final"]
+            kb.index_type = previous_state["index_type"]
+            kb.index_nprobe = previous_state["index_nprobe"]
+            kb.index_ef_search = previous_state["index_ef_search"]
             kb_helper.init_error = previous_init_error
             logger.error(
                 f"知识库 {kb.kb_name}({kb.kb_id}) 重新初始化失败，继续使用旧实例: {e}",
@@ -285,6 +354,7 @@ class KnowledgeBaseManager:
         kb_names: list[str],
         top_k_fusion: int = 20,
         top_m_final: int = 5,
+        plan: RetrievalPlan | None = None,
     ) -> dict | None:
         """从指定知识库中检索相关内容"""
         kb_ids = []
@@ -313,6 +383,7 @@ class KnowledgeBaseManager:
             kb_id_helper_map=kb_id_helper_map,
             top_k_fusion=top_k_fusion,
             top_m_final=top_m_final,
+            plan=plan,
         )
         if not results:
             return None
@@ -360,8 +431,69 @@ class KnowledgeBaseManager:
 
         return "\n".join(lines)
 
+    async def submit_ingest_job(
+        self,
+        job: KBIngestJob,
+        progress_callback=None,
+    ) -> "asyncio.Task[KBDocument]":
+        """将文档导入任务加入导入队列, 返回可等待导入结果的 Task"""
+        kb_helper = await self.get_kb(job.kb_id)
+        if not kb_helper:
+            raise ValueError(f"无法找到 ID 为 {job.kb_id} 的知识库")
+        return self.ingest_queue.submit(
+            job.job_id,
+            lambda: kb_helper.run_ingest_job(job.job_id, progress_callback),
+        )
+
+    async def resume_ingest_jobs(self) -> None:
+        """继续执行上次运行时中断的导入任务"""
+        jobs = await self.kb_db.list_ingest_jobs(statuses=["pending", "running"])
+        resumed = 0
+        for job in jobs:
+            if job.kb_id not in self.kb_insts:
+                await self.kb_db.delete_ingest_job(job.job_id)
+                continue
+            task = await self.submit_ingest_job(job)
+            task.add_done_callback(_log_ingest_result)
+            resumed += 1
+        if resumed:
+            logger.info(f"继续执行 {resumed} 个未完成的知识库文档导入任务")
+
+    async def list_ingest_jobs(self, kb_id: str | None = None) -> list[KBIngestJob]:
+        """列出未完成 (排队、执行中或失败) 的导入任务"""
+        return await self.kb_db.list_ingest_jobs(kb_id=kb_id)
+
+    async def retry_ingest_job(
+        self,
+        job_id: str,
+        progress_callback=None,
+    ) -> "asyncio.Task[KBDocument]":
+        """重新执行失败的导入任务, 从上次的检查点继续"""
+        job = await self.kb_db.get_ingest_job(job_id)
+        if not job:
+            raise ValueError(f"无法找到 ID 为 {job_id} 的导入任务")
+        if not self.ingest_queue.is_active(job_id):
+            await self.kb_db.update_ingest_job(job_id, status="pending", error=None)
+        return await self.submit_ingest_job(job, progress_callback)
+
+    async def discard_ingest_job(self, job_id: str) -> None:
+        """放弃导入任务并清理其检查点与暂存文件"""
+        job = await self.kb_db.get_ingest_job(job_id)
+        if not job:
+            raise ValueError(f"无法找到 ID 为 {job_id} 的导入任务")
+        if self.ingest_queue.is_active(job_id):
+            raise ValueError("导入任务正在执行中，无法放弃")
+        kb_helper = await self.get_kb(job.kb_id)
+        if kb_helper:
+            await kb_helper.discard_ingest_job(job)
+        else:
+            await self.kb_db.delete_ingest_job(job_id)
+
     async def terminate(self) -> None:
         """终止所有知识库实例,关闭数据库连接"""
+        # 未完成的导入任务保留检查点, 下次启动时继续
+        await self.ingest_queue.close()
+
         for kb_id, kb_helper in self.kb_insts.items():
             try:
                 await kb_helper.terminate()
@@ -370,6 +502,9 @@ class KnowledgeBaseManager:
 
         self.kb_insts.clear()
 
+        if self.query_embedding_cache:
+            await self.query_embedding_cache.close()
+
         # 关闭元数据数据库
         if hasattr(self, "kb_db") and self.kb_db:
             try:
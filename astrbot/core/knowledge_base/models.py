@@ -1,6 +1,7 @@
 import uuid
 from datetime import datetime, timezone
 
+from sqlalchemy import LargeBinary
 from sqlmodel import Field, MetaData, SQLModel, Text, UniqueConstraint
 
 
@@ -40,6 +41,10 @@ class KnowledgeBase(BaseKBModel, table=True):
     top_k_dense: int | None = Field(default=50, nullable=True)
     top_k_sparse: int | None = Field(default=50, nullable=True)
     top_m_final: int | None = Field(default=5, nullable=True)
+    # 向量索引配置参数
+    index_type: str | None = Field(default="flat", max_length=20, nullable=True)
+    index_nprobe: int | None = Field(default=8, nullable=True)
+    index_ef_search: int | None = Field(default=64, nullable=True)
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     updated_at: datetime = Field(
         default_factory=lambda: datetime.now(timezone.utc),
@@ -118,3 +123,110 @@ class KBMedia(BaseKBModel, table=True):
     file_size: int = Field(nullable=False)
     mime_type: str = Field(max_length=100, nullable=False)
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+class KBQueryEmbedding(BaseKBModel, table=True):
+    """查询向量缓存表
+
+    持久化检索查询的向量, 使查询向量缓存在重启后仍然有效。
+    """
+
+    __tablename__ = "kb_query_embeddings"  # type: ignore
+
+    cache_key: str = Field(primary_key=True, max_length=64)
+    embedding: bytes = Field(sa_type=LargeBinary, nullable=False)
+    created_at: float = Field(nullable=False, index=True)
+
+
+class KBIngestJob(BaseKBModel, table=True):
+    """文档导入任务表
+
+    记录文档导入流水线 (解析 → 分块 → 向量化 → 写入索引) 的进度。
+    未完成的任务会在重启后继续执行, 失败的任务保留已完成的分块与向量, 重试时从断点继续。
+    """
+
+    __tablename__ = "kb_ingest_jobs"  # type: ignore
+
+    id: int | None = Field(
+        primary_key=True,
+        sa_column_kwargs={"autoincrement": True},
+        default=None,
+    )
+    job_id: str = Field(
+        max_length=36,
+        nullable=False,
+        unique=True,
+        default_factory=lambda: str(uuid.uuid4()),
+        index=True,
+    )
+    kb_id: str = Field(max_length=36, nullable=False, index=True)
+    # 导入完成后文档使用的 ID, 创建任务时预先生成
+    doc_id: str = Field(
+        max_length=36,
+        nullable=False,
+        default_factory=lambda: str(uuid.uuid4()),
+    )
+    doc_name: str = Field(max_length=255, nullable=False)
+    file_type: str = Field(max_length=20, nullable=False)
+    file_size: int = Field(default=0, nullable=False)
+    # 暂存的源文件路径, 完成分块后不再需要
+    source_path: str = Field(default="", max_length=512, nullable=False)
+    chunk_size: int = Field(default=512, nullable=False)
+    chunk_overlap: int = Field(default=50, nullable=False)
+    batch_size: int = Field(default=32, nullable=False)
+    tasks_limit: int = Field(default=3, nullable=False)
+    max_retries: int = Field(default=3, nullable=False)
+    # pending, running, failed; 完成后任务记录会被删除
+    status: str = Field(default="pending", max_length=20, nullable=False, index=True)
+    # parsing, embedding, indexing
+    stage: str = Field(default="parsing", max_length=20, nullable=False)
+    chunk_count: int = Field(default=0, nullable=False)
+    embedded_count: int = Field(default=0, nullable=False)
+    error: str | None = Field(default=None, sa_type=Text)
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    updated_at: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc),
+        sa_column_kwargs={"onupdate": datetime.now(timezone.utc)},
+    )
+
+
+class KBIngestChunk(BaseKBModel, table=True):
+    """导入任务的文本块检查点
+
+    保存分块结果与已生成的向量, 向量为 float32 字节串, 尚未向量化时为空。
+    """
+
+    __tablename__ = "kb_ingest_chunks"  # type: ignore
+
+    id: int | None = Field(
+        primary_key=True,
+        sa_column_kwargs={"autoincrement": True},
+        default=None,
+    )
+    job_id: str = Field(max_length=36, nullable=False, index=True)
+    chunk_index: int = Field(nullable=False)
+    content: str = Field(sa_type=Text, nullable=False)
+    embedding: bytes | None = Field(default=None, sa_type=LargeBinary)
+
+    __table_args__ = (
+        UniqueConstraint(
+            "job_id",
+            "chunk_index",
+            name="uix_ingest_chunk",
+        ),
+    )
+
+
+class KBChunkEmbedding(BaseKBModel, table=True):
+    """文本块向量存储表
+
+    按 (Embedding 模型, 文本哈希) 保存文本块的向量。重新上传或重新分块文档时,
+    内容未变化的文本块直接复用已有向量, 不同文档与知识库之间的相同文本也共享同一条记录。
+    """
+
+    __tablename__ = "kb_chunk_embeddings"  # type: ignore
+
+    model_key: str = Field(primary_key=True, max_length=64)
+    content_hash: str = Field(primary_key=True, max_length=64)
+    embedding: bytes = Field(sa_type=LargeBinary, nullable=False)
+    last_used_at: float = Field(nullable=False, index=True)
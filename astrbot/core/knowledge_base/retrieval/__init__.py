@@ -3,14 +3,17 @@
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
-    from .manager import RetrievalManager, RetrievalResult
+    from .embedding_cache import QueryEmbeddingCache
+    from .manager import RetrievalManager, RetrievalPlan, RetrievalResult
     from .rank_fusion import FusedResult, RankFusion
     from .sparse_retriever import SparseResult, SparseRetriever
 
 __all__ = [
     "FusedResult",
+    "QueryEmbeddingCache",
     "RankFusion",
     "RetrievalManager",
+    "RetrievalPlan",
     "RetrievalResult",
     "SparseResult",
     "SparseRetriever",
@@ -18,11 +21,17 @@ __all__ = [
 
 
 def __getattr__(name: str):
-    if name in {"RetrievalManager", "RetrievalResult"}:
-        from .manager import RetrievalManager, RetrievalResult
+    if name == "QueryEmbeddingCache":
+        from .embedding_cache import QueryEmbeddingCache
+
+        return QueryEmbeddingCache
+
+    if name in {"RetrievalManager", "RetrievalPlan", "RetrievalResult"}:
+        from .manager import RetrievalManager, RetrievalPlan, RetrievalResult
 
         return {
             "RetrievalManager": RetrievalManager,
+            "RetrievalPlan": RetrievalPlan,
             "RetrievalResult": RetrievalResult,
         }[name]
 
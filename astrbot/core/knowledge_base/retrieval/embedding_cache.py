@@ -0,0 +1,189 @@
+"""查询向量缓存
+
+在 EmbeddingProvider 之前缓存检索查询的向量, 相同的问题不再重复请求 Embedding 服务。
+"""
+
+import asyncio
+import hashlib
+import re
+import time
+import unicodedata
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from astrbot import logger
+from astrbot.core.provider.provider import EmbeddingProvider
+from astrbot.core.utils.async_cache import LRUCache, SingleFlight
+
+if TYPE_CHECKING:
+    from astrbot.core.knowledge_base.kb_db_sqlite import KBSQLiteDatabase
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_query(text: str) -> str:
+    """归一化查询文本: NFKC 规范化并折叠空白字符"""
+    return _WHITESPACE_RE.sub(" ", unicodedata.normalize("NFKC", text)).strip()
+
+
+class QueryEmbeddingCache:
+    """LRU + TTL 查询向量缓存
+
+    缓存键由 (Embedding Provider ID, 模型名, 归一化查询文本) 计算得到。
+    并发请求同一个未命中的键时只会调用一次 Provider。
+    传入 store 时, 新写入的向量会持久化到知识库数据库, 并在 initialize 时加载回内存。
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl: float = 3600,
+        store: "KBSQLiteDatabase | None" = None,
+    ) -> None:
+        """初始化查询向量缓存
+
+        Args:
+            max_entries: 内存中最多缓存的向量数量
+            ttl: 缓存有效期 (秒), 小于等于 0 表示永不过期
+            store: 用于持久化的知识库数据库, 为空时只缓存在内存中
+
+        """
+        self.store = store
+        self.hits = 0
+        self.misses = 0
+        self._entries: LRUCache[str, list[float]] = LRUCache(max_entries, ttl)
+        self._inflight: SingleFlight[str, list[float]] = SingleFlight()
+        self._persist_tasks: set[asyncio.Task] = set()
+
+    @property
+    def max_entries(self) -> int:
+        return self._entries.max_entries
+
+    @property
+    def ttl(self) -> float:
+        return self._entries.ttl
+
+    @ttl.setter
+    def ttl(self, value: float) -> None:
+        self._entries.ttl = value
+
+    @staticmethod
+    def make_key(provider: EmbeddingProvider, text: str) -> str:
+        provider_id = provider.provider_config.get("id", "")
+        model = provider.provider_config.get("embedding_model") or provider.get_model()
+        raw = "\x00".join([provider_id, model or "", normalize_query(text)])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    async def initialize(self) -> None:
+        """从持久化存储中加载未过期的向量"""
+        if not self.store:
+            return
+        since = time.time() - self.ttl if self.ttl > 0 else 0
+        try:
+            await self.store.prune_query_embeddings(before=since, keep=self.max_entries)
+            records = await self.store.load_query_embeddings(
+                since=since,
+                limit=self.max_entries,
+            )
+        except Exception as e:
+            logger.warning(f"加载查询向量缓存失败, 将使用空缓存: {e}")
+            return
+        # 记录按时间倒序返回, 倒序插入使最新的记录位于 LRU 末尾
+        for record in reversed(records):
+            embedding = np.frombuffer(record.embedding, dtype=np.float32).tolist()
+            self._entries.put(record.cache_key, embedding, record.created_at)
+        logger.info(f"已加载 {len(records)} 条查询向量缓存")
+
+    def _put(self, key: str, embedding: list[float]) -> None:
+        created_at = time.time()
+        self._entries.put(key, embedding, created_at)
+        if self.store:
+            task = asyncio.create_task(self._persist(key, embedding, created_at))
+            self._persist_tasks.add(task)
+            task.add_done_callback(self._persist_tasks.discard)
+
+    async def _persist(
+        self,
+        key: str,
+        embedding: list[float],
+        created_at: float,
+    ) -> None:
+        assert self.store is not None
+        try:
+            await self.store.save_query_embedding(
+                cache_key=key,
+                embedding=np.asarray(embedding, dtype=np.float32).tobytes(),
+                created_at=created_at,
+            )
+        except Exception as e:
+            logger.warning(f"持久化查询向量缓存失败: {e}")
+
+    async def get_embedding(
+        self,
+        provider: EmbeddingProvider,
+        text: str,
+    ) -> list[float]:
+        """获取查询向量, 未命中时调用 provider.get_embedding"""
+        key = self.make_key(provider, text)
+        if (embedding := self._entries.get(key)) is not None:
+            self.hits += 1
+            return embedding
+
+        async def produce() -> list[float]:
+            self.misses += 1
+            embedding = await provider.get_embedding(text)
+            self._put(key, embedding)
+            return embedding
+
+        embedding, shared = await self._inflight.do(key, produce)
+        if shared:
+            self.hits += 1
+        return embedding
+
+    async def get_embeddings(
+        self,
+        provider: EmbeddingProvider,
+        texts: list[str],
+    ) -> list[list[float]]:
+        """批量获取查询向量, 只对未命中的文本调用 provider.get_embeddings"""
+        keys = [self.make_key(provider, text) for text in texts]
+        results: list[list[float] | None] = [self._entries.get(key) for key in keys]
+        missing: dict[str, str] = {}
+        for key, text, embedding in zip(keys, texts, results):
+            if embedding is None:
+                missing.setdefault(key, text)
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+
+        if missing:
+            embeddings = await provider.get_embeddings(list(missing.values()))
+            fetched = dict(zip(missing, embeddings))
+            for key, embedding in fetched.items():
+                self._put(key, embedding)
+            results = [
+                embedding if embedding is not None else fetched[key]
+                for key, embedding in zip(keys, results)
+            ]
+        return results  # type: ignore[return-value]
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self._entries.evictions,
+            "hit_rate": self.hits / total if total else 0.0,
+            "persistent": self.store is not None,
+        }
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    async def close(self) -> None:
+        """等待尚未完成的持久化写入"""
+        if self._persist_tasks:
+            await asyncio.gather(*self._persist_tasks, return_exceptions=True)
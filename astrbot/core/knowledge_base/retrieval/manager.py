@@ -3,22 +3,31 @@
 协调稠密检索、稀疏检索和 Rerank,提供统一的检索接口
 """
 
+import asyncio
+import json
 import time
-from dataclasses import dataclass
-from typing import TYPE_CHECKING
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, TypeVar
 
 from astrbot import logger
 from astrbot.core.db.vec_db.base import Result
 from astrbot.core.knowledge_base.kb_db_sqlite import KBSQLiteDatabase
+from astrbot.core.knowledge_base.retrieval.embedding_cache import QueryEmbeddingCache
 from astrbot.core.knowledge_base.retrieval.rank_fusion import RankFusion
-from astrbot.core.knowledge_base.retrieval.sparse_retriever import SparseRetriever
+from astrbot.core.knowledge_base.retrieval.sparse_retriever import (
+    SparseResult,
+    SparseRetriever,
+)
 from astrbot.core.provider.provider import RerankProvider
 
-from ..kb_helper import KBHelper
-
 if TYPE_CHECKING:
     from astrbot.core.db.vec_db.faiss_impl import FaissVecDB
 
+    from ..kb_helper import KBHelper
+
+_T = TypeVar("_T")
+
 
 @dataclass
 class RetrievalResult:
@@ -34,6 +43,44 @@ class RetrievalResult:
     metadata: dict
 
 
+@dataclass
+class RetrievalPlan:
+    """检索执行计划
+
+    稠密检索与稀疏检索并发执行, 每个阶段内按知识库扇出,
+    并发数受 max_concurrency 限制。各阶段拥有独立的超时时间 (秒),
+    超时的知识库会被跳过, 已完成的结果仍会参与融合。
+    """
+
+    max_concurrency: int = 4
+    dense_timeout: float = 10.0
+    sparse_timeout: float = 10.0
+    rerank_timeout: float = 10.0
+
+    @classmethod
+    def from_config(cls, config: dict) -> "RetrievalPlan":
+        timeout = float(config.get("kb_retrieval_timeout", 10) or 10)
+        concurrency = config.get("kb_retrieval_concurrency")
+        return cls(
+            max_concurrency=max(1, int(4 if concurrency is None else concurrency)),
+            dense_timeout=timeout,
+            sparse_timeout=timeout,
+            rerank_timeout=timeout,
+        )
+
+
+@dataclass
+class RetrievalStageMetric:
+    """单个检索阶段的耗时指标"""
+
+    stage: str
+    duration_ms: float
+    result_count: int
+    kb_count: int = 0
+    timed_out_kb_ids: list[str] = field(default_factory=list)
+    timed_out: bool = False
+
+
 class RetrievalManager:
     """检索管理器
 
@@ -47,33 +94,36 @@ class RetrievalManager:
         sparse_retriever: SparseRetriever,
         rank_fusion: RankFusion,
         kb_db: KBSQLiteDatabase,
+        query_embedding_cache: QueryEmbeddingCache | None = None,
     ) -> None:
         """初始化检索管理器
 
         Args:
-            vec_db_factory: 向量数据库工厂
             sparse_retriever: 稀疏检索器
             rank_fusion: 结果融合器
             kb_db: 知识库数据库实例
+            query_embedding_cache: 查询向量缓存, 为空时每次检索都请求 Embedding Provider
 
         """
         self.sparse_retriever = sparse_retriever
         self.rank_fusion = rank_fusion
         self.kb_db = kb_db
+        self.query_embedding_cache = query_embedding_cache
 
     async def retrieve(
         self,
         query: str,
         kb_ids: list[str],
-        kb_id_helper_map: dict[str, KBHelper],
+        kb_id_helper_map: dict[str, "KBHelper"],
         top_k_fusion: int = 20,
         top_m_final: int = 5,
+        plan: RetrievalPlan | None = None,
+        stage_metrics: list[RetrievalStageMetric] | None = None,
     ) -> list[RetrievalResult]:
         """混合检索
 
         流程:
-        1. 稠密检索 (向量相似度)
-        2. 稀疏检索 (BM25)
+        1. 稠密检索 (向量相似度) 与 2. 稀疏检索 (BM25) 并发执行
         3. 结果融合 (RRF)
         4. Rerank 重排序
 
@@ -81,7 +131,8 @@ class RetrievalManager:
             query: 查询文本
             kb_ids: 知识库 ID 列表
             top_m_final: 最终返回数量
-            enable_rerank: 是否启用 Rerank
+            plan: 并发与超时设置, 为空时使用默认值
+            stage_metrics: 可选, 本次检索各阶段的耗时指标会追加到该列表中
 
         Returns:
             List[RetrievalResult]: 检索结果列表
@@ -108,41 +159,43 @@ class RetrievalManager:
                 logger.warning(f"知识库 ID {kb_id} 实例未找到, 已跳过该知识库的检索")
 
         kb_ids = new_kb_ids
-
-        # 1. 稠密检索
-        time_start = time.time()
-        dense_results = await self._dense_retrieve(
-            query=query,
-            kb_ids=kb_ids,
-            kb_options=kb_options,
-        )
-        time_end = time.time()
-        logger.debug(
-            f"Dense retrieval across {len(kb_ids)} bases took {time_end - time_start:.2f}s and returned {len(dense_results)} results.",
-        )
-
-        # 2. 稀疏检索
-        time_start = time.time()
-        sparse_results = await self.sparse_retriever.retrieve(
-            query=query,
-            kb_ids=kb_ids,
-            kb_options=kb_options,
-        )
-        time_end = time.time()
-        logger.debug(
-            f"Sparse retrieval across {len(kb_ids)} bases took {time_end - time_start:.2f}s and returned {len(sparse_results)} results.",
+        plan = plan or RetrievalPlan()
+        semaphore = asyncio.Semaphore(plan.max_concurrency)
+        metrics: list[RetrievalStageMetric] = []
+
+        # 1. 稠密检索与 2. 稀疏检索并发执行
+        dense_results, sparse_results = await asyncio.gather(
+            self._dense_retrieve(
+                query=query,
+                kb_ids=kb_ids,
+                kb_options=kb_options,
+                semaphore=semaphore,
+                timeout=plan.dense_timeout,
+                metrics=metrics,
+            ),
+            self._sparse_retrieve(
+                query=query,
+                kb_ids=kb_ids,
+                kb_options=kb_options,
+                semaphore=semaphore,
+                timeout=plan.sparse_timeout,
+                metrics=metrics,
+            ),
         )
 
         # 3. 结果融合
-        time_start = time.time()
+        time_start = time.perf_counter()
         fused_results = await self.rank_fusion.fuse(
             dense_results=dense_results,
             sparse_results=sparse_results,
             top_k=top_k_fusion,
         )
-        time_end = time.time()
-        logger.debug(
-            f"Rank fusion took {time_end - time_start:.2f}s and returned {len(fused_results)} results.",
+        metrics.append(
+            RetrievalStageMetric(
+                stage="fusion",
+                duration_ms=(time.perf_counter() - time_start) * 1000,
+                result_count=len(fused_results),
+            ),
         )
 
         # 4. 转换为 RetrievalResult (批量获取元数据)
@@ -180,63 +233,210 @@ class RetrievalManager:
                 first_rerank = rerank_provider
                 break
         if first_rerank and retrieval_results:
+            time_start = time.perf_counter()
+            timed_out = False
             try:
-                retrieval_results = await self._rerank(
-                    query=query,
-                    results=retrieval_results,
-                    top_k=top_m_final,
-                    rerank_provider=first_rerank,
+                retrieval_results = await asyncio.wait_for(
+                    self._rerank(
+                        query=query,
+                        results=retrieval_results,
+                        top_k=top_m_final,
+                        rerank_provider=first_rerank,
+                    ),
+                    timeout=plan.rerank_timeout,
+                )
+            except asyncio.TimeoutError:
+                timed_out = True
+                logger.warning(
+                    f"Rerank 超时 ({plan.rerank_timeout}s)，已跳过重排序并使用融合结果",
                 )
             except Exception as e:
                 logger.warning(f"Rerank 执行失败，已跳过重排序并使用融合结果: {e}")
+            metrics.append(
+                RetrievalStageMetric(
+                    stage="rerank",
+                    duration_ms=(time.perf_counter() - time_start) * 1000,
+                    result_count=len(retrieval_results),
+                    timed_out=timed_out,
+                ),
+            )
+
+        if stage_metrics is not None:
+            stage_metrics.extend(metrics)
+        for metric in metrics:
+            logger.debug(
+                f"KB retrieval stage metric: {json.dumps(metric.__dict__, ensure_ascii=False)}",
+            )
 
         return retrieval_results[:top_m_final]
 
+    async def _fan_out(
+        self,
+        kb_ids: list[str],
+        fn: Callable[[str], Awaitable[_T]],
+        semaphore: asyncio.Semaphore,
+        timeout: float | None,
+    ) -> tuple[dict[str, _T], list[str]]:
+        """按知识库并发执行 fn, 返回已完成的结果与超时的知识库 ID
+
+        失败的知识库由 fn 自行处理; 超过 timeout 仍未完成的任务会被取消。
+        """
+
+        async def run(kb_id: str) -> _T:
+            async with semaphore:
+                return await fn(kb_id)
+
+        tasks = {kb_id: asyncio.create_task(run(kb_id)) for kb_id in kb_ids}
+        if not tasks:
+            return {}, []
+        _, pending = await asyncio.wait(tasks.values(), timeout=timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        results: dict[str, _T] = {}
+        timed_out: list[str] = []
+        for kb_id, task in tasks.items():
+            if task in pending:
+                timed_out.append(kb_id)
+            else:
+                results[kb_id] = task.result()
+        return results, timed_out
+
+    async def _sparse_retrieve(
+        self,
+        query: str,
+        kb_ids: list[str],
+        kb_options: dict,
+        semaphore: asyncio.Semaphore,
+        timeout: float,
+        metrics: list[RetrievalStageMetric],
+    ):
+        """稀疏检索 (BM25)
+
+        与稠密检索相同, 按知识库并发检索, 失败或超时的知识库会被跳过。
+        """
+
+        query_tokens = self.sparse_retriever.tokenize_query(query)
+
+        async def retrieve_kb(kb_id: str) -> list[SparseResult]:
+            try:
+                return await self.sparse_retriever.retrieve_kb(
+                    query_tokens,
+                    kb_id,
+                    kb_options,
+                )
+            except Exception as e:
+                logger.error(
+                    f"知识库 {kb_id} 稀疏检索失败: {type(e).__name__}: {e}",
+                    exc_info=True,
+                )
+                return []
+
+        time_start = time.perf_counter()
+        results_by_kb, timed_out = await self._fan_out(
+            [kb_id for kb_id in kb_ids if kb_id in kb_options],
+            retrieve_kb,
+            semaphore,
+            timeout,
+        )
+        if timed_out:
+            logger.warning(f"知识库 {timed_out} 稀疏检索超时 ({timeout}s)，已跳过")
+
+        sparse_results: list[SparseResult] = []
+        for kb_id in kb_ids:
+            sparse_results.extend(results_by_kb.get(kb_id, []))
+        sparse_results.sort(key=lambda x: x.score, reverse=True)
+        metrics.append(
+            RetrievalStageMetric(
+                stage="sparse",
+                duration_ms=(time.perf_counter() - time_start) * 1000,
+                result_count=len(sparse_results),
+                kb_count=len(kb_ids),
+                timed_out_kb_ids=timed_out,
+            ),
+        )
+        return sparse_results
+
     async def _dense_retrieve(
         self,
         query: str,
         kb_ids: list[str],
         kb_options: dict,
+        semaphore: asyncio.Semaphore | None = None,
+        timeout: float | None = None,
+        metrics: list[RetrievalStageMetric] | None = None,
     ):
         """稠密检索 (向量相似度)
 
-        为每个知识库使用独立的向量数据库进行检索,然后合并结果。
+        为每个知识库使用独立的向量数据库并发检索,然后合并结果。
 
         Args:
             query: 查询文本
             kb_ids: 知识库 ID 列表
-            top_k: 返回结果数量
+            kb_options: 每个知识库的检索选项
+            semaphore: 限制并发检索的知识库数量
+            timeout: 整个阶段的超时时间, 超时的知识库会被跳过
+            metrics: 用于收集阶段指标的列表
 
         Returns:
             List[Result]: 检索结果列表
 
         """
-        all_results: list[Result] = []
-        for kb_id in kb_ids:
-            if kb_id not in kb_options:
-                continue
+
+        async def retrieve_kb(kb_id: str) -> list[Result]:
             try:
                 vec_db: FaissVecDB = kb_options[kb_id]["vec_db"]
                 dense_k = int(kb_options[kb_id]["top_k_dense"])
-                vec_results = await vec_db.retrieve(
+                query_embedding = None
+                if self.query_embedding_cache:
+                    query_embedding = await self.query_embedding_cache.get_embedding(
+                        vec_db.embedding_provider,
+                        query,
+                    )
+                return await vec_db.retrieve(
                     query=query,
                     k=dense_k,
                     fetch_k=dense_k * 2,
                     rerank=False,  # 稠密检索阶段不进行 rerank
                     metadata_filters={"kb_id": kb_id},
+                    query_embedding=query_embedding,
                 )
-
-                all_results.extend(vec_results)
             except Exception as e:
                 logger.error(
                     f"知识库 {kb_id} 稠密检索失败: {type(e).__name__}: {e}",
                     exc_info=True,
                 )
                 # skip the faulty KB and continue
+                return []
+
+        time_start = time.perf_counter()
+        results_by_kb, timed_out = await self._fan_out(
+            [kb_id for kb_id in kb_ids if kb_id in kb_options],
+            retrieve_kb,
+            semaphore or asyncio.Semaphore(len(kb_ids) or 1),
+            timeout,
+        )
+        if timed_out:
+            logger.warning(f"知识库 {timed_out} 稠密检索超时 ({timeout}s)，已跳过")
+
+        all_results: list[Result] = []
+        for kb_id in kb_ids:
+            all_results.extend(results_by_kb.get(kb_id, []))
 
         # 按相似度排序并返回 top_k
         all_results.sort(key=lambda x: x.similarity, reverse=True)
-        # return all_results[: len(all_results) // len(kb_ids)]
+        if metrics is not None:
+            metrics.append(
+                RetrievalStageMetric(
+                    stage="dense",
+                    duration_ms=(time.perf_counter() - time_start) * 1000,
+                    result_count=len(all_results),
+                    kb_count=len(kb_ids),
+                    timed_out_kb_ids=timed_out,
+                ),
+            )
         return all_results
 
     async def _rerank(
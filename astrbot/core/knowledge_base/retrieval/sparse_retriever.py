@@ -1,8 +1,11 @@
 """稀疏检索器
 
-使用 BM25 算法进行基于关键词的文档检索
+使用 BM25 算法进行基于关键词的文档检索。优先使用 SQLite FTS5 索引,
+不可用时回退到持久化的 BM25 倒排索引。
 """
 
+import asyncio
+import contextlib
 import json
 import os
 from dataclasses import dataclass
@@ -47,136 +50,94 @@ class SparseRetriever:
 
         """
         self.kb_db = kb_db
-        self._index_cache = {}  # 缓存 BM25 索引
 
         self.hit_stopwords = load_stopwords(
             os.path.join(os.path.dirname(__file__), "hit_stopwords.txt"),
         )
 
-    async def retrieve(
+    def tokenize_query(self, query: str) -> list[str]:
+        """对查询文本分词并去除停用词"""
+        return tokenize_text(query, self.hit_stopwords)
+
+    async def retrieve_kb(
         self,
-        query: str,
-        kb_ids: list[str],
+        query_tokens: list[str],
+        kb_id: str,
         kb_options: dict,
     ) -> list[SparseResult]:
-        """执行稀疏检索
+        """检索单个知识库
+
+        优先使用 FTS5 索引, 不可用时改用持久化 BM25 索引。
 
         Args:
-            query: 查询文本
-            kb_ids: 知识库 ID 列表
+            query_tokens: 查询分词结果
+            kb_id: 知识库 ID
             kb_options: 每个知识库的检索选项
 
         Returns:
-            List[SparseResult]: 检索结果列表
+            List[SparseResult]: 该知识库内按相关度排序的结果
 
         """
-        fts_results = []
-        fallback_kb_ids = []
-        query_tokens = tokenize_text(query, self.hit_stopwords)
-        for kb_id in kb_ids:
-            vec_db: FaissVecDB | None = kb_options.get(kb_id, {}).get("vec_db")
-            if not vec_db:
-                continue
-            top_k_sparse = kb_options.get(kb_id, {}).get("top_k_sparse", 50)
-            result = await vec_db.document_storage.search_sparse(
+        vec_db: FaissVecDB | None = kb_options.get(kb_id, {}).get("vec_db")
+        if not vec_db:
+            return []
+        top_k_sparse = kb_options[kb_id].get("top_k_sparse", 50)
+        result = await vec_db.document_storage.search_sparse(
+            query_tokens=query_tokens,
+            limit=top_k_sparse,
+        )
+        if result is None:
+            result = await vec_db.document_storage.search_bm25(
                 query_tokens=query_tokens,
                 limit=top_k_sparse,
             )
-            if result is None:
-                fallback_kb_ids.append(kb_id)
-                continue
-
-            # BM25 scores from independent FTS5 indexes are not comparable.
-            # Preserve each index's local rank for the later RRF stage.
-            for rank, doc in enumerate(result, start=1):
-                chunk_md = json.loads(doc["metadata"])
-                fts_results.append(
-                    SparseResult(
-                        chunk_id=doc["doc_id"],
-                        chunk_index=chunk_md["chunk_index"],
-                        doc_id=chunk_md["kb_doc_id"],
-                        kb_id=kb_id,
-                        content=doc["text"],
-                        score=-float(doc["score"]),
-                        rank=rank,
-                    ),
-                )
-
-        fallback_results = []
-        if fallback_kb_ids:
-            fallback_results = await self._retrieve_with_bm25(
-                query=query,
-                kb_ids=fallback_kb_ids,
-                kb_options=kb_options,
+
+        results = []
+        # BM25 scores from independent indexes are not comparable.
+        # Preserve each index's local rank for the later RRF stage.
+        for rank, doc in enumerate(result, start=1):
+            chunk_md = json.loads(doc["metadata"])
+            results.append(
+                SparseResult(
+                    chunk_id=doc["doc_id"],
+                    chunk_index=chunk_md["chunk_index"],
+                    doc_id=chunk_md["kb_doc_id"],
+                    kb_id=kb_id,
+                    content=doc["text"],
+                    score=-float(doc["score"]),
+                    rank=rank,
+                ),
             )
-        results = fts_results + fallback_results
-        results.sort(key=lambda x: x.score, reverse=True)
         return results
 
-    async def _retrieve_with_bm25(
+    async def retrieve(
         self,
         query: str,
         kb_ids: list[str],
         kb_options: dict,
+        semaphore: asyncio.Semaphore | None = None,
     ) -> list[SparseResult]:
-        top_k_sparse = 0
-        chunks = []
-        for kb_id in kb_ids:
-            vec_db: FaissVecDB | None = kb_options.get(kb_id, {}).get("vec_db")
-            if not vec_db:
-                continue
-            result = await vec_db.document_storage.get_documents(
-                metadata_filters={},
-                limit=None,
-                offset=None,
-            )
-            chunk_mds = [json.loads(doc["metadata"]) for doc in result]
-            result = [
-                {
-                    "chunk_id": doc["doc_id"],
-                    "chunk_index": chunk_md["chunk_index"],
-                    "doc_id": chunk_md["kb_doc_id"],
-                    "kb_id": kb_id,
-                    "text": doc["text"],
-                }
-                for doc, chunk_md in zip(result, chunk_mds)
-            ]
-            chunks.extend(result)
-            top_k_sparse += kb_options.get(kb_id, {}).get("top_k_sparse", 50)
-
-        if not chunks:
-            return []
+        """执行稀疏检索
 
-        # 2. 准备文档和索引
-        corpus = [chunk["text"] for chunk in chunks]
-        tokenized_corpus = [tokenize_text(doc, self.hit_stopwords) for doc in corpus]
+        各知识库的查询并发执行, 见 retrieve_kb。
 
-        # 3. 构建 BM25 索引
-        from rank_bm25 import BM25Okapi
+        Args:
+            query: 查询文本
+            kb_ids: 知识库 ID 列表
+            kb_options: 每个知识库的检索选项
+            semaphore: 限制并发查询的知识库数量, 为空时不限制
 
-        bm25 = BM25Okapi(tokenized_corpus)
+        Returns:
+            List[SparseResult]: 检索结果列表
 
-        # 4. 执行检索
-        tokenized_query = tokenize_text(query, self.hit_stopwords)
-        scores = bm25.get_scores(tokenized_query)
+        """
+        query_tokens = self.tokenize_query(query)
 
-        # 5. 排序并返回 Top-K
-        results = []
-        for idx, score in enumerate(scores):
-            chunk = chunks[idx]
-            results.append(
-                SparseResult(
-                    chunk_id=chunk["chunk_id"],
-                    chunk_index=chunk["chunk_index"],
-                    doc_id=chunk["doc_id"],
-                    kb_id=chunk["kb_id"],
-                    content=chunk["text"],
-                    score=float(score),
-                ),
-            )
+        async def search_kb(kb_id: str) -> list[SparseResult]:
+            async with semaphore or contextlib.nullcontext():
+                return await self.retrieve_kb(query_tokens, kb_id, kb_options)
 
+        kb_results = await asyncio.gather(*(search_kb(kb_id) for kb_id in kb_ids))
+        results = [result for kb_result in kb_results for result in kb_result]
         results.sort(key=lambda x: x.score, reverse=True)
-        for rank, result in enumerate(results, start=1):
-            result.rank = rank
-        # return results[: len(results) // len(kb_ids)]
-        return results[:top_k_sparse]
+        return results
@@ -9,6 +9,9 @@ import tempfile
 import time
 from asyncio import Queue
 from collections import deque
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
 from pathlib import Path
 from typing import TYPE_CHECKING
 
@@ -28,9 +31,24 @@ PLUGIN_LOGGER_PREFIX = "astrbot.plugin."
 PLUGIN_LOG_LEVELS = ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL")
 """Allowed per-plugin log levels."""
 
+_log_umo: ContextVar[str | None] = ContextVar("astrbot_log_umo", default=None)
+"""当前正在处理的事件的 unified_msg_origin, 写入日志记录的 umo 字段。"""
+
 if TYPE_CHECKING:
     from loguru import Record
 
+    from astrbot.core.log_store import LogStore
+
+
+@contextmanager
+def log_umo(umo: str | None) -> Iterator[None]:
+    """在上下文内输出的日志 (包括其中创建的异步任务) 都标记为属于会话 umo。"""
+    token = _log_umo.set(umo)
+    try:
+        yield
+    finally:
+        _log_umo.reset(token)
+
 
 class _RecordEnricherFilter(logging.Filter):
     """为 logging.LogRecord 注入 AstrBot 日志字段。"""
@@ -146,10 +164,23 @@ class _LoguruInterceptHandler(logging.Handler):
 class LogBroker:
     """日志代理类，用于缓存和分发日志消息。"""
 
+    store: "LogStore | None" = None
+    """持久化日志存储，未启用时为 None。"""
+
     def __init__(self) -> None:
         self.log_cache = deque(maxlen=CACHED_SIZE)
         self.subscribers: list[Queue] = []
 
+    def attach_store(self, store: "LogStore") -> None:
+        """挂载持久化日志存储，并写入挂载前已缓存的日志。"""
+        self.store = store
+        for log_entry in list(self.log_cache):
+            store.append(log_entry)
+
+    def detach_store(self) -> "LogStore | None":
+        store, self.store = self.store, None
+        return store
+
     def register(self) -> Queue:
         q = Queue(maxsize=CACHED_SIZE + 10)
         self.subscribers.append(q)
@@ -160,13 +191,37 @@ class LogBroker:
 
     def publish(self, log_entry: dict) -> None:
         self.log_cache.append(log_entry)
+        if self.store is not None:
+            self.store.append(log_entry)
         for q in self.subscribers:
+            # 订阅者消费过慢时丢弃其最旧的日志，保证实时日志不会停在过去
+            if q.full():
+                try:
+                    q.get_nowait()
+                except asyncio.QueueEmpty:
+                    pass
             try:
                 q.put_nowait(log_entry)
             except asyncio.QueueFull:
                 pass
 
 
+def _record_plugin_name(record: logging.LogRecord) -> str | None:
+    if record.name.startswith(PLUGIN_LOGGER_PREFIX):
+        return record.name[len(PLUGIN_LOGGER_PREFIX) :]
+    if not record.pathname:
+        return None
+    # 与 _is_plugin_path 一致: data/plugins/<name>/... 或 astrbot/builtin_stars/<name>/...
+    parts = Path(record.pathname).parts
+    for idx in range(1, len(parts) - 2):
+        if (parts[idx - 1], parts[idx]) in (
+            ("data", "plugins"),
+            ("astrbot", "builtin_stars"),
+        ):
+            return parts[idx + 1]
+    return None
+
+
 class LogQueueHandler(logging.Handler):
     """日志处理器，用于将日志消息发送到 LogBroker。"""
 
@@ -182,6 +237,8 @@ class LogQueueHandler(logging.Handler):
                 "time": time.time(),
                 "data": log_entry,
                 "category": getattr(record, "category", None) or "system",
+                "plugin": _record_plugin_name(record),
+                "umo": getattr(record, "umo", None) or _log_umo.get(),
             },
         )
 
@@ -0,0 +1,313 @@
+"""持久化日志存储
+
+将 LogBroker 发布的日志写入 SQLite, 控制台可以按时间范围、级别、分类、插件与会话查询,
+也可以在断线重连时补发内存缓存之外的历史日志。
+
+日志由后台线程批量写入, 发布日志的线程只需把日志放入有界队列, 不会阻塞;
+写入跟不上时新日志会被丢弃并计数。
+"""
+
+import json
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+
+LOG_STORE_BATCH_SIZE = 500
+LOG_STORE_FLUSH_INTERVAL = 0.5
+LOG_STORE_MAX_PENDING = 20000
+LOG_STORE_RETENTION_INTERVAL = 300
+LOG_QUERY_MAX_LIMIT = 1000
+
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS logs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        time REAL NOT NULL,
+        level TEXT NOT NULL,
+        category TEXT NOT NULL,
+        plugin TEXT,
+        umo TEXT,
+        payload TEXT NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_logs_time ON logs (time)",
+    "CREATE INDEX IF NOT EXISTS ix_logs_level_id ON logs (level, id)",
+    "CREATE INDEX IF NOT EXISTS ix_logs_category_id ON logs (category, id)",
+    "CREATE INDEX IF NOT EXISTS ix_logs_plugin_id ON logs (plugin, id)",
+    "CREATE INDEX IF NOT EXISTS ix_logs_umo_id ON logs (umo, id)",
+)
+
+
+@dataclass
+class LogQuery:
+    """日志查询条件, 同时用于过滤实时日志"""
+
+    start: float | None = None
+    end: float | None = None
+    levels: list[str] = field(default_factory=list)
+    categories: list[str] = field(default_factory=list)
+    plugin: str | None = None
+    umo: str | None = None
+    keyword: str | None = None
+    before_id: int | None = None
+    limit: int = 200
+
+    def matches(self, entry: dict) -> bool:
+        """判断一条日志是否满足查询条件 (不考虑 before_id 与 limit)"""
+        ts = float(entry.get("time", 0))
+        if self.start is not None and ts < self.start:
+            return False
+        if self.end is not None and ts > self.end:
+            return False
+        if self.levels and entry.get("level") not in self.levels:
+            return False
+        if self.categories and _entry_category(entry) not in self.categories:
+            return False
+        if self.plugin and entry.get("plugin") != self.plugin:
+            return False
+        if self.umo and entry.get("umo") != self.umo:
+            return False
+        if self.keyword:
+            return self.keyword in json.dumps(entry, ensure_ascii=False)
+        return True
+
+
+def _entry_category(entry: dict) -> str:
+    if entry.get("type") == "trace":
+        return "trace"
+    return entry.get("category") or "system"
+
+
+class LogStore:
+    """基于 SQLite 的日志存储, 按大小与时间保留日志"""
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int = 200 * 1024 * 1024,
+        retention_days: float = 7,
+    ) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.retention_days = retention_days
+        self.dropped = 0
+        self._pending: queue.Queue[dict | None] = queue.Queue(LOG_STORE_MAX_PENDING)
+        self._thread: threading.Thread | None = None
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def start(self) -> None:
+        """建表并启动后台写入线程"""
+        if self._thread is not None:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            # auto_vacuum 只能在建表前设置, 删除日志后通过 incremental_vacuum 收缩文件
+            conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            for statement in _SCHEMA:
+                conn.execute(statement)
+            conn.commit()
+        finally:
+            conn.close()
+        self._thread = threading.Thread(
+            target=self._run,
+            name="astrbot-log-store",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def append(self, entry: dict) -> None:
+        """提交一条日志。可在任意线程调用, 不会阻塞"""
+        try:
+            self._pending.put_nowait(entry)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self, timeout: float = 5) -> None:
+        """写入剩余的日志并停止后台线程"""
+        if self._thread is None:
+            return
+        try:
+            self._pending.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _next_batch(self) -> tuple[list[dict], bool]:
+        """取出一批待写入的日志, 第二个返回值表示是否收到了停止信号"""
+        batch: list[dict] = []
+        try:
+            entry = self._pending.get(timeout=LOG_STORE_FLUSH_INTERVAL)
+        except queue.Empty:
+            return batch, False
+        while entry is not None:
+            batch.append(entry)
+            if len(batch) >= LOG_STORE_BATCH_SIZE:
+                return batch, False
+            try:
+                entry = self._pending.get_nowait()
+            except queue.Empty:
+                return batch, False
+        return batch, True
+
+    def _run(self) -> None:
+        conn = self._connect()
+        last_retention = 0.0
+        try:
+            stopping = False
+            while not stopping:
+                batch, stopping = self._next_batch()
+                try:
+                    if batch:
+                        self._write(conn, batch)
+                    now = time.time()
+                    if now - last_retention >= LOG_STORE_RETENTION_INTERVAL:
+                        last_retention = now
+                        self.apply_retention(conn)
+                except sqlite3.Error as e:
+                    # 不能使用 logger, 否则写入失败的日志会再次进入队列
+                    print(f"[LogStore] 写入日志失败: {e}", file=sys.stderr)
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _write(conn: sqlite3.Connection, batch: list[dict]) -> None:
+        conn.executemany(
+            "INSERT INTO logs (time, level, category, plugin, umo, payload) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    float(entry.get("time", 0)),
+                    str(entry.get("level", "INFO")),
+                    _entry_category(entry),
+                    entry.get("plugin"),
+                    entry.get("umo"),
+                    json.dumps(entry, ensure_ascii=False, default=str),
+                )
+                for entry in batch
+            ],
+        )
+        conn.commit()
+
+    def apply_retention(self, conn: sqlite3.Connection | None = None) -> int:
+        """删除超出保留时间的日志, 并在超出大小上限时删除最早的日志。返回删除的条数"""
+        own_conn = conn is None
+        conn = conn or self._connect()
+        try:
+            deleted = 0
+            if self.retention_days > 0:
+                cutoff = time.time() - self.retention_days * 86400
+                deleted += conn.execute(
+                    "DELETE FROM logs WHERE time < ?",
+                    (cutoff,),
+                ).rowcount
+            if self.max_bytes > 0:
+                page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+                pages = conn.execute("PRAGMA page_count").fetchone()[0]
+                free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+                used = (pages - free) * page_size
+                if used > self.max_bytes:
+                    total = conn.execute("SELECT COUNT(*) FROM logs").fetchone()[0]
+                    # 多删除 10%, 避免每次检查都刚好超出上限
+                    ratio = 1 - self.max_bytes / used + 0.1
+                    count = min(total, int(total * ratio) + 1)
+                    deleted += conn.execute(
+                        "DELETE FROM logs WHERE id IN "
+                        "(SELECT id FROM logs ORDER BY id LIMIT ?)",
+                        (count,),
+                    ).rowcount
+            conn.commit()
+            if deleted:
+                conn.execute("PRAGMA incremental_vacuum").fetchall()
+            return deleted
+        finally:
+            if own_conn:
+                conn.close()
+
+    def query(self, q: LogQuery) -> dict:
+        """按条件查询日志, 按时间倒序返回, 通过 next_before_id 继续向前翻页"""
+        conditions: list[str] = []
+        params: list = []
+        if q.start is not None:
+            conditions.append("time >= ?")
+            params.append(q.start)
+        if q.end is not None:
+            conditions.append("time <= ?")
+            params.append(q.end)
+        if q.levels:
+            conditions.append(f"level IN ({', '.join('?' * len(q.levels))})")
+            params.extend(q.levels)
+        if q.categories:
+            placeholders = ", ".join("?" * len(q.categories))
+            conditions.append(f"category IN ({placeholders})")
+            params.extend(q.categories)
+        if q.plugin:
+            conditions.append("plugin = ?")
+            params.append(q.plugin)
+        if q.umo:
+            conditions.append("umo = ?")
+            params.append(q.umo)
+        if q.keyword:
+            conditions.append("instr(payload, ?) > 0")
+            params.append(q.keyword)
+        if q.before_id is not None:
+            conditions.append("id < ?")
+            params.append(q.before_id)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        limit = max(1, min(q.limit, LOG_QUERY_MAX_LIMIT))
+
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                f"SELECT id, payload FROM logs {where} ORDER BY id DESC LIMIT ?",
+                [*params, limit + 1],
+            ).fetchall()
+        finally:
+            conn.close()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        return {
+            "logs": [json.loads(payload) for _, payload in rows],
+            "next_before_id": rows[-1][0] if has_more else None,
+        }
+
+    def entries_since(self, ts: float, limit: int = LOG_QUERY_MAX_LIMIT) -> list[dict]:
+        """按时间顺序返回 ts 之后的日志, 用于断线重连时补发"""
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT payload FROM (SELECT id, payload FROM logs WHERE time > ? "
+                "ORDER BY id DESC LIMIT ?) ORDER BY id",
+                (ts, limit),
+            ).fetchall()
+        finally:
+            conn.close()
+        return [json.loads(payload) for (payload,) in rows]
+
+    def stats(self) -> dict:
+        conn = self._connect()
+        try:
+            count, oldest = conn.execute(
+                "SELECT COUNT(*), MIN(time) FROM logs",
+            ).fetchone()
+        finally:
+            conn.close()
+        return {
+            "count": count,
+            "oldest": oldest,
+            "file_size": os.path.getsize(self.path),
+            "max_bytes": self.max_bytes,
+            "retention_days": self.retention_days,
+            "pending": self._pending.qsize(),
+            "dropped": self.dropped,
+        }
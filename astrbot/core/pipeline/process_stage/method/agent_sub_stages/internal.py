@@ -15,6 +15,7 @@ from astrbot.core.agent.message import (
 from astrbot.core.agent.response import AgentStats
 from astrbot.core.astr_main_agent import (
     LLM_ERROR_MESSAGE_EXTRA_KEY,
+    LOADED_HISTORY_EXTRA_KEY,
     MainAgentBuildConfig,
     MainAgentBuildResult,
     build_main_agent,
@@ -28,6 +29,7 @@ from astrbot.core.message.message_event_result import (
 from astrbot.core.persona_error_reply import (
     extract_persona_custom_error_message_from_event,
 )
+from astrbot.core.pipeline.rate_limit_check.limiter import charge_llm_tokens
 from astrbot.core.pipeline.stage import Stage
 from astrbot.core.platform.astr_message_event import AstrMessageEvent
 from astrbot.core.provider.entities import (
@@ -152,6 +154,7 @@ class InternalAgentSubStage(Stage):
             subagent_orchestrator=conf.get("subagent_orchestrator", {}),
             timezone=self.ctx.plugin_manager.context.get_config().get("timezone"),
             max_quoted_fallback_images=settings.get("max_quoted_fallback_images", 20),
+            request_build_timeout=settings.get("request_build_timeout", 30),
         )
 
     async def _send_llm_error_message(
@@ -424,6 +427,8 @@ class InternalAgentSubStage(Stage):
                 finally:
                     if runner_registered and agent_runner is not None:
                         unregister_active_runner(event.unified_msg_origin, agent_runner)
+                    if agent_runner is not None and agent_runner.stats is not None:
+                        charge_llm_tokens(event, agent_runner.stats.token_usage.total)
 
         except Exception as e:
             logger.error(f"Error occurred while processing agent: {e}")
@@ -483,12 +488,7 @@ class InternalAgentSubStage(Stage):
                 )
             if has_checkpoint or (llm_response is None and req.tool_calls_result):
                 token_usage = None if has_checkpoint else req.conversation.token_usage
-                await self.conv_manager.update_conversation(
-                    event.unified_msg_origin,
-                    req.conversation.cid,
-                    history=message_to_save,
-                    token_usage=token_usage,
-                )
+                await self._persist_history(event, req, message_to_save, token_usage)
             return
 
         if llm_response and llm_response.role != "assistant":
@@ -529,10 +529,33 @@ class InternalAgentSubStage(Stage):
             # token_usage = runner_stats.token_usage.total
             token_usage = llm_response.usage.total if llm_response.usage else None
 
+        await self._persist_history(event, req, message_to_save, token_usage)
+
+    async def _persist_history(
+        self,
+        event: AstrMessageEvent,
+        req: ProviderRequest,
+        history: list[dict],
+        token_usage: int | None,
+    ) -> None:
+        conversation = req.conversation
+        assert conversation is not None
+        loaded = event.get_extra(LOADED_HISTORY_EXTRA_KEY)
+        if isinstance(loaded, list):
+            # 只写入本轮的变化, 而不是重写整个历史记录
+            await self.conv_manager.sync_conversation_history(
+                event.unified_msg_origin,
+                conversation.cid,
+                loaded=loaded,
+                history=history,
+                stored_count=conversation.message_count,
+                token_usage=token_usage,
+            )
+            return
         await self.conv_manager.update_conversation(
             event.unified_msg_origin,
-            req.conversation.cid,
-            history=message_to_save,
+            conversation.cid,
+            history=history,
             token_usage=token_usage,
         )
 
@@ -11,6 +11,7 @@ from astrbot.core.star.star import star_map
 from astrbot.core.star.star_handler import EventType, StarHandlerMetadata
 
 from ...context import PipelineContext, call_event_hook, call_handler
+from ...profiler import KIND_HANDLER, profile_stream
 from ..stage import Stage
 
 
@@ -45,7 +46,13 @@ class StarRequestSubStage(Stage):
                 continue
             logger.debug(f"plugin -> {md.name} - {handler.handler_name}")
             try:
-                wrapper = call_handler(event, handler.handler, **params)
+                wrapper = profile_stream(
+                    call_handler(event, handler.handler, **params),
+                    KIND_HANDLER,
+                    handler.handler_full_name,
+                    self.ctx.astrbot_config_id,
+                    event.get_platform_name(),
+                )
                 async for ret in wrapper:
                     yield ret
                 if event.is_stopped():
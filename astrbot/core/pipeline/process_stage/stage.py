@@ -5,6 +5,7 @@ from astrbot.core.provider.entities import ProviderRequest
 from astrbot.core.star.star_handler import StarHandlerMetadata
 
 from ..context import PipelineContext
+from ..profiler import KIND_STAGE, profile_stream
 from ..stage import Stage, register_stage
 from .method.agent_request import AgentRequestSubStage
 from .method.star_request import StarRequestSubStage
@@ -25,6 +26,16 @@ class ProcessStage(Stage):
         self.star_request_sub_stage = StarRequestSubStage()
         await self.star_request_sub_stage.initialize(ctx)
 
+    def _run_agent_sub_stage(self, event: AstrMessageEvent) -> AsyncGenerator:
+        # 单独统计 LLM 请求的耗时, 以便与插件 Handler 区分
+        return profile_stream(
+            self.agent_sub_stage.process(event),
+            KIND_STAGE,
+            "ProcessStage.AgentRequestSubStage",
+            self.ctx.astrbot_config_id,
+            event.get_platform_name(),
+        )
+
     async def process(
         self,
         event: AstrMessageEvent,
@@ -41,7 +52,7 @@ class ProcessStage(Stage):
                     # Handler 的 LLM 请求
                     event.set_extra("provider_request", resp)
                     _t = False
-                    async for _ in self.agent_sub_stage.process(event):
+                    async for _ in self._run_agent_sub_stage(event):
                         _t = True
                         yield
                     if not _t:
@@ -62,5 +73,5 @@ class ProcessStage(Stage):
             if (
                 event.get_result() and not event.is_stopped()
             ) or not event.get_result():
-                async for _ in self.agent_sub_stage.process(event):
+                async for _ in self._run_agent_sub_stage(event):
                     yield
@@ -0,0 +1,157 @@
+"""消息管道性能剖析
+
+记录每个 Stage 与插件 Handler 的耗时, 按 conf_id 与平台分别统计到延迟直方图中。
+洋葱模型下, Stage 的耗时分为两段:
+
+- pre: 从开始执行到 yield (或执行结束) 的耗时, 不包括后续 Stage
+- post: 后续 Stage 执行完毕恢复执行后, 到下一次 yield (或执行结束) 的耗时
+
+未启用时调用方只需检查 enabled 属性, 不会产生额外的计时与包装开销。
+"""
+
+from __future__ import annotations
+
+import time
+from collections.abc import AsyncGenerator
+from typing import Any
+
+from astrbot.core.utils.latency_histogram import LatencyHistogram
+
+KIND_STAGE = "stage"
+KIND_HANDLER = "handler"
+
+_PROMETHEUS_METRICS = {
+    KIND_STAGE: (
+        "astrbot_pipeline_stage_duration_seconds",
+        "stage",
+        "Time spent in each pipeline stage, excluding the stages it wraps.",
+    ),
+    KIND_HANDLER: (
+        "astrbot_plugin_handler_duration_seconds",
+        "handler",
+        "Time spent in each plugin handler.",
+    ),
+}
+
+# (kind, name, phase, conf_id, platform)
+ProfileKey = tuple[str, str, str, str, str]
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_bound(bound: float) -> str:
+    return "+Inf" if bound == float("inf") else repr(float(bound))
+
+
+class PipelineProfiler:
+    """管道耗时统计"""
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.started_at = time.time()
+        self._histograms: dict[ProfileKey, LatencyHistogram] = {}
+
+    def record(
+        self,
+        kind: str,
+        name: str,
+        phase: str,
+        conf_id: str,
+        platform: str,
+        seconds: float,
+    ) -> None:
+        key = (kind, name, phase, conf_id, platform)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = LatencyHistogram()
+        histogram.record(seconds)
+
+    async def profile_stream(
+        self,
+        agen: AsyncGenerator[Any, None],
+        kind: str,
+        name: str,
+        conf_id: str,
+        platform: str,
+    ) -> AsyncGenerator[Any, None]:
+        """包装一个洋葱模型的异步生成器, 分别记录 yield 前后两段的耗时"""
+        phase = "pre"
+        started = time.perf_counter()
+        async for item in agen:
+            elapsed = time.perf_counter() - started
+            self.record(kind, name, phase, conf_id, platform, elapsed)
+            yield item
+            phase = "post"
+            started = time.perf_counter()
+        elapsed = time.perf_counter() - started
+        self.record(kind, name, phase, conf_id, platform, elapsed)
+
+    def reset(self) -> None:
+        self._histograms.clear()
+        self.started_at = time.time()
+
+    def snapshot(self) -> dict:
+        entries = []
+        for key, histogram in self._histograms.items():
+            kind, name, phase, conf_id, platform = key
+            entries.append(
+                {
+                    "kind": kind,
+                    "name": name,
+                    "phase": phase,
+                    "conf_id": conf_id,
+                    "platform": platform,
+                    **histogram.snapshot(),
+                },
+            )
+        entries.sort(key=lambda entry: entry["sum"], reverse=True)
+        return {
+            "enabled": self.enabled,
+            "started_at": self.started_at,
+            "entries": entries,
+        }
+
+    def render_prometheus(self) -> str:
+        """以 Prometheus 文本格式导出所有直方图"""
+        lines: list[str] = []
+        for kind, (metric, name_label, help_text) in _PROMETHEUS_METRICS.items():
+            series = [
+                (key, histogram)
+                for key, histogram in sorted(self._histograms.items())
+                if key[0] == kind
+            ]
+            if not series:
+                continue
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} histogram")
+            for (_, name, phase, conf_id, platform), histogram in series:
+                labels = (
+                    f'{name_label}="{_escape_label(name)}",'
+                    f'phase="{phase}",'
+                    f'conf_id="{_escape_label(conf_id)}",'
+                    f'platform="{_escape_label(platform)}"'
+                )
+                for bound, count in histogram.cumulative_buckets():
+                    le = _format_bound(bound)
+                    lines.append(f'{metric}_bucket{{{labels},le="{le}"}} {count}')
+                lines.append(f"{metric}_sum{{{labels}}} {histogram.total}")
+                lines.append(f"{metric}_count{{{labels}}} {histogram.count}")
+        return "\n".join(lines) + "\n" if lines else ""
+
+
+pipeline_profiler = PipelineProfiler()
+
+
+def profile_stream(
+    agen: AsyncGenerator[Any, None],
+    kind: str,
+    name: str,
+    conf_id: str,
+    platform: str,
+) -> AsyncGenerator[Any, None]:
+    """启用性能剖析时包装异步生成器, 否则原样返回"""
+    if not pipeline_profiler.enabled:
+        return agen
+    return pipeline_profiler.profile_stream(agen, kind, name, conf_id, platform)
@@ -0,0 +1,224 @@
+"""基于 GCRA (Generic Cell Rate Algorithm) 的多层级限流器
+
+每个限流键只保存一个浮点数 TAT (Theoretical Arrival Time, 理论到达时间):
+
+- 发射间隔 T = period / limit, 每消耗 1 个单位 TAT 向后推移 T
+- 请求的新 TAT 为 max(TAT, now) + cost * T, 当 now < 新 TAT - period 时拒绝
+- 允许的突发量为 limit, 长期速率为 limit / period
+
+TAT 不晚于当前时间的键与新键等价, 可以直接淘汰, 因此内存只与活跃的键数量相关。
+
+消息计数类规则在处理前按 1 计费; LLM Token 类规则在处理前只检查是否已耗尽额度,
+模型调用结束后再按实际消耗的 Token 数计费。
+"""
+
+from __future__ import annotations
+
+import time
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from astrbot.core.platform.astr_message_event import AstrMessageEvent
+
+# 模型调用结束后用于计费 Token 的回调, 由 RateLimitStage 写入事件的 extra
+TOKEN_CHARGE_EXTRA_KEY = "_rate_limit_token_charge"
+
+UNIT_MESSAGE = "message"
+UNIT_TOKEN = "token"
+
+
+@dataclass(frozen=True)
+class RateLimitRule:
+    """限流规则
+
+    scope 为规则的作用范围 (session, user, group, platform, global),
+    limit 为 period 秒内允许的消息数或 LLM Token 数。
+    """
+
+    scope: str
+    limit: float
+    period: float
+    unit: str = UNIT_MESSAGE
+
+    @property
+    def emission_interval(self) -> float:
+        return self.period / self.limit
+
+
+@dataclass
+class RateLimitOptions:
+    """限流配置, 对应 platform_settings.rate_limit
+
+    count / time 为会话级限制 (与旧版行为一致), *_count 为其他层级在相同时间窗口内的
+    消息数限制, *_token_quota 为 token_time 秒内的 LLM Token 额度。0 表示不限制。
+    """
+
+    time: float = 60
+    count: int = 30
+    strategy: str = "stall"
+    user_count: int = 0
+    group_count: int = 0
+    platform_count: int = 0
+    global_count: int = 0
+    token_time: float = 3600
+    user_token_quota: int = 0
+    group_token_quota: int = 0
+    global_token_quota: int = 0
+    persist_state: bool = False
+
+    @classmethod
+    def from_config(cls, config: dict) -> RateLimitOptions:
+        def _int(key: str, default: int) -> int:
+            return max(0, int(config.get(key, default) or 0))
+
+        def _period(key: str, default: float) -> float:
+            return max(0.0, float(config.get(key, default) or 0))
+
+        return cls(
+            time=_period("time", 60),
+            count=_int("count", 30),
+            strategy=config.get("strategy", "stall"),
+            user_count=_int("user_count", 0),
+            group_count=_int("group_count", 0),
+            platform_count=_int("platform_count", 0),
+            global_count=_int("global_count", 0),
+            token_time=_period("token_time", 3600),
+            user_token_quota=_int("user_token_quota", 0),
+            group_token_quota=_int("group_token_quota", 0),
+            global_token_quota=_int("global_token_quota", 0),
+            persist_state=bool(config.get("persist_state", False)),
+        )
+
+    def rules(self) -> list[RateLimitRule]:
+        """返回所有生效的规则, limit 或 period 为 0 的规则会被忽略"""
+        candidates = [
+            RateLimitRule("session", self.count, self.time),
+            RateLimitRule("user", self.user_count, self.time),
+            RateLimitRule("group", self.group_count, self.time),
+            RateLimitRule("platform", self.platform_count, self.time),
+            RateLimitRule("global", self.global_count, self.time),
+            RateLimitRule("user", self.user_token_quota, self.token_time, UNIT_TOKEN),
+            RateLimitRule("group", self.group_token_quota, self.token_time, UNIT_TOKEN),
+            RateLimitRule(
+                "global", self.global_token_quota, self.token_time, UNIT_TOKEN
+            ),
+        ]
+        return [rule for rule in candidates if rule.limit > 0 and rule.period > 0]
+
+
+def scope_identity(event: AstrMessageEvent, scope: str) -> str | None:
+    """返回事件在指定作用范围内的标识, 不适用时 (例如私聊没有群组) 返回 None"""
+    match scope:
+        case "session":
+            return event.session_id
+        case "user":
+            return f"{event.get_platform_id()}:{event.get_sender_id()}"
+        case "group":
+            group_id = event.get_group_id()
+            return f"{event.get_platform_id()}:{group_id}" if group_id else None
+        case "platform":
+            return event.get_platform_id()
+        case "global":
+            return "*"
+    return None
+
+
+def rule_key(rule: RateLimitRule, identity: str) -> str:
+    return f"{rule.unit}:{rule.scope}:{identity}"
+
+
+class GCRALimiter:
+    """GCRA 限流器, 同时检查多个层级的规则
+
+    clock 默认使用 time.time, 以便持久化的状态在重启后依然有效。
+    """
+
+    def __init__(
+        self,
+        clock: Callable[[], float] = time.time,
+        sweep_interval: float = 60.0,
+    ) -> None:
+        self._clock = clock
+        self._tat: dict[str, float] = {}
+        self._sweep_interval = sweep_interval
+        self._last_sweep = clock()
+        self.dirty = False
+
+    def __len__(self) -> int:
+        return len(self._tat)
+
+    def now(self) -> float:
+        return self._clock()
+
+    def acquire(self, requests: Iterable[tuple[str, RateLimitRule, float]]) -> float:
+        """尝试为所有 (key, rule, cost) 计费
+
+        所有规则都允许时才会一起提交并返回 0, 否则不修改任何状态,
+        返回需要等待的秒数 (各层级中的最大值)。
+        """
+        now = self._clock()
+        self._maybe_sweep(now)
+
+        updates: list[tuple[str, float]] = []
+        retry_after = 0.0
+        for key, rule, cost in requests:
+            tat = max(self._tat.get(key, now), now)
+            new_tat = tat + cost * rule.emission_interval
+            allow_at = new_tat - rule.period
+            if allow_at > now:
+                retry_after = max(retry_after, allow_at - now)
+            elif cost:
+                updates.append((key, new_tat))
+
+        if retry_after > 0:
+            return retry_after
+        for key, new_tat in updates:
+            self._tat[key] = new_tat
+        if updates:
+            self.dirty = True
+        return 0.0
+
+    def charge(self, key: str, rule: RateLimitRule, cost: float) -> None:
+        """无条件计费, 用于事后统计的 LLM Token 消耗"""
+        if cost <= 0:
+            return
+        now = self._clock()
+        self._tat[key] = (
+            max(self._tat.get(key, now), now) + cost * rule.emission_interval
+        )
+        self.dirty = True
+
+    def _maybe_sweep(self, now: float) -> None:
+        if now - self._last_sweep >= self._sweep_interval:
+            self.sweep(now)
+
+    def sweep(self, now: float | None = None) -> int:
+        """淘汰已恢复为初始状态的键, 返回淘汰的数量"""
+        now = self._clock() if now is None else now
+        self._last_sweep = now
+        expired = [key for key, tat in self._tat.items() if tat <= now]
+        for key in expired:
+            del self._tat[key]
+        return len(expired)
+
+    def export_state(self) -> dict[str, float]:
+        """导出仍处于限流窗口内的键"""
+        now = self._clock()
+        return {key: tat for key, tat in self._tat.items() if tat > now}
+
+    def load_state(self, state: dict[str, float]) -> None:
+        now = self._clock()
+        for key, tat in state.items():
+            if tat > now:
+                self._tat[key] = max(self._tat.get(key, 0.0), tat)
+
+
+def charge_llm_tokens(event: AstrMessageEvent, tokens: int) -> None:
+    """按模型调用实际消耗的 Token 数为该事件涉及的 Token 额度计费"""
+    if tokens <= 0:
+        return
+    charge = event.get_extra(TOKEN_CHARGE_EXTRA_KEY)
+    if callable(charge):
+        charge(tokens)
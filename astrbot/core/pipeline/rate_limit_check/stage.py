@@ -1,105 +1,144 @@
 import asyncio
-from collections import defaultdict, deque
 from collections.abc import AsyncGenerator
-from datetime import datetime, timedelta
+from functools import partial
 
-from astrbot.core import logger
+from astrbot.core import db_helper, logger
 from astrbot.core.config.astrbot_config import RateLimitStrategy
 from astrbot.core.platform.astr_message_event import AstrMessageEvent
 
 from ..context import PipelineContext
 from ..stage import Stage, register_stage
+from .limiter import (
+    TOKEN_CHARGE_EXTRA_KEY,
+    UNIT_TOKEN,
+    GCRALimiter,
+    RateLimitOptions,
+    RateLimitRule,
+    rule_key,
+    scope_identity,
+)
+
+# 持久化限流状态的最小间隔 (秒)
+PERSIST_INTERVAL = 30.0
+# STALL 策略唤醒后重新检查前的额外等待时间 (秒)
+STALL_MARGIN = 0.3
 
 
 @register_stage
 class RateLimitStage(Stage):
     """检查是否需要限制消息发送的限流器。
 
-    使用 Fixed Window 算法。
-    如果触发限流，将 stall 流水线，直到下一个时间窗口来临时自动唤醒。
+    使用 GCRA 算法, 每个限流键只保存一个时间戳, 空闲的键会被定期淘汰。
+    支持会话、用户、群组、平台与全局多个层级的消息数限制, 以及用户、群组与全局的
+    LLM Token 额度。任一层级触发限流时, 按配置的策略 stall 流水线直到额度恢复, 或丢弃该消息。
     """
 
     def __init__(self) -> None:
-        # 存储每个会话的请求时间队列
-        self.event_timestamps: defaultdict[str, deque[datetime]] = defaultdict(deque)
-        # 为每个会话设置一个锁，避免并发冲突
-        self.locks: defaultdict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
-        # 限流参数
-        self.rate_limit_count: int = 0
-        self.rate_limit_time: timedelta = timedelta(0)
+        self.limiter = GCRALimiter()
+        self.options = RateLimitOptions()
+        self.rules: list[RateLimitRule] = self.options.rules()
+        self.rl_strategy = self.options.strategy
+        self.conf_id = ""
+        self._last_persist = 0.0
+        self._persist_task: asyncio.Task | None = None
 
     async def initialize(self, ctx: PipelineContext) -> None:
-        """初始化限流器，根据配置设置限流参数。"""
-        self.rate_limit_count = ctx.astrbot_config["platform_settings"]["rate_limit"][
-            "count"
-        ]
-        self.rate_limit_time = timedelta(
-            seconds=ctx.astrbot_config["platform_settings"]["rate_limit"]["time"],
+        """初始化限流器，根据配置设置限流规则。"""
+        self.options = RateLimitOptions.from_config(
+            ctx.astrbot_config["platform_settings"]["rate_limit"],
         )
-        self.rl_strategy = ctx.astrbot_config["platform_settings"]["rate_limit"][
-            "strategy"
-        ]  # stall or discard
+        self.rules = self.options.rules()
+        self.rl_strategy = self.options.strategy  # stall or discard
+        self.conf_id = ctx.astrbot_config_id
+        if self.options.persist_state and self.rules:
+            try:
+                states = await db_helper.get_rate_limit_states(self.conf_id)
+                self.limiter.load_state({s.key: s.tat for s in states})
+            except Exception as e:
+                logger.warning(f"Failed to load rate limit states: {e}")
+        self._last_persist = self.limiter.now()
 
     async def process(
         self,
         event: AstrMessageEvent,
     ) -> None | AsyncGenerator[None, None]:
-        """检查并处理限流逻辑。如果触发限流，流水线会 stall 并在窗口期后自动恢复。
+        """检查并处理限流逻辑。如果触发限流，流水线会 stall 并在额度恢复后自动继续。
 
         Args:
             event (AstrMessageEvent): 当前消息事件。
-            ctx (PipelineContext): 流水线上下文。
-
-        Returns:
-            MessageEventResult: 继续或停止事件处理的结果。
 
         """
-        session_id = event.session_id
-
-        async with self.locks[session_id]:  # 确保同一会话不会并发修改队列
-            now = datetime.now()
-            # 检查并处理限流，可能需要多次检查直到满足条件
-            while True:
-                timestamps = self.event_timestamps[session_id]
-                self._remove_expired_timestamps(timestamps, now)
-
-                if self.rate_limit_count <= 0:
-                    break
-                if len(timestamps) < self.rate_limit_count:
-                    timestamps.append(now)
-                    break
-                next_window_time = timestamps[0] + self.rate_limit_time
-                stall_duration = (next_window_time - now).total_seconds() + 0.3
-
-                match self.rl_strategy:
-                    case RateLimitStrategy.STALL.value:
-                        logger.info(
-                            f"Session {session_id} was rate-limited. Processing will "
-                            f"pause for {stall_duration:.2f} seconds according to the "
-                            "rate-limit policy.",
-                        )
-                        await asyncio.sleep(stall_duration)
-                        now = datetime.now()
-                    case RateLimitStrategy.DISCARD.value:
-                        logger.info(
-                            f"Session {session_id} was rate-limited. This request was "
-                            "discarded according to the rate-limit policy; the limit "
-                            f"resets in {stall_duration:.2f} seconds.",
-                        )
-                        return event.stop_event()
-
-    def _remove_expired_timestamps(
+        if not self.rules:
+            return
+
+        requests = []
+        token_keys: list[tuple[str, RateLimitRule]] = []
+        for rule in self.rules:
+            identity = scope_identity(event, rule.scope)
+            if identity is None:
+                continue
+            key = rule_key(rule, identity)
+            if rule.unit == UNIT_TOKEN:
+                # Token 额度在处理前只检查是否已耗尽, 模型调用结束后再计费
+                requests.append((key, rule, 0))
+                token_keys.append((key, rule))
+            else:
+                requests.append((key, rule, 1))
+
+        # 等待期间不持有任何锁, 唤醒后重新检查所有层级
+        while retry_after := self.limiter.acquire(requests):
+            stall_duration = retry_after + STALL_MARGIN
+            match self.rl_strategy:
+                case RateLimitStrategy.STALL.value:
+                    logger.info(
+                        f"Session {event.session_id} was rate-limited. Processing "
+                        f"will pause for {stall_duration:.2f} seconds according to "
+                        "the rate-limit policy.",
+                    )
+                    await asyncio.sleep(stall_duration)
+                case RateLimitStrategy.DISCARD.value:
+                    logger.info(
+                        f"Session {event.session_id} was rate-limited. This request "
+                        "was discarded according to the rate-limit policy; the limit "
+                        f"resets in {stall_duration:.2f} seconds.",
+                    )
+                    return event.stop_event()
+                case _:
+                    return
+
+        if token_keys:
+            event.set_extra(
+                TOKEN_CHARGE_EXTRA_KEY,
+                partial(self._charge_tokens, token_keys),
+            )
+        self._maybe_persist()
+
+    def _charge_tokens(
         self,
-        timestamps: deque[datetime],
-        now: datetime,
+        token_keys: list[tuple[str, RateLimitRule]],
+        tokens: int,
     ) -> None:
-        """移除时间窗口外的时间戳。
-
-        Args:
-            timestamps (Deque[datetime]): 当前会话的时间戳队列。
-            now (datetime): 当前时间，用于计算过期时间。
+        for key, rule in token_keys:
+            self.limiter.charge(key, rule, tokens)
+        self._maybe_persist()
+
+    def _maybe_persist(self) -> None:
+        if not self.options.persist_state or not self.limiter.dirty:
+            return
+        now = self.limiter.now()
+        if now - self._last_persist < PERSIST_INTERVAL:
+            return
+        if self._persist_task and not self._persist_task.done():
+            return
+        self._last_persist = now
+        self.limiter.dirty = False
+        self._persist_task = asyncio.create_task(
+            self._persist(self.limiter.export_state()),
+        )
 
-        """
-        expiry_threshold: datetime = now - self.rate_limit_time
-        while timestamps and timestamps[0] < expiry_threshold:
-            timestamps.popleft()
+    async def _persist(self, states: dict[str, float]) -> None:
+        try:
+            await db_helper.replace_rate_limit_states(self.conf_id, states)
+        except Exception as e:
+            self.limiter.dirty = True
+            logger.warning(f"Failed to persist rate limit states: {e}")
@@ -12,6 +12,10 @@ from astrbot.core.star.star_handler import EventType
 from astrbot.core.utils.path_util import path_Mapping
 
 from ..context import PipelineContext, call_event_hook
+from ..result_decorate.tts_synthesis import (
+    resolve_pending_segment,
+    resolve_pending_segments,
+)
 from ..stage import Stage, register_stage
 
 
@@ -267,22 +271,28 @@ class RespondStage(Stage):
                         f"actual_chain: {result.chain}",
                     )
                     return
-                for comp in result.chain:
-                    i = await self._calc_comp_interval(comp)
+                sent_chain: list[BaseMessageComponent] = []
+                for seg in result.chain:
+                    i = await self._calc_comp_interval(seg)
                     await asyncio.sleep(i)
-                    try:
-                        if comp.type in need_separately:
-                            await event.send(result.derive([comp]))
-                        else:
-                            await event.send(result.derive([*header_comps, comp]))
-                            header_comps.clear()
-                    except Exception as e:
-                        logger.error(
-                            "Failed to send the message chain: "
-                            f"chain = {MessageChain([comp])}, error = {e}",
-                            exc_info=True,
-                        )
+                    # 语音分段可能仍在合成, 发送到该分段时再等待
+                    for comp in await resolve_pending_segment(event, seg):
+                        sent_chain.append(comp)
+                        try:
+                            if comp.type in need_separately:
+                                await event.send(result.derive([comp]))
+                            else:
+                                await event.send(result.derive([*header_comps, comp]))
+                                header_comps.clear()
+                        except Exception as e:
+                            logger.error(
+                                "Failed to send the message chain: "
+                                f"chain = {MessageChain([comp])}, error = {e}",
+                                exc_info=True,
+                            )
+                result.chain[:] = sent_chain
             else:
+                result.chain = await resolve_pending_segments(event, result.chain)
                 if all(
                     comp.type in {ComponentType.Reply, ComponentType.At}
                     for comp in result.chain
@@ -1,11 +1,21 @@
+import asyncio
 import random
 import re
 import time
 import traceback
-from collections.abc import AsyncGenerator
+from collections.abc import AsyncGenerator, Awaitable
 
 from astrbot.core import file_token_service, html_renderer, logger
-from astrbot.core.message.components import At, Image, Json, Node, Plain, Record, Reply
+from astrbot.core.message.components import (
+    At,
+    BaseMessageComponent,
+    Image,
+    Json,
+    Node,
+    Plain,
+    Record,
+    Reply,
+)
 from astrbot.core.message.message_event_result import ResultContentType
 from astrbot.core.pipeline.content_safety_check.stage import ContentSafetyCheckStage
 from astrbot.core.platform.astr_message_event import AstrMessageEvent
@@ -16,6 +26,7 @@ from astrbot.core.star.star_handler import EventType, star_handlers_registry
 
 from ..context import PipelineContext
 from ..stage import Stage, register_stage, registered_stages
+from .tts_synthesis import PENDING_TTS_EXTRA_KEY, synthesize_segments
 
 
 @register_stage
@@ -54,6 +65,18 @@ class ResultDecorateStage(Stage):
             )
         except (TypeError, ValueError):
             self.tts_trigger_probability = 1.0
+        try:
+            self.tts_synthesis_concurrency = max(
+                1,
+                int(
+                    ctx.astrbot_config["provider_tts_settings"].get(
+                        "synthesis_concurrency",
+                        3,
+                    ),
+                ),
+            )
+        except (TypeError, ValueError):
+            self.tts_synthesis_concurrency = 3
 
         # 分段回复
         self.words_count_threshold = int(
@@ -123,6 +146,46 @@ class ResultDecorateStage(Stage):
                 result.append(seg)
         return result if result else [text]
 
+    async def _build_tts_components(
+        self,
+        comp: Plain,
+        audio_path: Awaitable[str | None],
+    ) -> list[BaseMessageComponent]:
+        """等待分段的语音合成完成, 返回替换该分段的消息段。合成失败时保留原文本"""
+        try:
+            path = await audio_path
+            if not path:
+                logger.error(
+                    "Failed to convert the message segment to speech "
+                    f"because no TTS audio file was found: {comp.text}",
+                )
+                return [comp]
+
+            use_file_service = self.ctx.astrbot_config["provider_tts_settings"][
+                "use_file_service"
+            ]
+            callback_api_base = self.ctx.astrbot_config["callback_api_base"]
+            dual_output = self.ctx.astrbot_config["provider_tts_settings"][
+                "dual_output"
+            ]
+
+            url = None
+            if use_file_service and callback_api_base:
+                token = await file_token_service.register_file(path)
+                url = f"{callback_api_base}/api/file/{token}"
+                logger.debug(f"Registered: {url}")
+
+            components: list[BaseMessageComponent] = [
+                Record(file=url or path, url=url or path, text=comp.text),
+            ]
+            if dual_output:
+                components.append(comp)
+            return components
+        except Exception:
+            logger.error(traceback.format_exc())
+            logger.error("TTS failed; sending text instead.")
+            return [comp]
+
     async def process(
         self,
         event: AstrMessageEvent,
@@ -311,55 +374,34 @@ class ResultDecorateStage(Stage):
                     )
 
             if should_tts and tts_provider:
+                targets = [
+                    comp
+                    for comp in result.chain
+                    if isinstance(comp, Plain) and len(comp.text) > 1
+                ]
+                audio_paths = synthesize_segments(
+                    tts_provider,
+                    [comp.text for comp in targets],
+                    self.tts_synthesis_concurrency,
+                )
+                segments = dict(zip(map(id, targets), audio_paths))
+                # 只等待第一段, 其余分段由 RespondStage 在发送到该分段时再等待
+                pending: dict[int, asyncio.Task] = {}
                 new_chain = []
                 for comp in result.chain:
-                    if isinstance(comp, Plain) and len(comp.text) > 1:
-                        try:
-                            logger.info(f"TTS request: {comp.text}")
-                            audio_path = await tts_provider.get_audio(comp.text)
-                            logger.info(f"TTS result: {audio_path}")
-                            if not audio_path:
-                                logger.error(
-                                    "Failed to convert the message segment to speech "
-                                    f"because no TTS audio file was found: {comp.text}",
-                                )
-                                new_chain.append(comp)
-                                continue
-
-                            use_file_service = self.ctx.astrbot_config[
-                                "provider_tts_settings"
-                            ]["use_file_service"]
-                            callback_api_base = self.ctx.astrbot_config[
-                                "callback_api_base"
-                            ]
-                            dual_output = self.ctx.astrbot_config[
-                                "provider_tts_settings"
-                            ]["dual_output"]
-
-                            url = None
-                            if use_file_service and callback_api_base:
-                                token = await file_token_service.register_file(
-                                    audio_path,
-                                )
-                                url = f"{callback_api_base}/api/file/{token}"
-                                logger.debug(f"Registered: {url}")
-
-                            new_chain.append(
-                                Record(
-                                    file=url or audio_path,
-                                    url=url or audio_path,
-                                    text=comp.text,
-                                ),
-                            )
-                            if dual_output:
-                                new_chain.append(comp)
-                        except Exception:
-                            logger.error(traceback.format_exc())
-                            logger.error("TTS failed; sending text instead.")
-                            new_chain.append(comp)
+                    audio_path = segments.pop(id(comp), None)
+                    if audio_path is None:
+                        new_chain.append(comp)
+                        continue
+                    components = self._build_tts_components(comp, audio_path)
+                    if comp is targets[0]:
+                        new_chain.extend(await components)
                     else:
+                        pending[id(comp)] = asyncio.create_task(components)
                         new_chain.append(comp)
                 result.chain = new_chain
+                if pending:
+                    event.set_extra(PENDING_TTS_EXTRA_KEY, pending)
 
             # 文本转图片
             elif (
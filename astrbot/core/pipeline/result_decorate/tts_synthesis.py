@@ -0,0 +1,186 @@
+"""分段回复的 TTS 合成
+
+所有分段同时开始合成, 并按分段顺序返回结果。ResultDecorateStage 只等待第一段,
+其余分段在 RespondStage 发送到对应位置时再等待, 从而第一段语音可以在后续分段仍在合成时
+先发送出去。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import uuid
+from collections.abc import Awaitable
+
+from astrbot.core import logger
+from astrbot.core.message.components import BaseMessageComponent
+from astrbot.core.platform.astr_message_event import AstrMessageEvent
+from astrbot.core.provider.provider import TTSProvider
+from astrbot.core.utils.astrbot_path import get_astrbot_temp_path
+from astrbot.core.utils.tts_audio_cache import tts_audio_cache
+
+PENDING_TTS_EXTRA_KEY = "_pending_tts_segments"
+"""event extra 中尚未合成完成的分段: {id(占位 Plain): 合成后的消息段 Task}"""
+
+_background_tasks: set[asyncio.Task] = set()
+
+
+async def _synthesize(
+    provider: TTSProvider,
+    text: str,
+    semaphore: asyncio.Semaphore,
+) -> str | None:
+    key = tts_audio_cache.make_key(provider, text)
+    if cached := await tts_audio_cache.get(key):
+        logger.debug(f"TTS cache hit: {text}")
+        return cached
+    async with semaphore:
+        logger.info(f"TTS request: {text}")
+        audio_path = await provider.get_audio(text)
+        logger.info(f"TTS result: {audio_path}")
+    if audio_path:
+        await tts_audio_cache.put(key, audio_path)
+    return audio_path
+
+
+def _write_temp_audio(data: bytes) -> str:
+    temp_dir = get_astrbot_temp_path()
+    os.makedirs(temp_dir, exist_ok=True)
+    path = os.path.join(temp_dir, f"tts_stream_{uuid.uuid4().hex}.wav")
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
+
+
+async def _synthesize_stream(
+    provider: TTSProvider,
+    texts: list[str],
+    futures: list[asyncio.Future[str | None]],
+    concurrency: int,
+) -> None:
+    """通过一个 get_audio_stream 会话依次合成未命中缓存的分段
+
+    流式输出按 (文本, 音频) 中的文本对应到分段; 提供商可能合并文本或跳过失败的分段,
+    流结束后仍未得到音频的分段改为逐段调用 get_audio 合成。
+    """
+    # 文本 -> 按顺序等待该文本音频的 (缓存键, Future)
+    pending: dict[str, list[tuple[str, asyncio.Future[str | None]]]] = {}
+    text_queue: asyncio.Queue[str | None] = asyncio.Queue()
+    audio_queue: asyncio.Queue[bytes | tuple[str, bytes] | None] = asyncio.Queue()
+    for text, future in zip(texts, futures):
+        key = tts_audio_cache.make_key(provider, text)
+        if cached := await tts_audio_cache.get(key):
+            future.set_result(cached)
+        else:
+            pending.setdefault(text, []).append((key, future))
+            text_queue.put_nowait(text)
+    if not pending:
+        return
+    text_queue.put_nowait(None)
+
+    async def produce() -> None:
+        try:
+            await provider.get_audio_stream(text_queue, audio_queue)
+        except Exception as e:
+            logger.error(f"流式 TTS 合成失败: {e}", exc_info=True)
+        finally:
+            await audio_queue.put(None)
+
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def fallback(text: str, future: asyncio.Future[str | None]) -> None:
+        try:
+            path = await _synthesize(provider, text, semaphore)
+        except Exception as e:
+            logger.error(f"TTS 合成失败: {e}", exc_info=True)
+            path = None
+        if not future.done():
+            future.set_result(path)
+
+    producer = asyncio.create_task(produce())
+    try:
+        try:
+            while any(pending.values()):
+                item = await audio_queue.get()
+                if item is None:
+                    break
+                if not isinstance(item, tuple) or not pending.get(item[0]):
+                    logger.debug("流式 TTS 返回的音频无法对应到分段, 已忽略")
+                    continue
+                text, data = item
+                key, future = pending[text].pop(0)
+                path = await asyncio.to_thread(_write_temp_audio, data)
+                logger.info(f"TTS result: {path}")
+                await tts_audio_cache.put(key, path)
+                future.set_result(path)
+            await producer
+        except Exception as e:
+            logger.error(f"流式 TTS 合成失败: {e}", exc_info=True)
+        finally:
+            producer.cancel()
+
+        unresolved = [
+            (text, future) for text, future in zip(texts, futures) if not future.done()
+        ]
+        if unresolved:
+            logger.warning(
+                f"流式 TTS 未返回 {len(unresolved)} 个分段的音频, 改为逐段合成",
+            )
+            await asyncio.gather(*(fallback(t, f) for t, f in unresolved))
+    finally:
+        for future in futures:
+            if not future.done():
+                future.set_result(None)
+
+
+def synthesize_segments(
+    provider: TTSProvider,
+    texts: list[str],
+    concurrency: int,
+) -> list[Awaitable[str | None]]:
+    """开始合成所有分段, 按分段顺序返回各分段音频文件路径的 Awaitable
+
+    支持流式 TTS 的提供商在同一个会话中按顺序合成, 每段合成完毕即可使用,
+    流式会话没有返回音频的分段再逐段合成; 其余提供商最多同时发起 concurrency 个 get_audio 请求。
+    命中 TTS 音频缓存的分段不会请求提供商。
+    """
+    if provider.support_stream():
+        loop = asyncio.get_running_loop()
+        futures: list[asyncio.Future[str | None]] = [
+            loop.create_future() for _ in texts
+        ]
+        task = asyncio.create_task(
+            _synthesize_stream(provider, texts, futures, concurrency),
+        )
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+        return list(futures)
+
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    return [
+        asyncio.create_task(_synthesize(provider, text, semaphore)) for text in texts
+    ]
+
+
+async def resolve_pending_segment(
+    event: AstrMessageEvent,
+    comp: BaseMessageComponent,
+) -> list[BaseMessageComponent]:
+    """等待该消息段的 TTS 合成完成, 返回用于替换它的消息段"""
+    pending: dict | None = event.get_extra(PENDING_TTS_EXTRA_KEY)
+    if not pending or (task := pending.pop(id(comp), None)) is None:
+        return [comp]
+    return await task
+
+
+async def resolve_pending_segments(
+    event: AstrMessageEvent,
+    chain: list[BaseMessageComponent],
+) -> list[BaseMessageComponent]:
+    """等待消息链中所有分段的 TTS 合成完成"""
+    if not event.get_extra(PENDING_TTS_EXTRA_KEY):
+        return chain
+    resolved: list[BaseMessageComponent] = []
+    for comp in chain:
+        resolved.extend(await resolve_pending_segment(event, comp))
+    return resolved
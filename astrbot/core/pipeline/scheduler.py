@@ -1,7 +1,9 @@
+import time
 from collections.abc import AsyncGenerator
 from typing import cast
 
 from astrbot.core import logger
+from astrbot.core.log import log_umo
 from astrbot.core.platform import AstrMessageEvent
 from astrbot.core.platform.sources.webchat.webchat_event import WebChatMessageEvent
 from astrbot.core.platform.sources.wecom_ai_bot.wecomai_event import (
@@ -11,6 +13,7 @@ from astrbot.core.utils.active_event_registry import active_event_registry
 
 from .bootstrap import ensure_builtin_stages_registered
 from .context import PipelineContext
+from .profiler import KIND_STAGE, pipeline_profiler
 from .stage import Stage, registered_stages
 from .stage_order import STAGES_ORDER
 
@@ -41,9 +44,11 @@ class PipelineScheduler:
             from_stage (int): 从第几个阶段开始执行, 默认从0开始
 
         """
+        profiling = pipeline_profiler.enabled
         for i in range(from_stage, len(self.stages)):
             stage = self.stages[i]  # 获取当前要执行的阶段
             # logger.debug(f"执行阶段 {stage.__class__.__name__}")
+            started = time.perf_counter() if profiling else 0.0
             coroutine = stage.process(
                 event,
             )  # 调用阶段的process方法, 返回协程或者异步生成器
@@ -51,6 +56,15 @@ class PipelineScheduler:
             if isinstance(coroutine, AsyncGenerator):
                 # 如果返回的是异步生成器, 实现洋葱模型的核心
                 agen = cast(AsyncGenerator[None], coroutine)
+                if profiling:
+                    # 分别记录 yield 前 (pre) 与后续阶段返回后 (post) 的耗时
+                    agen = pipeline_profiler.profile_stream(
+                        agen,
+                        KIND_STAGE,
+                        stage.__class__.__name__,
+                        self.ctx.astrbot_config_id,
+                        event.get_platform_name(),
+                    )
                 async for _ in agen:
                     # 此处是前置处理完成后的暂停点(yield), 下面开始执行后续阶段
                     if event.is_stopped():
@@ -72,6 +86,15 @@ class PipelineScheduler:
                 # 如果返回的是普通协程(不含yield的async函数), 则不进入下一层(基线条件)
                 # 简单地等待它执行完成, 然后继续执行下一个阶段
                 await coroutine
+                if profiling:
+                    pipeline_profiler.record(
+                        KIND_STAGE,
+                        stage.__class__.__name__,
+                        "pre",
+                        self.ctx.astrbot_config_id,
+                        event.get_platform_name(),
+                        time.perf_counter() - started,
+                    )
 
                 if event.is_stopped():
                     logger.debug(
@@ -88,13 +111,14 @@ class PipelineScheduler:
         """
         active_event_registry.register(event)
         try:
-            await self._process_stages(event)
+            with log_umo(event.unified_msg_origin):
+                await self._process_stages(event)
 
-            # 发送一个空消息, 以便于后续的处理
-            if isinstance(event, WebChatMessageEvent | WecomAIBotMessageEvent):
-                await event.send(None)
+                # 发送一个空消息, 以便于后续的处理
+                if isinstance(event, WebChatMessageEvent | WecomAIBotMessageEvent):
+                    await event.send(None)
 
-            logger.debug("pipeline execution completed.")
+                logger.debug("pipeline execution completed.")
         finally:
             event.cleanup_temporary_local_files()
             active_event_registry.unregister(event)
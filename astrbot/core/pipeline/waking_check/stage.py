@@ -9,7 +9,7 @@ from astrbot.core.star.filter.command_group import CommandGroupFilter
 from astrbot.core.star.filter.permission import PermissionTypeFilter
 from astrbot.core.star.session_plugin_manager import SessionPluginManager
 from astrbot.core.star.star import star_map
-from astrbot.core.star.star_handler import EventType, star_handlers_registry
+from astrbot.core.star.star_handler import star_handlers_registry
 
 from ..context import PipelineContext
 from ..stage import Stage, register_stage
@@ -164,8 +164,9 @@ class WakingCheckStage(Stage):
             event.plugins_name = enabled_plugins_name
         logger.debug(f"enabled_plugins_name: {enabled_plugins_name}")
 
-        for handler in star_handlers_registry.get_handlers_by_event_type(
-            EventType.AdapterMessageEvent,
+        # 通过分发索引只评估指令名、正则、平台或消息类型可能匹配的 handler
+        for handler in star_handlers_registry.get_message_handler_candidates(
+            event,
             plugins_name=event.plugins_name,
         ):
             if (
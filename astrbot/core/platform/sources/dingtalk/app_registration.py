@@ -4,6 +4,8 @@ from typing import Any
 
 import aiohttp
 
+from astrbot.core.utils.http_client import http_client
+
 DEFAULT_DINGTALK_REGISTRATION_BASE_URL = "https://oapi.dingtalk.com"
 DEFAULT_DINGTALK_REGISTRATION_SOURCE = "DING_DWS_CLAW"
 
@@ -53,7 +55,7 @@ async def _post_registration(
     payload: dict[str, str],
 ) -> tuple[int, dict[str, Any]]:
     timeout = aiohttp.ClientTimeout(total=15)
-    async with aiohttp.ClientSession(timeout=timeout, trust_env=True) as session:
+    async with http_client.session(timeout=timeout, trust_env=True) as session:
         async with session.post(
             f"{dingtalk_registration_base_url()}{path}",
             json=payload,
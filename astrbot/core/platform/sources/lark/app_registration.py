@@ -4,6 +4,8 @@ from urllib.parse import urlencode
 
 import aiohttp
 
+from astrbot.core.utils.http_client import http_client
+
 DEFAULT_FEISHU_OPEN_DOMAIN = "https://open.feishu.cn"
 DEFAULT_LARK_OPEN_DOMAIN = "https://open.larksuite.com"
 APP_REGISTRATION_PATH = "/oauth/v1/app/registration"
@@ -75,7 +77,7 @@ async def _post_registration(
     form: dict[str, str],
 ) -> tuple[int, dict[str, Any]]:
     timeout = aiohttp.ClientTimeout(total=15)
-    async with aiohttp.ClientSession(timeout=timeout, trust_env=True) as session:
+    async with http_client.session(timeout=timeout, trust_env=True) as session:
         async with session.post(
             endpoint,
             data=form,
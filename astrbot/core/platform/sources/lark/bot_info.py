@@ -3,6 +3,8 @@ from typing import Any
 
 import aiohttp
 
+from astrbot.core.utils.http_client import http_client
+
 from .app_registration import DEFAULT_FEISHU_OPEN_DOMAIN, DEFAULT_LARK_OPEN_DOMAIN
 
 TENANT_ACCESS_TOKEN_INTERNAL_PATH = "/open-apis/auth/v3/tenant_access_token/internal"
@@ -34,7 +36,7 @@ async def _post_json(
     payload: dict[str, str],
 ) -> dict[str, Any]:
     timeout = aiohttp.ClientTimeout(total=15)
-    async with aiohttp.ClientSession(timeout=timeout, trust_env=True) as session:
+    async with http_client.session(timeout=timeout, trust_env=True) as session:
         async with session.post(endpoint, json=payload) as response:
             data = await response.json(content_type=None)
     if not isinstance(data, dict):
@@ -48,7 +50,7 @@ async def _get_json(
     headers: dict[str, str],
 ) -> dict[str, Any]:
     timeout = aiohttp.ClientTimeout(total=15)
-    async with aiohttp.ClientSession(timeout=timeout, trust_env=True) as session:
+    async with http_client.session(timeout=timeout, trust_env=True) as session:
         async with session.get(endpoint, headers=headers) as response:
             data = await response.json(content_type=None)
     if not isinstance(data, dict):
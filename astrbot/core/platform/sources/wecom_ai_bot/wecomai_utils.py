@@ -13,6 +13,7 @@ import aiohttp
 from Crypto.Cipher import AES
 
 from astrbot.api import logger
+from astrbot.core.utils.http_client import http_client
 
 
 # 常量定义
@@ -169,7 +170,7 @@ async def process_encrypted_image(
     # 1. 下载加密图片
     logger.info("开始下载加密图片: %s", image_url)
     try:
-        async with aiohttp.ClientSession() as session:
+        async with http_client.session() as session:
             async with session.get(image_url, timeout=15) as response:
                 response.raise_for_status()
                 encrypted_data = await response.read()
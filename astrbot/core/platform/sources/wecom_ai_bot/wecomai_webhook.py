@@ -14,6 +14,7 @@ import aiohttp
 from astrbot.api import logger
 from astrbot.api.event import MessageChain
 from astrbot.api.message_components import At, File, Image, Plain, Record, Video
+from astrbot.core.utils.http_client import http_client
 from astrbot.core.utils.media_utils import convert_audio_format
 
 
@@ -64,7 +65,7 @@ class WecomAIBotWebhookClient:
 
     async def send_payload(self, payload: dict[str, Any]) -> None:
         timeout = aiohttp.ClientTimeout(total=self.timeout_seconds)
-        async with aiohttp.ClientSession(timeout=timeout) as session:
+        async with http_client.session(timeout=timeout) as session:
             async with session.post(self.webhook_url, json=payload) as response:
                 text = await response.text()
                 if response.status != 200:
@@ -118,7 +119,7 @@ class WecomAIBotWebhookClient:
         )
 
         timeout = aiohttp.ClientTimeout(total=self.timeout_seconds)
-        async with aiohttp.ClientSession(timeout=timeout) as session:
+        async with http_client.session(timeout=timeout) as session:
             async with session.post(
                 self._build_upload_url(media_type),
                 data=form,
@@ -122,6 +122,30 @@ class PlatformMessageHistoryManager:
         history.reverse()
         return history
 
+    async def get_by_cursor(
+        self,
+        platform_id: str,
+        user_id: str,
+        page_size: int = 200,
+        cursor: str | None = None,
+    ) -> tuple[list[PlatformMessageHistory], str | None]:
+        """Get a page of platform message history with keyset pagination.
+
+        The cursor continues towards older messages, and the records of a page
+        are returned oldest first like `get`.
+
+        Raises:
+            ValueError: If the cursor is malformed.
+        """
+        history, next_cursor = await self.db.get_platform_message_history_by_cursor(
+            platform_id=platform_id,
+            user_id=user_id,
+            page_size=page_size,
+            cursor=cursor,
+        )
+        history.reverse()
+        return history, next_cursor
+
     async def delete(
         self, platform_id: str, user_id: str, offset_sec: int = 86400
     ) -> None:
@@ -25,6 +25,7 @@ from astrbot.core.tools.registry import (
     iter_builtin_tool_classes,
 )
 from astrbot.core.utils.astrbot_path import get_astrbot_data_path
+from astrbot.core.utils.http_client import http_client
 
 DEFAULT_MCP_CONFIG = {"mcpServers": {}}
 
@@ -167,7 +168,7 @@ async def _quick_test_mcp_connection(config: dict) -> tuple[bool, str]:
     timeout = cfg.get("timeout", 10)
 
     try:
-        async with aiohttp.ClientSession() as session:
+        async with http_client.session() as session:
             if cfg.get("transport") == "streamable_http":
                 test_payload = {
                     "jsonrpc": "2.0",
@@ -1155,7 +1156,7 @@ class FunctionToolManager:
         }
 
         try:
-            async with aiohttp.ClientSession() as session:
+            async with http_client.session() as session:
                 async with session.get(url, headers=headers) as response:
                     if response.status == 200:
                         data = await response.json()
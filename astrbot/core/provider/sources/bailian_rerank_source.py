@@ -5,6 +5,7 @@ from urllib.parse import urlsplit
 import aiohttp
 
 from astrbot import logger
+from astrbot.core.utils.http_client import http_client
 
 from ..entities import ProviderType, RerankResult
 from ..provider import RerankProvider
@@ -69,7 +70,7 @@ class BailianRerankProvider(RerankProvider):
             "Content-Type": "application/json",
         }
 
-        self.client = aiohttp.ClientSession(
+        self.client = http_client.session(
             headers=headers, timeout=aiohttp.ClientTimeout(total=self.timeout)
         )
 
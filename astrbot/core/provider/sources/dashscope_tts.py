@@ -16,6 +16,7 @@ except (
 
 from astrbot.core.utils.astrbot_path import get_astrbot_temp_path
 from astrbot.core.utils.datetime_utils import generate_timestamp_id
+from astrbot.core.utils.http_client import http_client
 
 from ..entities import ProviderType
 from ..provider import TTSProvider
@@ -122,7 +123,7 @@ class ProviderDashscopeTTSAPI(TTSProvider):
         timeout = max(self.timeout_ms / 1000, 1) if self.timeout_ms else 20
         try:
             async with (
-                aiohttp.ClientSession() as session,
+                http_client.session() as session,
                 session.get(
                     url,
                     timeout=aiohttp.ClientTimeout(total=timeout),
@@ -6,6 +6,7 @@ import aiohttp
 from astrbot import logger
 from astrbot.core.utils.astrbot_path import get_astrbot_temp_path
 from astrbot.core.utils.datetime_utils import generate_timestamp_id
+from astrbot.core.utils.http_client import http_client
 
 from ..entities import ProviderType
 from ..provider import TTSProvider
@@ -41,7 +42,7 @@ class ProviderGSVTTS(TTSProvider):
 
     async def initialize(self) -> None:
         """异步初始化：在 ProviderManager 中被调用"""
-        self._session = aiohttp.ClientSession(
+        self._session = http_client.session(
             timeout=aiohttp.ClientTimeout(total=self.timeout),
         )
         try:
@@ -1,9 +1,8 @@
 from pathlib import Path
 
-import aiohttp
-
 from astrbot.core.utils.astrbot_path import get_astrbot_temp_path
 from astrbot.core.utils.datetime_utils import generate_timestamp_id
+from astrbot.core.utils.http_client import http_client
 
 from ..entities import ProviderType
 from ..provider import TTSProvider
@@ -50,7 +49,7 @@ class ProviderGSVITTS(TTSProvider):
             "text_lang": self.text_lang,
         }
 
-        async with aiohttp.ClientSession() as session:
+        async with http_client.session() as session:
             async with session.post(url, json=data, headers=headers) as response:
                 if response.status == 200:
                     resp_json = await response.json()
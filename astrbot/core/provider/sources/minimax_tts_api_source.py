@@ -7,6 +7,7 @@ import aiohttp
 from astrbot.api import logger
 from astrbot.core.utils.astrbot_path import get_astrbot_temp_path
 from astrbot.core.utils.datetime_utils import generate_timestamp_id
+from astrbot.core.utils.http_client import http_client
 
 from ..entities import ProviderType
 from ..provider import TTSProvider
@@ -103,7 +104,7 @@ class ProviderMiniMaxTTSAPI(TTSProvider):
         """进行流式请求"""
         try:
             async with (
-                aiohttp.ClientSession() as session,
+                http_client.session() as session,
                 session.post(
                     self.concat_base_url,
                     headers=self.headers,
@@ -1,6 +1,7 @@
 import aiohttp
 
 from astrbot import logger
+from astrbot.core.utils.http_client import http_client
 
 from ..entities import ProviderType, RerankResult
 from ..provider import RerankProvider
@@ -36,7 +37,7 @@ class NvidiaRerankProvider(RerankProvider):
                 "Content-Type": "application/json",
                 "Accept": "application/json",
             }
-            self.client = aiohttp.ClientSession(
+            self.client = http_client.session(
                 headers=headers, timeout=aiohttp.ClientTimeout(total=self.timeout)
             )
         return self.client
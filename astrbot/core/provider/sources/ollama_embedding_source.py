@@ -1,6 +1,7 @@
 import aiohttp
 
 from astrbot import logger
+from astrbot.core.utils.http_client import http_client
 
 from ..entities import ProviderType
 from ..provider import EmbeddingProvider
@@ -41,7 +42,7 @@ class OllamaEmbeddingProvider(EmbeddingProvider):
                 "Accept": "application/json",
             }
             timeout = aiohttp.ClientTimeout(total=self.timeout)
-            self.client = aiohttp.ClientSession(
+            self.client = http_client.session(
                 headers=headers,
                 timeout=timeout,
             )
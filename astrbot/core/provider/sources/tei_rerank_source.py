@@ -1,6 +1,7 @@
 import aiohttp
 
 from astrbot import logger
+from astrbot.core.utils.http_client import http_client
 
 from ..entities import ProviderType, RerankResult
 from ..provider import RerankProvider
@@ -34,7 +35,7 @@ class TEIRerankProvider(RerankProvider):
         h = {}
         if self.api_key:
             h["Authorization"] = f"Bearer {self.api_key}"
-        self.client = aiohttp.ClientSession(
+        self.client = http_client.session(
             headers=h,
             timeout=aiohttp.ClientTimeout(total=self.timeout),
         )
@@ -1,5 +1,7 @@
 import aiohttp
 
+from astrbot.core.utils.http_client import http_client
+
 from ..entities import ProviderType, RerankResult
 from ..provider import RerankProvider
 from ..register import register_provider_adapter
@@ -29,7 +31,7 @@ class VLLMRerankProvider(RerankProvider):
         h = {}
         if self.auth_key:
             h["Authorization"] = f"Bearer {self.auth_key}"
-        self.client = aiohttp.ClientSession(
+        self.client = http_client.session(
             headers=h,
             timeout=aiohttp.ClientTimeout(total=self.timeout),
         )
@@ -0,0 +1,204 @@
+"""消息事件 Handler 分发索引
+
+WakingCheckStage 需要为每条消息找出可能被触发的 Handler。逐个评估所有 Handler 的
+event_filters 的开销随插件数量线性增长, 因此在 Handler 注册表变化后预先构建索引:
+
+- 指令 (CommandFilter / CommandGroupFilter): 以完整指令名 (包括别名和指令组前缀) 建立前缀树
+- 正则 (RegexFilter): 合并为预编译的组合正则, 未命中时整组跳过, 命中后再逐个确认
+- 其他 Handler: 按平台 (PlatformAdapterTypeFilter) 与消息类型 (EventMessageTypeFilter) 分桶
+
+索引只负责缩小候选范围, 候选 Handler 仍会完整执行自身的 event_filters, 匹配语义保持不变。
+"""
+
+from __future__ import annotations
+
+import re
+from collections.abc import Iterable
+
+from astrbot.core.platform.astr_message_event import AstrMessageEvent
+from astrbot.core.platform.message_type import MessageType
+
+from .filter.command import CommandFilter
+from .filter.command_group import CommandGroupFilter
+from .filter.event_message_type import EventMessageTypeFilter
+from .filter.platform_adapter_type import PlatformAdapterTypeFilter
+from .filter.regex import RegexFilter
+from .star_handler import EventType, StarHandlerMetadata
+
+_WHITESPACE = re.compile(r"\s+")
+# 无法安全合并的正则: 开头的全局内联标志、反向引用
+_GLOBAL_INLINE_FLAGS = re.compile(r"^\(\?[aiLmsux]+\)")
+_BACKREFERENCE = re.compile(r"\\[1-9]|\(\?P=")
+
+
+class _TrieNode:
+    __slots__ = ("children", "handler_ids")
+
+    def __init__(self) -> None:
+        self.children: dict[str, _TrieNode] = {}
+        self.handler_ids: list[int] = []
+
+
+class _BucketProbe:
+    """仅提供平台与消息类型信息, 用于预先评估分桶类 filter"""
+
+    __slots__ = ("message_type", "platform_name")
+
+    def __init__(self, platform_name: str, message_type: MessageType) -> None:
+        self.platform_name = platform_name
+        self.message_type = message_type
+
+    def get_platform_name(self) -> str:
+        return self.platform_name
+
+    def get_message_type(self) -> MessageType:
+        return self.message_type
+
+
+class HandlerDispatchIndex:
+    """AdapterMessageEvent Handler 的分发索引
+
+    Handler 以其在注册表中的位置 (即优先级顺序) 作为编号, match 返回的候选
+    Handler 与线性遍历注册表时的顺序一致。
+    """
+
+    def __init__(self, handlers: Iterable[StarHandlerMetadata]) -> None:
+        self.handlers: list[StarHandlerMetadata] = []
+        self._command_trie = _TrieNode()
+        # (组合正则, [(原正则, handler_id)]): 组合正则命中后再逐个确认
+        self._regex_groups: list[tuple[re.Pattern, list[tuple[re.Pattern, int]]]] = []
+        self._generic_ids: list[int] = []
+        self._bucket_cache: dict[tuple[str, MessageType], list[int]] = {}
+
+        regex_handlers: list[tuple[re.Pattern, int]] = []
+        for handler in handlers:
+            if handler.event_type != EventType.AdapterMessageEvent:
+                continue
+            if not handler.event_filters:
+                continue
+            handler_id = len(self.handlers)
+            self.handlers.append(handler)
+
+            command_filter = next(
+                (
+                    f
+                    for f in handler.event_filters
+                    if isinstance(f, CommandFilter | CommandGroupFilter)
+                ),
+                None,
+            )
+            if command_filter is not None:
+                # filter 之间为 AND 关系, 只需按其中一个指令 filter 建索引
+                for name in command_filter.get_complete_command_names():
+                    self._insert_command(name, handler_id)
+                continue
+
+            regex_filter = next(
+                (f for f in handler.event_filters if isinstance(f, RegexFilter)),
+                None,
+            )
+            if regex_filter is not None:
+                regex_handlers.append((regex_filter.regex, handler_id))
+                continue
+
+            self._generic_ids.append(handler_id)
+
+        self._build_regex_groups(regex_handlers)
+
+    @property
+    def size(self) -> int:
+        return len(self.handlers)
+
+    def _insert_command(self, name: str, handler_id: int) -> None:
+        node = self._command_trie
+        for char in name:
+            node = node.children.setdefault(char, _TrieNode())
+        if handler_id not in node.handler_ids:
+            node.handler_ids.append(handler_id)
+
+    def _build_regex_groups(self, regex_handlers: list[tuple[re.Pattern, int]]) -> None:
+        by_flags: dict[int, list[tuple[re.Pattern, int]]] = {}
+        for regex, handler_id in regex_handlers:
+            pattern = regex.pattern
+            if (
+                not isinstance(pattern, str)
+                or _GLOBAL_INLINE_FLAGS.match(pattern)
+                or _BACKREFERENCE.search(pattern)
+            ):
+                self._regex_groups.append((regex, [(regex, handler_id)]))
+                continue
+            by_flags.setdefault(regex.flags, []).append((regex, handler_id))
+
+        for flags, group in by_flags.items():
+            if len(group) == 1:
+                self._regex_groups.append((group[0][0], group))
+                continue
+            try:
+                combined = re.compile(
+                    "|".join(f"(?:{regex.pattern})" for regex, _ in group),
+                    flags,
+                )
+            except re.error:
+                # 例如不同正则中存在同名分组, 退回逐个匹配
+                self._regex_groups.extend(
+                    (regex, [(regex, hid)]) for regex, hid in group
+                )
+                continue
+            self._regex_groups.append((combined, group))
+
+    def _walk_commands(self, text: str, candidates: set[int]) -> None:
+        node = self._command_trie
+        candidates.update(node.handler_ids)
+        for char in text:
+            child = node.children.get(char)
+            if child is None:
+                return
+            node = child
+            candidates.update(node.handler_ids)
+
+    def _bucket(self, platform_name: str, message_type: MessageType) -> list[int]:
+        key = (platform_name, message_type)
+        handler_ids = self._bucket_cache.get(key)
+        if handler_ids is not None:
+            return handler_ids
+
+        probe = _BucketProbe(platform_name, message_type)
+        handler_ids = []
+        for handler_id in self._generic_ids:
+            for f in self.handlers[handler_id].event_filters:
+                if type(f) in (PlatformAdapterTypeFilter, EventMessageTypeFilter):
+                    if not f.filter(probe, None):  # type: ignore[arg-type]
+                        break
+            else:
+                handler_ids.append(handler_id)
+        self._bucket_cache[key] = handler_ids
+        return handler_ids
+
+    def match(self, event: AstrMessageEvent) -> list[StarHandlerMetadata]:
+        """返回可能被该事件触发的 Handler, 按优先级排序"""
+        candidates: set[int] = set(
+            self._bucket(event.get_platform_name(), event.get_message_type()),
+        )
+
+        # 指令 filter 仅在唤醒后生效
+        if event.is_at_or_wake_command:
+            # CommandFilter 使用规整空白后的文本, CommandGroupFilter 使用原始文本
+            raw_text = event.message_str
+            normalized = _WHITESPACE.sub(" ", event.get_message_str().strip())
+            self._walk_commands(normalized, candidates)
+            if raw_text != normalized:
+                self._walk_commands(raw_text, candidates)
+
+        if self._regex_groups:
+            text = event.get_message_str().strip()
+            for combined, members in self._regex_groups:
+                if not combined.search(text):
+                    continue
+                if len(members) == 1:
+                    candidates.add(members[0][1])
+                    continue
+                candidates.update(
+                    handler_id for regex, handler_id in members if regex.search(text)
+                )
+
+        return [self.handlers[handler_id] for handler_id in sorted(candidates)]
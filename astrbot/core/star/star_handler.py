@@ -3,11 +3,16 @@ from __future__ import annotations
 import enum
 from collections.abc import AsyncGenerator, Awaitable, Callable
 from dataclasses import dataclass, field
-from typing import Any, Generic, Literal, TypeVar, overload
+from typing import TYPE_CHECKING, Any, Generic, Literal, TypeVar, overload
 
 from .filter import HandlerFilter
 from .star import star_map
 
+if TYPE_CHECKING:
+    from astrbot.core.platform.astr_message_event import AstrMessageEvent
+
+    from .dispatch_index import HandlerDispatchIndex
+
 T = TypeVar("T", bound="StarHandlerMetadata")
 
 
@@ -15,6 +20,7 @@ class StarHandlerRegistry(Generic[T]):
     def __init__(self) -> None:
         self.star_handlers_map: dict[str, StarHandlerMetadata] = {}
         self._handlers: list[StarHandlerMetadata] = []
+        self._dispatch_index: HandlerDispatchIndex | None = None
 
     def append(self, handler: StarHandlerMetadata) -> None:
         """添加一个 Handler，并保持按优先级有序"""
@@ -24,6 +30,36 @@ class StarHandlerRegistry(Generic[T]):
         self.star_handlers_map[handler.handler_full_name] = handler
         self._handlers.append(handler)
         self._handlers.sort(key=lambda h: -h.extras_configs["priority"])
+        self.invalidate_dispatch_index()
+
+    def invalidate_dispatch_index(self) -> None:
+        """Handler 或指令名发生变化后调用, 下次分发时重建索引"""
+        self._dispatch_index = None
+
+    def get_message_handler_candidates(
+        self,
+        event: AstrMessageEvent,
+        plugins_name: list[str] | None = None,
+    ) -> list[StarHandlerMetadata]:
+        """通过分发索引获取可能处理该消息事件的 AdapterMessageEvent Handler
+
+        结果是 get_handlers_by_event_type(EventType.AdapterMessageEvent) 的子集,
+        顺序一致, 但跳过了指令名和正则都不可能匹配的 Handler。
+        """
+        if self._dispatch_index is None:
+            from .dispatch_index import HandlerDispatchIndex
+
+            self._dispatch_index = HandlerDispatchIndex(self._handlers)
+        return [
+            handler
+            for handler in self._dispatch_index.match(event)
+            if self._is_handler_available(
+                handler,
+                EventType.AdapterMessageEvent,
+                True,
+                plugins_name,
+            )
+        ]
 
     def _print_handlers(self) -> None:
         for handler in self._handlers:
@@ -153,37 +189,52 @@ class StarHandlerRegistry(Generic[T]):
         only_activated=True,
         plugins_name: list[str] | None = None,
     ) -> list[StarHandlerMetadata]:
-        handlers = []
-        for handler in self._handlers:
-            # 过滤事件类型
-            if handler.event_type != event_type:
-                continue
-            if not handler.enabled:
-                continue
-            # 过滤启用状态
-            if only_activated:
-                plugin = star_map.get(handler.handler_module_path)
-                if not (plugin and plugin.activated):
-                    continue
-            # 过滤插件白名单
-            if plugins_name is not None and plugins_name != ["*"]:
-                plugin = star_map.get(handler.handler_module_path)
-                if not plugin:
-                    continue
-                if (
-                    plugin.name not in plugins_name
-                    and event_type
-                    not in (
-                        EventType.OnAstrBotLoadedEvent,
-                        EventType.OnPlatformLoadedEvent,
-                        EventType.OnPluginLoadedEvent,
-                        EventType.OnPluginUnloadedEvent,
-                    )
-                    and not plugin.reserved
-                ):
-                    continue
-            handlers.append(handler)
-        return handlers
+        return [
+            handler
+            for handler in self._handlers
+            if self._is_handler_available(
+                handler,
+                event_type,
+                only_activated,
+                plugins_name,
+            )
+        ]
+
+    @staticmethod
+    def _is_handler_available(
+        handler: StarHandlerMetadata,
+        event_type: EventType,
+        only_activated: bool,
+        plugins_name: list[str] | None,
+    ) -> bool:
+        # 过滤事件类型
+        if handler.event_type != event_type:
+            return False
+        if not handler.enabled:
+            return False
+        # 过滤启用状态
+        if only_activated:
+            plugin = star_map.get(handler.handler_module_path)
+            if not (plugin and plugin.activated):
+                return False
+        # 过滤插件白名单
+        if plugins_name is not None and plugins_name != ["*"]:
+            plugin = star_map.get(handler.handler_module_path)
+            if not plugin:
+                return False
+            if (
+                plugin.name not in plugins_name
+                and event_type
+                not in (
+                    EventType.OnAstrBotLoadedEvent,
+                    EventType.OnPlatformLoadedEvent,
+                    EventType.OnPluginLoadedEvent,
+                    EventType.OnPluginUnloadedEvent,
+                )
+                and not plugin.reserved
+            ):
+                return False
+        return True
 
     def get_handler_by_full_name(self, full_name: str) -> StarHandlerMetadata | None:
         return self.star_handlers_map.get(full_name, None)
@@ -201,10 +252,12 @@ class StarHandlerRegistry(Generic[T]):
     def clear(self) -> None:
         self.star_handlers_map.clear()
         self._handlers.clear()
+        self.invalidate_dispatch_index()
 
     def remove(self, handler: StarHandlerMetadata) -> None:
         self.star_handlers_map.pop(handler.handler_full_name, None)
         self._handlers = [h for h in self._handlers if h != handler]
+        self.invalidate_dispatch_index()
 
     def __iter__(self):
         return iter(self._handlers)
@@ -308,6 +308,7 @@ def _decode_escaped_text(value: str) -> str:
 class FileReadTool(FunctionTool):
     name: str = "astrbot_file_read_tool"
     description: str = "read file content. Supports text, image, and PDF (text extraction), docx and epub files."
+    parallel_safe: bool = True
     parameters: dict = field(
         default_factory=lambda: {
             "type": "object",
@@ -568,6 +569,7 @@ class FileEditTool(FunctionTool):
 class GrepTool(FunctionTool):
     name: str = "astrbot_grep_tool"
     description: str = "Search and read file contents using ripgrep."
+    parallel_safe: bool = True
     parameters: dict = field(
         default_factory=lambda: {
             "type": "object",
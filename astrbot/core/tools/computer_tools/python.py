@@ -144,6 +144,7 @@ class LocalPythonTool(FunctionTool):
             current_workspace_root.mkdir(parents=True, exist_ok=True)
             result = await sb.python.exec(
                 code,
+                kernel_id=context.context.event.unified_msg_origin,
                 timeout=effective_timeout,
                 silent=silent,
                 cwd=str(current_workspace_root),
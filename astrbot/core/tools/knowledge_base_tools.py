@@ -6,6 +6,7 @@ from astrbot.core.agent.run_context import ContextWrapper
 from astrbot.core.agent.tool import FunctionTool, ToolExecResult
 from astrbot.core.astr_agent_context import AstrAgentContext
 from astrbot.core.knowledge_base.kb_helper import KBHelper
+from astrbot.core.knowledge_base.retrieval.manager import RetrievalPlan
 from astrbot.core.star.context import Context
 from astrbot.core.tools.registry import builtin_tool
 
@@ -91,6 +92,7 @@ async def retrieve_knowledge_base(
         kb_names=kb_names,
         top_k_fusion=top_k_fusion,
         top_m_final=top_k,
+        plan=RetrievalPlan.from_config(config),
     )
     if not kb_context:
         return None
@@ -113,6 +115,7 @@ class KnowledgeBaseQueryTool(FunctionTool[AstrAgentContext]):
         "definitions, background knowledge, or previously indexed content. "
         "Only send short keywords or a concise question as the query."
     )
+    parallel_safe: bool = True
     parameters: dict = Field(
         default_factory=lambda: {
             "type": "object",
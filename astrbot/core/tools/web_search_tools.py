@@ -1,10 +1,12 @@
 import asyncio
+import functools
 import json
 import uuid
+from collections.abc import Awaitable, Callable
+from dataclasses import asdict, field
 from dataclasses import dataclass as std_dataclass
-from dataclasses import field
+from typing import Any
 
-import aiohttp
 from pydantic import Field
 from pydantic.dataclasses import dataclass as pydantic_dataclass
 
@@ -12,6 +14,8 @@ from astrbot.core import logger, sp
 from astrbot.core.agent.tool import FunctionTool, ToolExecResult
 from astrbot.core.astr_agent_context import AstrAgentContext
 from astrbot.core.tools.registry import builtin_tool
+from astrbot.core.utils.http_client import http_client
+from astrbot.core.utils.web_search_cache import web_search_cache
 
 WEB_SEARCH_TOOL_NAMES = [
     "web_search_baidu",
@@ -174,6 +178,36 @@ def _search_result_payload(results: list[SearchResult]) -> str:
     return json.dumps({"results": ret_ls}, ensure_ascii=False)
 
 
+def _cached(provider: str, *, search: bool = False):
+    """Serve a provider call from the shared web search cache.
+
+    Calls with the same provider and normalized payload share one cache entry,
+    and identical concurrent calls are coalesced into a single request.
+
+    Args:
+        provider: Cache namespace of the endpoint, e.g. ``tavily_search``.
+        search: Whether the call returns ``SearchResult`` objects, which are
+            stored as plain dicts.
+    """
+
+    def decorator(
+        func: Callable[[dict, dict], Awaitable[Any]],
+    ) -> Callable[[dict, dict], Awaitable[Any]]:
+        @functools.wraps(func)
+        async def wrapper(provider_settings: dict, payload: dict) -> Any:
+            async def produce() -> Any:
+                result = await func(provider_settings, payload)
+                return [asdict(item) for item in result] if search else result
+
+            result = await web_search_cache.fetch(provider, payload, produce)
+            return [SearchResult(**item) for item in result] if search else result
+
+        return wrapper
+
+    return decorator
+
+
+@_cached("tavily_search", search=True)
 async def _tavily_search(
     provider_settings: dict,
     payload: dict,
@@ -205,7 +239,7 @@ async def _tavily_search(
             "Authorization": f"Bearer {tavily_key}",
             "Content-Type": "application/json",
         }
-        async with aiohttp.ClientSession(trust_env=True) as session:
+        async with http_client.session(trust_env=True) as session:
             async with session.post(
                 "https://api.tavily.com/search",
                 json=payload,
@@ -238,6 +272,7 @@ async def _tavily_search(
     raise Exception("Tavily web search failed with all configured keys.")
 
 
+@_cached("tavily_extract")
 async def _tavily_extract(provider_settings: dict, payload: dict) -> list[dict]:
     """Call the Tavily Extract API with API key failover.
 
@@ -265,7 +300,7 @@ async def _tavily_extract(provider_settings: dict, payload: dict) -> list[dict]:
             "Authorization": f"Bearer {tavily_key}",
             "Content-Type": "application/json",
         }
-        async with aiohttp.ClientSession(trust_env=True) as session:
+        async with http_client.session(trust_env=True) as session:
             async with session.post(
                 "https://api.tavily.com/extract",
                 json=payload,
@@ -294,6 +329,7 @@ async def _tavily_extract(provider_settings: dict, payload: dict) -> list[dict]:
     raise Exception("Tavily web extract failed with all configured keys.")
 
 
+@_cached("bocha_search", search=True)
 async def _bocha_search(
     provider_settings: dict,
     payload: dict,
@@ -327,7 +363,7 @@ async def _bocha_search(
             # See: https://github.com/aio-libs/aiohttp/issues/11898
             "Accept-Encoding": "gzip, deflate",
         }
-        async with aiohttp.ClientSession(trust_env=True) as session:
+        async with http_client.session(trust_env=True) as session:
             async with session.post(
                 "https://api.bochaai.com/v1/web-search",
                 json=payload,
@@ -360,6 +396,7 @@ async def _bocha_search(
     raise Exception("BoCha web search failed with all configured keys.")
 
 
+@_cached("brave_search", search=True)
 async def _brave_search(
     provider_settings: dict,
     payload: dict,
@@ -389,7 +426,7 @@ async def _brave_search(
             "Accept": "application/json",
             "X-Subscription-Token": brave_key,
         }
-        async with aiohttp.ClientSession(trust_env=True) as session:
+        async with http_client.session(trust_env=True) as session:
             async with session.get(
                 "https://api.search.brave.com/res/v1/web/search",
                 params=payload,
@@ -421,6 +458,7 @@ async def _brave_search(
     raise Exception("Brave web search failed with all configured keys.")
 
 
+@_cached("firecrawl_search", search=True)
 async def _firecrawl_search(
     provider_settings: dict,
     payload: dict,
@@ -450,7 +488,7 @@ async def _firecrawl_search(
             "Authorization": f"Bearer {firecrawl_key}",
             "Content-Type": "application/json",
         }
-        async with aiohttp.ClientSession(trust_env=True) as session:
+        async with http_client.session(trust_env=True) as session:
             async with session.post(
                 "https://api.firecrawl.dev/v2/search",
                 json=payload,
@@ -490,6 +528,7 @@ async def _firecrawl_search(
     raise Exception("Firecrawl web search failed with all configured keys.")
 
 
+@_cached("firecrawl_scrape")
 async def _firecrawl_scrape(provider_settings: dict, payload: dict) -> dict:
     """Call the Firecrawl Scrape API with API key failover.
 
@@ -517,7 +556,7 @@ async def _firecrawl_scrape(provider_settings: dict, payload: dict) -> dict:
             "Authorization": f"Bearer {firecrawl_key}",
             "Content-Type": "application/json",
         }
-        async with aiohttp.ClientSession(trust_env=True) as session:
+        async with http_client.session(trust_env=True) as session:
             async with session.post(
                 "https://api.firecrawl.dev/v2/scrape",
                 json=payload,
@@ -546,6 +585,7 @@ async def _firecrawl_scrape(provider_settings: dict, payload: dict) -> dict:
     raise Exception("Firecrawl web scraper failed with all configured keys.")
 
 
+@_cached("baidu_search", search=True)
 async def _baidu_search(
     provider_settings: dict,
     payload: dict,
@@ -559,7 +599,7 @@ async def _baidu_search(
         "X-Appbuilder-Authorization": f"Bearer {api_key}",
         "Content-Type": "application/json",
     }
-    async with aiohttp.ClientSession(trust_env=True) as session:
+    async with http_client.session(trust_env=True) as session:
         async with session.post(
             "https://qianfan.baidubce.com/v2/ai_search/web_search",
             json=payload,
@@ -592,6 +632,7 @@ class TavilyWebSearchTool(FunctionTool[AstrAgentContext]):
         "A web search tool that uses Tavily to search the web for relevant content. "
         "Ideal for gathering current information, news, and detailed web content analysis."
     )
+    parallel_safe: bool = True
     parameters: dict = Field(
         default_factory=lambda: {
             "type": "object",
@@ -676,6 +717,7 @@ class TavilyWebSearchTool(FunctionTool[AstrAgentContext]):
 class TavilyExtractWebPageTool(FunctionTool[AstrAgentContext]):
     name: str = "tavily_extract_web_page"
     description: str = "Extract the content of a web page using Tavily."
+    parallel_safe: bool = True
     parameters: dict = Field(
         default_factory=lambda: {
             "type": "object",
@@ -726,6 +768,7 @@ class BochaWebSearchTool(FunctionTool[AstrAgentContext]):
         "A web search tool based on Bocha Search API, used to retrieve web pages "
         "related to the user's query."
     )
+    parallel_safe: bool = True
     parameters: dict = Field(
         default_factory=lambda: {
             "type": "object",
@@ -787,6 +830,7 @@ class BochaWebSearchTool(FunctionTool[AstrAgentContext]):
 class BraveWebSearchTool(FunctionTool[AstrAgentContext]):
     name: str = "web_search_brave"
     description: str = "A web search tool based on Brave Search API."
+    parallel_safe: bool = True
     parameters: dict = Field(
         default_factory=lambda: {
             "type": "object",
@@ -848,6 +892,7 @@ class FirecrawlWebSearchTool(FunctionTool[AstrAgentContext]):
         "A web search tool based on Firecrawl Search API, used to retrieve web "
         "pages related to the user's query."
     )
+    parallel_safe: bool = True
     parameters: dict = Field(
         default_factory=lambda: {
             "type": "object",
@@ -899,6 +944,7 @@ class FirecrawlWebSearchTool(FunctionTool[AstrAgentContext]):
 class FirecrawlExtractWebPageTool(FunctionTool[AstrAgentContext]):
     name: str = "firecrawl_extract_web_page"
     description: str = "Extract the content of a web page using Firecrawl."
+    parallel_safe: bool = True
     parameters: dict = Field(
         default_factory=lambda: {
             "type": "object",
@@ -966,6 +1012,7 @@ class BaiduWebSearchTool(FunctionTool[AstrAgentContext]):
         "A web search tool based on Baidu AI Search. "
         "Use this for real-time web retrieval when Baidu AI Search is configured."
     )
+    parallel_safe: bool = True
     parameters: dict = Field(
         default_factory=lambda: {
             "type": "object",
@@ -1021,6 +1068,7 @@ class BaiduWebSearchTool(FunctionTool[AstrAgentContext]):
         return _search_result_payload(results)
 
 
+@_cached("exa_search", search=True)
 async def _exa_search(
     provider_settings: dict,
     payload: dict,
@@ -1031,7 +1079,7 @@ async def _exa_search(
         "x-api-key": exa_key,
         "Content-Type": "application/json",
     }
-    async with aiohttp.ClientSession(trust_env=True) as session:
+    async with http_client.session(trust_env=True) as session:
         async with session.post(
             "https://api.exa.ai/search",
             json=payload,
@@ -1058,6 +1106,7 @@ async def _exa_search(
             ]
 
 
+@_cached("exa_get_contents")
 async def _exa_get_contents(
     provider_settings: dict,
     payload: dict,
@@ -1068,7 +1117,7 @@ async def _exa_get_contents(
         "x-api-key": exa_key,
         "Content-Type": "application/json",
     }
-    async with aiohttp.ClientSession(trust_env=True) as session:
+    async with http_client.session(trust_env=True) as session:
         async with session.post(
             "https://api.exa.ai/contents",
             json=payload,
@@ -1093,6 +1142,7 @@ class ExaWebSearchTool(FunctionTool[AstrAgentContext]):
         "A web search tool powered by Exa, an AI-native search engine. "
         "Supports keyword and semantic search with domain, date, and category filters."
     )
+    parallel_safe: bool = True
     parameters: dict = Field(
         default_factory=lambda: {
             "type": "object",
@@ -1195,6 +1245,7 @@ class ExaGetContentsTool(FunctionTool[AstrAgentContext]):
 
     name: str = "exa_get_contents"
     description: str = "Extract the content of a web page using Exa."
+    parallel_safe: bool = True
     parameters: dict = Field(
         default_factory=lambda: {
             "type": "object",
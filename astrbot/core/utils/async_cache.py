@@ -0,0 +1,146 @@
+"""缓存的通用组件
+
+- LRUCache: 内存中的 LRU + TTL 映射, 记录每个条目的写入时间
+- SingleFlight: 合并对同一个键的并发调用, 只执行一次, 结果与异常由所有调用方共享
+
+查询向量、图片转述、网页搜索与媒体下载等缓存都基于这两个组件实现。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable, Iterator
+from typing import Generic, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class LRUCache(Generic[K, V]):
+    """LRU + TTL 映射
+
+    超出 max_entries 时淘汰最久未使用的条目; ttl 小于等于 0 表示永不过期。
+    淘汰的条目数量累计在 evictions 中。
+    """
+
+    def __init__(self, max_entries: int, ttl: float) -> None:
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self.evictions = 0
+        # 键 -> (写入时间, 值), 按最近使用时间排序
+        self._data: OrderedDict[K, tuple[float, V]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._data
+
+    def __iter__(self) -> Iterator[K]:
+        return iter(self._data)
+
+    def expired(self, created_at: float) -> bool:
+        return self.ttl > 0 and time.time() - created_at > self.ttl
+
+    def get(self, key: K) -> V | None:
+        """读取未过期的值并标记为最近使用. 过期的条目会被删除"""
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        created_at, value = entry
+        if self.expired(created_at):
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def pop_expired(self, key: K) -> bool:
+        """条目存在且已过期时删除它并返回 True"""
+        entry = self._data.get(key)
+        if entry is None or not self.expired(entry[0]):
+            return False
+        del self._data[key]
+        return True
+
+    def put(self, key: K, value: V, created_at: float | None = None) -> list[K]:
+        """写入条目, 返回因超出容量被淘汰的键"""
+        self._data[key] = (time.time() if created_at is None else created_at, value)
+        self._data.move_to_end(key)
+        return self.evict()
+
+    def pop(self, key: K) -> V | None:
+        entry = self._data.pop(key, None)
+        return None if entry is None else entry[1]
+
+    def evict(self) -> list[K]:
+        """淘汰超出容量的条目, 返回被淘汰的键. 调小 max_entries 后需要调用"""
+        evicted = []
+        while len(self._data) > self.max_entries:
+            key, _ = self._data.popitem(last=False)
+            evicted.append(key)
+        self.evictions += len(evicted)
+        return evicted
+
+    def clear(self) -> None:
+        self._data.clear()
+
+
+class _LeaderCancelled(Exception):
+    """执行调用的协程被取消, 等待者需要重新发起调用"""
+
+
+class SingleFlight(Generic[K, V]):
+    """合并对同一个键的并发调用
+
+    第一个调用方 (leader) 执行 produce, 其余调用方等待并共享它的结果或异常。
+    leader 被取消时取消只作用于 leader 自身: 等待者不会收到 CancelledError,
+    而是由其中一个重新执行 produce。等待者被取消也不会影响正在进行的调用。
+    """
+
+    def __init__(self) -> None:
+        self._inflight: dict[K, asyncio.Future[V]] = {}
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._inflight
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    async def do(
+        self,
+        key: K,
+        produce: Callable[[], Awaitable[V]],
+    ) -> tuple[V, bool]:
+        """执行或加入对 key 的调用
+
+        Returns:
+            (结果, 是否共享了其他调用方的结果)
+
+        """
+        while (future := self._inflight.get(key)) is not None:
+            try:
+                return await asyncio.shield(future), True
+            except _LeaderCancelled:
+                continue
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await produce()
+        except asyncio.CancelledError:
+            future.set_exception(_LeaderCancelled())
+            # 避免无人等待时出现 "exception was never retrieved"
+            future.exception()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()
+            raise
+        else:
+            future.set_result(value)
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+        return value, False
@@ -0,0 +1,135 @@
+"""共享的 HTTP 连接池
+
+工具、提供商和平台适配器通过 http_client.session() 创建 aiohttp 会话。这些会话共用同一个
+TCPConnector: 同一主机的 keep-alive 连接可以被后续请求复用, 不必每次请求都重新进行 DNS 解析、
+TCP 握手和 TLS 握手; SSL 上下文 (系统证书 + certifi) 也只构建一次。
+
+会话本身很轻量, 调用方照常使用 async with 关闭会话即可, 关闭会话不会关闭连接池。
+代理沿用原有方式: 传入 trust_env=True 时读取 http_proxy 等环境变量, 或在单次请求中传入 proxy。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import weakref
+from types import SimpleNamespace
+from typing import Any
+
+import aiohttp
+
+from astrbot.core.utils.http_ssl import build_ssl_context_with_certifi
+
+
+class HTTPClientRegistry:
+    """进程级的 HTTP 连接池, 并统计连接复用情况"""
+
+    def __init__(
+        self,
+        limit: int = 100,
+        limit_per_host: int = 0,
+        keepalive_timeout: float = 30,
+    ) -> None:
+        """初始化连接池
+
+        Args:
+            limit: 同时打开的连接总数上限, 0 表示不限制
+            limit_per_host: 同一主机同时打开的连接数上限, 0 表示不限制
+            keepalive_timeout: 空闲连接保留的时间 (秒)
+
+        """
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        # 连接不能跨事件循环使用, 部分平台 SDK 在独立线程的事件循环中回调, 因此每个事件循环各有一个连接池
+        self._connectors: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, aiohttp.TCPConnector
+        ] = weakref.WeakKeyDictionary()
+        self._hosts: dict[str, dict[str, int]] = {}
+
+        self._trace_config = aiohttp.TraceConfig()
+        self._trace_config.on_request_start.append(self._on_request_start)
+        self._trace_config.on_connection_create_end.append(self._on_connection_create)
+        self._trace_config.on_connection_reuseconn.append(self._on_connection_reuse)
+
+    def configure(
+        self,
+        limit: int,
+        limit_per_host: int,
+        keepalive_timeout: float,
+    ) -> None:
+        """修改连接池参数, 对之后创建的连接池生效"""
+        self.limit = max(0, limit)
+        self.limit_per_host = max(0, limit_per_host)
+        self.keepalive_timeout = max(0, keepalive_timeout)
+
+    def connector(self) -> aiohttp.TCPConnector:
+        """返回当前事件循环的共享连接池"""
+        loop = asyncio.get_running_loop()
+        connector = self._connectors.get(loop)
+        if connector is None or connector.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                ssl=build_ssl_context_with_certifi(),
+            )
+            self._connectors[loop] = connector
+        return connector
+
+    def session(self, **kwargs: Any) -> aiohttp.ClientSession:
+        """创建使用共享连接池的会话, 参数与 aiohttp.ClientSession 相同 (connector 除外)"""
+        trace_configs = [*(kwargs.pop("trace_configs", None) or ()), self._trace_config]
+        return aiohttp.ClientSession(
+            connector=self.connector(),
+            connector_owner=False,
+            trace_configs=trace_configs,
+            **kwargs,
+        )
+
+    async def close(self) -> None:
+        """关闭当前事件循环的连接池"""
+        connector = self._connectors.pop(asyncio.get_running_loop(), None)
+        if connector is not None and not connector.closed:
+            await connector.close()
+
+    def _host_stats(self, ctx: SimpleNamespace) -> dict[str, int]:
+        host = getattr(ctx, "host", None) or "unknown"
+        stats = self._hosts.get(host)
+        if stats is None:
+            stats = self._hosts[host] = {"requests": 0, "created": 0, "reused": 0}
+        return stats
+
+    async def _on_request_start(self, _session, ctx, params) -> None:
+        ctx.host = params.url.host
+        self._host_stats(ctx)["requests"] += 1
+
+    async def _on_connection_create(self, _session, ctx, _params) -> None:
+        self._host_stats(ctx)["created"] += 1
+
+    async def _on_connection_reuse(self, _session, ctx, _params) -> None:
+        self._host_stats(ctx)["reused"] += 1
+
+    def stats(self) -> dict:
+        hosts = {host: dict(stats) for host, stats in self._hosts.items()}
+        created = sum(stats["created"] for stats in hosts.values())
+        reused = sum(stats["reused"] for stats in hosts.values())
+        idle_connections = sum(
+            len(conns)
+            for connector in list(self._connectors.values())
+            if not connector.closed
+            for conns in connector._conns.values()
+        )
+        return {
+            "limit": self.limit,
+            "limit_per_host": self.limit_per_host,
+            "keepalive_timeout": self.keepalive_timeout,
+            "requests": sum(stats["requests"] for stats in hosts.values()),
+            "connections_created": created,
+            "connections_reused": reused,
+            "reuse_ratio": reused / (created + reused) if created + reused else 0.0,
+            "idle_connections": idle_connections,
+            "hosts": hosts,
+        }
+
+
+http_client = HTTPClientRegistry()
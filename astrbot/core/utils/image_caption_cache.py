@@ -0,0 +1,199 @@
+"""图片转述缓存
+
+按图片内容缓存图片转述结果。同一张表情包或图片在不同群聊中被反复发送时, 只需要压缩与
+请求转述模型一次。缓存键由图片内容的哈希、转述模型 ID 与提示词计算得到, 与图片的
+路径或来源无关。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import hashlib
+import time
+from collections.abc import Awaitable, Callable
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from astrbot import logger
+from astrbot.core.utils.async_cache import LRUCache, SingleFlight
+from astrbot.core.utils.media_utils import file_uri_to_path
+
+if TYPE_CHECKING:
+    from astrbot.core.db import BaseDatabase
+
+
+def _hash_image(url_or_path: str) -> str | None:
+    """计算图片内容的 sha256. 远程图片与无法读取的图片返回 None"""
+    if url_or_path.startswith("http"):
+        return None
+    try:
+        if url_or_path.startswith("data:image"):
+            data = base64.b64decode(url_or_path.split(",", 1)[1])
+        else:
+            data = Path(file_uri_to_path(url_or_path)).read_bytes()
+    except Exception:  # noqa: BLE001
+        return None
+    return hashlib.sha256(data).hexdigest()
+
+
+class ImageCaptionCache:
+    """LRU + TTL 图片转述缓存
+
+    并发请求同一个未命中的键时只会请求一次转述模型。
+    配置 store 后, 新的转述结果会持久化到数据库, 并在 initialize 时加载回内存。
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 2048,
+        ttl: float = 7 * 24 * 3600,
+        store: BaseDatabase | None = None,
+    ) -> None:
+        """初始化图片转述缓存
+
+        Args:
+            max_entries: 内存中最多缓存的转述数量
+            ttl: 缓存有效期 (秒), 小于等于 0 表示永不过期
+            store: 用于持久化的数据库, 为空时只缓存在内存中
+
+        """
+        self.enabled = True
+        self.store = store
+        self.hits = 0
+        self.misses = 0
+        self._entries: LRUCache[str, str] = LRUCache(max_entries, ttl)
+        self._inflight: SingleFlight[str, str] = SingleFlight()
+        self._persist_tasks: set[asyncio.Task] = set()
+
+    def configure(
+        self,
+        enabled: bool,
+        max_entries: int,
+        ttl: float,
+        store: BaseDatabase | None,
+    ) -> None:
+        self.enabled = enabled
+        self._entries.max_entries = max(1, max_entries)
+        self._entries.ttl = ttl
+        self.store = store
+        self._entries.evict()
+
+    @property
+    def max_entries(self) -> int:
+        return self._entries.max_entries
+
+    @property
+    def ttl(self) -> float:
+        return self._entries.ttl
+
+    async def initialize(self) -> None:
+        """从持久化存储中加载未过期的转述"""
+        if not self.store:
+            return
+        since = time.time() - self.ttl if self.ttl > 0 else 0
+        try:
+            await self.store.prune_image_captions(before=since, keep=self.max_entries)
+            records = await self.store.load_image_captions(
+                since=since,
+                limit=self.max_entries,
+            )
+        except Exception as e:
+            logger.warning(f"加载图片转述缓存失败, 将使用空缓存: {e}")
+            return
+        # 记录按时间倒序返回, 倒序插入使最新的记录位于 LRU 末尾
+        for record in reversed(records):
+            self._entries.put(record.cache_key, record.caption, record.created_at)
+        logger.info(f"已加载 {len(records)} 条图片转述缓存")
+
+    async def make_key(
+        self,
+        provider_id: str,
+        prompt: str,
+        image_urls: list[str],
+    ) -> str | None:
+        """计算缓存键. 任一图片无法按内容哈希 (如远程图片) 时返回 None, 不使用缓存"""
+        if not self.enabled or not image_urls:
+            return None
+        digests = await asyncio.to_thread(
+            lambda: [_hash_image(url) for url in image_urls],
+        )
+        if any(digest is None for digest in digests):
+            return None
+        raw = "\x00".join([provider_id, prompt, *digests])  # type: ignore[list-item]
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _put(self, key: str, caption: str) -> None:
+        created_at = time.time()
+        self._entries.put(key, caption, created_at)
+        if self.store:
+            task = asyncio.create_task(self._persist(key, caption, created_at))
+            self._persist_tasks.add(task)
+            task.add_done_callback(self._persist_tasks.discard)
+
+    async def _persist(self, key: str, caption: str, created_at: float) -> None:
+        assert self.store is not None
+        try:
+            await self.store.save_image_caption(
+                cache_key=key,
+                caption=caption,
+                created_at=created_at,
+            )
+        except Exception as e:
+            logger.warning(f"持久化图片转述缓存失败: {e}")
+
+    async def get_caption(
+        self,
+        key: str | None,
+        produce: Callable[[], Awaitable[str]],
+    ) -> str:
+        """获取图片转述, 未命中时调用 produce 压缩图片并请求转述模型
+
+        key 为 None 时直接调用 produce。空的转述结果不会被缓存。
+        """
+        if key is None:
+            return await produce()
+        if (caption := self._entries.get(key)) is not None:
+            self.hits += 1
+            return caption
+
+        async def produce_and_store() -> str:
+            self.misses += 1
+            caption = await produce()
+            if caption:
+                self._put(key, caption)
+            return caption
+
+        caption, shared = await self._inflight.do(key, produce_and_store)
+        if shared:
+            self.hits += 1
+        return caption
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self._entries.evictions,
+            "hit_rate": self.hits / total if total else 0.0,
+            "persistent": self.store is not None,
+        }
+
+    async def clear(self) -> None:
+        """清空内存与持久化存储中的缓存, 并重置统计"""
+        self._entries.clear()
+        self.hits = self.misses = self._entries.evictions = 0
+        if self.store:
+            await self.store.prune_image_captions(before=float("inf"), keep=0)
+
+    async def close(self) -> None:
+        """等待尚未完成的持久化写入"""
+        if self._persist_tasks:
+            await asyncio.gather(*self._persist_tasks, return_exceptions=True)
+
+
+image_caption_cache = ImageCaptionCache()
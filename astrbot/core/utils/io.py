@@ -12,11 +12,11 @@ from typing import cast
 from urllib.parse import unquote, urlparse
 
 import aiohttp
-import certifi
 import psutil
 from PIL import Image
 
 from .astrbot_path import get_astrbot_temp_path
+from .http_client import http_client
 
 logger = logging.getLogger("astrbot")
 
@@ -96,11 +96,15 @@ def port_checker(port: int, host: str = "localhost") -> bool:
         return False
 
 
-def save_temp_img(img: Image.Image | bytes) -> str:
+def _temp_img_path() -> str:
     temp_dir = get_astrbot_temp_path()
     # 获得时间戳
     timestamp = f"{int(time.time())}_{uuid.uuid4().hex[:8]}"
-    p = os.path.join(temp_dir, f"io_temp_img_{timestamp}.jpg")
+    return os.path.join(temp_dir, f"io_temp_img_{timestamp}.jpg")
+
+
+def save_temp_img(img: Image.Image | bytes) -> str:
+    p = _temp_img_path()
 
     if isinstance(img, Image.Image):
         cast(Image.Image, img).save(p)
@@ -110,6 +114,15 @@ def save_temp_img(img: Image.Image | bytes) -> str:
     return p
 
 
+async def _save_image_response(resp: aiohttp.ClientResponse, path: str | None) -> str:
+    """将响应分块写入文件, 避免把整张图片读入内存"""
+    path = path or _temp_img_path()
+    with open(path, "wb") as f:
+        async for chunk in resp.content.iter_chunked(8192):
+            f.write(chunk)
+    return path
+
+
 async def download_image_by_url(
     url: str,
     post: bool = False,
@@ -118,28 +131,14 @@ async def download_image_by_url(
 ) -> str:
     """下载图片, 返回 path"""
     try:
-        ssl_context = ssl.create_default_context(
-            cafile=certifi.where(),
-        )  # 使用 certifi 提供的 CA 证书
-        connector = aiohttp.TCPConnector(ssl=ssl_context)  # 使用 certifi 的根证书
-        async with aiohttp.ClientSession(
-            trust_env=True,
-            connector=connector,
-        ) as session:
+        # 共享连接池使用系统证书与 certifi 提供的 CA 证书
+        async with http_client.session(trust_env=True) as session:
             if post:
                 async with session.post(url, json=post_data) as resp:
-                    if not path:
-                        return save_temp_img(await resp.read())
-                    with open(path, "wb") as f:
-                        f.write(await resp.read())
-                    return path
+                    return await _save_image_response(resp, path)
             else:
                 async with session.get(url) as resp:
-                    if not path:
-                        return save_temp_img(await resp.read())
-                    with open(path, "wb") as f:
-                        f.write(await resp.read())
-                    return path
+                    return await _save_image_response(resp, path)
     except (aiohttp.ClientConnectorSSLError, aiohttp.ClientConnectorCertificateError):
         # 关闭SSL验证（仅在证书验证失败时作为fallback）
         logger.warning(
@@ -151,21 +150,13 @@ async def download_image_by_url(
         ssl_context = ssl.create_default_context()
         ssl_context.check_hostname = False
         ssl_context.verify_mode = ssl.CERT_NONE
-        async with aiohttp.ClientSession() as session:
+        async with http_client.session() as session:
             if post:
                 async with session.post(url, json=post_data, ssl=ssl_context) as resp:
-                    if not path:
-                        return save_temp_img(await resp.read())
-                    with open(path, "wb") as f:
-                        f.write(await resp.read())
-                    return path
+                    return await _save_image_response(resp, path)
             else:
                 async with session.get(url, ssl=ssl_context) as resp:
-                    if not path:
-                        return save_temp_img(await resp.read())
-                    with open(path, "wb") as f:
-                        f.write(await resp.read())
-                    return path
+                    return await _save_image_response(resp, path)
     except Exception as e:
         raise e
 
@@ -295,14 +286,8 @@ async def download_file(
     """
 
     try:
-        ssl_context = ssl.create_default_context(
-            cafile=certifi.where(),
-        )  # 使用 certifi 提供的 CA 证书
-        connector = aiohttp.TCPConnector(ssl=ssl_context)
-        async with aiohttp.ClientSession(
-            trust_env=True,
-            connector=connector,
-        ) as session:
+        # 共享连接池使用系统证书与 certifi 提供的 CA 证书
+        async with http_client.session(trust_env=True) as session:
             async with session.get(url, timeout=1800) as resp:
                 _raise_for_download_status(resp, url)
                 with open(path, "wb") as f:
@@ -330,7 +315,7 @@ async def download_file(
         ssl_context = ssl.create_default_context()
         ssl_context.check_hostname = False
         ssl_context.verify_mode = ssl.CERT_NONE
-        async with aiohttp.ClientSession() as session:
+        async with http_client.session() as session:
             async with session.get(url, ssl=ssl_context, timeout=120) as resp:
                 _raise_for_download_status(resp, url)
                 with open(path, "wb") as f:
@@ -0,0 +1,154 @@
+"""HDR 风格的延迟直方图
+
+以微秒为单位记录耗时, 按 2 的幂分段, 每段再线性划分为 16 个子桶, 相对误差约 6%。
+只保存出现过的桶, 内存占用与耗时分布的跨度相关, 与记录次数无关。
+"""
+
+from __future__ import annotations
+
+import math
+from collections.abc import Iterable
+
+# 每个 2 的幂区间内的子桶数量为 2 ** (SUB_BUCKET_BITS - 1)
+SUB_BUCKET_BITS = 5
+_SUB_BUCKET_COUNT = 1 << SUB_BUCKET_BITS
+_SUB_BUCKET_HALF = _SUB_BUCKET_COUNT >> 1
+
+# Prometheus histogram 导出时使用的桶边界 (秒)
+DEFAULT_PROMETHEUS_BUCKETS = (
+    0.001,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+
+def _bucket_index(micros: int) -> int:
+    if micros < _SUB_BUCKET_COUNT:
+        return micros
+    shift = micros.bit_length() - SUB_BUCKET_BITS
+    return shift * _SUB_BUCKET_HALF + (micros >> shift)
+
+
+def _bucket_bounds(index: int) -> tuple[int, int]:
+    """返回桶覆盖的微秒区间 [lower, upper)"""
+    if index < _SUB_BUCKET_COUNT:
+        return index, index + 1
+    shift = index // _SUB_BUCKET_HALF - 1
+    mantissa = index - shift * _SUB_BUCKET_HALF
+    return mantissa << shift, (mantissa + 1) << shift
+
+
+class LatencyHistogram:
+    """记录耗时 (秒) 的直方图, 支持分位数查询与 Prometheus 格式的累计桶导出"""
+
+    __slots__ = ("count", "counts", "max", "min", "total")
+
+    def __init__(self) -> None:
+        self.counts: dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def record(self, seconds: float) -> None:
+        seconds = max(0.0, seconds)
+        index = _bucket_index(int(seconds * 1_000_000))
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total += seconds
+        if seconds < self.min:
+            self.min = seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def merge(self, other: LatencyHistogram) -> None:
+        """将另一个直方图的记录合并到当前直方图"""
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def to_dict(self) -> dict:
+        """序列化为可 JSON 存储的字典"""
+        return {
+            "counts": {str(index): count for index, count in self.counts.items()},
+            "count": self.count,
+            "total": self.total,
+            "min": self.min if self.count else 0.0,
+            "max": self.max,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict | None) -> LatencyHistogram:
+        histogram = cls()
+        if not data or not data.get("count"):
+            return histogram
+        histogram.counts = {
+            int(index): int(count) for index, count in data["counts"].items()
+        }
+        histogram.count = int(data["count"])
+        histogram.total = float(data["total"])
+        histogram.min = float(data["min"])
+        histogram.max = float(data["max"])
+        return histogram
+
+    def percentile(self, q: float) -> float:
+        """返回第 q 百分位 (0-100) 的耗时 (秒), 取所在桶的中点"""
+        if not self.count:
+            return 0.0
+        target = max(1, math.ceil(self.count * q / 100))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= target:
+                lower, upper = _bucket_bounds(index)
+                value = (lower + upper) / 2 / 1_000_000
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def cumulative_buckets(
+        self,
+        bounds: Iterable[float] = DEFAULT_PROMETHEUS_BUCKETS,
+    ) -> list[tuple[float, int]]:
+        """返回 (le, 累计数量) 列表, 最后一项为 +Inf"""
+        bounds = sorted(bounds)
+        result: list[tuple[float, int]] = []
+        items = sorted(self.counts.items())
+        position = 0
+        cumulative = 0
+        for bound in bounds:
+            limit = bound * 1_000_000
+            while position < len(items):
+                index, count = items[position]
+                if _bucket_bounds(index)[0] > limit:
+                    break
+                cumulative += count
+                position += 1
+            result.append((bound, cumulative))
+        result.append((math.inf, self.count))
+        return result
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": round(self.total, 6),
+            "avg": round(self.total / self.count, 6) if self.count else 0.0,
+            "min": round(self.min, 6) if self.count else 0.0,
+            "max": round(self.max, 6),
+            "p50": round(self.percentile(50), 6),
+            "p90": round(self.percentile(90), 6),
+            "p99": round(self.percentile(99), 6),
+        }
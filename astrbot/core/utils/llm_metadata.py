@@ -4,7 +4,7 @@ from typing import Literal, TypedDict
 import aiohttp
 
 from astrbot.core import logger
-from astrbot.core.utils.http_ssl import build_tls_connector
+from astrbot.core.utils.http_client import http_client
 
 
 class LLMModalities(TypedDict):
@@ -38,9 +38,7 @@ LLM_METADATA_URLS = (
 async def update_llm_metadata() -> None:
     global LLM_METADATAS
     last_error: Exception | None = None
-    async with aiohttp.ClientSession(
-        trust_env=True, connector=build_tls_connector()
-    ) as session:
+    async with http_client.session(trust_env=True) as session:
         for url in LLM_METADATA_URLS:
             try:
                 async with session.get(url) as response:
@@ -0,0 +1,380 @@
+"""媒体下载缓存
+
+平台 CDN 上的表情包、头像与被转发的图片经常被反复下载。媒体缓存将下载的文件按内容的
+sha256 保存在数据目录下, 并记录 URL 到文件的映射:
+
+- 同一 URL 在有效期内再次下载时直接返回缓存文件;
+- 不同 URL 指向相同内容时只保存一份文件;
+- 并发下载同一 URL 时只发起一次请求;
+- 文件按总大小以 LRU 方式淘汰, 超过单文件大小上限的文件不进入缓存。
+
+返回的路径在文件被淘汰前保持不变, Image、Record、Video 等消息组件可以直接使用。
+缓存目录不在临时目录下, 不会被事件结束时的临时文件清理删除; 调用方误删缓存文件时,
+下次访问会重新下载。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+import uuid
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from pathlib import Path
+from typing import Any
+
+from astrbot import logger
+from astrbot.core.utils.astrbot_path import (
+    get_astrbot_data_path,
+    get_astrbot_temp_path,
+)
+from astrbot.core.utils.async_cache import SingleFlight
+from astrbot.core.utils.io import download_file
+
+_INDEX_FILE = "index.json"
+
+Downloader = Callable[[str, str], Awaitable[Any]]
+
+
+class MediaCache:
+    """按 URL 与内容哈希去重的磁盘 LRU 媒体缓存
+
+    内容文件以 "<sha256><后缀>" 命名, 文件的修改时间即最近一次使用的时间。
+    URL 到文件名的映射保存在内存中, 关闭时写入 index.json, 启动时加载。
+    """
+
+    def __init__(
+        self,
+        cache_dir: str | None = None,
+        max_bytes: int = 500 * 1024 * 1024,
+        max_file_bytes: int = 50 * 1024 * 1024,
+        url_ttl: float = 86400,
+        enabled: bool = True,
+    ) -> None:
+        """初始化媒体缓存
+
+        Args:
+            cache_dir: 缓存目录, 为空时使用 data/media_cache
+            max_bytes: 缓存文件的总大小上限 (字节)
+            max_file_bytes: 单个文件的大小上限 (字节), 更大的文件不进入缓存
+            url_ttl: URL 映射的有效期 (秒), 过期后重新下载以获取可能已更新的内容,
+                小于等于 0 表示永不过期
+            enabled: 是否启用缓存, 关闭时每次都下载到临时目录
+
+        """
+        self.enabled = enabled
+        self.cache_dir = Path(
+            cache_dir or os.path.join(get_astrbot_data_path(), "media_cache"),
+        )
+        self.max_bytes = max(0, max_bytes)
+        self.max_file_bytes = max(0, max_file_bytes)
+        self.url_ttl = url_ttl
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.deduplicated = 0
+        self.evictions = 0
+        # 文件名 -> 文件大小, 按最近使用时间排序
+        self._files: OrderedDict[str, int] = OrderedDict()
+        self._total_bytes = 0
+        # URL -> (文件名, 下载时间)
+        self._urls: dict[str, tuple[str, float]] = {}
+        self._inflight: SingleFlight[str, tuple[Path, bool]] = SingleFlight()
+        self._lock = asyncio.Lock()
+
+    def configure(
+        self,
+        enabled: bool,
+        max_bytes: int,
+        max_file_bytes: int,
+        url_ttl: float,
+    ) -> None:
+        self.enabled = enabled
+        self.max_bytes = max(0, max_bytes)
+        self.max_file_bytes = max(0, max_file_bytes)
+        self.url_ttl = url_ttl
+
+    async def initialize(self) -> None:
+        """扫描缓存目录并加载 URL 映射"""
+        files, urls = await asyncio.to_thread(self._scan)
+        self._files = OrderedDict(files)
+        self._total_bytes = sum(self._files.values())
+        self._urls = {
+            url: (name, fetched_at)
+            for url, (name, fetched_at) in urls.items()
+            if name in self._files and not self._url_expired(fetched_at)
+        }
+        async with self._lock:
+            await self._evict()
+        if self._files:
+            logger.info(f"已加载 {len(self._files)} 个媒体缓存文件")
+
+    def _scan(
+        self,
+    ) -> tuple[list[tuple[str, int]], dict[str, tuple[str, float]]]:
+        if not self.cache_dir.is_dir():
+            return [], {}
+        files = []
+        for path in self.cache_dir.iterdir():
+            if not path.is_file() or path.name == _INDEX_FILE:
+                continue
+            if path.name.startswith("."):
+                # 上次运行中断时残留的下载文件
+                path.unlink(missing_ok=True)
+                continue
+            stat = path.stat()
+            files.append((stat.st_mtime, path.name, stat.st_size))
+        files.sort()
+
+        urls: dict[str, tuple[str, float]] = {}
+        try:
+            with (self.cache_dir / _INDEX_FILE).open(encoding="utf-8") as f:
+                for url, (name, fetched_at) in json.load(f).items():
+                    urls[url] = (name, float(fetched_at))
+        except (OSError, ValueError, TypeError):
+            pass
+        return [(name, size) for _, name, size in files], urls
+
+    async def close(self) -> None:
+        """保存 URL 映射, 供下次启动时使用"""
+        if not self._urls:
+            return
+        urls = {url: list(entry) for url, entry in self._urls.items()}
+
+        def _save() -> None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp = self.cache_dir / f".{_INDEX_FILE}.tmp"
+            with tmp.open("w", encoding="utf-8") as f:
+                json.dump(urls, f, ensure_ascii=False)
+            os.replace(tmp, self.cache_dir / _INDEX_FILE)
+
+        try:
+            await asyncio.to_thread(_save)
+        except OSError as e:
+            logger.warning(f"保存媒体缓存索引失败: {e}")
+
+    def _url_expired(self, fetched_at: float) -> bool:
+        return self.url_ttl > 0 and time.time() - fetched_at > self.url_ttl
+
+    async def fetch(
+        self,
+        url: str,
+        suffix: str = ".bin",
+        sniff_suffix: Callable[[Path], str | None] | None = None,
+        download: Downloader = download_file,
+    ) -> tuple[Path, bool]:
+        """下载 URL 指向的媒体, 优先使用缓存
+
+        Args:
+            url: 媒体的 http(s) URL
+            suffix: 缓存文件的后缀
+            sniff_suffix: 可选, 根据下载内容判断后缀 (如图片格式), 返回 None 时使用 suffix
+            download: 将 URL 下载到指定路径的函数, 默认分块流式写入磁盘
+
+        Returns:
+            (文件路径, 是否为缓存文件)。缓存文件由缓存管理, 调用方不应删除;
+            未缓存时 (缓存关闭或文件过大) 返回临时目录下的文件, 由调用方负责清理。
+
+        """
+        if not self.enabled:
+            return (
+                await self._download_uncached(url, suffix, sniff_suffix, download),
+                False,
+            )
+
+        if (path := await self._get(url)) is not None:
+            self.hits += 1
+            return path, True
+
+        async def download_and_store() -> tuple[Path, bool]:
+            self.misses += 1
+            return await self._download(url, suffix, sniff_suffix, download)
+
+        (path, cached), shared = await self._inflight.do(url, download_and_store)
+        if not shared:
+            return path, cached
+        self.coalesced += 1
+        if cached:
+            return path, True
+        # 未缓存的临时文件归首个调用方所有, 其余调用方各自下载
+        return (
+            await self._download_uncached(url, suffix, sniff_suffix, download),
+            False,
+        )
+
+    async def _get(self, url: str) -> Path | None:
+        entry = self._urls.get(url)
+        if entry is None:
+            return None
+        name, fetched_at = entry
+        if self._url_expired(fetched_at) or name not in self._files:
+            del self._urls[url]
+            return None
+        path = self.cache_dir / name
+        if not await asyncio.to_thread(self._touch, path):
+            # 文件已被外部删除
+            del self._urls[url]
+            self._drop(name)
+            return None
+        self._files.move_to_end(name)
+        return path
+
+    @staticmethod
+    def _touch(path: Path) -> bool:
+        try:
+            os.utime(path)
+        except OSError:
+            return False
+        return True
+
+    def _drop(self, name: str) -> None:
+        size = self._files.pop(name, None)
+        if size is not None:
+            self._total_bytes -= size
+
+    async def _download(
+        self,
+        url: str,
+        suffix: str,
+        sniff_suffix: Callable[[Path], str | None] | None,
+        download: Downloader,
+    ) -> tuple[Path, bool]:
+        await asyncio.to_thread(self.cache_dir.mkdir, parents=True, exist_ok=True)
+        tmp = self.cache_dir / f".{uuid.uuid4().hex}.part"
+        try:
+            await download(url, str(tmp))
+            digest, size = await asyncio.to_thread(self._hash_file, tmp)
+            if sniff_suffix is not None:
+                suffix = await asyncio.to_thread(sniff_suffix, tmp) or suffix
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+
+        if size > self.max_file_bytes or size > self.max_bytes:
+            target = self._temp_path(suffix)
+            await asyncio.to_thread(os.replace, tmp, target)
+            return target, False
+
+        name = f"{digest}{suffix}"
+        target = self.cache_dir / name
+        async with self._lock:
+            if name in self._files and await asyncio.to_thread(self._touch, target):
+                # 不同 URL 指向相同内容, 复用已有文件
+                self.deduplicated += 1
+                await asyncio.to_thread(tmp.unlink, missing_ok=True)
+                self._files.move_to_end(name)
+            else:
+                await asyncio.to_thread(os.replace, tmp, target)
+                self._drop(name)
+                self._files[name] = size
+                self._total_bytes += size
+            self._urls[url] = (name, time.time())
+            await self._evict(keep=name)
+        return target, True
+
+    async def _download_uncached(
+        self,
+        url: str,
+        suffix: str,
+        sniff_suffix: Callable[[Path], str | None] | None,
+        download: Downloader,
+    ) -> Path:
+        target = self._temp_path(suffix)
+        try:
+            await download(url, str(target))
+            if sniff_suffix is not None:
+                detected = await asyncio.to_thread(sniff_suffix, target)
+                if detected and detected != suffix:
+                    renamed = self._temp_path(detected)
+                    await asyncio.to_thread(os.replace, target, renamed)
+                    target = renamed
+        except BaseException:
+            target.unlink(missing_ok=True)
+            raise
+        return target
+
+    @staticmethod
+    def _temp_path(suffix: str) -> Path:
+        temp_dir = Path(get_astrbot_temp_path())
+        temp_dir.mkdir(parents=True, exist_ok=True)
+        return temp_dir / f"media_download_{uuid.uuid4().hex}{suffix}"
+
+    @staticmethod
+    def _hash_file(path: Path) -> tuple[str, int]:
+        sha256 = hashlib.sha256()
+        size = 0
+        with path.open("rb") as f:
+            while chunk := f.read(1024 * 1024):
+                sha256.update(chunk)
+                size += len(chunk)
+        return sha256.hexdigest(), size
+
+    async def _evict(self, keep: str | None = None) -> None:
+        expired: list[str] = []
+        for name in list(self._files):
+            if self._total_bytes <= self.max_bytes:
+                break
+            if name == keep:
+                continue
+            expired.append(name)
+            self._drop(name)
+            self.evictions += 1
+        if not expired:
+            return
+        expired_set = set(expired)
+        self._urls = {
+            url: entry
+            for url, entry in self._urls.items()
+            if entry[0] not in expired_set
+        }
+        await asyncio.to_thread(self._unlink, expired)
+
+    def _unlink(self, names: list[str]) -> None:
+        for name in names:
+            try:
+                (self.cache_dir / name).unlink(missing_ok=True)
+            except OSError as e:
+                logger.warning(f"删除媒体缓存文件 {name} 失败: {e}")
+
+    def is_cached_path(self, path: str | Path) -> bool:
+        """判断路径是否为缓存管理的文件"""
+        try:
+            return Path(path).resolve().parent == self.cache_dir.resolve()
+        except OSError:
+            return False
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses + self.coalesced
+        return {
+            "enabled": self.enabled,
+            "files": len(self._files),
+            "urls": len(self._urls),
+            "bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+            "max_file_bytes": self.max_file_bytes,
+            "url_ttl": self.url_ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "deduplicated": self.deduplicated,
+            "evictions": self.evictions,
+            "hit_rate": (self.hits + self.coalesced) / total if total else 0.0,
+        }
+
+    async def clear(self) -> None:
+        """删除所有缓存文件与 URL 映射, 并重置统计"""
+        async with self._lock:
+            names = list(self._files)
+            self._files.clear()
+            self._urls.clear()
+            self._total_bytes = 0
+            self.hits = self.misses = self.coalesced = 0
+            self.deduplicated = self.evictions = 0
+            await asyncio.to_thread(self._unlink, [*names, _INDEX_FILE])
+
+
+# 启动时根据配置启用
+media_cache = MediaCache(enabled=False)
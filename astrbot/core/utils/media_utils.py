@@ -26,6 +26,7 @@ from astrbot import logger
 from astrbot.core.utils.astrbot_path import get_astrbot_temp_path
 from astrbot.core.utils.datetime_utils import generate_timestamp_id
 from astrbot.core.utils.io import download_file
+from astrbot.core.utils.media_cache import media_cache
 from astrbot.core.utils.tencent_record_helper import (
     tencent_silk_to_wav,
     wav_to_tencent_silk,
@@ -426,6 +427,49 @@ def _cleanup_paths(cleanup_paths: list[Path] | None) -> None:
             logger.warning("Failed to cleanup %s: %s", cleanup_path, exc)
 
 
+def _sniff_image_suffix(path: Path) -> str | None:
+    """Return the suffix matching the image format detected from file content."""
+    return _extension_from_mime_type(
+        detect_image_mime_type(path, default_mime_type=None)
+    )
+
+
+async def _fetch_cached_media(
+    url: str,
+    media_type: str,
+    suffix: str,
+) -> _LocalMediaFile:
+    """Download an http(s) media reference through the shared media cache.
+
+    Cached files have a stable path and are owned by the cache, so they are not
+    added to ``cleanup_paths``. Files too large for the cache are downloaded to
+    the temp directory and cleaned up as usual.
+    """
+    if media_type == "image":
+        target_path, cached = await media_cache.fetch(
+            url,
+            suffix=".bin",
+            sniff_suffix=_sniff_image_suffix,
+            download=download_file,
+        )
+        mime_type = await detect_image_mime_type_async(
+            target_path,
+            default_mime_type=None,
+        ) or _guess_mime_type(target_path)
+    else:
+        target_path, cached = await media_cache.fetch(
+            url,
+            suffix=Path(urlparse(url).path).suffix or suffix,
+            download=download_file,
+        )
+        mime_type = _guess_mime_type(target_path)
+    return _LocalMediaFile(
+        path=target_path,
+        mime_type=mime_type,
+        cleanup_paths=[] if cached else [target_path],
+    )
+
+
 async def _materialize_media_ref(
     media_ref: MediaRefStr,
     *,
@@ -447,6 +491,8 @@ async def _materialize_media_ref(
     suffix = default_suffix or DEFAULT_MEDIA_SUFFIXES.get(media_type, ".bin")
 
     if media_ref.startswith(("http://", "https://")):
+        if media_cache.enabled:
+            return await _fetch_cached_media(media_ref, media_type, suffix)
         if media_type == "image":
             target_path = _temp_media_path("image", ".bin")
         else:
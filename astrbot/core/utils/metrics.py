@@ -6,10 +6,9 @@ import uuid
 from contextlib import suppress
 from typing import Any
 
-import aiohttp
-
 from astrbot.core import db_helper, logger
 from astrbot.core.config import VERSION
+from astrbot.core.utils.http_client import http_client
 
 
 class Metric:
@@ -203,7 +202,7 @@ class Metric:
         payload = {"metrics_data": payload_metrics}
 
         try:
-            async with aiohttp.ClientSession(trust_env=True) as session:
+            async with http_client.session(trust_env=True) as session:
                 async with session.post(base_url, json=payload, timeout=3) as response:
                     if response.status != 200:
                         pass
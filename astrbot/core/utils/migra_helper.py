@@ -7,6 +7,12 @@ from astrbot.core.agent.runners.deerflow.constants import (
 )
 from astrbot.core.astrbot_config_mgr import AstrBotConfig, AstrBotConfigManager
 from astrbot.core.db.migration.migra_45_to_46 import migrate_45_to_46
+from astrbot.core.db.migration.migra_conversation_messages import (
+    migrate_conversation_messages,
+)
+from astrbot.core.db.migration.migra_provider_stat_rollups import (
+    migrate_provider_stat_rollups,
+)
 from astrbot.core.db.migration.migra_token_usage import migrate_token_usage
 from astrbot.core.db.migration.migra_webchat_session import migrate_webchat_session
 
@@ -156,6 +162,20 @@ async def migra(
         logger.error(f"Migration for token_usage column failed: {e!s}")
         logger.error(traceback.format_exc())
 
+    # migration for segmented conversation history
+    try:
+        await migrate_conversation_messages(db)
+    except Exception as e:
+        logger.error(f"Migration for conversation messages failed: {e!s}")
+        logger.error(traceback.format_exc())
+
+    # migration for provider stat rollups
+    try:
+        await migrate_provider_stat_rollups(db)
+    except Exception as e:
+        logger.error(f"Migration for provider stat rollups failed: {e!s}")
+        logger.error(traceback.format_exc())
+
     # migra third party agent runner configs
     _c = False
     providers = astrbot_config["provider"]
@@ -10,6 +10,7 @@ from PIL import Image, ImageDraw, ImageFont
 
 from astrbot.core.config import VERSION
 from astrbot.core.utils.astrbot_path import get_astrbot_data_path
+from astrbot.core.utils.http_client import http_client
 from astrbot.core.utils.io import save_temp_img
 
 from . import RenderStrategy
@@ -635,12 +636,7 @@ class ImageElement(MarkdownElement):
     async def load_image(self):
         """加载图片"""
         try:
-            ssl_context = ssl.create_default_context(cafile=certifi.where())
-            connector = aiohttp.TCPConnector(ssl=ssl_context)
-
-            async with aiohttp.ClientSession(
-                trust_env=True, connector=connector
-            ) as session:
+            async with http_client.session(trust_env=True) as session:
                 async with session.get(self.image_url) as resp:
                     if resp.status == 200:
                         image_data = await resp.read()
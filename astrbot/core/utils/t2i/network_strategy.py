@@ -5,10 +5,8 @@ import re
 from functools import lru_cache
 from pathlib import Path
 
-import aiohttp
-
 from astrbot.core.config import VERSION
-from astrbot.core.utils.http_ssl import build_tls_connector
+from astrbot.core.utils.http_client import http_client
 from astrbot.core.utils.io import download_image_by_url
 from astrbot.core.utils.t2i.template_manager import TemplateManager
 
@@ -113,10 +111,7 @@ class NetworkRenderStrategy(RenderStrategy):
     async def get_official_endpoints(self) -> None:
         """获取官方的 t2i 端点列表。"""
         try:
-            async with aiohttp.ClientSession(
-                trust_env=True,
-                connector=build_tls_connector(),
-            ) as session:
+            async with http_client.session(trust_env=True) as session:
                 async with session.get(
                     "https://api.soulter.top/astrbot/t2i-endpoints",
                 ) as resp:
@@ -175,10 +170,7 @@ class NetworkRenderStrategy(RenderStrategy):
             try:
                 if return_url:
                     async with (
-                        aiohttp.ClientSession(
-                            trust_env=True,
-                            connector=build_tls_connector(),
-                        ) as session,
+                        http_client.session(trust_env=True) as session,
                         session.post(
                             f"{endpoint}/generate",
                             json=post_data,
@@ -0,0 +1,180 @@
+"""TTS 音频缓存
+
+按 (TTS 提供商, 音色, 文本) 缓存合成好的音频文件。问候语、固定的报错回复等重复出现的
+短句只需要合成一次。音频保存在数据目录下, 按总大小以 LRU 方式淘汰, 重启后仍然有效。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+from collections import OrderedDict
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from astrbot import logger
+from astrbot.core.utils.astrbot_path import get_astrbot_data_path
+
+if TYPE_CHECKING:
+    from astrbot.core.provider.provider import TTSProvider
+
+
+class TTSAudioCache:
+    """基于磁盘的 LRU TTS 音频缓存
+
+    文件名即缓存键, 文件的修改时间即最近一次使用的时间, 因此无需额外的索引文件。
+    """
+
+    def __init__(
+        self,
+        cache_dir: str | None = None,
+        max_bytes: int = 200 * 1024 * 1024,
+    ) -> None:
+        """初始化 TTS 音频缓存
+
+        Args:
+            cache_dir: 缓存目录, 为空时使用 data/tts_cache
+            max_bytes: 缓存文件的总大小上限 (字节)
+
+        """
+        self.enabled = True
+        self.cache_dir = Path(
+            cache_dir or os.path.join(get_astrbot_data_path(), "tts_cache"),
+        )
+        self.max_bytes = max(0, max_bytes)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[str, tuple[Path, int]] = OrderedDict()
+        self._total_bytes = 0
+        self._lock = asyncio.Lock()
+
+    def configure(self, enabled: bool, max_bytes: int) -> None:
+        self.enabled = enabled
+        self.max_bytes = max(0, max_bytes)
+
+    async def initialize(self) -> None:
+        """扫描缓存目录, 按修改时间恢复 LRU 顺序"""
+        entries = await asyncio.to_thread(self._scan)
+        self._entries = OrderedDict(entries)
+        self._total_bytes = sum(size for _, size in self._entries.values())
+        async with self._lock:
+            await self._evict()
+        if self._entries:
+            logger.info(f"已加载 {len(self._entries)} 条 TTS 音频缓存")
+
+    def _scan(self) -> list[tuple[str, tuple[Path, int]]]:
+        if not self.cache_dir.is_dir():
+            return []
+        files = []
+        for path in self.cache_dir.iterdir():
+            if not path.is_file() or path.name.startswith("."):
+                continue
+            stat = path.stat()
+            files.append((stat.st_mtime, path.stem, path, stat.st_size))
+        files.sort()
+        return [(key, (path, size)) for _, key, path, size in files]
+
+    @staticmethod
+    def make_key(provider: TTSProvider, text: str) -> str:
+        """计算缓存键
+
+        各 TTS 提供商的音色、模型、语速等参数都保存在 provider_config 中,
+        因此以整个 provider_config 作为音色指纹, 修改其中任一参数都会使旧缓存失效。
+        """
+        voice = json.dumps(
+            provider.provider_config,
+            sort_keys=True,
+            ensure_ascii=False,
+            default=str,
+        )
+        raw = "\x00".join([provider.provider_config.get("id", ""), voice, text])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    async def get(self, key: str) -> str | None:
+        """获取缓存的音频文件路径, 未命中时返回 None"""
+        if not self.enabled:
+            return None
+        entry = self._entries.get(key)
+        if entry is None or not await asyncio.to_thread(self._touch, entry[0]):
+            if entry is not None:
+                self._drop(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return str(entry[0])
+
+    @staticmethod
+    def _touch(path: Path) -> bool:
+        try:
+            os.utime(path)
+        except OSError:
+            return False
+        return True
+
+    def _drop(self, key: str) -> None:
+        _, size = self._entries.pop(key)
+        self._total_bytes -= size
+
+    async def put(self, key: str, audio_path: str) -> None:
+        """将 TTS 提供商生成的音频文件复制到缓存中"""
+        if not self.enabled:
+            return
+        target = self.cache_dir / f"{key}{Path(audio_path).suffix}"
+
+        def _copy() -> int:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp = self.cache_dir / f".{key}.tmp"
+            shutil.copyfile(audio_path, tmp)
+            os.replace(tmp, target)
+            return target.stat().st_size
+
+        async with self._lock:
+            try:
+                size = await asyncio.to_thread(_copy)
+            except OSError as e:
+                logger.warning(f"写入 TTS 音频缓存失败: {e}")
+                return
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (target, size)
+            self._total_bytes += size
+            await self._evict()
+
+    async def _evict(self) -> None:
+        expired: list[Path] = []
+        while self._entries and self._total_bytes > self.max_bytes:
+            key = next(iter(self._entries))
+            expired.append(self._entries[key][0])
+            self._drop(key)
+            self.evictions += 1
+        if expired:
+            await asyncio.to_thread(self._unlink, expired)
+
+    @staticmethod
+    def _unlink(paths: list[Path]) -> None:
+        for path in paths:
+            try:
+                path.unlink(missing_ok=True)
+            except OSError as e:
+                logger.warning(f"删除 TTS 音频缓存文件 {path} 失败: {e}")
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "size": len(self._entries),
+            "bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+tts_audio_cache = TTSAudioCache()
@@ -0,0 +1,227 @@
+"""网页搜索结果缓存
+
+按 (搜索提供商接口, 规范化后的请求参数) 缓存网页搜索与网页提取的结果。智能体在同一会话中
+常重复相同的搜索, 不同用户也会同时询问同一个热门话题, 命中缓存可以节省延迟与付费 API 额度。
+同一请求并发未命中时只会调用一次远程接口。结果以 JSON 文件保存在数据目录下, 按条目数以
+LRU 方式淘汰, 重启后仍然有效。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections.abc import Awaitable, Callable
+from pathlib import Path
+from typing import Any
+
+from astrbot import logger
+from astrbot.core.utils.astrbot_path import get_astrbot_data_path
+from astrbot.core.utils.async_cache import LRUCache, SingleFlight
+
+
+def _normalize(value: Any) -> Any:
+    """规范化请求参数: 去除字符串首尾空白并合并连续空白, 去掉值为空的字段"""
+    if isinstance(value, str):
+        return " ".join(value.split())
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items() if v is not None and v != ""}
+    if isinstance(value, list | tuple):
+        return [_normalize(v) for v in value]
+    return value
+
+
+class WebSearchCache:
+    """基于磁盘的 LRU + TTL 网页搜索结果缓存
+
+    每个条目保存为一个 JSON 文件, 文件名即缓存键, 文件的修改时间即最近一次使用的时间。
+    """
+
+    def __init__(
+        self,
+        cache_dir: str | None = None,
+        max_entries: int = 1000,
+        ttl: float = 3600,
+    ) -> None:
+        """初始化网页搜索结果缓存
+
+        Args:
+            cache_dir: 缓存目录, 为空时使用 data/web_search_cache
+            max_entries: 最多缓存的结果数量
+            ttl: 缓存有效期 (秒), 小于等于 0 表示永不过期
+
+        """
+        self.enabled = True
+        self.cache_dir = Path(
+            cache_dir or os.path.join(get_astrbot_data_path(), "web_search_cache"),
+        )
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        # 缓存键 -> 缓存文件
+        self._entries: LRUCache[str, Path] = LRUCache(max_entries, ttl)
+        self._inflight: SingleFlight[str, Any] = SingleFlight()
+
+    def configure(self, enabled: bool, max_entries: int, ttl: float) -> None:
+        self.enabled = enabled
+        self._entries.max_entries = max(1, max_entries)
+        self._entries.ttl = ttl
+
+    @property
+    def max_entries(self) -> int:
+        return self._entries.max_entries
+
+    @property
+    def ttl(self) -> float:
+        return self._entries.ttl
+
+    async def initialize(self) -> None:
+        """扫描缓存目录, 按修改时间恢复 LRU 顺序, 并删除过期与超出容量的条目"""
+        entries = await asyncio.to_thread(self._scan)
+        self._entries.clear()
+        stale = []
+        for key, created_at in entries:
+            if self._entries.expired(created_at):
+                stale.append(key)
+            else:
+                stale += self._entries.put(key, self._path(key), created_at)
+        if stale:
+            await asyncio.to_thread(self._unlink, stale)
+        if self._entries:
+            logger.info(f"已加载 {len(self._entries)} 条网页搜索缓存")
+
+    def _scan(self) -> list[tuple[str, float]]:
+        if not self.cache_dir.is_dir():
+            return []
+        files = []
+        for path in self.cache_dir.glob("*.json"):
+            try:
+                with path.open(encoding="utf-8") as f:
+                    created_at = float(json.load(f)["created_at"])
+                used_at = path.stat().st_mtime
+            except (OSError, ValueError, KeyError, TypeError):
+                path.unlink(missing_ok=True)
+                continue
+            files.append((used_at, path.stem, created_at))
+        files.sort()
+        return [(key, created_at) for _, key, created_at in files]
+
+    @staticmethod
+    def make_key(provider: str, payload: dict) -> str:
+        """计算缓存键. provider 区分搜索提供商及其接口, 如 tavily_search、tavily_extract"""
+        raw = json.dumps(
+            [provider, _normalize(payload)],
+            sort_keys=True,
+            ensure_ascii=False,
+            default=str,
+        )
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    async def _get(self, key: str) -> Any | None:
+        if self._entries.pop_expired(key):
+            await asyncio.to_thread(self._unlink, [key])
+            return None
+        path = self._entries.get(key)
+        if path is None:
+            return None
+
+        def _read() -> Any | None:
+            try:
+                with path.open(encoding="utf-8") as f:
+                    value = json.load(f)["value"]
+                os.utime(path)
+            except (OSError, ValueError, KeyError):
+                return None
+            return value
+
+        value = await asyncio.to_thread(_read)
+        if value is None:
+            self._entries.pop(key)
+        return value
+
+    async def _put(self, key: str, value: Any) -> None:
+        created_at = time.time()
+        path = self._path(key)
+
+        def _write() -> None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp = self.cache_dir / f".{key}.tmp"
+            with tmp.open("w", encoding="utf-8") as f:
+                json.dump(
+                    {"created_at": created_at, "value": value}, f, ensure_ascii=False
+                )
+            os.replace(tmp, path)
+
+        try:
+            await asyncio.to_thread(_write)
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"写入网页搜索缓存失败: {e}")
+            return
+        if evicted := self._entries.put(key, path, created_at):
+            await asyncio.to_thread(self._unlink, evicted)
+
+    def _unlink(self, keys: list[str]) -> None:
+        for key in keys:
+            try:
+                self._path(key).unlink(missing_ok=True)
+            except OSError as e:
+                logger.warning(f"删除网页搜索缓存文件 {key} 失败: {e}")
+
+    async def fetch(
+        self,
+        provider: str,
+        payload: dict,
+        produce: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        """获取搜索结果, 未命中时调用 produce 请求远程接口
+
+        produce 的返回值需可以被 JSON 序列化。请求失败与空结果不会被缓存;
+        并发的相同请求会共享同一次调用的结果或异常。
+        """
+        if not self.enabled:
+            return await produce()
+        key = self.make_key(provider, payload)
+        if (value := await self._get(key)) is not None:
+            self.hits += 1
+            return value
+
+        async def produce_and_store() -> Any:
+            self.misses += 1
+            value = await produce()
+            if value:
+                await self._put(key, value)
+            return value
+
+        value, shared = await self._inflight.do(key, produce_and_store)
+        if shared:
+            self.coalesced += 1
+        return value
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses + self.coalesced
+        return {
+            "enabled": self.enabled,
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self._entries.evictions,
+            "hit_rate": (self.hits + self.coalesced) / total if total else 0.0,
+        }
+
+    async def clear(self) -> None:
+        """删除所有缓存文件, 并重置统计"""
+        keys = list(self._entries)
+        self._entries.clear()
+        self.hits = self.misses = self.coalesced = self._entries.evictions = 0
+        await asyncio.to_thread(self._unlink, keys)
+
+
+web_search_cache = WebSearchCache()
@@ -7,6 +7,7 @@ from astrbot.core import logger
 from astrbot.dashboard.async_utils import run_maybe_async
 from astrbot.dashboard.responses import error, ok
 from astrbot.dashboard.schemas import (
+    BackupExportRequest,
     BackupImportRequest,
     BackupRenameRequest,
     BackupUploadInitRequest,
@@ -131,18 +132,22 @@ async def list_dashboard_backups(
 
 @router.post("/backups")
 async def create_backup(
+    payload: BackupExportRequest | None = None,
     _auth: AuthContext = Depends(require_system_scope),
     service: BackupService = Depends(get_service),
 ):
-    return await _run(service.export_backup, prefix="创建备份失败")
+    data = _model_dict(payload) if payload else {}
+    return await _run(lambda: service.export_backup(data), prefix="创建备份失败")
 
 
 @legacy_router.post("/export")
 async def export_dashboard_backup(
+    request: Request,
     _username: str = Depends(require_dashboard_user),
     service: BackupService = Depends(get_service),
 ):
-    return await _run(service.export_backup, prefix="创建备份失败")
+    data = await _json_or_empty(request)
+    return await _run(lambda: service.export_backup(data), prefix="创建备份失败")
 
 
 @router.post("/backups/upload")
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from typing import Any
 
-from fastapi import APIRouter, Depends, Request
+from fastapi import APIRouter, Depends, Query, Request
 from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 
 from astrbot.dashboard.async_utils import run_maybe_async
@@ -137,10 +137,11 @@ async def batch_delete_chat_sessions(
 @router.get("/chat/sessions/{session_id}")
 async def get_chat_session(
     session_id: str,
+    cursor: str | None = Query(default=None),
     auth: AuthContext = Depends(require_chat_scope),
     service: ChatService = Depends(get_service),
 ):
-    return await _run(lambda: service.get_session(auth.username, session_id))
+    return await _run(lambda: service.get_session(auth.username, session_id, cursor))
 
 
 @router.patch("/chat/sessions/{session_id}")
@@ -348,6 +349,7 @@ async def dashboard_get_session(
         lambda: service.get_session_from_dashboard_query(
             username,
             request.query_params.get("session_id"),
+            request.query_params.get("cursor"),
         )
     )
 
@@ -95,6 +95,8 @@ async def _list_conversations(
     exclude_ids: str,
     exclude_platforms: str,
     include_history: bool,
+    cursor: str | None = None,
+    with_total: bool = False,
 ):
     return await _run(
         lambda: service.list_conversations(
@@ -106,6 +108,8 @@ async def _list_conversations(
             exclude_ids=exclude_ids,
             exclude_platforms=exclude_platforms,
             include_history=include_history,
+            cursor=cursor,
+            with_total=with_total,
         )
     )
 
@@ -120,6 +124,8 @@ async def list_conversations(
     exclude_ids: str = Query(default=""),
     exclude_platforms: str = Query(default=""),
     include_history: bool = Query(default=True),
+    cursor: str | None = Query(default=None),
+    with_total: bool = Query(default=False),
     _auth: AuthContext = Depends(require_data_scope),
     service: ConversationService = Depends(get_service),
 ):
@@ -133,6 +139,8 @@ async def list_conversations(
         exclude_ids=exclude_ids,
         exclude_platforms=exclude_platforms,
         include_history=include_history,
+        cursor=cursor,
+        with_total=with_total,
     )
 
 
@@ -228,6 +236,8 @@ async def list_dashboard_conversations(
     exclude_ids: str = Query(default=""),
     exclude_platforms: str = Query(default=""),
     include_history: bool = Query(default=True),
+    cursor: str | None = Query(default=None),
+    with_total: bool = Query(default=False),
     _username: str = Depends(require_dashboard_user),
     service: ConversationService = Depends(get_service),
 ):
@@ -241,6 +251,8 @@ async def list_dashboard_conversations(
         exclude_ids=exclude_ids,
         exclude_platforms=exclude_platforms,
         include_history=include_history,
+        cursor=cursor,
+        with_total=with_total,
     )
 
 
@@ -252,6 +252,44 @@ async def delete_knowledge_base_document(
     )
 
 
+@router.get("/knowledge-bases/{kb_id}/ingest-jobs")
+async def list_knowledge_base_ingest_jobs(
+    kb_id: str,
+    _auth: AuthContext = Depends(require_kb_scope),
+    service: KnowledgeBaseService = Depends(get_service),
+):
+    return await _run(
+        lambda: service.list_ingest_jobs(kb_id=kb_id),
+        prefix="获取导入任务列表失败",
+    )
+
+
+@router.post("/knowledge-bases/{kb_id}/ingest-jobs/{job_id}/retry")
+async def retry_knowledge_base_ingest_job(
+    kb_id: str,
+    job_id: str,
+    _auth: AuthContext = Depends(require_kb_scope),
+    service: KnowledgeBaseService = Depends(get_service),
+):
+    return await _run(
+        lambda: service.retry_ingest_job({"kb_id": kb_id, "job_id": job_id}),
+        prefix="重试导入任务失败",
+    )
+
+
+@router.delete("/knowledge-bases/{kb_id}/ingest-jobs/{job_id}")
+async def discard_knowledge_base_ingest_job(
+    kb_id: str,
+    job_id: str,
+    _auth: AuthContext = Depends(require_kb_scope),
+    service: KnowledgeBaseService = Depends(get_service),
+):
+    return await _run(
+        lambda: service.discard_ingest_job({"kb_id": kb_id, "job_id": job_id}),
+        prefix="放弃导入任务失败",
+    )
+
+
 @router.get("/knowledge-bases/{kb_id}/chunks")
 async def list_knowledge_base_chunks(
     kb_id: str,
@@ -1,8 +1,9 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, Header, Request
+from fastapi import APIRouter, Depends, Header, Query, Request
 from fastapi.responses import StreamingResponse
 
+from astrbot.core.log_store import LogQuery
 from astrbot.dashboard.responses import ApiError, ok
 from astrbot.dashboard.schemas import TraceSettingsRequest
 from astrbot.dashboard.services.log_service import LogService, LogServiceError
@@ -29,9 +30,49 @@ def _raise_log_error(exc: LogServiceError) -> None:
     raise ApiError(str(exc)) from exc
 
 
-def _log_stream_response(last_event_id: str | None, service: LogService):
+def _split_csv(value: str | None) -> list[str]:
+    if not value:
+        return []
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def get_log_query(
+    start: float | None = Query(default=None, description="Unix timestamp"),
+    end: float | None = Query(default=None, description="Unix timestamp"),
+    level: str | None = Query(
+        default=None,
+        description="Comma-separated levels, e.g. WARNING,ERROR",
+    ),
+    category: str | None = Query(
+        default=None,
+        description="Comma-separated categories, e.g. system,trace",
+    ),
+    plugin: str | None = Query(default=None),
+    umo: str | None = Query(default=None),
+    keyword: str | None = Query(default=None),
+    before_id: int | None = Query(default=None),
+    limit: int = Query(default=200, ge=1, le=1000),
+) -> LogQuery:
+    return LogQuery(
+        start=start,
+        end=end,
+        levels=[item.upper() for item in _split_csv(level)],
+        categories=_split_csv(category),
+        plugin=plugin,
+        umo=umo,
+        keyword=keyword,
+        before_id=before_id,
+        limit=limit,
+    )
+
+
+def _log_stream_response(
+    last_event_id: str | None,
+    service: LogService,
+    log_filter: LogQuery | None = None,
+):
     return StreamingResponse(
-        service.stream_log_events(last_event_id),
+        service.stream_log_events(last_event_id, log_filter),
         media_type="text/event-stream",
         headers={
             "Cache-Control": "no-cache",
@@ -71,13 +112,26 @@ async def get_log_history(
     return _get_log_history(service)
 
 
+@router.get("/logs/query")
+async def query_logs(
+    log_query: LogQuery = Depends(get_log_query),
+    _auth: AuthContext = Depends(require_system_scope),
+    service: LogService = Depends(get_service),
+):
+    try:
+        return ok(await service.query_logs(log_query))
+    except LogServiceError as exc:
+        _raise_log_error(exc)
+
+
 @router.get("/logs/live")
 async def live_logs(
     last_event_id: str | None = Header(default=None, alias="Last-Event-ID"),
+    log_filter: LogQuery = Depends(get_log_query),
     _auth: AuthContext = Depends(require_system_scope),
     service: LogService = Depends(get_service),
 ):
-    return _log_stream_response(last_event_id, service)
+    return _log_stream_response(last_event_id, service, log_filter)
 
 
 @router.get("/trace/settings")
@@ -1,10 +1,16 @@
 from __future__ import annotations
 
 from fastapi import APIRouter, Depends, Query, Request
+from fastapi.responses import PlainTextResponse
 
 from astrbot.dashboard.async_utils import run_maybe_async
 from astrbot.dashboard.responses import ApiError, ok
-from astrbot.dashboard.schemas import GhProxyTestRequest, StorageCleanupRequest
+from astrbot.dashboard.schemas import (
+    GhProxyTestRequest,
+    ImageCaptionCacheToggleRequest,
+    PipelineProfilerToggleRequest,
+    StorageCleanupRequest,
+)
 from astrbot.dashboard.services.stat_service import StatService, StatServiceError
 
 from .auth import AuthContext, require_dashboard_user, require_scope
@@ -66,6 +72,107 @@ async def get_provider_token_stats(
     return await _run(service.get_provider_token_stats(days))
 
 
+@router.get("/stats/pipeline-profile")
+async def get_pipeline_profile(
+    _auth: AuthContext = Depends(require_system_scope),
+    service: StatService = Depends(get_service),
+):
+    return await _run(service.get_pipeline_profile)
+
+
+@router.get("/stats/pipeline-profile/prometheus")
+async def get_pipeline_profile_prometheus(
+    _auth: AuthContext = Depends(require_system_scope),
+    service: StatService = Depends(get_service),
+):
+    return PlainTextResponse(
+        service.get_pipeline_profile_prometheus(),
+        media_type="text/plain; version=0.0.4",
+    )
+
+
+@router.put("/stats/pipeline-profile/enabled")
+async def set_pipeline_profiler_enabled(
+    payload: PipelineProfilerToggleRequest,
+    _auth: AuthContext = Depends(require_system_scope),
+    service: StatService = Depends(get_service),
+):
+    return await _run(lambda: service.set_pipeline_profiler_enabled(payload.enabled))
+
+
+@router.post("/stats/pipeline-profile/reset")
+async def reset_pipeline_profile(
+    _auth: AuthContext = Depends(require_system_scope),
+    service: StatService = Depends(get_service),
+):
+    return await _run(service.reset_pipeline_profile)
+
+
+@router.get("/stats/http-client")
+async def get_http_client_stats(
+    _auth: AuthContext = Depends(require_system_scope),
+    service: StatService = Depends(get_service),
+):
+    return await _run(service.get_http_client_stats)
+
+
+@router.get("/stats/image-caption-cache")
+async def get_image_caption_cache_stats(
+    _auth: AuthContext = Depends(require_system_scope),
+    service: StatService = Depends(get_service),
+):
+    return await _run(service.get_image_caption_cache_stats)
+
+
+@router.put("/stats/image-caption-cache/enabled")
+async def set_image_caption_cache_enabled(
+    payload: ImageCaptionCacheToggleRequest,
+    _auth: AuthContext = Depends(require_system_scope),
+    service: StatService = Depends(get_service),
+):
+    return await _run(lambda: service.set_image_caption_cache_enabled(payload.enabled))
+
+
+@router.post("/stats/image-caption-cache/clear")
+async def clear_image_caption_cache(
+    _auth: AuthContext = Depends(require_system_scope),
+    service: StatService = Depends(get_service),
+):
+    return await _run(service.clear_image_caption_cache)
+
+
+@router.get("/stats/web-search-cache")
+async def get_web_search_cache_stats(
+    _auth: AuthContext = Depends(require_system_scope),
+    service: StatService = Depends(get_service),
+):
+    return await _run(service.get_web_search_cache_stats)
+
+
+@router.post("/stats/web-search-cache/clear")
+async def clear_web_search_cache(
+    _auth: AuthContext = Depends(require_system_scope),
+    service: StatService = Depends(get_service),
+):
+    return await _run(service.clear_web_search_cache)
+
+
+@router.get("/stats/media-cache")
+async def get_media_cache_stats(
+    _auth: AuthContext = Depends(require_system_scope),
+    service: StatService = Depends(get_service),
+):
+    return await _run(service.get_media_cache_stats)
+
+
+@router.post("/stats/media-cache/clear")
+async def clear_media_cache(
+    _auth: AuthContext = Depends(require_system_scope),
+    service: StatService = Depends(get_service),
+):
+    return await _run(service.clear_media_cache)
+
+
 @router.get("/stats/version")
 async def get_version(
     _auth: AuthContext = Depends(require_system_scope),
@@ -70,6 +70,10 @@ class BackupUploadSessionRequest(OpenModel):
     upload_id: str | None = None
 
 
+class BackupExportRequest(OpenModel):
+    incremental: bool | None = None
+
+
 class BackupImportRequest(OpenModel):
     confirmed: bool | None = None
 
@@ -198,6 +202,14 @@ class GhProxyTestRequest(BaseModel):
     proxy_url: str | None = None
 
 
+class PipelineProfilerToggleRequest(BaseModel):
+    enabled: bool
+
+
+class ImageCaptionCacheToggleRequest(BaseModel):
+    enabled: bool
+
+
 class OpenApiChatRequest(OpenModel):
     message: Any = None
     session_id: str | None = None
@@ -233,6 +245,9 @@ class KnowledgeBaseRequest(OpenModel):
     top_k_dense: int | None = None
     top_k_sparse: int | None = None
     top_m_final: int | None = None
+    index_type: Literal["flat", "hnsw", "ivf_flat", "ivf_pq"] | None = None
+    index_nprobe: int | None = None
+    index_ef_search: int | None = None
 
     model_config = ConfigDict(populate_by_name=True, extra="allow")
 
@@ -255,6 +270,9 @@ class KnowledgeBaseRequest(OpenModel):
                 "top_k_dense",
                 "top_k_sparse",
                 "top_m_final",
+                "index_type",
+                "index_nprobe",
+                "index_ef_search",
             },
             by_alias=False,
         )
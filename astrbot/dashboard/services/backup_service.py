@@ -254,6 +254,7 @@ class BackupService:
                     "type": manifest.get("origin", "exported"),
                     "astrbot_version": manifest.get("astrbot_version", "未知"),
                     "exported_at": manifest.get("exported_at"),
+                    "backup_type": manifest.get("backup_type", "full"),
                 }
             )
 
@@ -268,16 +269,49 @@ class BackupService:
             "page_size": page_size,
         }
 
-    def export_backup(self) -> dict:
+    def _latest_exported_manifest(self) -> dict | None:
+        """本实例最近一次导出的 NDJSON 格式备份的 manifest, 作为增量备份的基础"""
+        latest: dict | None = None
+        if not os.path.isdir(self.backup_dir):
+            return None
+        for filename in os.listdir(self.backup_dir):
+            if not filename.endswith(".zip") or filename.startswith("."):
+                continue
+            manifest = self.get_backup_manifest(os.path.join(self.backup_dir, filename))
+            if (
+                not manifest
+                or manifest.get("origin", "exported") != "exported"
+                or manifest.get("format") != "ndjson"
+            ):
+                continue
+            if latest is None or manifest.get("exported_at", "") > latest.get(
+                "exported_at", ""
+            ):
+                latest = manifest
+        return latest
+
+    def export_backup(self, data: object = None) -> dict:
+        payload = self._payload(data)
+        base_manifest = None
+        if payload.get("incremental"):
+            base_manifest = self._latest_exported_manifest()
+            if base_manifest is None:
+                raise BackupServiceError(
+                    "没有可作为增量备份基础的备份，请先创建完整备份"
+                )
         task_id = str(uuid.uuid4())
         self._init_task(task_id, "export", "pending")
-        asyncio.create_task(self.background_export_task(task_id))
+        asyncio.create_task(self.background_export_task(task_id, base_manifest))
         return {
             "task_id": task_id,
             "message": "export task created, processing in background",
         }
 
-    async def background_export_task(self, task_id: str) -> None:
+    async def background_export_task(
+        self,
+        task_id: str,
+        base_manifest: dict | None = None,
+    ) -> None:
         try:
             self._update_progress(task_id, status="processing", message="正在初始化...")
             kb_manager = getattr(self.core_lifecycle, "kb_manager", None)
@@ -289,6 +323,7 @@ class BackupService:
             zip_path = await exporter.export_all(
                 output_dir=self.backup_dir,
                 progress_callback=self._make_progress_callback(task_id),
+                base_manifest=base_manifest,
             )
             self._set_task_result(
                 task_id,
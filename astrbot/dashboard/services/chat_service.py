@@ -36,6 +36,7 @@ from astrbot.core.utils.media_utils import (
 
 SSE_HEARTBEAT = ": heartbeat\n\n"
 CHAT_RUN_SUBSCRIBER_QUEUE_SIZE = 256
+SESSION_HISTORY_PAGE_SIZE = 1000
 WEBCHAT_IMAGE_MIME_TYPES = {
     ".jpg": "image/jpeg",
     ".jpeg": "image/jpeg",
@@ -1411,7 +1412,17 @@ class ChatService:
     ) -> list[dict]:
         return await self.get_sessions(username, platform_id)
 
-    async def get_session(self, username: str, session_id: str) -> dict:
+    async def get_session(
+        self,
+        username: str,
+        session_id: str,
+        cursor: str | None = None,
+    ) -> dict:
+        """Return a session with a page of its message history.
+
+        The history page holds the newest messages. Pass the returned
+        ``next_cursor`` back as ``cursor`` to load older messages.
+        """
         session = await self.db.get_platform_session_by_id(session_id)
         if not session:
             raise ChatServiceError(f"Session {session_id} not found")
@@ -1422,12 +1433,15 @@ class ChatService:
         project_info = await self.db.get_project_by_session(
             session_id=session_id, creator=username
         )
-        history_ls = await self.platform_history_mgr.get(
-            platform_id=platform_id,
-            user_id=session_id,
-            page=1,
-            page_size=1000,
-        )
+        try:
+            history_ls, next_cursor = await self.platform_history_mgr.get_by_cursor(
+                platform_id=platform_id,
+                user_id=session_id,
+                page_size=SESSION_HISTORY_PAGE_SIZE,
+                cursor=cursor or None,
+            )
+        except ValueError as exc:
+            raise ChatServiceError(f"Invalid cursor: {cursor}") from exc
         threads = await self.db.get_webchat_threads_by_parent_session(
             parent_session_id=session_id,
             creator=username,
@@ -1438,6 +1452,8 @@ class ChatService:
             "threads": [serialize_thread(thread) for thread in threads],
             "is_running": self.running_convs.get(session_id, False),
             "active_runs": self.get_active_chat_runs(username, session_id),
+            "next_cursor": next_cursor,
+            "has_more": next_cursor is not None,
         }
         if project_info:
             response_data["project"] = {
@@ -1451,10 +1467,11 @@ class ChatService:
         self,
         username: str,
         session_id: str | None,
+        cursor: str | None = None,
     ) -> dict:
         if not session_id:
             raise ChatServiceError("Missing key: session_id")
-        return await self.get_session(username, session_id)
+        return await self.get_session(username, session_id, cursor)
 
     async def create_thread(self, username: str, data: dict) -> dict:
         session_id = data.get("session_id")
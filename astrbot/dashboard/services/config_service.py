@@ -26,6 +26,7 @@ from astrbot.core.platform.register import platform_cls_map, platform_registry
 from astrbot.core.provider.register import provider_registry
 from astrbot.core.star.star import star_registry
 from astrbot.core.utils.astrbot_path import get_astrbot_plugin_data_path
+from astrbot.core.utils.http_client import http_client
 from astrbot.core.utils.totp import (
     is_totp_enabled,
     revoke_user_trusted_devices,
@@ -404,7 +405,7 @@ async def _validate_neo_connectivity(post_config: dict) -> str | None:
 
     health_url = f"{endpoint}/health"
     try:
-        async with aiohttp.ClientSession() as session:
+        async with http_client.session() as session:
             async with session.get(
                 health_url,
                 timeout=aiohttp.ClientTimeout(total=5),
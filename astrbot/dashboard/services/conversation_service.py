@@ -9,6 +9,7 @@ from io import BytesIO
 from astrbot.core import logger
 from astrbot.core.core_lifecycle import AstrBotCoreLifecycle
 from astrbot.core.db import BaseDatabase
+from astrbot.core.db.pagination import decode_cursor
 from astrbot.core.umo_alias import build_umo_alias_map, parse_umo, serialize_umo_alias
 
 
@@ -43,6 +44,8 @@ class ConversationService:
         exclude_ids: str,
         exclude_platforms: str,
         include_history: bool = True,
+        cursor: str | None = None,
+        with_total: bool = False,
     ) -> dict:
         platform_list = [item.strip() for item in platforms.split(",") if item.strip()]
         message_type_list = [
@@ -60,17 +63,45 @@ class ConversationService:
             page_size = 20
         page_size = min(page_size, 100)
 
-        try:
-            conversations, total_count = await self.conv_mgr.get_filtered_conversations(
-                page=page,
+        filters = {
+            "platforms": platform_list,
+            "message_types": message_type_list,
+            "exclude_ids": exclude_id_list,
+            "exclude_platforms": exclude_platform_list,
+            "include_history": include_history,
+        }
+        if cursor is not None:
+            return await self._list_conversations_by_cursor(
                 page_size=page_size,
-                platforms=platform_list,
-                message_types=message_type_list,
+                cursor=cursor,
                 search_query=search_query,
-                exclude_ids=exclude_id_list,
-                exclude_platforms=exclude_platform_list,
-                include_history=include_history,
+                with_total=with_total,
+                filters=filters,
             )
+        snippets: dict[str, str] = {}
+        try:
+            search_result = None
+            if search_query:
+                search_result = await self.conv_mgr.search_conversations(
+                    search_query,
+                    page=page,
+                    page_size=page_size,
+                    **filters,
+                )
+            if search_result is not None:
+                hits, total_count = search_result
+                conversations = [conversation for conversation, _ in hits]
+                snippets = {conversation.cid: snippet for conversation, snippet in hits}
+            else:
+                (
+                    conversations,
+                    total_count,
+                ) = await self.conv_mgr.get_filtered_conversations(
+                    page=page,
+                    page_size=page_size,
+                    search_query=search_query,
+                    **filters,
+                )
         except Exception as exc:
             logger.error(f"数据库查询出错: {exc!s}\n{traceback.format_exc()}")
             raise ConversationServiceError(f"数据库查询出错: {exc!s}") from exc
@@ -87,6 +118,7 @@ class ConversationService:
                     conversation,
                     alias_map,
                     include_history=include_history,
+                    search_snippet=snippets.get(conversation.cid, ""),
                 )
                 for conversation in conversations
             ],
@@ -98,6 +130,67 @@ class ConversationService:
             },
         }
 
+    async def _list_conversations_by_cursor(
+        self,
+        *,
+        page_size: int,
+        cursor: str,
+        search_query: str,
+        with_total: bool,
+        filters: dict,
+    ) -> dict:
+        include_history = filters["include_history"]
+        if cursor:
+            try:
+                decode_cursor(cursor)
+            except ValueError as exc:
+                raise ConversationServiceError(f"无效的分页游标: {cursor}") from exc
+        try:
+            (
+                conversations,
+                next_cursor,
+            ) = await self.conv_mgr.get_conversations_by_cursor(
+                page_size=page_size,
+                cursor=cursor or None,
+                search_query=search_query,
+                **filters,
+            )
+            total_count = None
+            if with_total:
+                count_filters = {
+                    key: value
+                    for key, value in filters.items()
+                    if key != "include_history"
+                }
+                total_count = await self.conv_mgr.count_filtered_conversations(
+                    search_query=search_query,
+                    **count_filters,
+                )
+        except Exception as exc:
+            logger.error(f"数据库查询出错: {exc!s}\n{traceback.format_exc()}")
+            raise ConversationServiceError(f"数据库查询出错: {exc!s}") from exc
+
+        umos = sorted({conv.user_id for conv in conversations if conv.user_id})
+        alias_map = build_umo_alias_map(await self.db_helper.get_umo_aliases(umos))
+        pagination = {
+            "page_size": page_size,
+            "next_cursor": next_cursor,
+            "has_more": next_cursor is not None,
+        }
+        if total_count is not None:
+            pagination["total"] = total_count
+        return {
+            "conversations": [
+                self._serialize_conversation(
+                    conversation,
+                    alias_map,
+                    include_history=include_history,
+                )
+                for conversation in conversations
+            ],
+            "pagination": pagination,
+        }
+
     async def get_conversation_detail(self, data: object) -> dict:
         payload = self._payload(data)
         user_id, cid = self._require_user_and_cid(payload)
@@ -286,6 +379,7 @@ class ConversationService:
         alias_map: dict,
         *,
         include_history: bool,
+        search_snippet: str = "",
     ) -> dict:
         """Serialize a conversation for a list response.
 
@@ -293,6 +387,7 @@ class ConversationService:
             conversation: Conversation object returned by the manager.
             alias_map: UMO aliases keyed by unified message origin.
             include_history: Whether to include the serialized message history.
+            search_snippet: HTML-escaped search hit with `<mark>` highlights.
 
         Returns:
             Conversation data suitable for a dashboard API response.
@@ -310,6 +405,8 @@ class ConversationService:
         }
         if include_history:
             result["history"] = conversation.history
+        if search_snippet:
+            result["search_snippet"] = search_snippet
         return result
 
     @staticmethod
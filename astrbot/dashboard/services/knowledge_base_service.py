@@ -7,10 +7,9 @@ import uuid
 from pathlib import Path
 from typing import Any
 
-import aiofiles
-
 from astrbot.core import logger
 from astrbot.core.core_lifecycle import AstrBotCoreLifecycle
+from astrbot.core.knowledge_base.retrieval.manager import RetrievalPlan
 from astrbot.core.provider.provider import EmbeddingProvider, RerankProvider
 from astrbot.core.utils.astrbot_path import get_astrbot_system_tmp_path
 from astrbot.dashboard.schemas import KnowledgeBaseRequest
@@ -143,11 +142,16 @@ class KnowledgeBaseService:
         tasks_limit: int,
         max_retries: int,
     ) -> None:
-        """Process staged knowledge base files one at a time.
+        """Import staged knowledge base files through the ingest queue.
+
+        Each file becomes a checkpointed ingest job. Jobs run concurrently up
+        to ``kb_ingest_workers``; a job interrupted by a restart resumes on the
+        next startup, and a failed job can be retried without re-embedding the
+        chunks it already finished.
 
         Args:
             task_id: Identifier used to report upload progress and results.
-            kb_helper: Knowledge base helper that parses and stores documents.
+            kb_helper: Knowledge base helper that creates the ingest jobs.
             files_to_upload: Metadata and temporary paths for staged files.
             staging_dir: Task-specific system temporary directory.
             chunk_size: Maximum size of each generated document chunk.
@@ -167,54 +171,49 @@ class KnowledgeBaseService:
                 "total": 100,
             }
 
-            uploaded_docs = []
-            failed_docs = []
+            kb_manager = self.get_kb_manager()
 
-            for file_idx, file_info in enumerate(files_to_upload):
-                file_content = None
+            async def ingest(file_idx: int, file_info: dict[str, Any]):
+                file_name = file_info["file_name"]
                 try:
-                    temp_file_path = Path(file_info["temp_file_path"])
-                    async with aiofiles.open(temp_file_path, "rb") as file_obj:
-                        file_content = await file_obj.read()
-                    self.update_progress(
-                        task_id,
-                        status="processing",
-                        file_index=file_idx,
-                        file_name=file_info["file_name"],
-                        stage="parsing",
-                        current=0,
-                        total=100,
-                    )
-                    progress_callback = self.make_progress_callback(
-                        task_id, file_idx, file_info["file_name"]
-                    )
-                    doc = await kb_helper.upload_document(
-                        file_name=file_info["file_name"],
-                        file_content=file_content,
+                    job = await kb_helper.create_ingest_job(
+                        file_name=file_name,
                         file_type=file_info["file_type"],
+                        source_path=file_info["temp_file_path"],
                         chunk_size=chunk_size,
                         chunk_overlap=chunk_overlap,
                         batch_size=batch_size,
                         tasks_limit=tasks_limit,
                         max_retries=max_retries,
-                        progress_callback=progress_callback,
                     )
-                    uploaded_docs.append(doc.model_dump())
-                except Exception as exc:
-                    logger.error(f"上传文档 {file_info['file_name']} 失败: {exc}")
-                    failed_docs.append(
-                        {
-                            "file_name": file_info["file_name"],
-                            "error": self.format_failed_doc_error(
-                                file_info["file_name"], exc
-                            ),
-                        },
+                    task = await kb_manager.submit_ingest_job(
+                        job,
+                        progress_callback=self.make_progress_callback(
+                            task_id, file_idx, file_name
+                        ),
                     )
+                    # The job keeps running in the ingest queue even if this
+                    # upload task is cancelled.
+                    doc = await asyncio.shield(task)
+                    return doc.model_dump(), None
+                except Exception as exc:
+                    logger.error(f"上传文档 {file_name} 失败: {exc}")
+                    return None, {
+                        "file_name": file_name,
+                        "error": self.format_failed_doc_error(file_name, exc),
+                    }
                 finally:
-                    # Release the current file before reading the next one.
-                    file_content = None
                     Path(file_info["temp_file_path"]).unlink(missing_ok=True)
 
+            results = await asyncio.gather(
+                *(
+                    ingest(file_idx, file_info)
+                    for file_idx, file_info in enumerate(files_to_upload)
+                ),
+            )
+            uploaded_docs = [doc for doc, failure in results if failure is None]
+            failed_docs = [failure for _, failure in results if failure is not None]
+
             self.set_task_result(
                 task_id,
                 "completed",
@@ -401,6 +400,9 @@ class KnowledgeBaseService:
             top_k_dense=payload.get("top_k_dense"),
             top_k_sparse=payload.get("top_k_sparse"),
             top_m_final=payload.get("top_m_final"),
+            index_type=payload.get("index_type"),
+            index_nprobe=payload.get("index_nprobe"),
+            index_ef_search=payload.get("index_ef_search"),
         )
         return kb_helper.kb.model_dump(), "创建知识库成功"
 
@@ -432,6 +434,9 @@ class KnowledgeBaseService:
             "top_k_dense",
             "top_k_sparse",
             "top_m_final",
+            "index_type",
+            "index_nprobe",
+            "index_ef_search",
         ]
         provided_updates = {key: payload[key] for key in update_keys if key in payload}
         if not provided_updates:
@@ -469,6 +474,8 @@ class KnowledgeBaseService:
         if not kb_helper:
             raise KnowledgeBaseServiceError("知识库不存在")
         kb = kb_helper.kb
+        query_cache = self.get_kb_manager().query_embedding_cache
+        chunk_store = self.get_kb_manager().chunk_embedding_store
         return {
             "kb_id": kb.kb_id,
             "kb_name": kb.kb_name,
@@ -476,6 +483,8 @@ class KnowledgeBaseService:
             "chunk_count": kb.chunk_count,
             "created_at": kb.created_at.isoformat(),
             "updated_at": kb.updated_at.isoformat(),
+            "query_embedding_cache": query_cache.stats() if query_cache else None,
+            "chunk_embedding_store": chunk_store.stats() if chunk_store else None,
         }
 
     async def get_kb_stats_from_dashboard_query(
@@ -766,6 +775,45 @@ class KnowledgeBaseService:
         await kb_helper.delete_chunk(chunk_id, doc_id)
         return None, "删除文本块成功"
 
+    async def list_ingest_jobs(self, *, kb_id: str | None) -> dict[str, Any]:
+        if not kb_id:
+            raise KnowledgeBaseServiceError("缺少参数 kb_id")
+        kb_manager = self.get_kb_manager()
+        jobs = await kb_manager.list_ingest_jobs(kb_id=kb_id)
+        return {
+            "items": [
+                {
+                    **job.model_dump(exclude={"source_path"}),
+                    "active": kb_manager.ingest_queue.is_active(job.job_id),
+                }
+                for job in jobs
+            ],
+            "queue": kb_manager.ingest_queue.stats(),
+        }
+
+    async def _get_ingest_job(self, data: object):
+        payload = self._payload(data)
+        kb_id = payload.get("kb_id")
+        job_id = payload.get("job_id")
+        if not kb_id:
+            raise KnowledgeBaseServiceError("缺少参数 kb_id")
+        if not job_id:
+            raise KnowledgeBaseServiceError("缺少参数 job_id")
+        job = await self.get_kb_manager().kb_db.get_ingest_job(job_id)
+        if not job or job.kb_id != kb_id:
+            raise KnowledgeBaseServiceError("导入任务不存在")
+        return job
+
+    async def retry_ingest_job(self, data: object) -> tuple[None, str]:
+        job = await self._get_ingest_job(data)
+        await self.get_kb_manager().retry_ingest_job(job.job_id)
+        return None, "已重新提交导入任务"
+
+    async def discard_ingest_job(self, data: object) -> tuple[None, str]:
+        job = await self._get_ingest_job(data)
+        await self.get_kb_manager().discard_ingest_job(job.job_id)
+        return None, "已放弃导入任务"
+
     async def list_chunks(
         self,
         *,
@@ -822,10 +870,13 @@ class KnowledgeBaseService:
             raise KnowledgeBaseServiceError("缺少参数 kb_names 或格式错误")
 
         top_k = payload.get("top_k", 5)
+        config = self.core_lifecycle.astrbot_config
         results = await kb_manager.retrieve(
             query=query,
             kb_names=kb_names,
+            top_k_fusion=config.get("kb_fusion_top_k", 20),
             top_m_final=top_k,
+            plan=RetrievalPlan.from_config(config),
         )
         result_list = results["results"] if results else []
         response_data = {
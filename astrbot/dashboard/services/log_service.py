@@ -7,6 +7,7 @@ from collections.abc import AsyncGenerator
 
 from astrbot.core import LogBroker, logger
 from astrbot.core.config.astrbot_config import AstrBotConfig
+from astrbot.core.log_store import LogQuery
 
 
 class LogServiceError(Exception):
@@ -26,14 +27,33 @@ class LogService:
         }
         return f"id: {ts}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
 
-    async def replay_cached_logs(self, last_event_id: str) -> AsyncGenerator[str, None]:
+    async def replay_cached_logs(
+        self,
+        last_event_id: str,
+        log_filter: LogQuery | None = None,
+    ) -> AsyncGenerator[str, None]:
         try:
             last_ts = float(last_event_id)
             cached_logs = list(self.log_broker.log_cache)
+            oldest_cached = (
+                float(cached_logs[0].get("time", 0)) if cached_logs else None
+            )
+            store = self.log_broker.store
+            if store and (oldest_cached is None or oldest_cached > last_ts):
+                # 断线期间的日志超出了内存缓存的范围, 更早的部分从持久化存储补发
+                stored_logs = await asyncio.to_thread(store.entries_since, last_ts)
+                cached_logs = [
+                    log_item
+                    for log_item in stored_logs
+                    if oldest_cached is None
+                    or float(log_item.get("time", 0)) < oldest_cached
+                ] + cached_logs
 
             for log_item in cached_logs:
                 log_ts = float(log_item.get("time", 0))
-                if log_ts > last_ts:
+                if log_ts <= last_ts:
+                    continue
+                if not log_filter or log_filter.matches(log_item):
                     yield self.format_log_sse(log_item, log_ts)
         except ValueError:
             pass
@@ -41,17 +61,21 @@ class LogService:
             logger.error(f"Log SSE 补发历史错误: {exc}")
 
     async def stream_log_events(
-        self, last_event_id: str | None
+        self,
+        last_event_id: str | None,
+        log_filter: LogQuery | None = None,
     ) -> AsyncGenerator[str, None]:
         queue = None
         try:
             if last_event_id:
-                async for event in self.replay_cached_logs(last_event_id):
+                async for event in self.replay_cached_logs(last_event_id, log_filter):
                     yield event
 
             queue = self.log_broker.register()
             while True:
                 message = await queue.get()
+                if log_filter and not log_filter.matches(message):
+                    continue
                 current_ts = message.get("time", time.time())
                 yield self.format_log_sse(message, current_ts)
         except asyncio.CancelledError:
@@ -69,6 +93,18 @@ class LogService:
             logger.error(f"获取日志历史失败: {exc}")
             raise LogServiceError(f"获取日志历史失败: {exc}") from exc
 
+    async def query_logs(self, log_query: LogQuery) -> dict:
+        store = self.log_broker.store
+        if store is None:
+            raise LogServiceError("持久化日志存储未启用")
+        try:
+            result = await asyncio.to_thread(store.query, log_query)
+            result["store"] = await asyncio.to_thread(store.stats)
+            return result
+        except Exception as exc:
+            logger.error(f"查询日志失败: {exc}")
+            raise LogServiceError(f"查询日志失败: {exc}") from exc
+
     def get_trace_settings(self) -> dict:
         try:
             return {"trace_enable": self.config.get("trace_enable", True)}
@@ -23,25 +23,42 @@ from astrbot.core.dashboard_assets import (
     get_dashboard_version,
 )
 from astrbot.core.db import BaseDatabase
-from astrbot.core.db.po import PlatformStat, ProviderStat
+from astrbot.core.db.po import PlatformStat, ProviderStatRollup
+from astrbot.core.db.provider_stat_rollup import (
+    ALL_UMO,
+    PERIOD_DAY,
+    PERIOD_HOUR,
+    local_day_start,
+    local_hour_start,
+)
 from astrbot.core.desktop_runtime import (
     DESKTOP_MANAGED_RESTART_MESSAGE,
     is_desktop_managed_backend,
     is_desktop_session_auth_enabled,
 )
+from astrbot.core.pipeline.profiler import pipeline_profiler
 from astrbot.core.utils.astrbot_path import get_astrbot_path
 from astrbot.core.utils.auth_password import (
     is_default_dashboard_password,
     is_md5_dashboard_password,
 )
+from astrbot.core.utils.http_client import http_client
+from astrbot.core.utils.image_caption_cache import image_caption_cache
+from astrbot.core.utils.latency_histogram import LatencyHistogram
+from astrbot.core.utils.media_cache import media_cache
 from astrbot.core.utils.storage_cleaner import StorageCleaner
 from astrbot.core.utils.version_comparator import VersionComparator
+from astrbot.core.utils.web_search_cache import web_search_cache
 from astrbot.dashboard.password_state import (
     get_dashboard_password_hash,
     is_password_change_required,
     is_password_storage_upgraded,
 )
 
+# 模型调用统计支持的时间范围 (天), 7 天及以内按小时聚合, 更长的范围按天聚合
+PROVIDER_STAT_RANGES = (1, 3, 7, 30, 90)
+HOURLY_RANGE_MAX_DAYS = 7
+
 
 class StatServiceError(Exception):
     pass
@@ -268,6 +285,7 @@ class StatService:
                 }
                 plugin_info.append(info)
 
+            event_bus = getattr(self.core_lifecycle, "event_bus", None)
             running_time = self.get_running_time_components(
                 int(time.time()) - self.core_lifecycle.start_time,
             )
@@ -289,108 +307,186 @@ class StatService:
                 "cpu_percent": round(cpu_percent, 1),
                 "thread_count": thread_count,
                 "start_time": self.core_lifecycle.start_time,
+                "event_dispatch": event_bus.metrics() if event_bus else {},
             }
         except Exception as exc:
             logger.error(traceback.format_exc())
             raise StatServiceError(str(exc)) from exc
 
+    def get_pipeline_profile(self) -> dict:
+        return pipeline_profiler.snapshot()
+
+    def get_pipeline_profile_prometheus(self) -> str:
+        return pipeline_profiler.render_prometheus()
+
+    def set_pipeline_profiler_enabled(self, enabled: bool) -> dict:
+        pipeline_profiler.enabled = enabled
+        return {"enabled": pipeline_profiler.enabled}
+
+    def reset_pipeline_profile(self) -> dict:
+        pipeline_profiler.reset()
+        return pipeline_profiler.snapshot()
+
+    def get_http_client_stats(self) -> dict:
+        return http_client.stats()
+
+    def get_image_caption_cache_stats(self) -> dict:
+        return image_caption_cache.stats()
+
+    def set_image_caption_cache_enabled(self, enabled: bool) -> dict:
+        image_caption_cache.enabled = enabled
+        self.config["image_caption_cache_enable"] = enabled
+        self.config.save_config()
+        return image_caption_cache.stats()
+
+    async def clear_image_caption_cache(self) -> dict:
+        await image_caption_cache.clear()
+        return image_caption_cache.stats()
+
+    def get_web_search_cache_stats(self) -> dict:
+        return web_search_cache.stats()
+
+    async def clear_web_search_cache(self) -> dict:
+        await web_search_cache.clear()
+        return web_search_cache.stats()
+
+    def get_media_cache_stats(self) -> dict:
+        return media_cache.stats()
+
+    async def clear_media_cache(self) -> dict:
+        await media_cache.clear()
+        return media_cache.stats()
+
     @staticmethod
-    def _ensure_aware_utc(value: datetime) -> datetime:
-        if value.tzinfo is None:
-            return value.replace(tzinfo=timezone.utc)
-        return value.astimezone(timezone.utc)
+    def _percentiles_ms(histogram: LatencyHistogram) -> dict:
+        return {
+            f"p{q}": histogram.percentile(q) * 1000 if histogram.count else 0
+            for q in (50, 90, 99)
+        }
 
     async def get_provider_token_stats(self, days: int) -> dict:
         try:
-            if days not in (1, 3, 7):
+            if days not in PROVIDER_STAT_RANGES:
                 days = 1
 
-            local_tz = datetime.now().astimezone().tzinfo or timezone.utc
-            now_local = datetime.now(local_tz)
-            range_start_local = (now_local - timedelta(days=days)).replace(
-                minute=0, second=0, microsecond=0
-            )
-            today_start_local = now_local.replace(
-                hour=0, minute=0, second=0, microsecond=0
-            )
-            query_start_local = min(range_start_local, today_start_local)
-            query_start_utc = query_start_local.astimezone(timezone.utc)
+            now = datetime.now(timezone.utc)
+            today_start = local_day_start(now)
+            if days <= HOURLY_RANGE_MAX_DAYS:
+                period = PERIOD_HOUR
+                range_start = local_hour_start(now - timedelta(days=days))
+                bucket_timestamps = list(
+                    range(range_start, int(now.timestamp()) + 1, 3600)
+                )
+            else:
+                period = PERIOD_DAY
+                bucket_timestamps = [
+                    local_day_start(now - timedelta(days=offset))
+                    for offset in range(days - 1, -1, -1)
+                ]
+                range_start = bucket_timestamps[0]
 
+            token_total = (
+                col(ProviderStatRollup.token_input_other)
+                + col(ProviderStatRollup.token_input_cached)
+                + col(ProviderStatRollup.token_output)
+            )
             async with self.db_helper.get_db() as session:
-                result = await session.execute(
-                    select(ProviderStat)
-                    .where(
-                        ProviderStat.agent_type == "internal",
-                        ProviderStat.created_at >= query_start_utc,
+                range_rows = (
+                    (
+                        await session.execute(
+                            select(ProviderStatRollup).where(
+                                col(ProviderStatRollup.period) == period,
+                                col(ProviderStatRollup.bucket_start) >= range_start,
+                                col(ProviderStatRollup.umo) == ALL_UMO,
+                            )
+                        )
                     )
-                    .order_by(col(ProviderStat.created_at).asc())
+                    .scalars()
+                    .all()
                 )
-                records = result.scalars().all()
-
-            bucket_timestamps: list[int] = []
-            bucket_cursor = range_start_local
-            while bucket_cursor <= now_local:
-                bucket_timestamps.append(int(bucket_cursor.timestamp() * 1000))
-                bucket_cursor += timedelta(hours=1)
+                umo_rows = (
+                    await session.execute(
+                        select(ProviderStatRollup.umo, func.sum(token_total))
+                        .where(
+                            col(ProviderStatRollup.period) == period,
+                            col(ProviderStatRollup.bucket_start) >= range_start,
+                            col(ProviderStatRollup.umo) != ALL_UMO,
+                        )
+                        .group_by(col(ProviderStatRollup.umo))
+                    )
+                ).all()
+                today_rows = (
+                    await session.execute(
+                        select(
+                            ProviderStatRollup.provider_id,
+                            ProviderStatRollup.provider_model,
+                            func.sum(token_total),
+                            func.sum(ProviderStatRollup.calls),
+                        )
+                        .where(
+                            col(ProviderStatRollup.period) == PERIOD_HOUR,
+                            col(ProviderStatRollup.bucket_start) >= today_start,
+                            col(ProviderStatRollup.umo) == ALL_UMO,
+                        )
+                        .group_by(
+                            col(ProviderStatRollup.provider_id),
+                            col(ProviderStatRollup.provider_model),
+                        )
+                    )
+                ).all()
 
             trend_by_provider: dict[str, dict[int, int]] = defaultdict(
                 lambda: defaultdict(int)
             )
             total_by_provider: dict[str, int] = defaultdict(int)
-            total_by_umo: dict[str, int] = defaultdict(int)
             total_by_bucket: dict[int, int] = defaultdict(int)
             range_total_tokens = 0
             range_total_output_tokens = 0
             range_total_calls = 0
-            range_success_calls = 0
-            range_ttft_total_ms = 0.0
+            range_error_calls = 0
+            range_ttft_total = 0.0
             range_ttft_samples = 0
-            range_duration_total_ms = 0.0
+            range_duration_total = 0.0
             range_duration_samples = 0
+            ttft_histogram = LatencyHistogram()
+            duration_histogram = LatencyHistogram()
+
+            for row in range_rows:
+                row_tokens = (
+                    row.token_input_other + row.token_input_cached + row.token_output
+                )
+                bucket_ts = row.bucket_start * 1000
+                trend_by_provider[row.provider_id][bucket_ts] += row_tokens
+                total_by_provider[row.provider_id] += row_tokens
+                total_by_bucket[bucket_ts] += row_tokens
+                range_total_tokens += row_tokens
+                range_total_calls += row.calls
+                range_error_calls += row.error_calls
+                range_ttft_total += row.ttft_sum
+                range_ttft_samples += row.ttft_samples
+                range_duration_total += row.duration_sum
+                range_duration_samples += row.duration_samples
+                range_total_output_tokens += row.duration_output_tokens
+                ttft_histogram.merge(LatencyHistogram.from_dict(row.ttft_sketch))
+                duration_histogram.merge(
+                    LatencyHistogram.from_dict(row.duration_sketch),
+                )
+
+            total_by_umo = {umo: int(tokens or 0) for umo, tokens in umo_rows}
             today_by_model: dict[str, int] = defaultdict(int)
             today_by_provider: dict[str, int] = defaultdict(int)
             today_total_tokens = 0
             today_total_calls = 0
-
-            for record in records:
-                created_at_utc = self._ensure_aware_utc(record.created_at)
-                created_at_local = created_at_utc.astimezone(local_tz)
-                token_total = (
-                    record.token_input_other
-                    + record.token_input_cached
-                    + record.token_output
-                )
-                provider_id = record.provider_id or "unknown"
-                provider_model = record.provider_model or "Unknown"
-
-                if created_at_local >= range_start_local:
-                    bucket_local = created_at_local.replace(
-                        minute=0, second=0, microsecond=0
-                    )
-                    bucket_ts = int(bucket_local.timestamp() * 1000)
-                    trend_by_provider[provider_id][bucket_ts] += token_total
-                    total_by_provider[provider_id] += token_total
-                    total_by_umo[record.umo or "unknown"] += token_total
-                    total_by_bucket[bucket_ts] += token_total
-                    range_total_tokens += token_total
-                    range_total_calls += 1
-                    if record.status != "error":
-                        range_success_calls += 1
-                    if record.time_to_first_token > 0:
-                        range_ttft_total_ms += record.time_to_first_token * 1000
-                        range_ttft_samples += 1
-                    if record.end_time > record.start_time:
-                        range_duration_total_ms += (
-                            record.end_time - record.start_time
-                        ) * 1000
-                        range_duration_samples += 1
-                        range_total_output_tokens += record.token_output
-
-                if created_at_local >= today_start_local:
-                    today_total_calls += 1
-                    today_total_tokens += token_total
-                    today_by_model[provider_model] += token_total
-                    today_by_provider[provider_id] += token_total
+            for provider_id, provider_model, tokens, calls in today_rows:
+                tokens = int(tokens or 0)
+                today_total_tokens += tokens
+                today_total_calls += int(calls or 0)
+                today_by_model[provider_model or "Unknown"] += tokens
+                today_by_provider[provider_id] += tokens
+            range_success_calls = range_total_calls - range_error_calls
+            range_ttft_total_ms = range_ttft_total * 1000
+            range_duration_total_ms = range_duration_total * 1000
+            bucket_timestamps = [bucket * 1000 for bucket in bucket_timestamps]
 
             sorted_provider_ids = sorted(
                 total_by_provider.keys(),
@@ -450,6 +546,7 @@ class StatService:
 
             return {
                 "days": days,
+                "period": period,
                 "trend": {
                     "series": series,
                     "total_series": total_series,
@@ -474,6 +571,10 @@ class StatService:
                 "range_success_rate": (
                     range_success_calls / range_total_calls if range_total_calls else 0
                 ),
+                "range_ttft_percentiles_ms": self._percentiles_ms(ttft_histogram),
+                "range_duration_percentiles_ms": self._percentiles_ms(
+                    duration_histogram,
+                ),
                 "range_by_provider": range_by_provider_data,
                 "range_by_umo": range_by_umo_data,
                 "today_total_tokens": today_total_tokens,
@@ -495,7 +596,7 @@ class StatService:
             start_time = time.time()
 
             async with (
-                aiohttp.ClientSession() as session,
+                http_client.session() as session,
                 session.get(
                     test_url,
                     timeout=aiohttp.ClientTimeout(total=10),
@@ -317,6 +317,9 @@ export type KnowledgeBaseRequest = {
     top_k_dense?: number;
     top_k_sparse?: number;
     top_m_final?: number;
+    index_type?: 'flat' | 'hnsw' | 'ivf_flat' | 'ivf_pq';
+    index_nprobe?: number;
+    index_ef_search?: number;
 };
 
 export type KnowledgeDocumentImportRequest = {
@@ -1376,6 +1379,12 @@ export type GetChatSessionData = {
     path: {
         session_id: string;
     };
+    query?: {
+        /**
+         * Load older messages. Pass the `next_cursor` of the previous response; omit it for the newest messages.
+         */
+        cursor?: string;
+    };
 };
 
 export type GetChatSessionResponse = (SuccessEnvelope);
@@ -3142,6 +3151,10 @@ export type DeleteSessionGroupError = unknown;
 
 export type ListConversationsData = {
     query?: {
+        /**
+         * Switch to cursor pagination. Pass an empty value for the first page, then the `next_cursor` of the previous page. `page` is ignored.
+         */
+        cursor?: string;
         /**
          * Comma-separated user IDs to exclude.
          */
@@ -3167,6 +3180,10 @@ export type ListConversationsData = {
         platforms?: string;
         search?: string;
         user_id?: string;
+        /**
+         * In cursor mode, also return a briefly cached total count.
+         */
+        with_total?: boolean;
     };
 };
 
@@ -1449,6 +1449,11 @@ export const knowledgeApi = {
       openApiV1.getKnowledgeBase({ path: { kb_id: kbId } }),
     );
   },
+  stats(kbId: string) {
+    return typed<any>(
+      openApiV1.getKnowledgeBaseStats({ path: { kb_id: kbId } }),
+    );
+  },
   create(config: KnowledgeBaseCreateRequest) {
     return typed<OpenConfig>(
       openApiV1.createKnowledgeBase({ body: config }),
@@ -0,0 +1,190 @@
+"""Benchmark WakingCheckStage handler matching with synthetic plugin sets.
+
+Compares the old linear scan (evaluate every handler's filters for every
+message) against the registry's dispatch index (evaluate only candidates).
+
+Usage:
+    uv run python scripts/benchmark_handler_dispatch.py [--plugins 20 60 120]
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+
+from astrbot.core.platform.message_type import MessageType  # noqa: E402
+from astrbot.core.star.dispatch_index import HandlerDispatchIndex  # noqa: E402
+from astrbot.core.star.filter.command import CommandFilter  # noqa: E402
+from astrbot.core.star.filter.command_group import CommandGroupFilter  # noqa: E402
+from astrbot.core.star.filter.event_message_type import (  # noqa: E402
+    EventMessageType,
+    EventMessageTypeFilter,
+)
+from astrbot.core.star.filter.platform_adapter_type import (  # noqa: E402
+    PlatformAdapterType,
+    PlatformAdapterTypeFilter,
+)
+from astrbot.core.star.filter.regex import RegexFilter  # noqa: E402
+from astrbot.core.star.star_handler import (  # noqa: E402
+    EventType,
+    StarHandlerMetadata,
+)
+
+
+async def _handler(self, event, arg: str = "") -> None:
+    pass
+
+
+class _Event:
+    def __init__(self, text: str, platform: str, message_type: MessageType) -> None:
+        self.message_str = text
+        self.is_at_or_wake_command = True
+        self.platform = platform
+        self.message_type = message_type
+
+    def get_message_str(self) -> str:
+        return self.message_str
+
+    def get_platform_name(self) -> str:
+        return self.platform
+
+    def get_message_type(self) -> MessageType:
+        return self.message_type
+
+    def set_extra(self, key, value) -> None:
+        pass
+
+
+def _metadata(plugin: int, name: str) -> StarHandlerMetadata:
+    return StarHandlerMetadata(
+        event_type=EventType.AdapterMessageEvent,
+        handler_full_name=f"plugin_{plugin}.main_{name}",
+        handler_name=name,
+        handler_module_path=f"plugin_{plugin}.main",
+        handler=_handler,
+        event_filters=[],
+        extras_configs={"priority": 0},
+    )
+
+
+def build_plugin_set(plugin_count: int) -> list[StarHandlerMetadata]:
+    """Each synthetic plugin registers 3 commands, a command group with a
+    sub-command, a regex handler and a platform-specific listener."""
+    handlers = []
+    for p in range(plugin_count):
+        for c in range(3):
+            md = _metadata(p, f"cmd{c}")
+            md.event_filters.append(
+                CommandFilter(f"p{p}c{c}", {f"p{p}a{c}"}, handler_md=md),
+            )
+            handlers.append(md)
+
+        group = CommandGroupFilter(f"p{p}grp")
+        group_md = _metadata(p, "grp")
+        group_md.event_filters.append(group)
+        handlers.append(group_md)
+        sub_md = _metadata(p, "sub")
+        sub_md.event_filters.append(
+            CommandFilter(
+                "sub",
+                handler_md=sub_md,
+                parent_command_names=group.get_complete_command_names(),
+            ),
+        )
+        handlers.append(sub_md)
+
+        regex_md = _metadata(p, "regex")
+        regex_md.event_filters.append(RegexFilter(rf"^p{p}-\d+$"))
+        handlers.append(regex_md)
+
+        listener_md = _metadata(p, "listener")
+        listener_md.event_filters.append(
+            PlatformAdapterTypeFilter(PlatformAdapterType.TELEGRAM),
+        )
+        listener_md.event_filters.append(
+            EventMessageTypeFilter(EventMessageType.GROUP_MESSAGE),
+        )
+        handlers.append(listener_md)
+    return handlers
+
+
+def build_messages(plugin_count: int, count: int) -> list[_Event]:
+    rng = random.Random(42)
+    messages = []
+    for _ in range(count):
+        p = rng.randrange(plugin_count)
+        text = rng.choice(
+            [
+                f"p{p}c1 arg",
+                f"p{p}a2",
+                f"p{p}grp sub x",
+                f"p{p}-123",
+                "just chatting with the bot",
+                "你好，今天天气怎么样",
+            ],
+        )
+        platform = rng.choice(["aiocqhttp", "telegram", "discord"])
+        messages.append(_Event(text, platform, MessageType.GROUP_MESSAGE))
+    return messages
+
+
+def _evaluate(handlers, event) -> int:
+    matched = 0
+    for handler in handlers:
+        try:
+            if all(f.filter(event, {}) for f in handler.event_filters):
+                matched += 1
+        except ValueError:
+            matched += 1
+    return matched
+
+
+def run(plugin_count: int, message_count: int) -> None:
+    handlers = build_plugin_set(plugin_count)
+    messages = build_messages(plugin_count, message_count)
+
+    start = time.perf_counter()
+    linear_matches = [_evaluate(handlers, event) for event in messages]
+    linear = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index = HandlerDispatchIndex(handlers)
+    build = time.perf_counter() - start
+
+    candidate_total = 0
+    start = time.perf_counter()
+    indexed_matches = []
+    for event in messages:
+        candidates = index.match(event)
+        candidate_total += len(candidates)
+        indexed_matches.append(_evaluate(candidates, event))
+    indexed = time.perf_counter() - start
+
+    assert linear_matches == indexed_matches, "index changed matching results"
+    print(
+        f"plugins={plugin_count:<4} handlers={len(handlers):<5} "
+        f"linear={linear / message_count * 1e6:8.1f}us/msg "
+        f"indexed={indexed / message_count * 1e6:8.1f}us/msg "
+        f"speedup={linear / indexed:5.1f}x "
+        f"candidates={candidate_total / message_count:5.1f}/msg "
+        f"build={build * 1e3:.1f}ms",
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--plugins", type=int, nargs="+", default=[20, 60, 120])
+    parser.add_argument("--messages", type=int, default=5000)
+    args = parser.parse_args()
+    for plugin_count in args.plugins:
+        run(plugin_count, args.messages)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,16 @@
 """Tests for EstimateTokenCounter multimodal support."""
 
+import sys
+import types
+
+from astrbot.core.agent.context import token_counter as token_counter_module
 from astrbot.core.agent.context.token_counter import (
     AUDIO_TOKEN_ESTIMATE,
     IMAGE_TOKEN_ESTIMATE,
+    BPETokenCounter,
     EstimateTokenCounter,
+    encoding_for_model,
+    get_token_counter,
 )
 from astrbot.core.agent.message import (
     AudioURLPart,
@@ -138,3 +145,111 @@ class TestToolCalls:
         # 文本 + tool call JSON 都应被计算
         text_only = counter.count_tokens([_msg("assistant", "calling tool")])
         assert tokens > text_only
+
+
+class TestCountCache:
+    def test_unchanged_history_is_not_recounted(self, monkeypatch):
+        local_counter = EstimateTokenCounter()
+        counted: list[str] = []
+        original = local_counter._count_text
+
+        def tracking_count(text: str) -> int:
+            counted.append(text)
+            return original(text)
+
+        monkeypatch.setattr(local_counter, "_count_text", tracking_count)
+        history = [
+            _msg("user", "hello world"),
+            _msg("assistant", [TextPart(text="hi there")]),
+        ]
+
+        first = local_counter.count_tokens(history)
+        history.append(_msg("user", "a new question"))
+        second = local_counter.count_tokens(history)
+
+        assert second > first
+        assert counted == ["hello world", "hi there", "a new question"]
+
+    def test_tool_calls_are_memoized_by_identity(self):
+        local_counter = EstimateTokenCounter()
+        tool_call = {
+            "type": "function",
+            "id": "1",
+            "function": {"name": "get_weather", "arguments": "{}"},
+        }
+        msg = Message(role="assistant", content="calling", tool_calls=[tool_call])
+
+        assert local_counter.count_tokens([msg]) == local_counter.count_tokens([msg])
+        assert len(local_counter._tool_call_cache) == 1
+
+    def test_cache_does_not_keep_message_texts(self):
+        local_counter = EstimateTokenCounter()
+        text = "a long message " * 100
+
+        local_counter.count_tokens([_msg("user", text)])
+
+        keys = list(local_counter._text_cache._entries)
+        assert len(keys) == 1
+        assert isinstance(keys[0], bytes)
+        assert len(keys[0]) < len(text)
+
+
+class FakeEncoding:
+    def encode_ordinary(self, text: str) -> list[int]:
+        return list(range(len(text.split())))
+
+
+class TestBPETokenCounter:
+    def test_counts_with_encoding_and_message_overhead(self):
+        bpe_counter = BPETokenCounter(FakeEncoding())
+        tokens = bpe_counter.count_tokens([_msg("user", "one two three")])
+        assert tokens == 3 + BPETokenCounter.tokens_per_message
+
+    def test_encoding_chosen_per_model(self):
+        assert encoding_for_model("gpt-4o-mini") == "o200k_base"
+        assert encoding_for_model("openai/gpt-5") == "o200k_base"
+        assert encoding_for_model("gpt-4-turbo") == "cl100k_base"
+        assert encoding_for_model("deepseek-chat") == "cl100k_base"
+        assert encoding_for_model(None) == "cl100k_base"
+
+    def test_falls_back_to_estimate_without_tiktoken(self, monkeypatch, tmp_path):
+        logged: list[str] = []
+        monkeypatch.setitem(sys.modules, "tiktoken", None)
+        monkeypatch.setenv(token_counter_module.BPE_VOCAB_DIR_ENV, str(tmp_path))
+        monkeypatch.setattr(token_counter_module, "_bpe_counters", {})
+        monkeypatch.setattr(token_counter_module, "_estimate_fallback_logged", False)
+        monkeypatch.setattr(
+            token_counter_module.logger, "info", lambda msg: logged.append(msg)
+        )
+
+        shared = get_token_counter("gpt-4o")
+
+        assert isinstance(shared, EstimateTokenCounter)
+        assert get_token_counter("gpt-4o-mini") is shared
+        assert get_token_counter("gpt-4") is shared
+        assert len(logged) == 1
+        assert token_counter_module.BPE_VOCAB_DIR_ENV in logged[0]
+
+    def test_uses_tiktoken_encoding_without_local_vocabulary(
+        self, monkeypatch, tmp_path
+    ):
+        requested: list[str] = []
+
+        def get_encoding(name: str) -> FakeEncoding:
+            requested.append(name)
+            return FakeEncoding()
+
+        fake_tiktoken = types.ModuleType("tiktoken")
+        fake_tiktoken.get_encoding = get_encoding
+        fake_load = types.ModuleType("tiktoken.load")
+        fake_load.load_tiktoken_bpe = lambda path: {}
+        monkeypatch.setitem(sys.modules, "tiktoken", fake_tiktoken)
+        monkeypatch.setitem(sys.modules, "tiktoken.load", fake_load)
+        monkeypatch.setenv(token_counter_module.BPE_VOCAB_DIR_ENV, str(tmp_path))
+        monkeypatch.setattr(token_counter_module, "_bpe_counters", {})
+
+        shared = get_token_counter("gpt-4o")
+
+        assert isinstance(shared, BPETokenCounter)
+        assert get_token_counter("gpt-5") is shared
+        assert requested == ["o200k_base"]
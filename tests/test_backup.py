@@ -1,10 +1,11 @@
 """备份功能单元测试"""
 
+import hashlib
 import json
 import os
 import re
 import zipfile
-from datetime import datetime
+from datetime import datetime, timezone
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
@@ -23,6 +24,7 @@ from astrbot.core.backup.importer import (
     ImportResult,
     _get_major_version,
 )
+from astrbot.core.backup.ndjson import NDJSONWriter, iter_ndjson_batches
 from astrbot.core.config.default import VERSION
 from astrbot.core.db.po import (
     ConversationV2,
@@ -90,6 +92,18 @@ def mock_kb_manager():
     return kb_manager
 
 
+def _stream_result(*batches):
+    """模拟 session.stream_scalars 的返回值, 按批返回记录"""
+
+    async def partitions(*_args):
+        for batch in batches:
+            yield batch
+
+    result = MagicMock()
+    result.partitions = MagicMock(side_effect=partitions)
+    return result
+
+
 class TestImportResult:
     """ImportResult 类测试"""
 
@@ -179,25 +193,33 @@ class TestAstrBotExporter:
             kb_manager=mock_kb_manager,
         )
 
-        main_data = {
-            "platform_stats": [{"id": 1}],
-            "conversations": [],
-            "attachments": [],
+        main_stats = {
+            "platform_stats": 1,
+            "conversations": 0,
+            "attachments": 1,
         }
-        kb_meta_data = {
-            "knowledge_bases": [],
-            "kb_documents": [],
+        kb_meta_stats = {
+            "knowledge_bases": 0,
+            "kb_documents": 0,
         }
         dir_stats = {
             "plugins": {"files": 10, "size": 1024},
             "plugin_data": {"files": 5, "size": 512},
         }
 
-        manifest = exporter._generate_manifest(main_data, kb_meta_data, dir_stats)
+        manifest = exporter._generate_manifest(
+            main_stats,
+            kb_meta_stats,
+            dir_stats,
+            attachments=[{"attachment_id": "att-1", "path": "/tmp/a.png"}],
+        )
 
         assert manifest["version"] == BACKUP_MANIFEST_VERSION
         assert manifest["astrbot_version"] == VERSION
         assert manifest["origin"] == "exported"  # 验证备份来源标记
+        assert manifest["format"] == "ndjson"
+        assert manifest["backup_type"] == "full"
+        assert manifest["files"]["attachments"] == ["att-1.png"]
         assert "exported_at" in manifest
         assert "tables" in manifest
         assert "statistics" in manifest
@@ -212,9 +234,7 @@ class TestAstrBotExporter:
         """测试导出创建 ZIP 文件"""
         # 设置模拟数据库返回空数据
         session = AsyncMock()
-        result = MagicMock()
-        result.scalars.return_value.all.return_value = []
-        session.execute = AsyncMock(return_value=result)
+        session.stream_scalars = AsyncMock(return_value=_stream_result())
 
         mock_main_db.get_db.return_value = AsyncMock(
             __aenter__=AsyncMock(return_value=session),
@@ -237,7 +257,7 @@ class TestAstrBotExporter:
         with zipfile.ZipFile(zip_path, "r") as zf:
             namelist = zf.namelist()
             assert "manifest.json" in namelist
-            assert "databases/main_db.json" in namelist
+            assert "databases/main_db/platform_stats.ndjson" in namelist
             assert "config/cmd_config.json" in namelist
 
 
@@ -1039,6 +1059,243 @@ class TestModelMappings:
             assert table in KB_METADATA_MODELS, f"Missing table: {table}"
 
 
+def _record(data: dict) -> MagicMock:
+    record = MagicMock()
+    record.model_dump.return_value = data
+    return record
+
+
+def _import_db(session: AsyncMock) -> MagicMock:
+    session.begin = MagicMock(return_value=AsyncMock())
+    db = MagicMock()
+    db.get_db.return_value = AsyncMock(
+        __aenter__=AsyncMock(return_value=session),
+        __aexit__=AsyncMock(return_value=False),
+    )
+    return db
+
+
+def _write_ndjson_backup(zip_path, tables: dict[str, list[dict]], **manifest):
+    checksums = {}
+    with zipfile.ZipFile(zip_path, "w") as zf:
+        for table_name, rows in tables.items():
+            arcname = f"databases/main_db/{table_name}.ndjson"
+            with NDJSONWriter(zf, arcname) as writer:
+                writer.write_rows(rows)
+            checksums[arcname] = writer.checksum
+        zf.writestr(
+            "manifest.json",
+            json.dumps(
+                {
+                    "version": BACKUP_MANIFEST_VERSION,
+                    "astrbot_version": VERSION,
+                    "format": "ndjson",
+                    "tables": {"main_db": list(tables)},
+                    "checksums": checksums,
+                    **manifest,
+                }
+            ),
+        )
+
+
+class TestStreamingBackup:
+    """NDJSON 流式备份与增量备份测试"""
+
+    def test_ndjson_roundtrip_in_batches(self, tmp_path):
+        """测试 NDJSON 分批写入与读取"""
+        zip_path = tmp_path / "data.zip"
+        rows = [{"id": i, "text": f"消息 {i}"} for i in range(5)]
+        with zipfile.ZipFile(zip_path, "w") as zf:
+            with NDJSONWriter(zf, "t.ndjson") as writer:
+                writer.write_rows(rows[:3])
+                writer.write_rows(rows[3:])
+
+        with zipfile.ZipFile(zip_path) as zf:
+            expected = f"sha256:{hashlib.sha256(zf.read('t.ndjson')).hexdigest()}"
+            assert writer.checksum == expected
+            assert writer.count == 5
+            batches = list(
+                iter_ndjson_batches(zf, "t.ndjson", batch_size=2, checksum=expected)
+            )
+            assert [len(batch) for batch in batches] == [2, 2, 1]
+            assert [row for batch in batches for row in batch] == rows
+
+            with pytest.raises(ValueError, match="校验和"):
+                list(iter_ndjson_batches(zf, "t.ndjson", checksum="sha256:bad"))
+
+    @pytest.mark.asyncio
+    async def test_export_writes_tables_as_ndjson(self, temp_backup_dir, temp_data_dir):
+        """测试主数据库按批导出为 NDJSON，并记录校验和与统计"""
+        session = AsyncMock()
+        session.stream_scalars = AsyncMock(
+            return_value=_stream_result(
+                [_record({"id": 1}), _record({"id": 2})],
+                [_record({"id": 3})],
+            )
+        )
+        db = MagicMock()
+        db.get_db.return_value = AsyncMock(
+            __aenter__=AsyncMock(return_value=session),
+            __aexit__=AsyncMock(return_value=None),
+        )
+        exporter = AstrBotExporter(
+            main_db=db,
+            config_path=str(temp_data_dir / "cmd_config.json"),
+        )
+
+        zip_path = await exporter.export_all(output_dir=str(temp_backup_dir))
+
+        with zipfile.ZipFile(zip_path) as zf:
+            manifest = json.loads(zf.read("manifest.json"))
+            arcname = "databases/main_db/platform_stats.ndjson"
+            content = zf.read(arcname)
+            assert [json.loads(line)["id"] for line in content.splitlines()] == [
+                1,
+                2,
+                3,
+            ]
+            assert manifest["checksums"][arcname] == (
+                f"sha256:{hashlib.sha256(content).hexdigest()}"
+            )
+        assert manifest["statistics"]["main_db"]["platform_stats"] == 3
+        assert manifest["backup_type"] == "full"
+        assert "snapshot_at" in manifest
+
+    @pytest.mark.asyncio
+    async def test_incremental_export_records_base(
+        self, temp_backup_dir, temp_data_dir
+    ):
+        """测试增量备份记录起始时间和只包含变化记录的表"""
+        session = AsyncMock()
+        session.stream_scalars = AsyncMock(return_value=_stream_result())
+        db = MagicMock()
+        db.get_db.return_value = AsyncMock(
+            __aenter__=AsyncMock(return_value=session),
+            __aexit__=AsyncMock(return_value=None),
+        )
+        exporter = AstrBotExporter(
+            main_db=db,
+            config_path=str(temp_data_dir / "cmd_config.json"),
+        )
+        base = {
+            "exported_at": "2025-01-01T00:00:10+00:00",
+            "snapshot_at": "2025-01-01T00:00:00+00:00",
+        }
+
+        zip_path = await exporter.export_all(
+            output_dir=str(temp_backup_dir), base_manifest=base
+        )
+
+        assert "astrbot_incremental_" in zip_path
+        with zipfile.ZipFile(zip_path) as zf:
+            manifest = json.loads(zf.read("manifest.json"))
+        assert manifest["backup_type"] == "incremental"
+        assert manifest["incremental"]["since"] == base["snapshot_at"]
+        changed = manifest["incremental"]["changed_tables"]
+        assert "conversations" in changed
+        assert "platform_stats" not in changed
+        assert "conversation_messages" not in changed
+
+    def test_incremental_conditions(self):
+        """测试增量备份中各类表的过滤条件"""
+        since = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+        updated = AstrBotExporter._incremental_condition(
+            "conversations", MAIN_DB_MODELS["conversations"], since
+        )
+        assert "updated_at" in str(updated)
+        child = AstrBotExporter._incremental_condition(
+            "conversation_messages", MAIN_DB_MODELS["conversation_messages"], since
+        )
+        assert "conversation_id IN" in str(child)
+        assert "updated_at" in str(child)
+        assert (
+            AstrBotExporter._incremental_condition(
+                "platform_stats", MAIN_DB_MODELS["platform_stats"], since
+            )
+            is None
+        )
+
+    @pytest.mark.asyncio
+    async def test_import_ndjson_in_batches(self, tmp_path):
+        """测试 NDJSON 备份按批导入"""
+        zip_path = tmp_path / "backup.zip"
+        rows = [{"persona_id": f"p{i}"} for i in range(3)]
+        _write_ndjson_backup(zip_path, {"personas": rows})
+
+        importer = AstrBotImporter(main_db=_import_db(AsyncMock()))
+        importer._clear_main_db = AsyncMock()
+        importer._insert_rows = AsyncMock(side_effect=lambda s, t, m, r, **kw: len(r))
+        importer._import_directories = AsyncMock(return_value={})
+
+        result = await importer.import_all(str(zip_path))
+
+        assert result.success is True
+        assert result.imported_tables["personas"] == 3
+        importer._clear_main_db.assert_awaited_once()
+        _, table_name, _, batch = importer._insert_rows.await_args.args
+        assert table_name == "personas"
+        assert batch == rows
+        assert importer._insert_rows.await_args.kwargs["merge"] is False
+
+    @pytest.mark.asyncio
+    async def test_import_incremental_merges_changed_rows(self, tmp_path):
+        """测试增量备份合并变化的记录，并替换子表与完整导出的表"""
+        zip_path = tmp_path / "incremental.zip"
+        _write_ndjson_backup(
+            zip_path,
+            {
+                "platform_stats": [],
+                "conversations": [{"conversation_id": "c1"}],
+                "conversation_messages": [{"conversation_id": "c1", "seq": 0}],
+            },
+            backup_type="incremental",
+            incremental={"changed_tables": ["conversations"]},
+        )
+
+        session = AsyncMock()
+        importer = AstrBotImporter(main_db=_import_db(session))
+        importer._clear_main_db = AsyncMock()
+        importer._insert_rows = AsyncMock(side_effect=lambda s, t, m, r, **kw: len(r))
+        importer._import_directories = AsyncMock(return_value={})
+
+        result = await importer.import_all(str(zip_path))
+
+        assert result.success is True
+        importer._clear_main_db.assert_not_awaited()
+        merges = {
+            call.args[1]: call.kwargs["merge"]
+            for call in importer._insert_rows.await_args_list
+        }
+        assert merges == {"conversations": True, "conversation_messages": False}
+        # platform_stats 整表删除，conversation_messages 删除 c1 下的旧消息
+        statements = [str(call.args[0]) for call in session.execute.await_args_list]
+        assert len(statements) == 2
+        assert "platform_stats" in statements[0]
+        assert "conversation_messages" in statements[1]
+        assert "IN" in statements[1]
+
+    @pytest.mark.asyncio
+    async def test_import_rejects_corrupted_table(self, tmp_path):
+        """测试表文件校验和不匹配时导入失败"""
+        zip_path = tmp_path / "corrupted.zip"
+        _write_ndjson_backup(
+            zip_path,
+            {"personas": [{"persona_id": "p1"}]},
+            checksums={"databases/main_db/personas.ndjson": "sha256:bad"},
+        )
+
+        importer = AstrBotImporter(main_db=_import_db(AsyncMock()))
+        importer._clear_main_db = AsyncMock()
+        importer._insert_rows = AsyncMock(side_effect=lambda s, t, m, r, **kw: len(r))
+
+        result = await importer.import_all(str(zip_path))
+
+        assert result.success is False
+        assert any("校验和" in err for err in result.errors)
+        importer._insert_rows.assert_not_awaited()
+
+
 class TestBackupIntegration:
     """备份集成测试"""
 
@@ -1060,9 +1317,7 @@ class TestBackupIntegration:
         # 创建模拟数据库
         mock_db = MagicMock()
         session = AsyncMock()
-        result = MagicMock()
-        result.scalars.return_value.all.return_value = []
-        session.execute = AsyncMock(return_value=result)
+        session.stream_scalars = AsyncMock(return_value=_stream_result())
 
         mock_db.get_db.return_value = AsyncMock(
             __aenter__=AsyncMock(return_value=session),
@@ -1091,5 +1346,5 @@ class TestBackupIntegration:
             assert config["setting"] == "value"
 
             # 读取主数据库
-            main_db = json.loads(zf.read("databases/main_db.json"))
-            assert "platform_stats" in main_db
+            assert "platform_stats" in manifest["tables"]["main_db"]
+            assert zf.read("databases/main_db/platform_stats.ndjson") == b""
@@ -26,8 +26,8 @@ def provider() -> BailianRerankProvider:
 
 def test_bailian_rerank_provider_preserves_native_default_endpoint(monkeypatch):
     monkeypatch.setattr(
-        bailian_rerank_module.aiohttp,
-        "ClientSession",
+        bailian_rerank_module.http_client,
+        "session",
         lambda **_kwargs: object(),
     )
 
@@ -49,8 +49,8 @@ def test_bailian_rerank_config_template_preserves_native_default_endpoint():
 
 def test_bailian_rerank_provider_preserves_explicit_endpoint(monkeypatch):
     monkeypatch.setattr(
-        bailian_rerank_module.aiohttp,
-        "ClientSession",
+        bailian_rerank_module.http_client,
+        "session",
         lambda **_kwargs: object(),
     )
     custom_url = "https://rerank.example.test/custom"
@@ -0,0 +1,327 @@
+import json
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+from sqlalchemy import event, func, select
+
+from astrbot.core.agent.context.truncator import ContextTruncator
+from astrbot.core.agent.message import bind_checkpoint_messages
+from astrbot.core.conversation_mgr import ConversationManager
+from astrbot.core.db.po import ConversationMessage, ConversationV2
+from astrbot.core.db.sqlite import SQLiteDatabase
+
+
+async def _message_rows(db: SQLiteDatabase, cid: str) -> list[tuple[int, int]]:
+    async with db.get_db() as session:
+        result = await session.execute(
+            select(ConversationMessage.id, ConversationMessage.seq)
+            .where(ConversationMessage.conversation_id == cid)
+            .order_by(ConversationMessage.seq)
+        )
+        return [tuple(row) for row in result.all()]
+
+
+@pytest.mark.asyncio
+async def test_add_message_pair_appends_without_rewriting_history(tmp_path: Path):
+    db = SQLiteDatabase(str(tmp_path / "history.db"))
+    await db.initialize()
+    manager = ConversationManager(db)
+
+    conv = await db.create_conversation(
+        user_id="qq:FriendMessage:1",
+        platform_id="qq",
+        content=[{"role": "user", "content": "x" * 10_000}],
+    )
+    assert conv.content == [{"role": "user", "content": "x" * 10_000}]
+
+    statements = []
+
+    def capture_statement(_conn, _cursor, statement, parameters, _context, _many):
+        statements.append((statement, parameters))
+
+    event.listen(db.engine.sync_engine, "before_cursor_execute", capture_statement)
+    try:
+        await manager.add_message_pair(
+            conv.conversation_id,
+            {"role": "user", "content": "hi"},
+            {"role": "assistant", "content": "hello"},
+        )
+    finally:
+        event.remove(
+            db.engine.sync_engine,
+            "before_cursor_execute",
+            capture_statement,
+        )
+
+    assert not any("x" * 10_000 in str(params) for _, params in statements)
+    assert not any(
+        "conversations.content" in statement and statement.startswith("SELECT")
+        for statement, _ in statements
+    )
+
+    stored = await db.get_conversation_by_id(conv.conversation_id)
+    assert stored.history_segmented
+    assert stored.message_count == 3
+    assert [message["content"] for message in stored.content] == [
+        "x" * 10_000,
+        "hi",
+        "hello",
+    ]
+    assert await manager.get_conversation_messages(conv.conversation_id, limit=2) == [
+        {"role": "user", "content": "hi"},
+        {"role": "assistant", "content": "hello"},
+    ]
+
+    with pytest.raises(Exception, match="not found"):
+        await manager.add_message_pair("missing", {}, {})
+
+
+@pytest.mark.asyncio
+async def test_legacy_content_is_migrated_on_first_append(tmp_path: Path):
+    db = SQLiteDatabase(str(tmp_path / "legacy.db"))
+    await db.initialize()
+    async with db.get_db() as session:
+        async with session.begin():
+            session.add(
+                ConversationV2(
+                    conversation_id="legacy",
+                    platform_id="qq",
+                    user_id="qq:FriendMessage:1",
+                    content=[{"role": "user", "content": "old"}],
+                    created_at=datetime(2026, 1, 1, tzinfo=timezone.utc),
+                )
+            )
+
+    assert await db.get_conversation_messages("legacy") == [
+        {"role": "user", "content": "old"}
+    ]
+    assert (
+        await db.append_conversation_messages(
+            "legacy", [{"role": "assistant", "content": "new"}]
+        )
+        == 2
+    )
+
+    stored = await db.get_conversation_by_id("legacy")
+    assert stored.history_segmented
+    assert stored.content == [
+        {"role": "user", "content": "old"},
+        {"role": "assistant", "content": "new"},
+    ]
+    assert [seq for _, seq in await _message_rows(db, "legacy")] == [0, 1]
+
+
+@pytest.mark.asyncio
+async def test_update_conversation_appends_extended_history_and_replaces_rewrites(
+    tmp_path: Path,
+):
+    db = SQLiteDatabase(str(tmp_path / "update.db"))
+    await db.initialize()
+    history = [
+        {"role": "user", "content": "a"},
+        {"role": "assistant", "content": "b"},
+    ]
+    conv = await db.create_conversation(
+        user_id="qq:FriendMessage:1",
+        platform_id="qq",
+        content=history,
+    )
+    cid = conv.conversation_id
+    original_rows = await _message_rows(db, cid)
+
+    extended = [*history, {"role": "user", "content": "c"}]
+    await db.update_conversation(cid=cid, content=extended)
+    rows = await _message_rows(db, cid)
+    assert rows[:2] == original_rows
+    assert len(rows) == 3
+
+    compressed = [{"role": "user", "content": "summary"}]
+    stored = await db.update_conversation(cid=cid, content=compressed)
+    assert stored.content == compressed
+    assert stored.message_count == 1
+    assert [seq for _, seq in await _message_rows(db, cid)] == [0]
+
+    matches, total = await db.get_filtered_conversations(search_query="summary")
+    assert total == 1
+    assert matches[0].content == compressed
+
+    await db.delete_conversation(cid)
+    async with db.get_db() as session:
+        remaining = await session.execute(
+            select(func.count()).select_from(ConversationMessage)
+        )
+        assert remaining.scalar_one() == 0
+
+
+def _turn(index: int) -> list[dict]:
+    return [
+        {"role": "user", "content": f"q{index}"},
+        {"role": "assistant", "content": f"a{index}"},
+    ]
+
+
+def _tool_turn(index: int) -> list[dict]:
+    call = {
+        "id": f"call-{index}",
+        "type": "function",
+        "function": {"name": "search", "arguments": "{}"},
+    }
+    return [
+        {"role": "user", "content": f"q{index}"},
+        {"role": "assistant", "content": None, "tool_calls": [call]},
+        {"role": "tool", "tool_call_id": f"call-{index}", "content": "found"},
+        {"role": "assistant", "content": f"a{index}"},
+        {"role": "_checkpoint", "content": {"id": f"cp-{index}"}},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_history_window_is_sized_by_turns(tmp_path: Path):
+    db = SQLiteDatabase(str(tmp_path / "turns.db"))
+    await db.initialize()
+    manager = ConversationManager(db)
+    umo = "qq:FriendMessage:1"
+    turns = [_tool_turn(0), _turn(1), _tool_turn(2), _tool_turn(3), _turn(4)]
+    history = [message for turn in turns for message in turn]
+    conv = await db.create_conversation(user_id=umo, platform_id="qq", content=history)
+
+    loaded_conv = await manager.get_conversation(
+        umo, conv.conversation_id, history_turns=3
+    )
+    assert json.loads(loaded_conv.history) == [*turns[2], *turns[3], *turns[4]]
+    assert loaded_conv.message_count == len(history)
+    # Fewer stored turns than requested returns the whole history.
+    assert (
+        await manager.get_conversation_messages(conv.conversation_id, turns=10)
+        == history
+    )
+
+    truncator = ContextTruncator()
+    for max_turns in (1, 2, 3):
+        window = await manager.get_conversation_messages(
+            conv.conversation_id, turns=max_turns + 1
+        )
+        assert window[0]["role"] == "user"
+        assert truncator.truncate_by_turns(
+            bind_checkpoint_messages(window), max_turns
+        ) == truncator.truncate_by_turns(bind_checkpoint_messages(history), max_turns)
+
+
+@pytest.mark.asyncio
+async def test_sync_history_appends_turn_and_drops_truncated_messages(
+    tmp_path: Path,
+):
+    db = SQLiteDatabase(str(tmp_path / "sync.db"))
+    await db.initialize()
+    manager = ConversationManager(db)
+    umo = "qq:FriendMessage:1"
+    history = [message for i in range(4) for message in _turn(i)]
+    conv = await db.create_conversation(user_id=umo, platform_id="qq", content=history)
+    cid = conv.conversation_id
+    original_rows = await _message_rows(db, cid)
+
+    # Only the last two turns are read to build the request.
+    loaded_conv = await manager.get_conversation(umo, cid, history_turns=2)
+    loaded = json.loads(loaded_conv.history)
+    assert loaded == history[-4:]
+    assert loaded_conv.message_count == 8
+
+    statements = []
+
+    def capture_statement(_conn, _cursor, statement, parameters, _context, _many):
+        statements.append((statement, parameters))
+
+    event.listen(db.engine.sync_engine, "before_cursor_execute", capture_statement)
+    try:
+        count = await manager.sync_conversation_history(
+            umo,
+            cid,
+            loaded=loaded,
+            history=[*loaded, *_turn(4)],
+            stored_count=loaded_conv.message_count,
+            token_usage=42,
+        )
+    finally:
+        event.remove(
+            db.engine.sync_engine,
+            "before_cursor_execute",
+            capture_statement,
+        )
+
+    assert count == 10
+    assert not any("q0" in str(params) for _, params in statements)
+    assert not any(
+        statement.startswith("DELETE FROM conversation_messages")
+        for statement, _ in statements
+    )
+    assert (await _message_rows(db, cid))[:8] == original_rows
+
+    # A turn-based truncation drops the oldest turns, including unread ones.
+    loaded = [*loaded, *_turn(4)]
+    count = await manager.sync_conversation_history(
+        umo,
+        cid,
+        loaded=loaded,
+        history=[*loaded[2:], *_turn(5)],
+        stored_count=10,
+    )
+    assert count == 6
+    stored = await db.get_conversation_by_id(cid)
+    assert stored.content == [message for i in range(3, 6) for message in _turn(i)]
+    assert stored.token_usage == 42
+    assert stored.history_digest is None
+    # The kept rows are not rewritten.
+    assert (await _message_rows(db, cid))[:2] == original_rows[6:]
+
+
+@pytest.mark.asyncio
+async def test_sync_history_rewrites_changed_or_concurrently_updated_history(
+    tmp_path: Path,
+):
+    db = SQLiteDatabase(str(tmp_path / "rewrite.db"))
+    await db.initialize()
+    manager = ConversationManager(db)
+    umo = "qq:FriendMessage:1"
+    conv = await db.create_conversation(user_id=umo, platform_id="qq", content=_turn(0))
+    cid = conv.conversation_id
+
+    # Another request appended a turn after this one read the history.
+    await manager.add_message_pair(cid, *_turn(1))
+    await manager.sync_conversation_history(
+        umo,
+        cid,
+        loaded=_turn(0),
+        history=[*_turn(0), *_turn(2)],
+    )
+    stored = await db.get_conversation_by_id(cid)
+    assert stored.content == [*_turn(0), *_turn(2)]
+
+    # A compressed history is not an extension of the loaded one.
+    summary = [{"role": "user", "content": "summary"}]
+    assert (
+        await manager.sync_conversation_history(
+            umo,
+            cid,
+            loaded=stored.content,
+            history=summary,
+        )
+        == 1
+    )
+    stored = await db.get_conversation_by_id(cid)
+    assert stored.content == summary
+    assert stored.history_digest is not None
+    assert [seq for _, seq in await _message_rows(db, cid)] == [0]
+
+
+def test_history_delta_only_matches_prefix_truncation():
+    loaded = [message for i in range(3) for message in _turn(i)]
+    delta = ConversationManager._history_delta
+
+    assert delta(loaded, [*loaded, *_turn(3)]) == (0, _turn(3))
+    assert delta(loaded, [*loaded[2:], *_turn(3)]) == (2, _turn(3))
+    # Truncation that re-inserts an earlier user message is not a plain drop.
+    assert delta(loaded, [loaded[0], *loaded[5:], *_turn(3)]) is None
+    # Nothing of the loaded history is kept.
+    assert delta(loaded, _turn(3)) is None
+    assert delta(loaded, []) is None
@@ -201,3 +201,234 @@ async def test_multi_platform_summary_uses_global_order_index(
         in ordered_queries[0]
     )
     assert "content" not in ordered_queries[0].split("FROM", 1)[0]
+
+
+@pytest.mark.asyncio
+async def test_full_text_search_ranks_hits_and_follows_writes(tmp_path: Path):
+    db = SQLiteDatabase(str(tmp_path / "search.db"))
+    await db.initialize()
+    assert db.conversation_fts_available
+
+    weather = await db.create_conversation(
+        user_id="qq:FriendMessage:1",
+        platform_id="qq",
+        content=[
+            {"role": "user", "content": "今天北京的天气怎么样"},
+            {"role": "assistant", "content": [{"type": "text", "text": "北京晴"}]},
+        ],
+    )
+    travel = await db.create_conversation(
+        user_id="qq:GroupMessage:2",
+        platform_id="qq",
+        content=[{"role": "user", "content": "<b>周末</b>想去上海玩"}],
+    )
+
+    hits, total = await db.search_conversations("北京", include_history=False)
+    assert total == 1
+    [(conversation, snippet)] = hits
+    assert conversation.conversation_id == weather.conversation_id
+    assert "<mark>北京</mark>" in snippet
+
+    _, total = await db.search_conversations(
+        "北京",
+        platforms=["telegram"],
+        include_history=False,
+    )
+    assert total == 0
+
+    await db.append_conversation_messages(
+        travel.conversation_id,
+        [{"role": "assistant", "content": "北京也不错"}],
+    )
+    await db.update_conversation(travel.conversation_id, title="出行计划")
+    hits, total = await db.search_conversations("北京")
+    assert total == 2
+    hits, _ = await db.search_conversations("出行计划")
+    assert [conv.conversation_id for conv, _ in hits] == [travel.conversation_id]
+    hits, _ = await db.search_conversations("周末")
+    assert "<mark>周末</mark>" in hits[0][1]
+    assert "<b>" not in hits[0][1]
+
+    await db.update_conversation(
+        travel.conversation_id,
+        content=[{"role": "user", "content": "改成去杭州"}],
+    )
+    hits, _ = await db.search_conversations("北京")
+    assert [conv.conversation_id for conv, _ in hits] == [weather.conversation_id]
+
+    await db.delete_conversation(weather.conversation_id)
+    async with db.get_db() as session:
+        indexed_messages = (
+            await session.execute(
+                text("SELECT COUNT(*) FROM conversation_messages_fts"),
+            )
+        ).scalar_one()
+    assert indexed_messages == 1
+    assert await db.search_conversations("北京") == ([], 0)
+
+
+@pytest.mark.asyncio
+async def test_search_index_backfill_covers_rows_written_without_index(
+    tmp_path: Path,
+):
+    db = SQLiteDatabase(str(tmp_path / "backfill.db"))
+    await db.initialize()
+    async with db.get_db() as session:
+        async with session.begin():
+            session.add(
+                ConversationV2(
+                    conversation_id="raw",
+                    platform_id="qq",
+                    user_id="qq:FriendMessage:1",
+                    history_segmented=True,
+                    message_count=1,
+                ),
+            )
+            await session.execute(
+                text(
+                    "INSERT INTO conversation_messages (conversation_id, seq, message) "
+                    "VALUES ('raw', 0, :message)"
+                ),
+                {"message": json.dumps({"role": "user", "content": "深圳下雨了"})},
+            )
+
+    # Unindexed rows are still found through the LIKE fallback.
+    hits, total = await db.search_conversations("深圳下雨")
+    assert total == 1
+    assert hits[0][1] == ""
+
+    after_id = await db.index_conversations_for_search(batch_size=10)
+    assert after_id is not None
+    assert await db.index_conversations_for_search(after_id=after_id) is None
+    assert await db.index_conversations_for_search() is None
+
+    hits, total = await db.search_conversations("深圳")
+    assert total == 1
+    assert "<mark>深圳</mark>" in hits[0][1]
+
+
+@pytest.mark.asyncio
+async def test_cursor_pagination_walks_pages_without_offset(tmp_path: Path):
+    db = SQLiteDatabase(str(tmp_path / "cursor.db"))
+    await db.initialize()
+
+    async with db.get_db() as session:
+        async with session.begin():
+            session.add_all(
+                [
+                    ConversationV2(
+                        conversation_id=f"conversation-{index}",
+                        platform_id="qq",
+                        user_id=f"qq:FriendMessage:{index}",
+                        # Pairs of rows share a timestamp to exercise the tiebreak.
+                        created_at=datetime(
+                            2026,
+                            1,
+                            1 + index // 2,
+                            tzinfo=timezone.utc,
+                        ),
+                    )
+                    for index in range(7)
+                ],
+            )
+
+    statements = []
+
+    def capture_statement(_conn, _cursor, statement, parameters, _context, _many):
+        statements.append((statement, parameters))
+
+    seen = []
+    cursor = None
+    event.listen(db.engine.sync_engine, "before_cursor_execute", capture_statement)
+    try:
+        while True:
+            page, cursor = await db.get_conversations_by_cursor(
+                page_size=3,
+                cursor=cursor,
+                include_history=False,
+            )
+            seen.append([conversation.conversation_id for conversation in page])
+            if cursor is None:
+                break
+            # Rows created while paging must not shift the following pages.
+            await db.create_conversation(
+                user_id="qq:FriendMessage:new",
+                platform_id="qq",
+            )
+    finally:
+        event.remove(
+            db.engine.sync_engine,
+            "before_cursor_execute",
+            capture_statement,
+        )
+
+    assert seen == [
+        ["conversation-6", "conversation-5", "conversation-4"],
+        ["conversation-3", "conversation-2", "conversation-1"],
+        ["conversation-0"],
+    ]
+    # The SQLite dialect always renders "LIMIT ? OFFSET ?"; keyset pagination
+    # must never skip rows through the bound offset.
+    offsets = [
+        parameters[-1]
+        for statement, parameters in statements
+        if "OFFSET ?" in statement
+    ]
+    assert all(offset == 0 for offset in offsets)
+
+    with pytest.raises(ValueError):
+        await db.get_conversations_by_cursor(cursor="not-a-cursor")
+
+    assert await db.count_filtered_conversations(platforms=["qq"]) == 9
+    async with db.get_db() as session:
+        async with session.begin():
+            session.add(
+                ConversationV2(
+                    conversation_id="raw",
+                    platform_id="qq",
+                    user_id="qq:FriendMessage:raw",
+                ),
+            )
+    # Totals are cached per filter set until a conversation is created or deleted.
+    assert await db.count_filtered_conversations(platforms=["qq"]) == 9
+    await db.create_conversation(user_id="qq:FriendMessage:new", platform_id="qq")
+    assert await db.count_filtered_conversations(platforms=["qq"]) == 11
+    assert await db.count_filtered_conversations(platforms=["telegram"]) == 0
+
+
+@pytest.mark.asyncio
+async def test_platform_message_history_cursor_pages(tmp_path: Path):
+    db = SQLiteDatabase(str(tmp_path / "history-cursor.db"))
+    await db.initialize()
+    for index in range(5):
+        await db.insert_platform_message_history(
+            platform_id="webchat",
+            user_id="session",
+            content={
+                "type": "user",
+                "message": [{"type": "plain", "text": str(index)}],
+            },
+        )
+
+    first, cursor = await db.get_platform_message_history_by_cursor(
+        "webchat",
+        "session",
+        page_size=3,
+    )
+    second, last_cursor = await db.get_platform_message_history_by_cursor(
+        "webchat",
+        "session",
+        page_size=3,
+        cursor=cursor,
+    )
+    offset_pages = await db.get_platform_message_history(
+        "webchat",
+        "session",
+        page=1,
+        page_size=5,
+    )
+
+    assert [record.id for record in first + second] == [
+        record.id for record in offset_pages
+    ]
+    assert last_cursor is None
@@ -517,9 +517,10 @@ async def test_desktop_session_issues_jwt_without_password(
 
     assert response.status_code == 200
     assert data["status"] == "ok"
-    assert data["data"]["username"] == core_lifecycle_td.astrbot_config[
-        "dashboard"
-    ]["username"]
+    assert (
+        data["data"]["username"]
+        == core_lifecycle_td.astrbot_config["dashboard"]["username"]
+    )
     token = data["data"]["token"]
     payload = jwt.decode(
         token,
@@ -2540,6 +2541,62 @@ async def test_get_chat_session_rejects_session_owned_by_another_user(
     assert data["message"] == "Permission denied"
 
 
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "path_template",
+    [
+        "/api/chat/get_session?session_id={session_id}",
+        "/api/v1/chat/sessions/{session_id}",
+    ],
+)
+async def test_get_chat_session_pages_history_with_cursor(
+    app: FastAPIAppAdapter,
+    authenticated_header: dict,
+    core_lifecycle_td: AstrBotCoreLifecycle,
+    monkeypatch,
+    path_template: str,
+):
+    monkeypatch.setattr(
+        "astrbot.dashboard.services.chat_service.SESSION_HISTORY_PAGE_SIZE", 2
+    )
+    test_client = app.test_client()
+    create_session_response = await test_client.get(
+        "/api/chat/new_session", headers=authenticated_header
+    )
+    session_id = (await create_session_response.get_json())["data"]["session_id"]
+    for i in range(3):
+        await core_lifecycle_td.platform_message_history_manager.insert(
+            platform_id="webchat",
+            user_id=session_id,
+            content={"type": "user", "message": [{"type": "plain", "text": f"m{i}"}]},
+        )
+
+    def texts(data: dict) -> list[str]:
+        return [item["content"]["message"][0]["text"] for item in data["history"]]
+
+    path = path_template.format(session_id=session_id)
+    sep = "&" if "?" in path else "?"
+    response = await test_client.get(path, headers=authenticated_header)
+    first = (await response.get_json())["data"]
+    assert texts(first) == ["m1", "m2"]
+    assert first["has_more"]
+
+    response = await test_client.get(
+        f"{path}{sep}cursor={first['next_cursor']}", headers=authenticated_header
+    )
+    second = (await response.get_json())["data"]
+    assert texts(second) == ["m0"]
+    assert not second["has_more"]
+    assert second["next_cursor"] is None
+
+    response = await test_client.get(
+        f"{path}{sep}cursor=not-a-cursor", headers=authenticated_header
+    )
+    data = await response.get_json()
+    assert data["status"] == "error"
+    assert data["message"] == "Invalid cursor: not-a-cursor"
+
+
 @pytest.mark.asyncio
 async def test_plugins(
     app: FastAPIAppAdapter,
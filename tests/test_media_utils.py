@@ -504,6 +504,42 @@ async def test_convert_audio_format_keeps_missing_target_path():
     assert result == missing_path
 
 
+@pytest.mark.asyncio
+async def test_http_image_is_shared_through_media_cache(tmp_path, monkeypatch):
+    from PIL import Image as PILImage
+
+    from astrbot.core.utils.media_cache import MediaCache
+
+    monkeypatch.setattr(media_utils, "get_astrbot_temp_path", lambda: str(tmp_path))
+    cache = MediaCache(cache_dir=str(tmp_path / "media_cache"))
+    monkeypatch.setattr(media_utils, "media_cache", cache)
+    image_buffer = BytesIO()
+    PILImage.new("RGB", (1, 1), (255, 0, 0)).save(image_buffer, format="PNG")
+    calls = []
+
+    async def fake_download_file(url: str, target_path: str) -> None:
+        calls.append(url)
+        Path(target_path).write_bytes(image_buffer.getvalue())
+
+    monkeypatch.setattr(media_utils, "download_file", fake_download_file)
+
+    async with media_utils.MediaResolver(
+        "https://example.com/sticker?id=1",
+        media_type="image",
+    ).as_path() as resolved:
+        first_path = resolved.path
+        assert resolved.mime_type == "image/png"
+    second_path = await Image.fromURL(
+        "https://example.com/sticker?id=1"
+    ).convert_to_file_path()
+
+    assert first_path.exists()
+    assert Path(second_path) == first_path
+    assert first_path.parent == tmp_path / "media_cache"
+    assert first_path.suffix == ".png"
+    assert calls == ["https://example.com/sticker?id=1"]
+
+
 @pytest.mark.asyncio
 async def test_media_resolver_cleans_http_target_when_download_fails(
     tmp_path, monkeypatch
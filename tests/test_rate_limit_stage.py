@@ -1,66 +1,177 @@
 import asyncio
-from datetime import datetime as real_datetime
-from datetime import timedelta
 
 import pytest
 
 from astrbot.core.pipeline.rate_limit_check import stage as rate_limit_stage
+from astrbot.core.pipeline.rate_limit_check.limiter import (
+    GCRALimiter,
+    RateLimitOptions,
+    charge_llm_tokens,
+)
 
 
 class FakeEvent:
     """Minimal message event used by the rate-limit stage tests."""
 
-    session_id = "test-session"
+    def __init__(
+        self,
+        session_id: str = "test-session",
+        sender_id: str = "user-1",
+        group_id: str = "",
+    ) -> None:
+        self.session_id = session_id
+        self.sender_id = sender_id
+        self.group_id = group_id
+        self.stopped = False
+        self.extras = {}
+
+    def get_platform_id(self) -> str:
+        return "aiocqhttp"
+
+    def get_sender_id(self) -> str:
+        return self.sender_id
+
+    def get_group_id(self) -> str:
+        return self.group_id
+
+    def set_extra(self, key, value) -> None:
+        self.extras[key] = value
+
+    def get_extra(self, key=None, default=None):
+        return self.extras.get(key, default)
 
     def stop_event(self) -> None:
         """Stop event propagation for discard-strategy compatibility."""
+        self.stopped = True
 
 
-@pytest.mark.asyncio
-async def test_stalled_concurrent_events_use_current_time_after_lock(monkeypatch):
-    """Ensure queued events do not reuse timestamps captured before lock waits."""
-    virtual_seconds = 0.0
-    sleep_durations: list[float] = []
-    real_sleep = asyncio.sleep
-    base_time = real_datetime(2026, 1, 1)
+class VirtualClock:
+    def __init__(self) -> None:
+        self.now = 0.0
 
-    class FakeDateTime(real_datetime):
-        """Subclass of datetime with a deterministic now()."""
+    def __call__(self) -> float:
+        return self.now
 
-        @classmethod
-        def now(cls) -> real_datetime:
-            """Return the current virtual wall-clock time.
 
-            Returns:
-                Current virtual time.
-            """
-            return base_time + timedelta(seconds=virtual_seconds)
+def make_stage(clock: VirtualClock, **config) -> rate_limit_stage.RateLimitStage:
+    stage = rate_limit_stage.RateLimitStage()
+    stage.limiter = GCRALimiter(clock=clock)
+    stage.options = RateLimitOptions.from_config(config)
+    stage.rules = stage.options.rules()
+    stage.rl_strategy = stage.options.strategy
+    return stage
 
-    async def fake_sleep(duration: float) -> None:
-        """Advance virtual time after allowing concurrent tasks to queue.
 
-        Args:
-            duration: Requested sleep duration in seconds.
-        """
-        nonlocal virtual_seconds
+@pytest.fixture(autouse=True)
+def quiet_logger(monkeypatch):
+    monkeypatch.setattr(rate_limit_stage.logger, "info", lambda *args, **kwargs: None)
+
+
+@pytest.mark.asyncio
+async def test_stalled_concurrent_events_are_admitted_at_the_sustained_rate(
+    monkeypatch,
+):
+    """Stalled events sleep without holding a lock and recheck after waking."""
+    clock = VirtualClock()
+    sleep_durations: list[float] = []
+    admitted: list[float] = []
+    real_sleep = asyncio.sleep
+
+    async def fake_sleep(duration: float) -> None:
         sleep_durations.append(duration)
-        target_time = virtual_seconds + duration
+        target_time = clock.now + duration
         await real_sleep(0)
-        virtual_seconds = target_time
+        clock.now = max(clock.now, target_time)
 
-    monkeypatch.setattr(rate_limit_stage, "datetime", FakeDateTime)
     monkeypatch.setattr(rate_limit_stage.asyncio, "sleep", fake_sleep)
-    monkeypatch.setattr(rate_limit_stage.logger, "info", lambda *args, **kwargs: None)
+    limiter = make_stage(clock, time=60, count=2, strategy="stall")
+
+    async def run() -> None:
+        await limiter.process(FakeEvent())
+        admitted.append(clock.now)
+
+    await asyncio.gather(*(run() for _ in range(5)))
+
+    # Burst of 2, then one message every 30 seconds (60s / 2).
+    margin = rate_limit_stage.STALL_MARGIN
+    assert admitted == pytest.approx([0, 0, 30 + margin, 60 + margin, 90 + margin])
+    assert all(duration > 0 for duration in sleep_durations)
+
+
+@pytest.mark.asyncio
+async def test_user_tier_limits_across_sessions():
+    clock = VirtualClock()
+    limiter = make_stage(clock, time=60, count=30, strategy="discard", user_count=2)
 
-    limiter = rate_limit_stage.RateLimitStage()
-    limiter.rate_limit_count = 2
-    limiter.rate_limit_time = timedelta(seconds=60)
-    limiter.rl_strategy = "stall"
+    events = [FakeEvent(session_id=f"session-{i}") for i in range(3)]
+    for event in events:
+        await limiter.process(event)
 
-    await asyncio.gather(*(limiter.process(FakeEvent()) for _ in range(5)))
+    assert [event.stopped for event in events] == [False, False, True]
+    other_user = FakeEvent(session_id="session-0", sender_id="user-2")
+    await limiter.process(other_user)
+    assert not other_user.stopped
 
-    margin = 0.3
-    expected_stall = limiter.rate_limit_time.total_seconds() + margin
-    assert sleep_durations == pytest.approx([expected_stall, expected_stall])
-    timestamps = list(limiter.event_timestamps[FakeEvent.session_id])
-    assert timestamps == sorted(timestamps)
+
+@pytest.mark.asyncio
+async def test_rejected_event_does_not_consume_other_tiers():
+    clock = VirtualClock()
+    limiter = make_stage(clock, time=60, count=1, strategy="discard", global_count=3)
+
+    await limiter.process(FakeEvent(session_id="a"))
+    blocked = FakeEvent(session_id="a")
+    await limiter.process(blocked)
+    assert blocked.stopped
+
+    # The blocked event must not have charged the global tier.
+    for session_id in ("b", "c"):
+        event = FakeEvent(session_id=session_id)
+        await limiter.process(event)
+        assert not event.stopped
+
+
+@pytest.mark.asyncio
+async def test_llm_token_quota_is_charged_after_processing():
+    clock = VirtualClock()
+    limiter = make_stage(
+        clock,
+        time=60,
+        count=30,
+        strategy="discard",
+        token_time=3600,
+        user_token_quota=1000,
+    )
+
+    first = FakeEvent()
+    await limiter.process(first)
+    assert not first.stopped
+    charge_llm_tokens(first, 1500)
+
+    second = FakeEvent()
+    await limiter.process(second)
+    assert second.stopped
+
+    # 1500 tokens of a 1000 tokens / hour quota drain after 1.5 hours.
+    clock.now = 1800.0
+    third = FakeEvent()
+    await limiter.process(third)
+    assert not third.stopped
+
+
+def test_idle_keys_are_evicted_and_state_round_trips():
+    clock = VirtualClock()
+    limiter = make_stage(clock, time=60, count=2, strategy="discard").limiter
+    rules = RateLimitOptions(time=60, count=2).rules()
+
+    for i in range(100):
+        assert limiter.acquire([(f"session-{i}", rules[0], 1)]) == 0
+    assert len(limiter) == 100
+
+    restored = GCRALimiter(clock=clock)
+    restored.load_state(limiter.export_state())
+    assert len(restored) == 100
+
+    clock.now = 31.0
+    assert limiter.sweep() == 100
+    assert len(limiter) == 0
+    assert limiter.export_state() == {}
@@ -2051,6 +2051,179 @@ async def test_follow_up_after_stop_not_merged_into_tool_result(
         assert ticket_before.resolved.is_set()
 
 
+class MultiToolCallProvider(MockProvider):
+    """Return several tool calls in the first response, then a final answer."""
+
+    def __init__(self, tool_names: list[str]):
+        super().__init__()
+        self.tool_names = tool_names
+
+    async def text_chat(self, **kwargs) -> LLMResponse:
+        self.call_count += 1
+        if kwargs.get("func_tool") is None or self.call_count > 1:
+            return LLMResponse(
+                role="assistant",
+                completion_text="最终回复",
+                usage=TokenUsage(input_other=10, output=5),
+            )
+        return LLMResponse(
+            role="assistant",
+            completion_text="",
+            tools_call_name=self.tool_names,
+            tools_call_args=[{"query": name} for name in self.tool_names],
+            tools_call_ids=[f"call_{i}" for i in range(len(self.tool_names))],
+            usage=TokenUsage(input_other=10, output=5),
+        )
+
+
+class ConcurrencyTrackingToolExecutor:
+    """Record tool call concurrency; earlier calls take longer to finish."""
+
+    def __init__(self, delays: dict[str, float]):
+        self.delays = delays
+        self.active = 0
+        self.max_active = 0
+        self.finished: list[str] = []
+        self.started = asyncio.Event()
+
+    def execute(self, tool, run_context, **tool_args):
+        async def generator():
+            from mcp.types import CallToolResult, TextContent
+
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            self.started.set()
+            try:
+                await asyncio.sleep(self.delays[tool_args["query"]])
+                self.finished.append(tool_args["query"])
+                yield CallToolResult(
+                    content=[TextContent(type="text", text=f"{tool.name} done")]
+                )
+            finally:
+                self.active -= 1
+
+        return generator()
+
+
+def _make_tool(name: str, parallel_safe: bool) -> FunctionTool:
+    return FunctionTool(
+        name=name,
+        description=name,
+        parameters={"type": "object", "properties": {"query": {"type": "string"}}},
+        handler=AsyncMock(),
+        parallel_safe=parallel_safe,
+    )
+
+
+async def _reset_multi_tool_runner(
+    runner, tool_names, tools, executor, mock_hooks, **kwargs
+):
+    request = ProviderRequest(
+        prompt="run tools",
+        func_tool=ToolSet(tools=tools),
+        contexts=[],
+    )
+    await runner.reset(
+        provider=MultiToolCallProvider(tool_names),
+        request=request,
+        run_context=ContextWrapper(context=None),
+        tool_executor=executor,
+        agent_hooks=mock_hooks,
+        streaming=False,
+        **kwargs,
+    )
+    return request
+
+
+@pytest.mark.asyncio
+async def test_parallel_safe_tools_run_concurrently_in_call_order(runner, mock_hooks):
+    names = ["search_a", "search_b", "search_c"]
+    executor = ConcurrencyTrackingToolExecutor(
+        {"search_a": 0.06, "search_b": 0.04, "search_c": 0.02}
+    )
+    request = await _reset_multi_tool_runner(
+        runner,
+        names,
+        [_make_tool(name, parallel_safe=True) for name in names],
+        executor,
+        mock_hooks,
+        max_parallel_tool_calls=2,
+    )
+
+    events = [resp async for resp in runner.step()]
+
+    assert executor.max_active == 2
+    assert executor.finished != names
+    tool_results = request.tool_calls_result[0].tool_calls_result
+    assert [block.tool_call_id for block in tool_results] == [
+        "call_0",
+        "call_1",
+        "call_2",
+    ]
+    assert [block.content for block in tool_results] == [
+        f"{name} done" for name in names
+    ]
+    result_ids = [
+        resp.data["chain"].chain[0].data["id"]
+        for resp in events
+        if resp.type == "tool_call_result"
+    ]
+    assert result_ids == ["call_0", "call_1", "call_2"]
+
+
+@pytest.mark.asyncio
+async def test_unsafe_tool_is_not_run_concurrently(runner, mock_hooks):
+    names = ["search_a", "write_file", "search_b"]
+    executor = ConcurrencyTrackingToolExecutor(
+        {"search_a": 0.03, "write_file": 0.01, "search_b": 0.01}
+    )
+    request = await _reset_multi_tool_runner(
+        runner,
+        names,
+        [
+            _make_tool("search_a", parallel_safe=True),
+            _make_tool("write_file", parallel_safe=False),
+            _make_tool("search_b", parallel_safe=True),
+        ],
+        executor,
+        mock_hooks,
+    )
+
+    async for _ in runner.step():
+        pass
+
+    assert executor.max_active == 1
+    assert executor.finished == names
+    assert len(request.tool_calls_result[0].tool_calls_result) == 3
+
+
+@pytest.mark.asyncio
+async def test_stop_interrupts_parallel_tool_calls(runner, mock_hooks):
+    names = ["search_a", "search_b"]
+    executor = ConcurrencyTrackingToolExecutor({"search_a": 10, "search_b": 10})
+    await _reset_multi_tool_runner(
+        runner,
+        names,
+        [_make_tool(name, parallel_safe=True) for name in names],
+        executor,
+        mock_hooks,
+    )
+
+    async def _consume():
+        return [resp.type async for resp in runner.step()]
+
+    consume_task = asyncio.create_task(_consume())
+    await asyncio.wait_for(executor.started.wait(), timeout=5)
+    await asyncio.sleep(0)
+    runner.request_stop()
+    types = await asyncio.wait_for(consume_task, timeout=5)
+
+    assert types[-1] == "aborted"
+    assert runner.was_aborted() is True
+    assert executor.active == 0
+    assert executor.finished == []
+
+
 if __name__ == "__main__":
     # 运行测试
     pytest.main([__file__, "-v"])
@@ -1,5 +1,6 @@
 """Tests for astr_main_agent module."""
 
+import asyncio
 import datetime
 import os
 from pathlib import Path
@@ -394,7 +395,7 @@ class TestGetSessionConv:
             mock_event.unified_msg_origin
         )
         conv_mgr.get_conversation.assert_called_once_with(
-            mock_event.unified_msg_origin, "existing-conv-id"
+            mock_event.unified_msg_origin, "existing-conv-id", history_turns=None
         )
 
     @pytest.mark.asyncio
@@ -1463,6 +1464,126 @@ class TestPluginToolFix:
         assert "transfer_to_demo_agent" in req.func_tool.names()
 
 
+class TestRunBuildSteps:
+    """Tests for the concurrent request build steps."""
+
+    @pytest.mark.asyncio
+    async def test_steps_run_concurrently_after_their_deps(self, mock_event):
+        module = ama
+        order = []
+
+        async def first(_results):
+            await asyncio.sleep(0.05)
+            order.append("first")
+            return 1
+
+        async def second(_results):
+            await asyncio.sleep(0.05)
+            order.append("second")
+            return 2
+
+        async def joined(results):
+            order.append("joined")
+            return results["first"] + results["second"]
+
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        results = await module._run_build_steps(
+            mock_event,
+            [
+                module._BuildStep("joined", joined, deps=("first", "second")),
+                module._BuildStep("first", first),
+                module._BuildStep("second", second, required=True),
+            ],
+            loop.time() + 10,
+        )
+
+        assert results == {"first": 1, "second": 2, "joined": 3}
+        assert order[-1] == "joined"
+        assert loop.time() - started < 0.09
+        mock_event.trace.record.assert_called_once()
+        action = mock_event.trace.record.call_args.args[0]
+        steps = mock_event.trace.record.call_args.kwargs["steps"]
+        assert action == "build_main_agent_steps"
+        assert {name: step["status"] for name, step in steps.items()} == {
+            "first": "ok",
+            "second": "ok",
+            "joined": "ok",
+        }
+
+    @pytest.mark.asyncio
+    async def test_optional_step_is_skipped_at_the_deadline(self, mock_event):
+        module = ama
+
+        async def slow(_results):
+            await asyncio.sleep(5)
+            return "late"
+
+        async def required(_results):
+            await asyncio.sleep(0.1)
+            return "done"
+
+        loop = asyncio.get_running_loop()
+        results = await module._run_build_steps(
+            mock_event,
+            [
+                module._BuildStep("slow", slow),
+                module._BuildStep("required", required, required=True),
+            ],
+            loop.time() + 0.01,
+        )
+
+        assert results == {"slow": None, "required": "done"}
+        steps = mock_event.trace.record.call_args.kwargs["steps"]
+        assert steps["slow"]["status"] == "skipped"
+        assert steps["required"]["status"] == "ok"
+
+    @pytest.mark.asyncio
+    async def test_step_error_propagates_and_cancels_siblings(self, mock_event):
+        module = ama
+        cancelled = asyncio.Event()
+
+        async def failing(_results):
+            raise RuntimeError("boom")
+
+        async def slow(_results):
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        loop = asyncio.get_running_loop()
+        with pytest.raises(RuntimeError, match="boom"):
+            await module._run_build_steps(
+                mock_event,
+                [
+                    module._BuildStep("slow", slow),
+                    module._BuildStep("failing", failing, required=True),
+                ],
+                loop.time() + 10,
+            )
+        assert cancelled.is_set()
+
+    @pytest.mark.asyncio
+    async def test_timeout_error_from_a_step_is_not_treated_as_deadline(
+        self, mock_event
+    ):
+        module = ama
+
+        async def timing_out(_results):
+            raise TimeoutError("upstream timed out")
+
+        loop = asyncio.get_running_loop()
+        for required in (True, False):
+            with pytest.raises(TimeoutError, match="upstream"):
+                await module._run_build_steps(
+                    mock_event,
+                    [module._BuildStep("step", timing_out, required=required)],
+                    loop.time() + 10,
+                )
+
+
 class TestBuildMainAgent:
     """Tests for build_main_agent function."""
 
@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+
+from astrbot.core.utils.async_cache import LRUCache, SingleFlight
+
+
+def test_lru_cache_evicts_least_recently_used_and_expires():
+    cache: LRUCache[str, int] = LRUCache(max_entries=2, ttl=10)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+
+    assert cache.put("c", 3) == ["b"]
+    assert list(cache) == ["a", "c"]
+    assert cache.evictions == 1
+
+    cache.put("old", 4, created_at=0.0)
+    assert cache.pop_expired("old")
+    assert "old" not in cache
+    cache.put("stale", 5, created_at=0.0)
+    assert cache.get("stale") is None
+    assert "stale" not in cache
+
+
+@pytest.mark.asyncio
+async def test_single_flight_shares_result_and_exception():
+    flight: SingleFlight[str, int] = SingleFlight()
+    calls = 0
+
+    async def produce() -> int:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return 42
+
+    results = await asyncio.gather(*(flight.do("k", produce) for _ in range(3)))
+    assert results == [(42, False), (42, True), (42, True)]
+    assert calls == 1
+    assert len(flight) == 0
+
+    async def fail() -> int:
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    outcomes = await asyncio.gather(
+        *(flight.do("k", fail) for _ in range(2)),
+        return_exceptions=True,
+    )
+    assert all(isinstance(o, RuntimeError) for o in outcomes)
+
+
+@pytest.mark.asyncio
+async def test_single_flight_waiter_takes_over_when_leader_is_cancelled():
+    flight: SingleFlight[str, int] = SingleFlight()
+    calls = 0
+
+    async def produce() -> int:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return calls
+
+    leader = asyncio.create_task(flight.do("k", produce))
+    await asyncio.sleep(0)
+    waiters = [asyncio.create_task(flight.do("k", produce)) for _ in range(2)]
+    await asyncio.sleep(0)
+    leader.cancel()
+
+    results = await asyncio.gather(*waiters)
+
+    assert leader.cancelled()
+    assert sorted(results) == [(2, False), (2, True)]
+    assert calls == 2
+
+
+@pytest.mark.asyncio
+async def test_single_flight_cancelled_waiter_does_not_affect_leader():
+    flight: SingleFlight[str, int] = SingleFlight()
+
+    async def produce() -> int:
+        await asyncio.sleep(0.01)
+        return 7
+
+    leader = asyncio.create_task(flight.do("k", produce))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(flight.do("k", produce))
+    await asyncio.sleep(0)
+    waiter.cancel()
+
+    assert await leader == (7, False)
+    assert waiter.cancelled()
@@ -0,0 +1,218 @@
+import asyncio
+import sys
+import types
+from pathlib import Path
+from unittest.mock import AsyncMock
+
+import pytest
+import pytest_asyncio
+
+from astrbot.core.db.vec_db.faiss_impl.vec_db import FaissVecDB
+from astrbot.core.knowledge_base.chunking.recursive import RecursiveCharacterChunker
+from astrbot.core.knowledge_base.embedding_store import ChunkEmbeddingStore
+from astrbot.core.knowledge_base.kb_db_sqlite import KBSQLiteDatabase
+from astrbot.core.knowledge_base.models import KnowledgeBase
+from astrbot.core.provider.provider import EmbeddingProvider
+
+
+class CountingEmbeddingProvider(EmbeddingProvider):
+    def __init__(self, provider_id: str = "emb", model: str = "m1"):
+        super().__init__({"id": provider_id, "embedding_model": model}, {})
+        self.calls: list[list[str]] = []
+
+    async def get_embedding(self, text: str) -> list[float]:
+        return (await self.get_embeddings([text]))[0]
+
+    async def get_embeddings(self, text: list[str]) -> list[list[float]]:
+        self.calls.append(list(text))
+        return [[float(len(t)), float(t.count(" ")), 1.0, 0.5] for t in text]
+
+    def get_dim(self) -> int:
+        return 4
+
+    @property
+    def embedded(self) -> list[str]:
+        return [text for call in self.calls for text in call]
+
+
+@pytest.fixture
+def stub_provider_manager_module():
+    """Stub provider manager module to avoid circular imports in unit tests."""
+    original_module = sys.modules.get("astrbot.core.provider.manager")
+    stub_module = types.ModuleType("astrbot.core.provider.manager")
+
+    class ProviderManager: ...
+
+    setattr(stub_module, "ProviderManager", ProviderManager)
+    sys.modules["astrbot.core.provider.manager"] = stub_module
+
+    to_drop = [
+        name
+        for name in list(sys.modules)
+        if name.startswith("astrbot.core.knowledge_base.kb_helper")
+        or name.startswith("astrbot.core.knowledge_base.kb_mgr")
+    ]
+    for name in to_drop:
+        sys.modules.pop(name, None)
+
+    try:
+        yield
+    finally:
+        if original_module is not None:
+            sys.modules["astrbot.core.provider.manager"] = original_module
+        else:
+            sys.modules.pop("astrbot.core.provider.manager", None)
+
+
+@pytest_asyncio.fixture
+async def kb_db(tmp_path: Path):
+    db = KBSQLiteDatabase(str(tmp_path / "kb.db"))
+    await db.initialize()
+    yield db
+    await db.close()
+
+
+async def _make_helper(tmp_path: Path, kb_db, provider, store, name: str = "kb"):
+    from astrbot.core.knowledge_base.kb_helper import KBHelper
+
+    kb = KnowledgeBase(kb_name=name, embedding_provider_id="emb")
+    async with kb_db.get_db() as session, session.begin():
+        session.add(kb)
+
+    kb_dir = tmp_path / name
+    kb_dir.mkdir()
+    vec_db = FaissVecDB(
+        doc_store_path=str(kb_dir / "doc.db"),
+        index_store_path=str(kb_dir / "index.faiss"),
+        embedding_provider=provider,
+    )
+    await vec_db.initialize()
+
+    helper = KBHelper.__new__(KBHelper)
+    helper.kb_db = kb_db
+    helper.kb = kb
+    helper.chunker = RecursiveCharacterChunker()
+    helper.kb_dir = kb_dir
+    helper.kb_medias_dir = kb_dir / "medias"
+    helper.kb_ingest_dir = kb_dir / "ingest"
+    helper.vec_db = vec_db
+    helper.embedding_store = store
+    helper._index_lock = asyncio.Lock()
+    helper._ensure_vec_db = AsyncMock(return_value=vec_db)
+    return helper
+
+
+@pytest.mark.asyncio
+async def test_get_embeddings_only_embeds_unseen_texts(kb_db):
+    provider = CountingEmbeddingProvider()
+    store = ChunkEmbeddingStore(kb_db)
+
+    async def embed(texts):
+        return await provider.get_embeddings(texts)
+
+    first = await store.get_embeddings(provider, ["a", "bb", "a"], embed)
+    second = await store.get_embeddings(provider, ["bb", "ccc", "a"], embed)
+
+    assert provider.calls == [["a", "bb"], ["ccc"]]
+    assert first[0] == first[2] == second[2]
+    assert first[1] == second[0]
+    assert store.stats()["hits"] == 2
+    assert await kb_db.count_chunk_embeddings() == 3
+
+
+@pytest.mark.asyncio
+async def test_vectors_are_not_shared_between_embedding_models(kb_db):
+    store = ChunkEmbeddingStore(kb_db)
+    m1 = CountingEmbeddingProvider(model="m1")
+    m2 = CountingEmbeddingProvider(model="m2")
+    await store.save(m1, ["same text"], [[1.0, 0.0, 0.0, 0.0]])
+
+    assert await store.lookup(m1, ["same text"]) == [[1.0, 0.0, 0.0, 0.0]]
+    assert await store.lookup(m2, ["same text"]) == [None]
+
+
+@pytest.mark.asyncio
+async def test_prune_keeps_most_recently_used_vectors(kb_db):
+    store = ChunkEmbeddingStore(kb_db, max_entries=2)
+    provider = CountingEmbeddingProvider()
+    for text in ["old", "mid", "new"]:
+        await store.save(provider, [text], [[1.0, 2.0, 3.0, 4.0]])
+        await asyncio.sleep(0.01)
+    await store.lookup(provider, ["old"])
+
+    await store.prune()
+
+    assert await kb_db.count_chunk_embeddings() == 2
+    assert await store.lookup(provider, ["old", "mid", "new"]) == [
+        [1.0, 2.0, 3.0, 4.0],
+        None,
+        [1.0, 2.0, 3.0, 4.0],
+    ]
+
+
+@pytest.mark.asyncio
+async def test_reupload_of_edited_document_embeds_only_changed_chunks(
+    tmp_path, kb_db, stub_provider_manager_module
+):
+    provider = CountingEmbeddingProvider()
+    store = ChunkEmbeddingStore(kb_db)
+    helper = await _make_helper(tmp_path, kb_db, provider, store)
+    chunks = [f"section {i} unchanged text" for i in range(5)]
+
+    await helper.upload_document(
+        file_name="manual.md",
+        file_content=None,
+        file_type="md",
+        pre_chunked_text=chunks,
+    )
+    provider.calls.clear()
+
+    edited = [*chunks[:2], "section 2 rewritten text", *chunks[3:]]
+    doc = await helper.upload_document(
+        file_name="manual.md",
+        file_content=None,
+        file_type="md",
+        pre_chunked_text=edited,
+    )
+
+    assert provider.embedded == ["manual\n\nsection 2 rewritten text"]
+    assert (
+        await helper.vec_db.count_documents(metadata_filter={"kb_doc_id": doc.doc_id})
+        == 5
+    )
+    await helper.vec_db.close()
+
+
+@pytest.mark.asyncio
+async def test_ingest_job_reuses_vectors_across_knowledge_bases(
+    tmp_path, kb_db, stub_provider_manager_module
+):
+    provider = CountingEmbeddingProvider()
+    store = ChunkEmbeddingStore(kb_db)
+    first = await _make_helper(tmp_path, kb_db, provider, store, name="first")
+    second = await _make_helper(tmp_path, kb_db, provider, store, name="second")
+    content = "\n\n".join(f"paragraph {i} " + "x" * 40 for i in range(3))
+
+    docs = []
+    for helper in (first, second):
+        source = tmp_path / "guide.txt"
+        source.write_text(content, encoding="utf-8")
+        job = await helper.create_ingest_job(
+            file_name="guide.txt",
+            file_type="txt",
+            source_path=source,
+            chunk_size=60,
+            chunk_overlap=0,
+        )
+        docs.append(await helper.run_ingest_job(job.job_id))
+
+    assert len(provider.embedded) == 3
+    assert docs[1].chunk_count == 3
+    assert (
+        await second.vec_db.count_documents(
+            metadata_filter={"kb_doc_id": docs[1].doc_id}
+        )
+        == 3
+    )
+    await first.vec_db.close()
+    await second.vec_db.close()
@@ -4,11 +4,13 @@ This module tests the ComputerClient, Booter implementations (local, shipyard, b
 filesystem operations, Python execution, shell execution, and security restrictions.
 """
 
+import asyncio
 import shlex
 import sys
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
+import pytest_asyncio
 
 from astrbot.core.computer.booters.base import ComputerBooter
 from astrbot.core.computer.booters.local import (
@@ -18,6 +20,10 @@ from astrbot.core.computer.booters.local import (
     LocalShellComponent,
     _is_safe_command,
 )
+from astrbot.core.computer.booters.local_kernel import (
+    LocalKernelManager,
+    LocalKernelOptions,
+)
 
 
 class TestLocalBooterInit:
@@ -193,42 +199,122 @@ class TestLocalShellComponent:
 class TestLocalPythonComponent:
     """Tests for LocalPythonComponent."""
 
+    @pytest_asyncio.fixture
+    async def python(self):
+        python = LocalPythonComponent()
+        yield python
+        await python.shutdown()
+
     @pytest.mark.asyncio
-    async def test_exec_simple_code(self):
+    async def test_exec_simple_code(self, python):
         """Test executing simple Python code."""
-        python = LocalPythonComponent()
         result = await python.exec("print('hello')")
         assert result["data"]["output"]["text"] == "hello\n"
 
     @pytest.mark.asyncio
-    async def test_exec_with_error(self):
+    async def test_exec_with_error(self, python):
         """Test executing Python code with error."""
-        python = LocalPythonComponent()
         result = await python.exec("raise ValueError('test error')")
         assert "test error" in result["data"]["error"]
 
     @pytest.mark.asyncio
-    async def test_exec_with_timeout(self):
+    async def test_exec_with_timeout(self, python):
         """Test Python execution with timeout."""
-        python = LocalPythonComponent()
         # This should timeout
         result = await python.exec("import time; time.sleep(10)", timeout=1)
         assert "timed out" in result["data"]["error"].lower()
 
     @pytest.mark.asyncio
-    async def test_exec_silent_mode(self):
+    async def test_exec_silent_mode(self, python):
         """Test Python execution in silent mode."""
-        python = LocalPythonComponent()
         result = await python.exec("print('hello')", silent=True)
         assert result["data"]["output"]["text"] == ""
 
     @pytest.mark.asyncio
-    async def test_exec_return_value(self):
+    async def test_exec_return_value(self, python):
         """Test Python execution returns value correctly."""
-        python = LocalPythonComponent()
         result = await python.exec("result = 1 + 1\nprint(result)")
         assert "2" in result["data"]["output"]["text"]
 
+    @pytest.mark.asyncio
+    async def test_exec_keeps_state_per_kernel(self, python):
+        """Cells with the same kernel_id share variables; other kernels do not."""
+        await python.exec("counter = 41", kernel_id="session-a")
+        result = await python.exec("counter + 1", kernel_id="session-a")
+        assert result["data"]["output"]["text"] == "42\n"
+
+        result = await python.exec("print(counter)", kernel_id="session-b")
+        assert "NameError" in result["data"]["error"]
+
+        result = await python.exec("print(counter)")
+        assert "NameError" in result["data"]["error"]
+
+    @pytest.mark.asyncio
+    async def test_exec_captures_subprocess_output(self, python, tmp_path):
+        """Output of child processes is captured and cwd applies per cell."""
+        result = await python.exec(
+            "import os, subprocess, sys\n"
+            "subprocess.run([sys.executable, '-c', 'print(\"child\")'])\n"
+            "print(os.getcwd())",
+            kernel_id="session-a",
+            cwd=str(tmp_path),
+        )
+        text = result["data"]["output"]["text"]
+        assert text.splitlines() == ["child", str(tmp_path)]
+
+    @pytest.mark.asyncio
+    async def test_exec_timeout_restarts_kernel(self, python):
+        """A timed-out kernel is replaced and its state is dropped."""
+        await python.exec("value = 1", kernel_id="session-a")
+        result = await python.exec(
+            "import time; time.sleep(10)", kernel_id="session-a", timeout=1
+        )
+        assert "timed out" in result["data"]["error"].lower()
+
+        result = await python.exec("print(value)", kernel_id="session-a")
+        assert "NameError" in result["data"]["error"]
+
+    @pytest.mark.asyncio
+    async def test_idle_kernels_are_evicted_over_limit(self):
+        """The least recently used idle kernel is closed when the limit is hit."""
+        python = LocalPythonComponent(
+            kernels=LocalKernelManager(LocalKernelOptions(pool_size=0, max_kernels=2))
+        )
+        try:
+            for kernel_id in ("a", "b", "c"):
+                await python.exec("x = 1", kernel_id=kernel_id)
+            assert set(python.kernels._kernels) == {"b", "c"}
+        finally:
+            await python.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_concurrent_first_cells_share_one_kernel(self):
+        """Concurrent cells of a new kernel_id start a single kernel."""
+        kernels = LocalKernelManager(LocalKernelOptions(pool_size=0))
+        python = LocalPythonComponent(kernels=kernels)
+        started = 0
+        start_kernel = kernels._start_kernel
+
+        async def counting_start_kernel():
+            nonlocal started
+            started += 1
+            return await start_kernel()
+
+        kernels._start_kernel = counting_start_kernel
+        try:
+            results = await asyncio.gather(
+                *(
+                    python.exec("import os; print(os.getpid())", kernel_id="a")
+                    for _ in range(3)
+                )
+            )
+            pids = {result["data"]["output"]["text"] for result in results}
+            assert len(pids) == 1
+            assert started == 1
+            assert list(kernels._kernels) == ["a"]
+        finally:
+            await python.shutdown()
+
 
 class TestLocalFileSystemComponent:
     """Tests for LocalFileSystemComponent."""
@@ -1,7 +1,10 @@
+import asyncio
 import sqlite3
+import threading
 
 import pytest
 
+from astrbot.core.db.vec_db.faiss_impl import document_storage
 from astrbot.core.db.vec_db.faiss_impl.document_storage import DocumentStorage
 
 
@@ -101,3 +104,92 @@ async def test_document_storage_fts_recovers_from_legacy_non_fts_table(tmp_path)
     assert [result["doc_id"] for result in results] == ["legacy-fix"]
 
     await storage.close()
+
+
+@pytest.mark.asyncio
+async def test_document_storage_bm25_tracks_inserts_updates_and_deletes(tmp_path):
+    storage = DocumentStorage(str(tmp_path / "doc.db"))
+    await storage.initialize()
+    storage.fts5_available = False
+
+    await storage.insert_documents_batch(
+        doc_ids=["chunk-1", "chunk-2", "chunk-3"],
+        texts=["apple banana apple", "apple orange", "grape melon"],
+        metadatas=[
+            {"kb_doc_id": "doc-1", "kb_id": "kb-1", "chunk_index": i} for i in range(3)
+        ],
+    )
+
+    results = await storage.search_bm25(["apple"], limit=10)
+
+    assert [result["doc_id"] for result in results] == ["chunk-1", "chunk-2"]
+    assert results[0]["score"] < results[1]["score"] < 0
+
+    await storage.update_document_by_doc_id("chunk-3", "apple pie")
+    await storage.delete_document_by_doc_id("chunk-1")
+    results = await storage.search_bm25(["apple"], limit=10)
+
+    assert {result["doc_id"] for result in results} == {"chunk-2", "chunk-3"}
+    assert await storage.search_bm25(["banana"], limit=10) == []
+    assert await storage.search_bm25(["apple"], limit=1) == results[:1]
+
+    await storage.close()
+
+
+@pytest.mark.asyncio
+async def test_document_storage_bm25_rebuilds_existing_documents(tmp_path):
+    storage = DocumentStorage(str(tmp_path / "doc.db"))
+    await storage.initialize()
+    assert storage.fts5_available is True
+
+    await storage.insert_document(
+        doc_id="fts-chunk",
+        text="legacy 知识库 文本",
+        metadata={"kb_doc_id": "doc-1", "kb_id": "kb-1", "chunk_index": 0},
+    )
+    storage.fts5_available = False
+
+    results = await storage.search_bm25(["知识库"], limit=10)
+
+    assert [result["doc_id"] for result in results] == ["fts-chunk"]
+    assert storage._bm25_index_ready is True
+
+    await storage.close()
+
+
+@pytest.mark.asyncio
+async def test_document_storage_bm25_rebuild_tokenizes_batches_off_the_loop(
+    tmp_path, monkeypatch
+):
+    monkeypatch.setattr(document_storage, "FTS_REBUILD_BATCH_SIZE", 2)
+    storage = DocumentStorage(str(tmp_path / "doc.db"))
+    await storage.initialize()
+    await storage.insert_documents_batch(
+        doc_ids=[f"chunk-{i}" for i in range(5)],
+        texts=[f"apple text{i}" for i in range(5)],
+        metadatas=[{"kb_doc_id": "doc-1", "chunk_index": i} for i in range(5)],
+    )
+    storage.fts5_available = False
+
+    threads = []
+    tokenize = storage._tokenize_bm25_rows
+
+    def recording_tokenize(rows):
+        threads.append(threading.current_thread())
+        return tokenize(rows)
+
+    monkeypatch.setattr(storage, "_tokenize_bm25_rows", recording_tokenize)
+    results, again = await asyncio.gather(
+        storage.search_bm25(["apple"], limit=10),
+        storage.search_bm25(["apple"], limit=10),
+    )
+
+    assert len(results) == 5
+    assert again == results
+    # One rebuild, one tokenization per batch, none on the event loop thread.
+    assert len(threads) == 3
+    assert threading.main_thread() not in threads
+    async with storage.get_session() as session:
+        assert await storage._get_bm25_stats(session) == (5, 10)
+
+    await storage.close()
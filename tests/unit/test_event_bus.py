@@ -6,7 +6,7 @@ from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
-from astrbot.core.event_bus import EventBus
+from astrbot.core.event_bus import EventBus, EventDispatchOptions
 
 
 @pytest.fixture
@@ -699,3 +699,164 @@ class TestEventFiltering:
 
             # Verify error was logged for missing scheduler
             mock_logger.error.assert_called_once()
+
+
+def _make_event(umo: str, text: str = "Hello"):
+    event = MagicMock()
+    event.unified_msg_origin = umo
+    event.get_platform_id.return_value = "platform"
+    event.get_platform_name.return_value = "Platform"
+    event.get_sender_name.return_value = "User"
+    event.get_sender_id.return_value = "user123"
+    event.get_message_outline.return_value = text
+    return event
+
+
+class TestEventBusWorkerPool:
+    """Tests for the worker_pool dispatch mode."""
+
+    @pytest.mark.asyncio
+    async def test_options_from_config_falls_back_to_defaults(self):
+        options = EventDispatchOptions.from_config(
+            {
+                "event_dispatch_mode": "unknown",
+                "event_dispatch_max_workers": 0,
+                "event_dispatch_overflow_policy": "bogus",
+            },
+        )
+
+        assert options.mode == "task"
+        assert options.max_workers == 32
+        assert options.overflow_policy == "queue"
+
+    @pytest.mark.asyncio
+    async def test_same_session_is_processed_in_order_with_bounded_workers(
+        self, event_queue, mock_config_manager
+    ):
+        running = 0
+        peak = 0
+        order: dict[str, list[str]] = {}
+        done = asyncio.Event()
+
+        async def execute(event):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            order.setdefault(event.unified_msg_origin, []).append(
+                event.get_message_outline(),
+            )
+            running -= 1
+            if sum(len(v) for v in order.values()) == 9:
+                done.set()
+
+        scheduler = MagicMock()
+        scheduler.execute = AsyncMock(side_effect=execute)
+        event_bus = EventBus(
+            event_queue=event_queue,
+            pipeline_scheduler_mapping={"test-conf-id": scheduler},
+            astrbot_config_mgr=mock_config_manager,
+            dispatch_options=EventDispatchOptions(mode="worker_pool", max_workers=2),
+        )
+        for i in range(3):
+            for session in ("a", "b", "c"):
+                await event_queue.put(_make_event(f"p:group:{session}", str(i)))
+
+        task = asyncio.create_task(event_bus.dispatch())
+        try:
+            await asyncio.wait_for(done.wait(), timeout=2.0)
+        finally:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+
+        assert peak == 2
+        assert all(messages == ["0", "1", "2"] for messages in order.values())
+        metrics = event_bus.metrics()
+        assert metrics["processed"] == 9
+        assert metrics["queue_depth"] == 0
+        assert metrics["wait_time_max"] > 0
+
+    @pytest.mark.asyncio
+    async def test_conf_quota_limits_concurrency_per_config(
+        self, event_queue, mock_config_manager
+    ):
+        running = 0
+        peak = 0
+        processed = 0
+        done = asyncio.Event()
+
+        async def execute(event):  # noqa: ARG001
+            nonlocal running, peak, processed
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            processed += 1
+            if processed == 4:
+                done.set()
+
+        scheduler = MagicMock()
+        scheduler.execute = AsyncMock(side_effect=execute)
+        event_bus = EventBus(
+            event_queue=event_queue,
+            pipeline_scheduler_mapping={"test-conf-id": scheduler},
+            astrbot_config_mgr=mock_config_manager,
+            dispatch_options=EventDispatchOptions(
+                mode="worker_pool",
+                max_workers=4,
+                conf_quota=1,
+            ),
+        )
+        for session in ("a", "b", "c", "d"):
+            await event_queue.put(_make_event(f"p:group:{session}"))
+
+        task = asyncio.create_task(event_bus.dispatch())
+        try:
+            await asyncio.wait_for(done.wait(), timeout=2.0)
+        finally:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+
+        assert peak == 1
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        ("policy", "expected"),
+        [("drop_oldest", ["1", "2"]), ("reject", ["0", "1"])],
+    )
+    async def test_overflow_policies(
+        self, event_queue, mock_config_manager, policy, expected
+    ):
+        scheduler = MagicMock()
+        scheduler.execute = AsyncMock()
+        event_bus = EventBus(
+            event_queue=event_queue,
+            pipeline_scheduler_mapping={"test-conf-id": scheduler},
+            astrbot_config_mgr=mock_config_manager,
+            dispatch_options=EventDispatchOptions(
+                mode="worker_pool",
+                max_pending=2,
+                overflow_policy=policy,
+            ),
+        )
+
+        # Workers are not started, so queued events stay pending.
+        for i in range(3):
+            await event_bus._enqueue(
+                _make_event(f"p:group:{i}", str(i)),
+                scheduler,
+                "test-conf-id",
+            )
+
+        pending = [
+            item.event.get_message_outline()
+            for queue in event_bus._session_queues.values()
+            for item in queue
+        ]
+        metrics = event_bus.metrics()
+        assert pending == expected
+        assert metrics["queue_depth"] == 2
+        assert metrics["queue_depth_by_conf"] == {"test-conf-id": 2}
+        assert metrics["dropped" if policy == "drop_oldest" else "rejected"] == 1
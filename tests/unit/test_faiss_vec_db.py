@@ -1,9 +1,13 @@
 import asyncio
 from unittest.mock import AsyncMock
 
+import numpy as np
 import pytest
 
-from astrbot.core.db.vec_db.faiss_impl.embedding_storage import EmbeddingStorage
+from astrbot.core.db.vec_db.faiss_impl.embedding_storage import (
+    AnnIndexOptions,
+    EmbeddingStorage,
+)
 from astrbot.core.db.vec_db.faiss_impl.vec_db import FaissVecDB
 from astrbot.core.exceptions import KnowledgeBaseUploadError
 from astrbot.core.provider.provider import EmbeddingProvider
@@ -154,6 +158,92 @@ def test_embedding_storage_accepts_a_valid_dimension_for_a_fresh_index() -> None
     assert storage.index.d == 4
 
 
+def test_ann_index_options_reject_unknown_type() -> None:
+    with pytest.raises(ValueError, match="不支持的索引类型"):
+        AnnIndexOptions(index_type="lsh")
+
+
+def test_ann_index_options_factory_string_bounds_ivf_lists() -> None:
+    assert AnnIndexOptions(index_type="hnsw").factory_string(8, 5000) == "IDMap,HNSW32"
+    assert AnnIndexOptions(index_type="ivf_flat").factory_string(8, 1000) == (
+        "IVF25,Flat"
+    )
+    assert AnnIndexOptions(index_type="ivf_pq").factory_string(96, 10000) == (
+        "IVF256,PQ32"
+    )
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("index_type", ["hnsw", "ivf_flat"])
+async def test_ann_index_is_built_in_background_and_swapped_in(
+    tmp_path,
+    index_type,
+) -> None:
+    rng = np.random.default_rng(0)
+    vectors = rng.random((400, 8), dtype=np.float32)
+    storage = EmbeddingStorage(
+        8,
+        str(tmp_path / "index.faiss"),
+        AnnIndexOptions(index_type=index_type, nprobe=16, min_train_size=200),
+    )
+
+    await storage.insert_batch(vectors, list(range(400)))
+    assert storage._ann_build_task is not None
+    await storage._ann_build_task
+
+    assert storage.ann_index is not None
+    assert storage.ann_index.ntotal == 400
+    assert (tmp_path / f"index.{index_type}.faiss").exists()
+    _, indices = await storage.search(vectors[7], k=1)
+    assert indices[0][0] == 7
+
+    report = await storage.evaluate_ann(sample_size=20, k=5)
+    assert report["recall"] > 0.8
+    await storage.close()
+
+
+@pytest.mark.asyncio
+async def test_ann_index_persist_is_deferred_until_close(tmp_path) -> None:
+    rng = np.random.default_rng(2)
+    vectors = rng.random((301, 8), dtype=np.float32)
+    storage = EmbeddingStorage(
+        8,
+        str(tmp_path / "index.faiss"),
+        AnnIndexOptions(index_type="ivf_flat", min_train_size=100),
+    )
+    await storage.insert_batch(vectors[:300], list(range(300)))
+    await storage._ann_build_task
+    ann_path = str(tmp_path / "index.ivf_flat.faiss")
+
+    await storage.insert(vectors[300], 300)
+
+    assert storage.ann_index.ntotal == 301
+    assert EmbeddingStorage._read_index(ann_path).ntotal == 300
+    assert EmbeddingStorage._read_index(storage.path).ntotal == 301
+    await storage.close()
+    assert EmbeddingStorage._read_index(ann_path).ntotal == 301
+
+
+@pytest.mark.asyncio
+async def test_hnsw_deletes_are_filtered_until_rebuild(tmp_path) -> None:
+    rng = np.random.default_rng(1)
+    vectors = rng.random((300, 8), dtype=np.float32)
+    storage = EmbeddingStorage(
+        8,
+        str(tmp_path / "index.faiss"),
+        AnnIndexOptions(index_type="hnsw", min_train_size=100),
+    )
+    await storage.insert_batch(vectors, list(range(300)))
+    await storage._ann_build_task
+
+    await storage.delete([3])
+    _, indices = await storage.search(vectors[3], k=5)
+
+    assert 3 not in indices[0]
+    assert len(indices[0]) == 5
+    await storage.close()
+
+
 @pytest.mark.asyncio
 async def test_get_embeddings_batch_preserves_input_order_when_batches_finish_out_of_order():
     provider = DelayedEmbeddingProvider()
@@ -797,7 +797,7 @@ async def test_modelscope_sync_enables_only_synced_servers(monkeypatch):
     async def fake_enable_mcp_server(name, config):
         enabled_servers.append((name, config))
 
-    monkeypatch.setattr(ftm.aiohttp, "ClientSession", lambda: FakeSession())
+    monkeypatch.setattr(ftm.http_client, "session", lambda **_kwargs: FakeSession())
     monkeypatch.setattr(manager, "load_mcp_config", lambda: default_config)
     monkeypatch.setattr(manager, "save_mcp_config", saved_configs.append)
     monkeypatch.setattr(manager, "enable_mcp_server", fake_enable_mcp_server)
@@ -0,0 +1,202 @@
+from types import SimpleNamespace
+
+import pytest
+
+from astrbot.core.platform.message_type import MessageType
+from astrbot.core.star.dispatch_index import HandlerDispatchIndex
+from astrbot.core.star.filter.command import CommandFilter
+from astrbot.core.star.filter.command_group import CommandGroupFilter
+from astrbot.core.star.filter.event_message_type import (
+    EventMessageType,
+    EventMessageTypeFilter,
+)
+from astrbot.core.star.filter.platform_adapter_type import (
+    PlatformAdapterType,
+    PlatformAdapterTypeFilter,
+)
+from astrbot.core.star.filter.regex import RegexFilter
+from astrbot.core.star.star import star_map
+from astrbot.core.star.star_handler import (
+    EventType,
+    StarHandlerMetadata,
+    StarHandlerRegistry,
+)
+
+
+async def handler_func(self, event, arg: str = "") -> None:
+    pass
+
+
+class FakeEvent:
+    def __init__(
+        self,
+        text: str,
+        wake: bool = True,
+        platform: str = "aiocqhttp",
+        message_type: MessageType = MessageType.GROUP_MESSAGE,
+    ) -> None:
+        self.message_str = text
+        self.is_at_or_wake_command = wake
+        self.platform = platform
+        self.message_type = message_type
+        self.extras = {}
+
+    def get_message_str(self) -> str:
+        return self.message_str
+
+    def get_platform_name(self) -> str:
+        return self.platform
+
+    def get_message_type(self) -> MessageType:
+        return self.message_type
+
+    def set_extra(self, key, value) -> None:
+        self.extras[key] = value
+
+
+def make_handler(name: str, priority: int = 0) -> StarHandlerMetadata:
+    return StarHandlerMetadata(
+        event_type=EventType.AdapterMessageEvent,
+        handler_full_name=f"plugin.main_{name}",
+        handler_name=name,
+        handler_module_path="plugin.main",
+        handler=handler_func,
+        event_filters=[],
+        extras_configs={"priority": priority},
+    )
+
+
+def command(name: str, alias: set | None = None, parents=None):
+    md = make_handler(name)
+    md.event_filters.append(
+        CommandFilter(name, alias, handler_md=md, parent_command_names=parents),
+    )
+    return md
+
+
+def build_handlers() -> dict[str, StarHandlerMetadata]:
+    group = CommandGroupFilter("grp", alias={"g"})
+    group_md = make_handler("grp")
+    group_md.event_filters.append(group)
+
+    regex_a = make_handler("regex_a")
+    regex_a.event_filters.append(RegexFilter(r"^weather\s+\w+"))
+    regex_b = make_handler("regex_b")
+    regex_b.event_filters.append(RegexFilter(r"(?P<n>\d{6})"))
+    regex_c = make_handler("regex_c")
+    regex_c.event_filters.append(RegexFilter(r"(?i)^hello"))
+
+    telegram_only = make_handler("telegram_only")
+    telegram_only.event_filters.append(
+        PlatformAdapterTypeFilter(PlatformAdapterType.TELEGRAM),
+    )
+    private_only = make_handler("private_only")
+    private_only.event_filters.append(
+        EventMessageTypeFilter(EventMessageType.PRIVATE_MESSAGE),
+    )
+    all_messages = make_handler("all_messages", priority=10)
+    all_messages.event_filters.append(EventMessageTypeFilter(EventMessageType.ALL))
+
+    return {
+        "help": command("help", {"h"}),
+        "grp": group_md,
+        "grp_sub": command("sub", parents=["grp", "g"]),
+        "regex_a": regex_a,
+        "regex_b": regex_b,
+        "regex_c": regex_c,
+        "telegram_only": telegram_only,
+        "private_only": private_only,
+        "all_messages": all_messages,
+    }
+
+
+def sorted_by_priority(handlers) -> list[StarHandlerMetadata]:
+    return sorted(handlers, key=lambda h: -h.extras_configs["priority"])
+
+
+def linear_match(handlers, event) -> list[StarHandlerMetadata]:
+    matched = []
+    for handler in handlers:
+        try:
+            if all(f.filter(event, {}) for f in handler.event_filters):
+                matched.append(handler)
+        except ValueError:
+            matched.append(handler)
+    return matched
+
+
+@pytest.mark.parametrize(
+    ("text", "wake", "platform", "message_type", "expected"),
+    [
+        ("help", True, "aiocqhttp", MessageType.GROUP_MESSAGE, {"help"}),
+        ("h  foo", True, "aiocqhttp", MessageType.GROUP_MESSAGE, {"help"}),
+        ("help", False, "aiocqhttp", MessageType.GROUP_MESSAGE, set()),
+        ("g sub x", True, "aiocqhttp", MessageType.GROUP_MESSAGE, {"grp", "sub"}),
+        ("weather paris", False, "aiocqhttp", MessageType.GROUP_MESSAGE, {"regex_a"}),
+        ("HELLO 123456", False, "telegram", MessageType.GROUP_MESSAGE, None),
+        ("nothing", False, "aiocqhttp", MessageType.FRIEND_MESSAGE, {"private_only"}),
+    ],
+)
+def test_index_candidates_cover_linear_matches(
+    text,
+    wake,
+    platform,
+    message_type,
+    expected,
+):
+    handlers = build_handlers()
+    ordered = sorted_by_priority(handlers.values())
+    index = HandlerDispatchIndex(ordered)
+    event = FakeEvent(text, wake, platform, message_type)
+
+    candidates = index.match(event)
+    linear = linear_match(ordered, FakeEvent(text, wake, platform, message_type))
+
+    assert set(map(id, linear)) <= set(map(id, candidates))
+    # Candidates keep the registry's priority order.
+    assert candidates == [h for h in ordered if h in candidates]
+    assert candidates[0] is handlers["all_messages"]
+    names = {h.handler_name for h in candidates} - {"all_messages"}
+    if expected is not None:
+        assert names == expected
+    else:
+        assert {"regex_b", "regex_c", "telegram_only"} <= names
+
+
+def test_index_skips_unrelated_commands_and_regexes():
+    handlers = build_handlers()
+    index = HandlerDispatchIndex(sorted_by_priority(handlers.values()))
+
+    names = {h.handler_name for h in index.match(FakeEvent("helpme"))}
+
+    assert names == {"help", "all_messages"}
+
+
+def test_registry_rebuilds_index_after_changes(monkeypatch):
+    monkeypatch.setitem(
+        star_map,
+        "plugin.main",
+        SimpleNamespace(activated=True, name="plugin", reserved=False),
+    )
+    registry = StarHandlerRegistry()
+    help_md = command("help")
+    registry.append(help_md)
+
+    assert registry.get_message_handler_candidates(FakeEvent("help")) == [help_md]
+
+    ping_md = command("ping")
+    registry.append(ping_md)
+    assert registry.get_message_handler_candidates(FakeEvent("ping")) == [ping_md]
+
+    command_filter = ping_md.event_filters[0]
+    command_filter.command_name = "pong"
+    command_filter._cmpl_cmd_names = None
+    registry.invalidate_dispatch_index()
+    assert registry.get_message_handler_candidates(FakeEvent("ping")) == []
+    assert registry.get_message_handler_candidates(FakeEvent("pong")) == [ping_md]
+
+    ping_md.enabled = False
+    assert registry.get_message_handler_candidates(FakeEvent("pong")) == []
+
+    registry.remove(help_md)
+    assert registry.get_message_handler_candidates(FakeEvent("help")) == []
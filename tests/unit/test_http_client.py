@@ -0,0 +1,69 @@
+import pytest
+import pytest_asyncio
+from aiohttp import web
+
+from astrbot.core.utils.http_client import HTTPClientRegistry
+
+
+@pytest_asyncio.fixture
+async def local_server():
+    async def handle(_request):
+        return web.Response(text="ok")
+
+    app = web.Application()
+    app.router.add_get("/", handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    try:
+        yield f"http://127.0.0.1:{port}/"
+    finally:
+        await runner.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_sessions_share_keepalive_connections(local_server):
+    registry = HTTPClientRegistry()
+    try:
+        for _ in range(3):
+            async with registry.session() as session:
+                async with session.get(local_server) as resp:
+                    assert await resp.text() == "ok"
+
+        stats = registry.stats()
+        assert stats["requests"] == 3
+        assert stats["connections_created"] == 1
+        assert stats["connections_reused"] == 2
+        assert stats["hosts"]["127.0.0.1"]["reused"] == 2
+        assert stats["idle_connections"] == 1
+    finally:
+        await registry.close()
+
+
+@pytest.mark.asyncio
+async def test_closing_session_keeps_pool_open():
+    registry = HTTPClientRegistry()
+    async with registry.session() as session:
+        connector = session.connector
+    assert not connector.closed
+    assert registry.connector() is connector
+
+    await registry.close()
+    assert connector.closed
+    assert registry.connector() is not connector
+    await registry.close()
+
+
+@pytest.mark.asyncio
+async def test_configure_applies_to_new_pool():
+    registry = HTTPClientRegistry()
+    registry.configure(limit=20, limit_per_host=-1, keepalive_timeout=5)
+    try:
+        connector = registry.connector()
+        assert connector.limit == 20
+        assert connector.limit_per_host == 0
+        assert registry.stats()["keepalive_timeout"] == 5
+    finally:
+        await registry.close()
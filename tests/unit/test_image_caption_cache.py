@@ -0,0 +1,177 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from astrbot.core.utils.image_caption_cache import ImageCaptionCache
+
+
+class MemoryStore:
+    def __init__(self):
+        self.rows: dict[str, tuple[str, float]] = {}
+
+    async def prune_image_captions(self, before: float, keep: int) -> None:
+        rows = sorted(
+            ((k, v) for k, v in self.rows.items() if v[1] >= before),
+            key=lambda item: item[1][1],
+            reverse=True,
+        )
+        self.rows = dict(rows[:keep])
+
+    async def load_image_captions(self, since: float, limit: int):
+        rows = sorted(self.rows.items(), key=lambda item: item[1][1], reverse=True)
+        return [
+            SimpleNamespace(cache_key=key, caption=caption, created_at=created_at)
+            for key, (caption, created_at) in rows[:limit]
+            if created_at >= since
+        ]
+
+    async def save_image_caption(self, cache_key, caption, created_at) -> None:
+        self.rows[cache_key] = (caption, created_at)
+
+
+def _write_image(tmp_path, name: str, data: bytes) -> str:
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+@pytest.mark.asyncio
+async def test_key_depends_on_content_provider_and_prompt(tmp_path):
+    cache = ImageCaptionCache()
+    a = _write_image(tmp_path, "a.jpg", b"same")
+    b = _write_image(tmp_path, "b.jpg", b"same")
+    c = _write_image(tmp_path, "c.jpg", b"other")
+
+    key = await cache.make_key("cap", "describe", [a])
+    assert key == await cache.make_key("cap", "describe", [b])
+    assert key != await cache.make_key("cap", "describe", [c])
+    assert key != await cache.make_key("cap2", "describe", [a])
+    assert key != await cache.make_key("cap", "describe it", [a])
+
+
+@pytest.mark.asyncio
+async def test_file_uri_is_hashed_like_its_path(tmp_path):
+    cache = ImageCaptionCache()
+    path = tmp_path / "a.jpg"
+    path.write_bytes(b"img")
+
+    key = await cache.make_key("cap", "p", [path.as_uri()])
+
+    assert key is not None
+    assert key == await cache.make_key("cap", "p", [str(path)])
+
+
+@pytest.mark.asyncio
+async def test_remote_or_missing_images_are_not_cached(tmp_path):
+    cache = ImageCaptionCache()
+    local = _write_image(tmp_path, "a.jpg", b"img")
+
+    assert await cache.make_key("cap", "p", ["https://example.com/a.jpg"]) is None
+    assert await cache.make_key("cap", "p", [local, str(tmp_path / "x")]) is None
+
+    cache.enabled = False
+    assert await cache.make_key("cap", "p", [local]) is None
+
+
+@pytest.mark.asyncio
+async def test_get_caption_hits_and_coalesces(tmp_path):
+    cache = ImageCaptionCache()
+    key = await cache.make_key("cap", "p", [_write_image(tmp_path, "a", b"x")])
+    calls = 0
+
+    async def produce() -> str:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "a cat"
+
+    results = await asyncio.gather(*(cache.get_caption(key, produce) for _ in range(3)))
+    assert results == ["a cat"] * 3
+    assert await cache.get_caption(key, produce) == "a cat"
+    assert calls == 1
+    stats = cache.stats()
+    assert stats["misses"] == 1
+    assert stats["hits"] == 3
+
+
+@pytest.mark.asyncio
+async def test_cancelled_leader_does_not_cancel_waiters():
+    cache = ImageCaptionCache()
+    calls = 0
+
+    async def produce() -> str:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "a cat"
+
+    leader = asyncio.create_task(cache.get_caption("k", produce))
+    await asyncio.sleep(0)
+    waiters = [asyncio.create_task(cache.get_caption("k", produce)) for _ in range(2)]
+    await asyncio.sleep(0)
+    leader.cancel()
+
+    assert await asyncio.gather(*waiters) == ["a cat"] * 2
+    assert leader.cancelled()
+    assert calls == 2
+
+
+@pytest.mark.asyncio
+async def test_empty_caption_and_errors_are_not_cached():
+    cache = ImageCaptionCache()
+    calls = 0
+
+    async def empty() -> str:
+        nonlocal calls
+        calls += 1
+        return ""
+
+    async def failing() -> str:
+        raise RuntimeError("provider down")
+
+    assert await cache.get_caption("k", empty) == ""
+    assert await cache.get_caption("k", empty) == ""
+    assert calls == 2
+    with pytest.raises(RuntimeError):
+        await cache.get_caption("k2", failing)
+    assert cache.stats()["size"] == 0
+
+
+@pytest.mark.asyncio
+async def test_lru_eviction_and_ttl(monkeypatch):
+    cache = ImageCaptionCache(max_entries=2, ttl=10)
+    now = 1000.0
+    monkeypatch.setattr(
+        "astrbot.core.utils.image_caption_cache.time.time",
+        lambda: now,
+    )
+
+    for key in ("a", "b", "c"):
+        await cache.get_caption(key, lambda key=key: asyncio.sleep(0, key))
+    assert cache.stats()["evictions"] == 1
+    assert cache._entries.get("a") is None
+
+    now += 11
+    assert cache._entries.get("b") is None
+
+
+@pytest.mark.asyncio
+async def test_persisted_captions_survive_restart():
+    store = MemoryStore()
+    cache = ImageCaptionCache(store=store)
+    await cache.get_caption("k", lambda: asyncio.sleep(0, "a dog"))
+    await cache.close()
+    assert "k" in store.rows
+
+    restarted = ImageCaptionCache(store=store)
+    await restarted.initialize()
+
+    async def produce() -> str:
+        raise AssertionError("should be served from the persisted cache")
+
+    assert await restarted.get_caption("k", produce) == "a dog"
+
+    await restarted.clear()
+    assert store.rows == {}
+    assert restarted.stats()["size"] == 0
@@ -47,10 +47,9 @@ def _patch_download_session(monkeypatch, response: _FakeResponse):
 
 
 def _patch_download_sessions(monkeypatch, responses: list[_FakeResponse | Exception]):
-    monkeypatch.setattr(io.aiohttp, "TCPConnector", lambda **_kwargs: object())
     monkeypatch.setattr(
-        io.aiohttp,
-        "ClientSession",
+        io.http_client,
+        "session",
         lambda **_kwargs: _FakeSession(responses.pop(0)),
     )
 
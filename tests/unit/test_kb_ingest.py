@@ -0,0 +1,358 @@
+"""
+Unit tests for the checkpointed knowledge base ingest pipeline.
+
+Covers:
+1. AIMD concurrency limiter halves on rate limits and recovers on success
+2. embed_in_batches retries rate-limited batches and checkpoints the rest
+3. IngestQueue limits concurrency and de-duplicates job submissions
+4. A failed ingest job resumes from its embedding checkpoint
+5. A job interrupted after chunking resumes on startup without re-parsing
+6. Deleting a knowledge base cancels its running ingest jobs first
+"""
+
+import asyncio
+import sys
+import types
+from pathlib import Path
+
+import pytest
+import pytest_asyncio
+
+from astrbot.core.db.vec_db.faiss_impl.vec_db import FaissVecDB
+from astrbot.core.exceptions import KnowledgeBaseUploadError
+from astrbot.core.knowledge_base.chunking.recursive import RecursiveCharacterChunker
+from astrbot.core.knowledge_base.ingest import (
+    AdaptiveConcurrency,
+    IngestQueue,
+    embed_in_batches,
+    is_rate_limit_error,
+)
+from astrbot.core.knowledge_base.kb_db_sqlite import KBSQLiteDatabase
+from astrbot.core.knowledge_base.models import KnowledgeBase
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+
+class FlakyEmbeddingProvider:
+    """Embedding provider stub that fails on selected calls."""
+
+    def __init__(self, dim: int = 4):
+        self.dim = dim
+        self.calls: list[list[str]] = []
+        self.fail_texts: set[str] = set()
+        self.rate_limits = 0
+
+    def get_dim(self) -> int:
+        return self.dim
+
+    async def get_embeddings(self, texts: list[str]) -> list[list[float]]:
+        self.calls.append(list(texts))
+        if self.rate_limits:
+            self.rate_limits -= 1
+            raise RateLimitError("429 Too Many Requests")
+        if any(text in self.fail_texts for text in texts):
+            raise RuntimeError("embedding service unavailable")
+        return [[float(len(text)), 0.0, 0.0, 1.0] for text in texts]
+
+
+@pytest.fixture
+def stub_provider_manager_module():
+    """Stub provider manager module to avoid circular imports in unit tests."""
+    original_module = sys.modules.get("astrbot.core.provider.manager")
+    stub_module = types.ModuleType("astrbot.core.provider.manager")
+
+    class ProviderManager: ...
+
+    setattr(stub_module, "ProviderManager", ProviderManager)
+    sys.modules["astrbot.core.provider.manager"] = stub_module
+
+    to_drop = [
+        name
+        for name in list(sys.modules)
+        if name.startswith("astrbot.core.knowledge_base.kb_helper")
+        or name.startswith("astrbot.core.knowledge_base.kb_mgr")
+    ]
+    for name in to_drop:
+        sys.modules.pop(name, None)
+
+    try:
+        yield
+    finally:
+        if original_module is not None:
+            sys.modules["astrbot.core.provider.manager"] = original_module
+        else:
+            sys.modules.pop("astrbot.core.provider.manager", None)
+
+
+@pytest_asyncio.fixture
+async def kb_db(tmp_path: Path):
+    db = KBSQLiteDatabase(str(tmp_path / "kb.db"))
+    await db.initialize()
+    yield db
+    await db.close()
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    original_sleep = asyncio.sleep
+
+    async def _sleep(delay, *args, **kwargs):
+        await original_sleep(0)
+
+    monkeypatch.setattr("astrbot.core.knowledge_base.ingest.asyncio.sleep", _sleep)
+
+
+async def _make_helper(tmp_path: Path, kb_db: KBSQLiteDatabase, provider):
+    from astrbot.core.knowledge_base.kb_helper import KBHelper
+
+    kb = KnowledgeBase(kb_name="ingest", embedding_provider_id="fake")
+    async with kb_db.get_db() as session, session.begin():
+        session.add(kb)
+
+    vec_db = FaissVecDB(
+        doc_store_path=str(tmp_path / "doc.db"),
+        index_store_path=str(tmp_path / "index.faiss"),
+        embedding_provider=provider,
+    )
+    await vec_db.initialize()
+
+    helper = KBHelper.__new__(KBHelper)
+    helper.kb_db = kb_db
+    helper.kb = kb
+    helper.chunker = RecursiveCharacterChunker()
+    helper.kb_dir = tmp_path / "kb"
+    helper.kb_medias_dir = helper.kb_dir / "medias"
+    helper.kb_ingest_dir = helper.kb_dir / "ingest"
+    helper.vec_db = vec_db
+    helper._index_lock = asyncio.Lock()
+    return helper
+
+
+def _write_source(tmp_path: Path, paragraphs: list[str]) -> Path:
+    source = tmp_path / "upload.txt"
+    source.write_text("\n\n".join(paragraphs), encoding="utf-8")
+    return source
+
+
+def test_rate_limit_detection():
+    assert is_rate_limit_error(RateLimitError("slow down"))
+    assert is_rate_limit_error(RuntimeError("Error code: 429 - rate limit reached"))
+    assert not is_rate_limit_error(RuntimeError("batch 1429 failed"))
+
+
+@pytest.mark.asyncio
+async def test_adaptive_concurrency_halves_on_rate_limit_and_recovers():
+    limiter = AdaptiveConcurrency(8)
+
+    limiter.on_rate_limited()
+    assert limiter.limit == 4
+    limiter.on_rate_limited()
+    limiter.on_rate_limited()
+    limiter.on_rate_limited()
+    assert limiter.limit == 1
+
+    limiter.on_success()
+    assert limiter.limit == 2
+    for _ in range(2):
+        limiter.on_success()
+    assert limiter.limit == 3
+    assert limiter.rate_limited == 4
+
+
+@pytest.mark.asyncio
+async def test_embed_in_batches_retries_rate_limits_and_checkpoints_other_batches():
+    provider = FlakyEmbeddingProvider()
+    provider.rate_limits = 5
+    provider.fail_texts = {"bad"}
+    limiter = AdaptiveConcurrency(4)
+    saved: dict[int, list[float]] = {}
+
+    async def on_batch(indexes, vectors):
+        saved.update(zip(indexes, vectors))
+
+    with pytest.raises(RuntimeError, match="unavailable"):
+        await embed_in_batches(
+            provider,  # type: ignore[arg-type]
+            [(0, "a"), (1, "bb"), (2, "bad"), (3, "cccc")],
+            batch_size=1,
+            limiter=limiter,
+            max_retries=2,
+            on_batch=on_batch,
+        )
+
+    # Rate limits do not consume the max_retries budget.
+    assert sorted(saved) == [0, 1, 3]
+    assert limiter.rate_limited == 5
+    assert limiter.limit < limiter.max_limit
+
+
+@pytest.mark.asyncio
+async def test_ingest_queue_limits_concurrency_and_deduplicates_jobs():
+    queue = IngestQueue(workers=2)
+    running = 0
+    peak = 0
+    gate = asyncio.Event()
+
+    async def job():
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await gate.wait()
+        running -= 1
+        return "done"
+
+    tasks = [queue.submit(f"job-{i}", job) for i in range(5)]
+    assert queue.submit("job-0", job) is tasks[0]
+    await asyncio.sleep(0.01)
+    assert queue.stats() == {"workers": 2, "running": 2, "queued": 3}
+
+    gate.set()
+    assert await asyncio.gather(*tasks) == ["done"] * 5
+    assert peak == 2
+    assert not queue.is_active("job-0")
+
+
+@pytest.mark.asyncio
+async def test_failed_ingest_job_resumes_from_embedding_checkpoint(
+    tmp_path: Path,
+    kb_db: KBSQLiteDatabase,
+    stub_provider_manager_module,
+):
+    provider = FlakyEmbeddingProvider()
+    helper = await _make_helper(tmp_path, kb_db, provider)
+    paragraphs = [f"paragraph {i} " + "x" * 40 for i in range(4)]
+    source = _write_source(tmp_path, paragraphs)
+
+    job = await helper.create_ingest_job(
+        file_name="upload.txt",
+        file_type="txt",
+        source_path=source,
+        chunk_size=60,
+        chunk_overlap=0,
+        batch_size=1,
+        max_retries=1,
+    )
+    assert not source.exists()
+
+    provider.fail_texts = {f"upload\n\n{paragraphs[2]}"}
+    with pytest.raises(KnowledgeBaseUploadError) as exc_info:
+        await helper.run_ingest_job(job.job_id)
+    assert exc_info.value.stage == "embedding"
+
+    failed = await kb_db.get_ingest_job(job.job_id)
+    assert failed is not None
+    assert failed.status == "failed"
+    assert failed.stage == "embedding"
+    assert failed.chunk_count == 4
+    assert failed.embedded_count == 3
+    assert await helper.vec_db.count_documents() == 0
+
+    provider.fail_texts = set()
+    provider.calls.clear()
+    doc = await helper.run_ingest_job(job.job_id)
+
+    # Only the chunk without a checkpointed vector is embedded again.
+    assert provider.calls == [[f"upload\n\n{paragraphs[2]}"]]
+    assert doc.doc_id == job.doc_id
+    assert doc.chunk_count == 4
+    assert await kb_db.get_ingest_job(job.job_id) is None
+    assert await kb_db.list_ingest_chunks(job.job_id) == []
+    assert await kb_db.get_document_by_id(job.doc_id) is not None
+    assert (
+        await helper.vec_db.count_documents(metadata_filter={"kb_doc_id": doc.doc_id})
+        == 4
+    )
+    await helper.vec_db.close()
+
+
+@pytest.mark.asyncio
+async def test_interrupted_job_is_resumed_by_manager_without_reparsing(
+    tmp_path: Path,
+    kb_db: KBSQLiteDatabase,
+    stub_provider_manager_module,
+):
+    from astrbot.core.knowledge_base.kb_mgr import KnowledgeBaseManager
+
+    provider = FlakyEmbeddingProvider()
+    helper = await _make_helper(tmp_path, kb_db, provider)
+    source = _write_source(tmp_path, ["alpha " * 5, "beta " * 5])
+    job = await helper.create_ingest_job(
+        file_name="upload.txt",
+        file_type="txt",
+        source_path=source,
+        chunk_size=40,
+        chunk_overlap=0,
+    )
+    # Simulate a crash right after the chunking checkpoint was written.
+    await kb_db.save_ingest_chunks(job.job_id, ["alpha chunk", "beta chunk"], [])
+    await kb_db.update_ingest_job(job.job_id, status="running")
+    Path(job.source_path).unlink()
+
+    manager = KnowledgeBaseManager.__new__(KnowledgeBaseManager)
+    manager.kb_db = kb_db
+    manager.kb_insts = {helper.kb.kb_id: helper}
+    manager.ingest_queue = IngestQueue(workers=1)
+
+    await manager.resume_ingest_jobs()
+    assert manager.ingest_queue.is_active(job.job_id)
+    doc = await manager.ingest_queue.submit(job.job_id, helper.run_ingest_job)
+
+    assert doc.chunk_count == 2
+    assert sorted(c for call in provider.calls for c in call) == [
+        "upload\n\nalpha chunk",
+        "upload\n\nbeta chunk",
+    ]
+    assert await manager.list_ingest_jobs(kb_id=helper.kb.kb_id) == []
+    await helper.vec_db.close()
+
+
+@pytest.mark.asyncio
+async def test_delete_kb_cancels_running_ingest_jobs(
+    tmp_path: Path,
+    kb_db: KBSQLiteDatabase,
+    stub_provider_manager_module,
+):
+    from astrbot.core.knowledge_base.kb_mgr import KnowledgeBaseManager
+
+    provider = FlakyEmbeddingProvider()
+    helper = await _make_helper(tmp_path, kb_db, provider)
+    source = _write_source(tmp_path, ["alpha " * 5, "beta " * 5])
+    job = await helper.create_ingest_job(
+        file_name="upload.txt",
+        file_type="txt",
+        source_path=source,
+        chunk_size=40,
+        chunk_overlap=0,
+    )
+
+    started = asyncio.Event()
+    cancelled = asyncio.Event()
+
+    async def blocked_embeddings(texts: list[str]) -> list[list[float]]:
+        started.set()
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+        return []
+
+    provider.get_embeddings = blocked_embeddings
+
+    manager = KnowledgeBaseManager.__new__(KnowledgeBaseManager)
+    manager.kb_db = kb_db
+    manager.kb_insts = {helper.kb.kb_id: helper}
+    manager.ingest_queue = IngestQueue(workers=1)
+
+    task = await manager.submit_ingest_job(job)
+    await asyncio.wait_for(started.wait(), timeout=5)
+
+    assert await manager.delete_kb(helper.kb.kb_id)
+
+    assert task.cancelled()
+    assert cancelled.is_set()
+    assert not manager.ingest_queue.is_active(job.job_id)
+    assert await kb_db.get_ingest_job(job.job_id) is None
+    assert not helper.kb_dir.exists()
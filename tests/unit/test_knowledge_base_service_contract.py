@@ -55,6 +55,9 @@ def make_kb(kb_id: str, kb_name: str):
         top_k_dense=50,
         top_k_sparse=50,
         top_m_final=5,
+        index_type="flat",
+        index_nprobe=8,
+        index_ef_search=64,
         model_dump=lambda: {"kb_id": kb_id, "kb_name": kb_name},
     )
 
@@ -159,6 +162,9 @@ async def test_create_kb_accepts_legacy_name_field():
         top_k_dense=12,
         top_k_sparse=8,
         top_m_final=3,
+        index_type=None,
+        index_nprobe=None,
+        index_ef_search=None,
     )
 
 
@@ -184,6 +190,9 @@ async def test_update_kb_preserves_omitted_fields():
         top_k_dense=50,
         top_k_sparse=50,
         top_m_final=5,
+        index_type="flat",
+        index_nprobe=8,
+        index_ef_search=64,
     )
 
 
@@ -281,12 +290,25 @@ async def test_upload_document_accepts_more_than_ten_files_and_cleans_temporary_
         tmp_path: Temporary directory provided by pytest.
         monkeypatch: Pytest fixture used to isolate staging and task scheduling.
     """
-    kb_helper = SimpleNamespace(
-        upload_document=AsyncMock(
-            return_value=SimpleNamespace(model_dump=lambda: {"doc_id": "doc-1"})
+    staged_contents = []
+
+    async def create_ingest_job(**kwargs):
+        staged_contents.append(Path(kwargs["source_path"]).read_bytes())
+        Path(kwargs["source_path"]).unlink()
+        return SimpleNamespace(job_id=f"job-{len(staged_contents)}")
+
+    async def submit_ingest_job(job, progress_callback=None):
+        return asyncio.ensure_future(
+            asyncio.sleep(0, SimpleNamespace(model_dump=lambda: {"doc_id": job.job_id}))
         )
+
+    kb_helper = SimpleNamespace(
+        create_ingest_job=AsyncMock(side_effect=create_ingest_job)
+    )
+    kb_manager = SimpleNamespace(
+        get_kb=AsyncMock(return_value=kb_helper),
+        submit_ingest_job=AsyncMock(side_effect=submit_ingest_job),
     )
-    kb_manager = SimpleNamespace(get_kb=AsyncMock(return_value=kb_helper))
     service = make_service(kb_manager)
     uploads = []
     for index in range(11):
@@ -338,9 +360,34 @@ async def test_upload_document_accepts_more_than_ten_files_and_cleans_temporary_
     await created_tasks[0]
 
     assert result["file_count"] == 11
-    assert kb_helper.upload_document.await_count == 11
-    assert [
-        call.kwargs["file_content"]
-        for call in kb_helper.upload_document.await_args_list
-    ] == [f"content-{index}".encode() for index in range(11)]
+    assert kb_helper.create_ingest_job.await_count == 11
+    assert kb_manager.submit_ingest_job.await_count == 11
+    assert sorted(staged_contents) == sorted(
+        f"content-{index}".encode() for index in range(11)
+    )
+    task_result = service.upload_tasks[result["task_id"]]["result"]
+    assert task_result["success_count"] == 11
     assert not list(tmp_path.glob("kb_upload_*"))
+
+
+@pytest.mark.asyncio
+async def test_retrieve_uses_configured_retrieval_plan():
+    kb_manager = MagicMock()
+    kb_manager.retrieve = AsyncMock(return_value={"results": [{"chunk_id": "c1"}]})
+    service = make_service(kb_manager)
+    service.core_lifecycle.astrbot_config = {
+        "kb_retrieval_concurrency": 2,
+        "kb_retrieval_timeout": 3,
+        "kb_fusion_top_k": 30,
+    }
+
+    result = await service.retrieve(
+        {"query": "hello", "kb_names": ["docs"], "top_k": 3},
+    )
+
+    assert result["total"] == 1
+    kwargs = kb_manager.retrieve.await_args.kwargs
+    assert kwargs["top_k_fusion"] == 30
+    assert kwargs["top_m_final"] == 3
+    assert kwargs["plan"].max_concurrency == 2
+    assert kwargs["plan"].sparse_timeout == 3.0
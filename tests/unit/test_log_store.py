@@ -0,0 +1,112 @@
+import time
+
+import pytest
+
+from astrbot.core.log_store import LogQuery, LogStore
+
+
+def _entry(ts: float, level: str = "INFO", **extra) -> dict:
+    return {"level": level, "time": ts, "data": f"{level} at {ts}", **extra}
+
+
+@pytest.fixture
+def store(tmp_path):
+    log_store = LogStore(str(tmp_path / "logs" / "log_store.db"), retention_days=0)
+    log_store.start()
+    yield log_store
+    log_store.close()
+
+
+def _flush(log_store: LogStore) -> None:
+    log_store.close()
+    log_store.start()
+
+
+def test_query_filters_by_level_plugin_umo_and_time(store):
+    now = time.time()
+    store.append(_entry(now - 30, "INFO", plugin="weather"))
+    store.append(_entry(now - 20, "ERROR", plugin="weather", umo="qq:1"))
+    store.append(_entry(now - 10, "ERROR", umo="qq:2"))
+    store.append({"type": "trace", "level": "TRACE", "time": now, "umo": "qq:1"})
+    _flush(store)
+
+    assert len(store.query(LogQuery())["logs"]) == 4
+    errors = store.query(LogQuery(levels=["ERROR"]))["logs"]
+    assert [log["time"] for log in errors] == [now - 10, now - 20]
+    assert len(store.query(LogQuery(plugin="weather"))["logs"]) == 2
+    assert len(store.query(LogQuery(umo="qq:1"))["logs"]) == 2
+    assert len(store.query(LogQuery(categories=["trace"]))["logs"]) == 1
+    assert len(store.query(LogQuery(start=now - 25, end=now - 5))["logs"]) == 2
+
+
+def test_query_pages_with_before_id(store):
+    now = time.time()
+    for i in range(5):
+        store.append(_entry(now + i))
+    _flush(store)
+
+    first = store.query(LogQuery(limit=2))
+    second = store.query(LogQuery(limit=2, before_id=first["next_before_id"]))
+    last = store.query(LogQuery(limit=2, before_id=second["next_before_id"]))
+
+    times = [log["time"] for page in (first, second, last) for log in page["logs"]]
+    assert times == [now + i for i in range(4, -1, -1)]
+    assert last["next_before_id"] is None
+
+
+def test_entries_since_returns_oldest_first(store):
+    now = time.time()
+    for i in range(3):
+        store.append(_entry(now + i))
+    _flush(store)
+
+    assert [log["time"] for log in store.entries_since(now)] == [now + 1, now + 2]
+
+
+def test_retention_by_age_and_size(tmp_path):
+    log_store = LogStore(
+        str(tmp_path / "log_store.db"),
+        max_bytes=64 * 1024,
+        retention_days=1,
+    )
+    log_store.start()
+    now = time.time()
+    log_store.append(_entry(now - 2 * 86400))
+    for i in range(2000):
+        log_store.append(_entry(now + i, data="x" * 200))
+    log_store.close()
+
+    assert log_store.apply_retention() > 1
+    logs = log_store.query(LogQuery(limit=1000))["logs"]
+    assert all(log["time"] >= now for log in logs)
+    assert logs[0]["time"] == now + 1999
+
+
+def test_live_filter_matches_entries():
+    log_filter = LogQuery(levels=["ERROR"], plugin="weather", keyword="timeout")
+
+    assert log_filter.matches(_entry(1, "ERROR", plugin="weather", data="timeout"))
+    assert not log_filter.matches(_entry(1, "INFO", plugin="weather", data="timeout"))
+    assert not log_filter.matches(_entry(1, "ERROR", plugin="other", data="timeout"))
+
+
+def test_log_handler_tags_records_with_current_umo():
+    import logging
+
+    from astrbot.core.log import LogBroker, LogQueueHandler, log_umo
+
+    broker = LogBroker()
+    test_logger = logging.getLogger("astrbot.test.log_umo")
+    test_logger.propagate = False
+    test_logger.addHandler(LogQueueHandler(broker))
+    try:
+        test_logger.warning("outside")
+        with log_umo("qq:FriendMessage:1"):
+            test_logger.warning("inside")
+    finally:
+        test_logger.handlers.clear()
+
+    assert [entry["umo"] for entry in broker.log_cache] == [
+        None,
+        "qq:FriendMessage:1",
+    ]
@@ -0,0 +1,231 @@
+import asyncio
+import hashlib
+
+import pytest
+
+from astrbot.core.utils import media_cache as media_cache_module
+from astrbot.core.utils.media_cache import MediaCache
+
+
+class FakeRemote:
+    def __init__(self, contents: dict[str, bytes]):
+        self.contents = contents
+        self.calls: list[str] = []
+        self.gate: asyncio.Event | None = None
+
+    async def download(self, url: str, path: str) -> None:
+        self.calls.append(url)
+        if self.gate is not None:
+            await self.gate.wait()
+        if url not in self.contents:
+            raise RuntimeError(f"not found: {url}")
+        with open(path, "wb") as f:
+            f.write(self.contents[url])
+
+
+@pytest.fixture
+def temp_dir(monkeypatch, tmp_path):
+    path = tmp_path / "temp"
+    monkeypatch.setattr(media_cache_module, "get_astrbot_temp_path", lambda: str(path))
+    return path
+
+
+def _make_cache(tmp_path, **kwargs) -> MediaCache:
+    return MediaCache(cache_dir=str(tmp_path / "media_cache"), **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_same_url_is_served_from_cache(tmp_path):
+    remote = FakeRemote({"https://cdn.test/a.png": b"image-a"})
+    cache = _make_cache(tmp_path)
+
+    first, cached = await cache.fetch(
+        "https://cdn.test/a.png", suffix=".png", download=remote.download
+    )
+    second, _ = await cache.fetch(
+        "https://cdn.test/a.png", suffix=".png", download=remote.download
+    )
+
+    assert cached
+    assert first == second
+    assert first.name == hashlib.sha256(b"image-a").hexdigest() + ".png"
+    assert first.read_bytes() == b"image-a"
+    assert remote.calls == ["https://cdn.test/a.png"]
+    assert cache.stats()["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_different_urls_with_same_content_share_a_file(tmp_path):
+    remote = FakeRemote(
+        {"https://cdn.test/1": b"sticker", "https://cdn.test/2": b"sticker"},
+    )
+    cache = _make_cache(tmp_path)
+
+    first, _ = await cache.fetch("https://cdn.test/1", download=remote.download)
+    second, _ = await cache.fetch("https://cdn.test/2", download=remote.download)
+
+    assert first == second
+    stats = cache.stats()
+    assert stats["files"] == 1
+    assert stats["urls"] == 2
+    assert stats["deduplicated"] == 1
+    assert [p.name for p in first.parent.iterdir()] == [first.name]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_fetches_of_same_url_are_coalesced(tmp_path):
+    remote = FakeRemote({"https://cdn.test/v.mp4": b"video"})
+    remote.gate = asyncio.Event()
+    cache = _make_cache(tmp_path)
+
+    tasks = [
+        asyncio.create_task(
+            cache.fetch("https://cdn.test/v.mp4", ".mp4", download=remote.download)
+        )
+        for _ in range(3)
+    ]
+    await asyncio.sleep(0)
+    remote.gate.set()
+    results = await asyncio.gather(*tasks)
+
+    assert remote.calls == ["https://cdn.test/v.mp4"]
+    assert len({path for path, _ in results}) == 1
+    assert cache.stats()["coalesced"] == 2
+
+
+@pytest.mark.asyncio
+async def test_cancelled_download_does_not_cancel_waiters(tmp_path):
+    remote = FakeRemote({"https://cdn.test/v.mp4": b"video"})
+    remote.gate = asyncio.Event()
+    cache = _make_cache(tmp_path)
+
+    leader = asyncio.create_task(
+        cache.fetch("https://cdn.test/v.mp4", ".mp4", download=remote.download)
+    )
+    await asyncio.sleep(0.01)
+    waiter = asyncio.create_task(
+        cache.fetch("https://cdn.test/v.mp4", ".mp4", download=remote.download)
+    )
+    await asyncio.sleep(0)
+    leader.cancel()
+    await asyncio.sleep(0.01)
+    remote.gate.set()
+
+    path, cached = await waiter
+    assert cached
+    assert path.read_bytes() == b"video"
+    assert leader.cancelled()
+    assert remote.calls == ["https://cdn.test/v.mp4"] * 2
+    assert [p.name for p in path.parent.iterdir()] == [path.name]
+
+
+@pytest.mark.asyncio
+async def test_failed_download_propagates_and_leaves_no_files(tmp_path):
+    remote = FakeRemote({})
+    cache = _make_cache(tmp_path)
+
+    with pytest.raises(RuntimeError):
+        await cache.fetch("https://cdn.test/missing", download=remote.download)
+
+    assert list((tmp_path / "media_cache").iterdir()) == []
+    assert cache.stats()["files"] == 0
+
+
+@pytest.mark.asyncio
+async def test_least_recently_used_files_are_evicted(tmp_path):
+    remote = FakeRemote(
+        {
+            "https://cdn.test/a": b"a" * 40,
+            "https://cdn.test/b": b"b" * 40,
+            "https://cdn.test/c": b"c" * 40,
+        },
+    )
+    cache = _make_cache(tmp_path, max_bytes=100)
+
+    path_a, _ = await cache.fetch("https://cdn.test/a", download=remote.download)
+    path_b, _ = await cache.fetch("https://cdn.test/b", download=remote.download)
+    await cache.fetch("https://cdn.test/a", download=remote.download)
+    path_c, _ = await cache.fetch("https://cdn.test/c", download=remote.download)
+
+    assert path_a.exists()
+    assert not path_b.exists()
+    assert path_c.exists()
+    stats = cache.stats()
+    assert stats["bytes"] == 80
+    assert stats["evictions"] == 1
+
+    await cache.fetch("https://cdn.test/b", download=remote.download)
+    assert remote.calls.count("https://cdn.test/b") == 2
+
+
+@pytest.mark.asyncio
+async def test_oversized_file_is_returned_uncached(tmp_path, temp_dir):
+    remote = FakeRemote({"https://cdn.test/big": b"x" * 64})
+    cache = _make_cache(tmp_path, max_file_bytes=32)
+
+    path, cached = await cache.fetch("https://cdn.test/big", download=remote.download)
+
+    assert not cached
+    assert path.parent == temp_dir
+    assert path.read_bytes() == b"x" * 64
+    assert cache.stats()["files"] == 0
+
+
+@pytest.mark.asyncio
+async def test_deleted_cache_file_is_downloaded_again(tmp_path):
+    remote = FakeRemote({"https://cdn.test/a": b"a"})
+    cache = _make_cache(tmp_path)
+
+    path, _ = await cache.fetch("https://cdn.test/a", download=remote.download)
+    path.unlink()
+    again, _ = await cache.fetch("https://cdn.test/a", download=remote.download)
+
+    assert again == path
+    assert again.exists()
+    assert len(remote.calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_sniffed_suffix_is_used_for_cache_file(tmp_path):
+    remote = FakeRemote({"https://cdn.test/avatar": b"\x89PNG"})
+    cache = _make_cache(tmp_path)
+
+    path, _ = await cache.fetch(
+        "https://cdn.test/avatar",
+        sniff_suffix=lambda _path: ".png",
+        download=remote.download,
+    )
+
+    assert path.suffix == ".png"
+
+
+@pytest.mark.asyncio
+async def test_url_index_survives_restart(tmp_path):
+    remote = FakeRemote({"https://cdn.test/a": b"a"})
+    cache = _make_cache(tmp_path)
+    path, _ = await cache.fetch("https://cdn.test/a", download=remote.download)
+    await cache.close()
+
+    restarted = _make_cache(tmp_path)
+    await restarted.initialize()
+    again, cached = await restarted.fetch(
+        "https://cdn.test/a", download=remote.download
+    )
+
+    assert cached
+    assert again == path
+    assert remote.calls == ["https://cdn.test/a"]
+
+
+@pytest.mark.asyncio
+async def test_disabled_cache_downloads_to_temp_dir(tmp_path, temp_dir):
+    remote = FakeRemote({"https://cdn.test/a": b"a"})
+    cache = _make_cache(tmp_path, enabled=False)
+
+    first, cached = await cache.fetch("https://cdn.test/a", download=remote.download)
+    second, _ = await cache.fetch("https://cdn.test/a", download=remote.download)
+
+    assert not cached
+    assert first != second
+    assert first.parent == temp_dir
+    assert len(remote.calls) == 2
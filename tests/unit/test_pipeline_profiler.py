@@ -0,0 +1,85 @@
+import pytest
+
+from astrbot.core.pipeline import profiler as profiler_module
+from astrbot.core.pipeline.profiler import (
+    KIND_HANDLER,
+    KIND_STAGE,
+    PipelineProfiler,
+    profile_stream,
+)
+from astrbot.core.utils.latency_histogram import LatencyHistogram
+
+
+def test_histogram_percentiles_stay_within_bucket_precision():
+    histogram = LatencyHistogram()
+    for millis in range(1, 1001):
+        histogram.record(millis / 1000)
+
+    snapshot = histogram.snapshot()
+    assert snapshot["count"] == 1000
+    assert snapshot["min"] == pytest.approx(0.001)
+    assert snapshot["max"] == pytest.approx(1.0)
+    assert snapshot["p50"] == pytest.approx(0.5, rel=0.07)
+    assert snapshot["p99"] == pytest.approx(0.99, rel=0.07)
+    assert len(histogram.counts) < 200
+
+
+def test_histogram_cumulative_buckets_end_with_total():
+    histogram = LatencyHistogram()
+    for seconds in (0.0005, 0.003, 0.2, 7.0):
+        histogram.record(seconds)
+
+    buckets = dict(histogram.cumulative_buckets((0.001, 0.01, 1.0)))
+
+    assert buckets[0.001] == 1
+    assert buckets[0.01] == 2
+    assert buckets[1.0] == 3
+    assert buckets[float("inf")] == 4
+
+
+@pytest.mark.asyncio
+async def test_profile_stream_records_pre_and_post_phases(monkeypatch):
+    profiler = PipelineProfiler()
+    profiler.enabled = True
+    monkeypatch.setattr(profiler_module, "pipeline_profiler", profiler)
+
+    async def stage():
+        yield "first"
+        yield "second"
+
+    wrapped = profile_stream(stage(), KIND_STAGE, "FakeStage", "default", "aiocqhttp")
+    assert [item async for item in wrapped] == ["first", "second"]
+
+    phases = {
+        entry["phase"]: entry["count"] for entry in profiler.snapshot()["entries"]
+    }
+    assert phases == {"pre": 1, "post": 2}
+
+
+def test_profile_stream_returns_generator_unchanged_when_disabled(monkeypatch):
+    monkeypatch.setattr(profiler_module, "pipeline_profiler", PipelineProfiler())
+
+    async def stage():
+        yield
+
+    agen = stage()
+    assert profile_stream(agen, KIND_STAGE, "FakeStage", "default", "qq") is agen
+
+
+def test_render_prometheus_escapes_labels():
+    profiler = PipelineProfiler()
+    profiler.record(KIND_STAGE, "ProcessStage", "pre", "default", "telegram", 0.02)
+    profiler.record(KIND_HANDLER, 'plugin.main_"cmd"', "pre", "default", "qq", 0.5)
+
+    text = profiler.render_prometheus()
+
+    assert "# TYPE astrbot_pipeline_stage_duration_seconds histogram" in text
+    assert (
+        'astrbot_pipeline_stage_duration_seconds_count{stage="ProcessStage",'
+        'phase="pre",conf_id="default",platform="telegram"} 1'
+    ) in text
+    assert 'handler="plugin.main_\\"cmd\\""' in text
+    assert 'le="+Inf"} 1' in text
+
+    profiler.reset()
+    assert profiler.render_prometheus() == ""
@@ -68,6 +68,7 @@ async def test_local_python_tool_uses_session_workspace(tmp_path, monkeypatch):
     assert workspace.is_dir()
     python_exec.assert_awaited_once_with(
         "print('ok')",
+        kernel_id="onebot:GroupMessage:12345",
         timeout=30,
         silent=False,
         cwd=str(workspace.resolve(strict=False)),
@@ -0,0 +1,166 @@
+import asyncio
+
+import pytest
+
+from astrbot.core.knowledge_base.retrieval.embedding_cache import (
+    QueryEmbeddingCache,
+    normalize_query,
+)
+
+
+class CountingEmbeddingProvider:
+    def __init__(self, provider_id: str = "emb", model: str = "m1", delay: float = 0):
+        self.provider_config = {"id": provider_id, "embedding_model": model}
+        self.delay = delay
+        self.single_calls = 0
+        self.batch_calls: list[list[str]] = []
+
+    def get_model(self) -> str:
+        return self.provider_config["embedding_model"]
+
+    async def get_embedding(self, text: str) -> list[float]:
+        self.single_calls += 1
+        await asyncio.sleep(self.delay)
+        return [float(len(text)), 1.0]
+
+    async def get_embeddings(self, text: list[str]) -> list[list[float]]:
+        self.batch_calls.append(list(text))
+        return [[float(len(t)), 1.0] for t in text]
+
+
+class MemoryStore:
+    def __init__(self):
+        self.rows: dict[str, tuple[bytes, float]] = {}
+
+    async def prune_query_embeddings(self, before: float, keep: int) -> None:
+        self.rows = {k: v for k, v in self.rows.items() if v[1] >= before}
+
+    async def load_query_embeddings(self, since: float, limit: int):
+        from types import SimpleNamespace
+
+        rows = sorted(self.rows.items(), key=lambda item: item[1][1], reverse=True)
+        return [
+            SimpleNamespace(cache_key=key, embedding=blob, created_at=created_at)
+            for key, (blob, created_at) in rows[:limit]
+            if created_at >= since
+        ]
+
+    async def save_query_embedding(self, cache_key, embedding, created_at) -> None:
+        self.rows[cache_key] = (embedding, created_at)
+
+
+def test_normalize_query_collapses_whitespace_and_width():
+    assert normalize_query("  你好\n\t世界  ") == "你好 世界"
+    assert normalize_query("ＡＢＣ") == "ABC"
+
+
+@pytest.mark.asyncio
+async def test_get_embedding_hits_cache_for_normalized_query():
+    provider = CountingEmbeddingProvider()
+    cache = QueryEmbeddingCache()
+
+    first = await cache.get_embedding(provider, "what is astrbot")
+    second = await cache.get_embedding(provider, "  what   is astrbot ")
+
+    assert first == second
+    assert provider.single_calls == 1
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+@pytest.mark.asyncio
+async def test_cache_key_includes_provider_and_model():
+    cache = QueryEmbeddingCache()
+    provider_a = CountingEmbeddingProvider(model="m1")
+    provider_b = CountingEmbeddingProvider(model="m2")
+
+    await cache.get_embedding(provider_a, "q")
+    await cache.get_embedding(provider_b, "q")
+
+    assert provider_a.single_calls == 1
+    assert provider_b.single_calls == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_are_coalesced():
+    provider = CountingEmbeddingProvider(delay=0.05)
+    cache = QueryEmbeddingCache()
+
+    results = await asyncio.gather(
+        *(cache.get_embedding(provider, "same question") for _ in range(5)),
+    )
+
+    assert provider.single_calls == 1
+    assert all(result == results[0] for result in results)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_leader_does_not_cancel_waiters():
+    provider = CountingEmbeddingProvider(delay=0.05)
+    cache = QueryEmbeddingCache()
+
+    leader = asyncio.create_task(cache.get_embedding(provider, "same question"))
+    await asyncio.sleep(0)
+    waiters = [
+        asyncio.create_task(cache.get_embedding(provider, "same question"))
+        for _ in range(3)
+    ]
+    await asyncio.sleep(0)
+    leader.cancel()
+
+    results = await asyncio.gather(*waiters)
+
+    assert leader.cancelled()
+    assert results == [[13.0, 1.0]] * 3
+    # One waiter takes over the cancelled call, the others share its result.
+    assert provider.single_calls == 2
+
+
+@pytest.mark.asyncio
+async def test_lru_eviction_and_ttl_expiry():
+    provider = CountingEmbeddingProvider()
+    cache = QueryEmbeddingCache(max_entries=2)
+
+    await cache.get_embedding(provider, "a")
+    await cache.get_embedding(provider, "b")
+    await cache.get_embedding(provider, "a")
+    await cache.get_embedding(provider, "c")
+    await cache.get_embedding(provider, "a")
+
+    assert provider.single_calls == 3
+    assert cache.stats()["evictions"] == 1
+
+    cache.ttl = 1
+    for key, (_, embedding) in list(cache._entries._data.items()):
+        cache._entries._data[key] = (0.0, embedding)
+    await cache.get_embedding(provider, "a")
+    assert provider.single_calls == 4
+
+
+@pytest.mark.asyncio
+async def test_get_embeddings_only_requests_missing_texts():
+    provider = CountingEmbeddingProvider()
+    cache = QueryEmbeddingCache()
+    await cache.get_embedding(provider, "cached")
+
+    results = await cache.get_embeddings(provider, ["cached", "new", "new"])
+
+    assert provider.batch_calls == [["new"]]
+    assert results == [[6.0, 1.0], [3.0, 1.0], [3.0, 1.0]]
+
+
+@pytest.mark.asyncio
+async def test_persisted_entries_survive_restart():
+    store = MemoryStore()
+    provider = CountingEmbeddingProvider()
+    cache = QueryEmbeddingCache(store=store)  # type: ignore[arg-type]
+    await cache.get_embedding(provider, "persist me")
+    await cache.close()
+
+    restarted = QueryEmbeddingCache(store=store)  # type: ignore[arg-type]
+    await restarted.initialize()
+    embedding = await restarted.get_embedding(provider, "persist me")
+
+    assert embedding == [10.0, 1.0]
+    assert provider.single_calls == 1
+    assert restarted.stats()["hits"] == 1
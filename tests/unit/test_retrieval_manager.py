@@ -0,0 +1,176 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from astrbot.core.db.vec_db.base import Result
+from astrbot.core.knowledge_base.retrieval.manager import (
+    RetrievalManager,
+    RetrievalPlan,
+)
+from astrbot.core.knowledge_base.retrieval.sparse_retriever import SparseResult
+
+
+def make_dense_result(chunk_id: str, kb_id: str, similarity: float) -> Result:
+    return Result(
+        similarity=similarity,
+        data={
+            "doc_id": chunk_id,
+            "text": chunk_id,
+            "metadata": json.dumps(
+                {"chunk_index": 0, "kb_doc_id": f"doc-{chunk_id}", "kb_id": kb_id},
+            ),
+        },
+    )
+
+
+class SlowVecDB:
+    def __init__(self, kb_id: str, delay: float, tracker: dict):
+        self.kb_id = kb_id
+        self.delay = delay
+        self.tracker = tracker
+        self.rerank_provider = None
+
+    async def retrieve(self, **kwargs):
+        self.tracker["running"] += 1
+        self.tracker["peak"] = max(self.tracker["peak"], self.tracker["running"])
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.tracker["running"] -= 1
+        return [make_dense_result(f"{self.kb_id}-chunk", self.kb_id, 0.5)]
+
+
+class RecordingSparseRetriever:
+    def __init__(self, delays: dict[str, float] | None = None):
+        self.delays = delays or {}
+        self.started = asyncio.Event()
+
+    def tokenize_query(self, query):
+        return [query]
+
+    async def retrieve_kb(self, query_tokens, kb_id, kb_options):
+        self.started.set()
+        await asyncio.sleep(self.delays.get(kb_id, 0.0))
+        return [
+            SparseResult(
+                chunk_index=0,
+                chunk_id=f"{kb_id}-sparse",
+                doc_id=f"doc-{kb_id}",
+                kb_id=kb_id,
+                content="",
+                score=1.0,
+                rank=1,
+            ),
+        ]
+
+
+class PassthroughFusion:
+    async def fuse(self, dense_results, sparse_results, top_k):
+        return [
+            SimpleNamespace(
+                chunk_id=result.data["doc_id"],
+                doc_id=json.loads(result.data["metadata"])["kb_doc_id"],
+                kb_id=json.loads(result.data["metadata"])["kb_id"],
+                content=result.data["text"],
+                score=result.similarity,
+                chunk_index=0,
+            )
+            for result in dense_results
+        ][:top_k]
+
+
+class MetadataDB:
+    async def get_documents_with_metadata_batch(self, doc_ids):
+        return {
+            doc_id: {
+                "document": SimpleNamespace(doc_name=doc_id),
+                "knowledge_base": SimpleNamespace(kb_name="kb"),
+            }
+            for doc_id in doc_ids
+        }
+
+
+def make_helpers(delays: dict[str, float], tracker: dict) -> dict:
+    return {
+        kb_id: SimpleNamespace(
+            kb=SimpleNamespace(
+                top_k_dense=5,
+                top_k_sparse=5,
+                top_m_final=5,
+                rerank_provider_id=None,
+            ),
+            vec_db=SlowVecDB(kb_id, delay, tracker),
+        )
+        for kb_id, delay in delays.items()
+    }
+
+
+@pytest.mark.asyncio
+async def test_retrieve_fans_out_dense_retrieval_under_concurrency_cap():
+    tracker = {"running": 0, "peak": 0}
+    helpers = make_helpers({f"kb-{i}": 0.05 for i in range(6)}, tracker)
+    manager = RetrievalManager(
+        sparse_retriever=RecordingSparseRetriever(),
+        rank_fusion=PassthroughFusion(),
+        kb_db=MetadataDB(),
+    )
+
+    metrics = []
+    results = await manager.retrieve(
+        query="q",
+        kb_ids=list(helpers),
+        kb_id_helper_map=helpers,
+        top_m_final=10,
+        plan=RetrievalPlan(max_concurrency=2),
+        stage_metrics=metrics,
+    )
+
+    assert len(results) == 6
+    assert tracker["peak"] == 2
+    stages = {metric.stage: metric for metric in metrics}
+    assert {"dense", "sparse", "fusion"} <= set(stages)
+    assert stages["dense"].result_count == 6
+    assert stages["dense"].kb_count == 6
+
+
+@pytest.mark.asyncio
+async def test_retrieve_skips_timed_out_kbs_and_keeps_completed_results():
+    tracker = {"running": 0, "peak": 0}
+    helpers = make_helpers({"fast": 0.0, "slow": 5.0}, tracker)
+    sparse = RecordingSparseRetriever({"slow": 5.0})
+    manager = RetrievalManager(
+        sparse_retriever=sparse,
+        rank_fusion=PassthroughFusion(),
+        kb_db=MetadataDB(),
+    )
+
+    metrics = []
+    results = await asyncio.wait_for(
+        manager.retrieve(
+            query="q",
+            kb_ids=["fast", "slow"],
+            kb_id_helper_map=helpers,
+            plan=RetrievalPlan(dense_timeout=0.1, sparse_timeout=0.1),
+            stage_metrics=metrics,
+        ),
+        timeout=2,
+    )
+
+    assert [result.kb_id for result in results] == ["fast"]
+    assert sparse.started.is_set()
+    stages = {metric.stage: metric for metric in metrics}
+    assert stages["dense"].timed_out_kb_ids == ["slow"]
+    # Sparse retrieval also skips only the KBs that timed out.
+    assert stages["sparse"].timed_out_kb_ids == ["slow"]
+    assert stages["sparse"].result_count == 1
+
+
+def test_retrieval_plan_from_config():
+    plan = RetrievalPlan.from_config(
+        {"kb_retrieval_concurrency": 0, "kb_retrieval_timeout": 3},
+    )
+
+    assert plan.max_concurrency == 1
+    assert plan.dense_timeout == plan.sparse_timeout == plan.rerank_timeout == 3.0
@@ -52,19 +52,23 @@ class FTSStorage:
 class FallbackStorage:
     def __init__(self):
         self.search_sparse_calls = 0
+        self.search_bm25_calls = 0
         self.get_documents_calls = 0
 
     async def search_sparse(self, query_tokens: list[str], limit: int):
         self.search_sparse_calls += 1
         return None
 
-    async def get_documents(self, metadata_filters: dict, limit: int | None, offset):
-        self.get_documents_calls += 1
+    async def search_bm25(self, query_tokens: list[str], limit: int):
+        self.search_bm25_calls += 1
+        assert query_tokens == ["apple"]
         return [
-            make_doc("chunk-1", "apple banana", 0),
-            make_doc("chunk-2", "orange pear", 1),
-            make_doc("chunk-3", "grape melon", 2),
-        ]
+            {**make_doc("chunk-1", "apple banana", 0), "score": -2.0},
+        ][:limit]
+
+    async def get_documents(self, *args, **kwargs):
+        self.get_documents_calls += 1
+        return []
 
 
 class StaticFTSStorage:
@@ -100,10 +104,13 @@ def test_sparse_retriever_module_import_does_not_load_bm25(monkeypatch):
 
 
 @pytest.mark.asyncio
-async def test_sparse_retriever_falls_back_to_bm25_when_fts5_is_unavailable():
+async def test_sparse_retriever_falls_back_to_bm25_when_fts5_is_unavailable(
+    monkeypatch,
+):
     storage = FallbackStorage()
     vec_db = SimpleNamespace(document_storage=storage)
     retriever = SparseRetriever(kb_db=None)
+    monkeypatch.setitem(sys.modules, "rank_bm25", None)
 
     results = await retriever.retrieve(
         query="apple",
@@ -112,8 +119,10 @@ async def test_sparse_retriever_falls_back_to_bm25_when_fts5_is_unavailable():
     )
 
     assert [result.chunk_id for result in results] == ["chunk-1"]
+    assert results[0].rank == 1
     assert storage.search_sparse_calls == 1
-    assert storage.get_documents_calls == 1
+    assert storage.search_bm25_calls == 1
+    assert storage.get_documents_calls == 0
 
 
 @pytest.mark.asyncio
@@ -64,6 +64,7 @@ async def test_get_stat_aggregates_platform_stats(temp_db):
         "cpu_percent",
         "thread_count",
         "start_time",
+        "event_dispatch",
     }
 
 
@@ -78,3 +79,74 @@ async def test_get_stat_empty_window(temp_db):
     assert result["platform"] == []
     assert result["message_count"] == 4
     assert all(count == 0 for _, count in result["message_time_series"])
+
+
+async def _insert_llm_call(db, *, umo, provider_id, model, status, output, ttft):
+    await db.insert_provider_stat(
+        umo=umo,
+        provider_id=provider_id,
+        provider_model=model,
+        status=status,
+        stats={
+            "token_usage": {"input_other": 10, "input_cached": 5, "output": output},
+            "start_time": 100.0,
+            "end_time": 102.0,
+            "time_to_first_token": ttft,
+        },
+    )
+
+
+@pytest.mark.asyncio
+async def test_provider_token_stats_read_incremental_rollups(temp_db):
+    """Provider stats are rolled up on insert and served from the rollup rows."""
+    for index in range(4):
+        await _insert_llm_call(
+            temp_db,
+            umo=f"qq:FriendMessage:{index % 2}",
+            provider_id="openai",
+            model="gpt-4.1",
+            status="error" if index == 3 else "completed",
+            output=20,
+            ttft=0.5,
+        )
+    await _insert_llm_call(
+        temp_db,
+        umo="qq:FriendMessage:0",
+        provider_id="claude",
+        model="",
+        status="completed",
+        output=100,
+        ttft=1.5,
+    )
+
+    service = _make_service(temp_db)
+    result = await service.get_provider_token_stats(1)
+
+    assert result["period"] == "hour"
+    assert result["range_total_calls"] == 5
+    assert result["range_total_tokens"] == 4 * 35 + 115
+    assert result["range_success_rate"] == pytest.approx(0.8)
+    assert result["range_avg_ttft_ms"] == pytest.approx(700)
+    assert result["range_avg_duration_ms"] == pytest.approx(2000)
+    assert result["range_ttft_percentiles_ms"]["p50"] == pytest.approx(500, rel=0.07)
+    assert result["range_ttft_percentiles_ms"]["p99"] == pytest.approx(1500, rel=0.07)
+    assert result["range_by_provider"] == [
+        {"provider_id": "openai", "tokens": 140},
+        {"provider_id": "claude", "tokens": 115},
+    ]
+    assert result["range_by_umo"] == [
+        {"umo": "qq:FriendMessage:0", "tokens": 185},
+        {"umo": "qq:FriendMessage:1", "tokens": 70},
+    ]
+    assert result["today_total_calls"] == 5
+    assert {item["provider_model"] for item in result["today_by_model"]} == {
+        "gpt-4.1",
+        "Unknown",
+    }
+    assert sum(point[1] for point in result["trend"]["total_series"]) == 255
+
+    monthly = await service.get_provider_token_stats(30)
+    assert monthly["period"] == "day"
+    assert len(monthly["trend"]["total_series"]) == 30
+    assert monthly["trend"]["total_series"][-1][1] == 255
+    assert monthly["range_total_calls"] == 5
@@ -0,0 +1,150 @@
+import asyncio
+import os
+
+import pytest
+
+from astrbot.core.pipeline.result_decorate import tts_synthesis
+from astrbot.core.utils.tts_audio_cache import TTSAudioCache
+
+
+class FakeTTSProvider:
+    def __init__(self, tmp_path, delay: float = 0.01, stream: bool = False):
+        self.provider_config = {"id": "tts", "voice": "alloy"}
+        self.tmp_path = tmp_path
+        self.delay = delay
+        self.stream = stream
+        self.requests: list[str] = []
+        self.active = 0
+        self.max_active = 0
+
+    def support_stream(self) -> bool:
+        return self.stream
+
+    async def get_audio(self, text: str) -> str:
+        self.requests.append(text)
+        path = self.tmp_path / f"out_{len(self.requests)}.wav"
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        await asyncio.sleep(self.delay)
+        self.active -= 1
+        path.write_bytes(text.encode())
+        return str(path)
+
+    async def get_audio_stream(self, text_queue, audio_queue) -> None:
+        while (text := await text_queue.get()) is not None:
+            self.requests.append(text)
+            await asyncio.sleep(self.delay)
+            await audio_queue.put((text, text.encode()))
+        await audio_queue.put(None)
+
+
+@pytest.fixture
+def audio_cache(tmp_path, monkeypatch):
+    cache = TTSAudioCache(cache_dir=str(tmp_path / "cache"))
+    monkeypatch.setattr(tts_synthesis, "tts_audio_cache", cache)
+    monkeypatch.setattr(
+        tts_synthesis,
+        "get_astrbot_temp_path",
+        lambda: str(tmp_path / "temp"),
+    )
+    return cache
+
+
+def _read(path: str) -> str:
+    with open(path, "rb") as f:
+        return f.read().decode()
+
+
+@pytest.mark.asyncio
+async def test_segments_are_synthesized_concurrently_in_order(tmp_path, audio_cache):
+    provider = FakeTTSProvider(tmp_path)
+    texts = [f"segment {i}" for i in range(6)]
+
+    paths = await asyncio.gather(
+        *tts_synthesis.synthesize_segments(provider, texts, concurrency=3),
+    )
+
+    assert [_read(path) for path in paths] == texts
+    assert provider.max_active == 3
+
+
+@pytest.mark.asyncio
+async def test_repeated_phrases_are_served_from_cache(tmp_path, audio_cache):
+    provider = FakeTTSProvider(tmp_path)
+    await asyncio.gather(*tts_synthesis.synthesize_segments(provider, ["你好"], 3))
+
+    paths = await asyncio.gather(
+        *tts_synthesis.synthesize_segments(provider, ["你好", "再见"], 3),
+    )
+
+    assert provider.requests == ["你好", "再见"]
+    assert _read(paths[0]) == "你好"
+    assert audio_cache.stats()["hits"] == 1
+
+    provider.provider_config["voice"] = "echo"
+    await asyncio.gather(*tts_synthesis.synthesize_segments(provider, ["你好"], 3))
+    assert provider.requests == ["你好", "再见", "你好"]
+
+
+@pytest.mark.asyncio
+async def test_stream_provider_resolves_first_segment_early(tmp_path, audio_cache):
+    provider = FakeTTSProvider(tmp_path, delay=0.05, stream=True)
+    texts = ["one", "two", "three"]
+
+    futures = tts_synthesis.synthesize_segments(provider, texts, concurrency=3)
+    first = await futures[0]
+
+    assert _read(first) == "one"
+    assert not futures[2].done()
+    rest = await asyncio.gather(*futures[1:])
+    assert [_read(path) for path in rest] == ["two", "three"]
+
+
+class JoiningStreamProvider(FakeTTSProvider):
+    """Streams like the base provider: one clip for all text, one segment dropped."""
+
+    async def get_audio_stream(self, text_queue, audio_queue) -> None:
+        texts = []
+        while (text := await text_queue.get()) is not None:
+            texts.append(text)
+        await audio_queue.put(("".join(texts), b"joined"))
+        await audio_queue.put((texts[0], texts[0].encode()))
+        await audio_queue.put(None)
+
+
+@pytest.mark.asyncio
+async def test_stream_items_are_matched_by_text_with_per_segment_fallback(
+    tmp_path,
+    audio_cache,
+):
+    provider = JoiningStreamProvider(tmp_path, stream=True)
+    texts = ["one", "two", "three"]
+
+    paths = await asyncio.gather(
+        *tts_synthesis.synthesize_segments(provider, texts, concurrency=3),
+    )
+
+    assert [_read(path) for path in paths] == texts
+    # "two" and "three" had no matching stream item and used get_audio.
+    assert provider.requests == ["two", "three"]
+    cached = await audio_cache.get(audio_cache.make_key(provider, "two"))
+    assert _read(cached) == "two"
+
+
+@pytest.mark.asyncio
+async def test_audio_cache_evicts_least_recently_used(tmp_path):
+    cache = TTSAudioCache(cache_dir=str(tmp_path / "cache"), max_bytes=10)
+    for name in ("a", "b", "c"):
+        src = tmp_path / f"{name}.wav"
+        src.write_bytes(b"12345")
+        await cache.put(name, str(src))
+        if name == "b":
+            assert await cache.get("a") is not None
+
+    assert await cache.get("b") is None
+    assert os.path.exists(tmp_path / "cache" / "a.wav")
+    assert not os.path.exists(tmp_path / "cache" / "b.wav")
+
+    restarted = TTSAudioCache(cache_dir=str(tmp_path / "cache"), max_bytes=10)
+    await restarted.initialize()
+    assert restarted.stats()["size"] == 2
@@ -54,7 +54,7 @@ async def test_waking_check_enforces_api_key_admin_authorization(
     )
     monkeypatch.setattr(
         star_handlers_registry,
-        "get_handlers_by_event_type",
+        "get_message_handler_candidates",
         lambda *_args, **_kwargs: [],
     )
 
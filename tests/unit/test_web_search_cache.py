@@ -0,0 +1,137 @@
+import asyncio
+
+import pytest
+
+from astrbot.core.utils.web_search_cache import WebSearchCache
+
+
+def _counting_producer(value):
+    calls = []
+
+    async def produce():
+        calls.append(1)
+        await asyncio.sleep(0)
+        return value
+
+    return produce, calls
+
+
+def test_key_ignores_key_order_whitespace_and_empty_fields():
+    key = WebSearchCache.make_key("tavily_search", {"query": "a  b", "topic": "news"})
+    assert key == WebSearchCache.make_key(
+        "tavily_search", {"topic": "news", "query": " a b ", "days": None}
+    )
+    assert key != WebSearchCache.make_key("bocha_search", {"query": "a b"})
+    assert key != WebSearchCache.make_key(
+        "tavily_search", {"query": "a b", "topic": "general"}
+    )
+
+
+@pytest.mark.asyncio
+async def test_repeated_request_hits_cache(tmp_path):
+    cache = WebSearchCache(cache_dir=str(tmp_path))
+    produce, calls = _counting_producer([{"url": "https://example.com"}])
+
+    for _ in range(3):
+        result = await cache.fetch("exa_search", {"query": "q"}, produce)
+
+    assert result == [{"url": "https://example.com"}]
+    assert len(calls) == 1
+    assert cache.stats()["hits"] == 2
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_requests_are_coalesced(tmp_path):
+    cache = WebSearchCache(cache_dir=str(tmp_path))
+    release = asyncio.Event()
+    calls = []
+
+    async def produce():
+        calls.append(1)
+        await release.wait()
+        return ["result"]
+
+    tasks = [
+        asyncio.create_task(cache.fetch("exa_search", {"query": "q"}, produce))
+        for _ in range(5)
+    ]
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await asyncio.gather(*tasks) == [["result"]] * 5
+    assert len(calls) == 1
+    assert cache.stats()["coalesced"] == 4
+
+
+@pytest.mark.asyncio
+async def test_cancelled_leader_does_not_cancel_waiters(tmp_path):
+    cache = WebSearchCache(cache_dir=str(tmp_path))
+    started = asyncio.Event()
+    release = asyncio.Event()
+    calls = []
+
+    async def produce():
+        calls.append(1)
+        started.set()
+        await release.wait()
+        return ["result"]
+
+    leader = asyncio.create_task(cache.fetch("exa_search", {"query": "q"}, produce))
+    await started.wait()
+    waiter = asyncio.create_task(cache.fetch("exa_search", {"query": "q"}, produce))
+    await asyncio.sleep(0)
+    leader.cancel()
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await waiter == ["result"]
+    assert leader.cancelled()
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_failures_and_empty_results_are_not_cached(tmp_path):
+    cache = WebSearchCache(cache_dir=str(tmp_path))
+
+    async def fail():
+        raise RuntimeError("quota exceeded")
+
+    with pytest.raises(RuntimeError):
+        await cache.fetch("exa_search", {"query": "q"}, fail)
+
+    produce, calls = _counting_producer([])
+    await cache.fetch("exa_search", {"query": "q"}, produce)
+    await cache.fetch("exa_search", {"query": "q"}, produce)
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_expired_entries_are_fetched_again(tmp_path):
+    cache = WebSearchCache(cache_dir=str(tmp_path), ttl=60)
+    produce, calls = _counting_producer(["result"])
+    await cache.fetch("exa_search", {"query": "q"}, produce)
+
+    key = cache.make_key("exa_search", {"query": "q"})
+    created_at, path = cache._entries._data[key]
+    cache._entries._data[key] = (created_at - 120, path)
+    await cache.fetch("exa_search", {"query": "q"}, produce)
+
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_entries_survive_restart_and_are_bounded(tmp_path):
+    cache = WebSearchCache(cache_dir=str(tmp_path), max_entries=2)
+    for query in ("a", "b", "c"):
+        produce, _ = _counting_producer([query])
+        await cache.fetch("exa_search", {"query": query}, produce)
+
+    assert cache.stats()["evictions"] == 1
+    assert len(list(tmp_path.glob("*.json"))) == 2
+
+    restored = WebSearchCache(cache_dir=str(tmp_path), max_entries=2)
+    await restored.initialize()
+    produce, calls = _counting_producer(["fresh"])
+    assert await restored.fetch("exa_search", {"query": "c"}, produce) == ["c"]
+    assert await restored.fetch("exa_search", {"query": "a"}, produce) == ["fresh"]
+    assert len(calls) == 1
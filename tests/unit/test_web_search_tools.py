@@ -4,6 +4,7 @@ from types import SimpleNamespace
 import pytest
 
 from astrbot.core.tools import web_search_tools as tools
+from astrbot.core.utils.web_search_cache import WebSearchCache
 
 
 class _FakeConfig(dict):
@@ -84,7 +85,7 @@ async def test_firecrawl_search_maps_v2_data_list(monkeypatch):
         session.trust_env = trust_env
         return session
 
-    monkeypatch.setattr(tools.aiohttp, "ClientSession", fake_client_session)
+    monkeypatch.setattr(tools.http_client, "session", fake_client_session)
 
     results = await tools._firecrawl_search(
         {"websearch_firecrawl_key": ["firecrawl-key"]},
@@ -130,7 +131,7 @@ async def test_firecrawl_search_maps_v2_grouped_web_data(monkeypatch):
         session.trust_env = trust_env
         return session
 
-    monkeypatch.setattr(tools.aiohttp, "ClientSession", fake_client_session)
+    monkeypatch.setattr(tools.http_client, "session", fake_client_session)
 
     results = await tools._firecrawl_search(
         {"websearch_firecrawl_key": ["firecrawl-key"]},
@@ -222,7 +223,7 @@ async def test_firecrawl_search_uses_session_context(monkeypatch):
         session.trust_env = trust_env
         return session
 
-    monkeypatch.setattr(tools.aiohttp, "ClientSession", fake_client_session)
+    monkeypatch.setattr(tools.http_client, "session", fake_client_session)
 
     await tools._firecrawl_search(
         {"websearch_firecrawl_key": ["firecrawl-key"]},
@@ -252,7 +253,7 @@ async def test_firecrawl_search_raises_error_for_http_errors(monkeypatch):
         session.trust_env = trust_env
         return session
 
-    monkeypatch.setattr(tools.aiohttp, "ClientSession", fake_client_session)
+    monkeypatch.setattr(tools.http_client, "session", fake_client_session)
 
     with pytest.raises(
         Exception,
@@ -284,7 +285,7 @@ async def test_firecrawl_scrape_uses_request_setup(monkeypatch):
         session.trust_env = trust_env
         return session
 
-    monkeypatch.setattr(tools.aiohttp, "ClientSession", fake_client_session)
+    monkeypatch.setattr(tools.http_client, "session", fake_client_session)
 
     result = await tools._firecrawl_scrape(
         {"websearch_firecrawl_key": ["firecrawl-key"]},
@@ -315,7 +316,7 @@ async def test_firecrawl_scrape_raises_error_for_http_errors(monkeypatch):
         session.trust_env = trust_env
         return session
 
-    monkeypatch.setattr(tools.aiohttp, "ClientSession", fake_client_session)
+    monkeypatch.setattr(tools.http_client, "session", fake_client_session)
 
     with pytest.raises(
         Exception,
@@ -432,6 +433,14 @@ def _resetKeyRotators():
     tools._FIRECRAWL_KEY_ROTATOR.index = 0
 
 
+@pytest.fixture(autouse=True)
+def _isolated_web_search_cache(monkeypatch, tmp_path):
+    """Give every test an empty result cache outside the data directory."""
+    cache = WebSearchCache(cache_dir=str(tmp_path / "web_search_cache"))
+    monkeypatch.setattr(tools, "web_search_cache", cache)
+    return cache
+
+
 # ---------------------------------------------------------------------------
 # Issue #8886: Tavily key rotation did not fail over to the next key.
 # ---------------------------------------------------------------------------
@@ -462,7 +471,11 @@ async def test_tavily_search_key_failover_on_quota_exceeded_432(
                 status=200,
                 jsonData={
                     "results": [
-                        {"title": "AstrBot", "url": "https://example.com", "content": "OK"}
+                        {
+                            "title": "AstrBot",
+                            "url": "https://example.com",
+                            "content": "OK",
+                        }
                     ]
                 },
             ),
@@ -473,7 +486,7 @@ async def test_tavily_search_key_failover_on_quota_exceeded_432(
         session.trust_env = trust_env
         return session
 
-    monkeypatch.setattr(tools.aiohttp, "ClientSession", fakeClientSession)
+    monkeypatch.setattr(tools.http_client, "session", fakeClientSession)
 
     providerSettings = {"websearch_tavily_key": ["bad-key", "good-key"]}
 
@@ -500,7 +513,11 @@ async def test_tavily_search_key_failover_on_rate_limited_429(
                 status=200,
                 jsonData={
                     "results": [
-                        {"title": "RateLimitOK", "url": "https://example2.com", "content": "OK"}
+                        {
+                            "title": "RateLimitOK",
+                            "url": "https://example2.com",
+                            "content": "OK",
+                        }
                     ]
                 },
             ),
@@ -511,7 +528,7 @@ async def test_tavily_search_key_failover_on_rate_limited_429(
         session.trust_env = trust_env
         return session
 
-    monkeypatch.setattr(tools.aiohttp, "ClientSession", fakeClientSession)
+    monkeypatch.setattr(tools.http_client, "session", fakeClientSession)
 
     providerSettings = {"websearch_tavily_key": ["rate-limited-key", "good-key"]}
 
@@ -545,7 +562,7 @@ async def test_tavily_search_fails_when_all_keys_exhausted_8886(
         session.trust_env = trust_env
         return session
 
-    monkeypatch.setattr(tools.aiohttp, "ClientSession", fakeClientSession)
+    monkeypatch.setattr(tools.http_client, "session", fakeClientSession)
 
     providerSettings = {"websearch_tavily_key": ["bad-key-1", "bad-key-2"]}
 
@@ -584,7 +601,7 @@ async def test_tavily_search_does_not_failover_on_server_error_500(
         session.trust_env = trust_env
         return session
 
-    monkeypatch.setattr(tools.aiohttp, "ClientSession", fakeClientSession)
+    monkeypatch.setattr(tools.http_client, "session", fakeClientSession)
 
     providerSettings = {"websearch_tavily_key": ["key-1", "key-2"]}
 
@@ -731,7 +748,7 @@ async def test_exa_search_raw_api_call(monkeypatch):
         session.trust_env = trust_env
         return session
 
-    monkeypatch.setattr(tools.aiohttp, "ClientSession", fake_client_session)
+    monkeypatch.setattr(tools.http_client, "session", fake_client_session)
 
     results = await tools._exa_search(
         {"websearch_exa_key": ["exa-key"]},
@@ -747,6 +764,35 @@ async def test_exa_search_raw_api_call(monkeypatch):
     ]
 
 
+@pytest.mark.asyncio
+async def test_exa_search_serves_repeated_query_from_cache(monkeypatch):
+    posts = []
+
+    def fake_client_session(*, trust_env):
+        session = _FakeFirecrawlSession(
+            _FakeFirecrawlResponse(
+                status=200,
+                json_data={
+                    "results": [
+                        {"title": "AstrBot", "url": "https://example.com", "text": "x"}
+                    ],
+                },
+            )
+        )
+        posts.append(session)
+        return session
+
+    monkeypatch.setattr(tools.http_client, "session", fake_client_session)
+    provider_settings = {"websearch_exa_key": ["exa-key"]}
+
+    first = await tools._exa_search(provider_settings, {"query": "AstrBot"})
+    second = await tools._exa_search(provider_settings, {"query": "  AstrBot "})
+
+    assert len(posts) == 1
+    assert first == second
+    assert isinstance(second[0], tools.SearchResult)
+
+
 @pytest.mark.asyncio
 async def test_exa_search_raises_on_http_error(monkeypatch):
     session = _FakeFirecrawlSession(
@@ -757,7 +803,7 @@ async def test_exa_search_raises_on_http_error(monkeypatch):
         session.trust_env = trust_env
         return session
 
-    monkeypatch.setattr(tools.aiohttp, "ClientSession", fake_client_session)
+    monkeypatch.setattr(tools.http_client, "session", fake_client_session)
 
     with pytest.raises(
         Exception,
@@ -795,7 +841,7 @@ async def test_exa_get_contents_raises_on_http_error(monkeypatch):
         session.trust_env = trust_env
         return session
 
-    monkeypatch.setattr(tools.aiohttp, "ClientSession", fake_client_session)
+    monkeypatch.setattr(tools.http_client, "session", fake_client_session)
 
     with pytest.raises(
         Exception,